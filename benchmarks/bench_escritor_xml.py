@@ -0,0 +1,85 @@
+"""
+Benchmark: hoja PRODUCCION con openpyxl (normal y streaming) vs XML directo.
+
+Genera N registros sintéticos de producción y escribe solo la hoja
+PRODUCCION en un .xlsx con cada escritor: openpyxl con Workbook normal,
+openpyxl write-only y EscritorXML (src/escritor_xml.py: textos y fórmulas
+compartidas, sin objetos Cell). Cada modo corre en un subproceso para medir
+su memoria pico por separado; al final se muestra el speedup contra el
+primer modo.
+
+Uso:
+    python benchmarks/bench_escritor_xml.py --filas 200000
+    python benchmarks/bench_escritor_xml.py --filas 1000000 --modos streaming xml
+"""
+import argparse
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from bench_streaming import registros_sinteticos  # noqa: E402
+
+MODOS = ["normal", "streaming", "xml"]
+
+
+def correr_modo(modo, filas):
+    """Escribe solo la hoja PRODUCCION con `filas` registros y reporta métricas"""
+    from openpyxl import Workbook
+    from src.escritor_xml import LibroXML
+    from src.sheets.produccion import crear_hoja_produccion
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.xlsx")
+        inicio = time.perf_counter()
+        wb = Workbook(write_only=(modo == "streaming"))
+        if modo != "streaming":
+            wb.remove(wb.active)
+        libro = LibroXML(wb, ruta) if modo == "xml" else None
+        crear_hoja_produccion(wb, datos_produccion=registros_sinteticos(filas))
+        if libro:
+            libro.guardar()
+        else:
+            wb.save(ruta)
+        segundos = time.perf_counter() - inicio
+        tamano = os.path.getsize(ruta)
+    # ru_maxrss está en KB en Linux
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{modo:<10} filas={filas:>9,}  tiempo={segundos:8.2f}s  "
+          f"memoria_pico={pico_mb:8.1f} MB  archivo={tamano / 1e6:6.1f} MB  "
+          f"({filas / segundos:,.0f} filas/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--modos", nargs="+", default=MODOS, choices=MODOS)
+    parser.add_argument("--interno", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        correr_modo(args.interno, args.filas)
+        return
+
+    tiempos = {}
+    for modo in args.modos:
+        salida = subprocess.run(
+            [sys.executable, __file__, "--filas", str(args.filas), "--interno", modo],
+            check=True, cwd=RAIZ, capture_output=True, text=True
+        ).stdout
+        print(salida, end="")
+        tiempos[modo] = float(re.search(r"tiempo=\s*([0-9.]+)s", salida).group(1))
+    base = args.modos[0]
+    for modo in args.modos[1:]:
+        print(f"{modo} vs {base}: x{tiempos[base] / tiempos[modo]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
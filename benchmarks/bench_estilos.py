@@ -0,0 +1,117 @@
+"""
+Benchmark: estilos con nombre (NamedStyle) vs una revisión de referencia.
+
+Mide tiempo y memoria pico de ModeloTDABC.generar_archivo para el árbol
+actual y para una revisión git de referencia, que se extrae en un worktree
+temporal. Por defecto es REFERENCIA, la última revisión que estilaba cada
+celda con objetos Font/PatternFill/Border propios (antes de los NamedStyle),
+así que el resultado no depende de dónde esté el commit en la historia. Con --filas > 0 mide además la hoja
+PRODUCCION con N registros sintéticos, que es donde domina el costo de
+estilar celdas. Cada medición corre en un subproceso separado.
+
+Uso:
+    python benchmarks/bench_estilos.py
+    python benchmarks/bench_estilos.py --referencia fcf8053 --filas 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Última revisión sin estilos con nombre (modo streaming recién agregado)
+REFERENCIA = "e32f0b5d341bc798ee2e2a3c878df0d79c92148a"
+
+
+def _medir(etiqueta, funcion):
+    """Ejecuta `funcion` y reporta tiempo, pico de tracemalloc y RSS"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico_py = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss está en KB en Linux
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{etiqueta:<28} tiempo={segundos:8.2f}s  "
+          f"memoria_python={pico_py / 1e6:8.1f} MB  rss_pico={pico_rss:8.1f} MB")
+
+
+def correr(raiz, etiqueta, prueba, filas):
+    """Corre una prueba importando el paquete `src` desde `raiz`"""
+    sys.path.insert(0, raiz)
+    random.seed(2024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.xlsx")
+
+        if prueba == "modelo":
+            from src.modelo_tdabc import ModeloTDABC
+
+            def generar():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ModeloTDABC().generar_archivo(ruta)
+        else:
+            from openpyxl import Workbook
+            from src.sheets.produccion import crear_hoja_produccion
+            sys.path.insert(0, str(RAIZ / "benchmarks"))
+            from bench_streaming import registros_sinteticos
+
+            def generar():
+                wb = Workbook()
+                wb.remove(wb.active)
+                crear_hoja_produccion(wb, datos_produccion=registros_sinteticos(filas))
+                wb.save(ruta)
+
+        _medir(f"{etiqueta} [{prueba}]", generar)
+
+
+@contextlib.contextmanager
+def worktree(revision):
+    """Extrae `revision` en un worktree temporal y lo elimina al salir"""
+    tmp = tempfile.mkdtemp(prefix="tdabc_ref_")
+    subprocess.run(["git", "worktree", "add", "--detach", tmp, revision],
+                   check=True, cwd=RAIZ, stdout=subprocess.DEVNULL)
+    try:
+        yield tmp
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", tmp],
+                       check=True, cwd=RAIZ)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--referencia", default=REFERENCIA,
+                        help="revisión git contra la cual comparar (por defecto la última sin estilos con nombre)")
+    parser.add_argument("--filas", type=int, default=50_000,
+                        help="registros de PRODUCCION para la prueba pesada (0 = omitir)")
+    parser.add_argument("--interno", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        raiz, etiqueta, prueba = args.interno
+        correr(raiz, etiqueta, prueba, args.filas)
+        return
+
+    pruebas = ["modelo"] + (["produccion"] if args.filas > 0 else [])
+    with worktree(args.referencia) as ref:
+        for prueba in pruebas:
+            for raiz, etiqueta in ((ref, args.referencia[:10]), (str(RAIZ), "actual")):
+                subprocess.run(
+                    [sys.executable, __file__, "--filas", str(args.filas),
+                     "--interno", raiz, etiqueta, prueba],
+                    check=True, cwd=raiz
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark: libro completo con las hojas en secuencia vs en procesos separados.
+
+Guarda N registros sintéticos de producción en un AlmacenSQL temporal y
+genera el modelo leyendo ese periodo, primero en un solo proceso y luego con
+generar_archivo(procesos=P) (cada hoja en un proceso y ensamblado final).
+Con varios núcleos el tiempo paralelo debería acercarse al de la hoja más
+lenta (PRODUCCION) más el ensamblado.
+
+Uso:
+    python benchmarks/bench_hojas_paralelas.py --filas 200000
+    python benchmarks/bench_hojas_paralelas.py --filas 500000 --procesos 4 --streaming
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from bench_streaming import registros_sinteticos  # noqa: E402
+
+PERIODO = "2025-01"
+
+
+def main():
+    from src.almacen_sql import AlmacenSQL
+    from src.modelo_tdabc import ModeloTDABC
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--streaming", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = AlmacenSQL(os.path.join(tmp, "bench.sqlite"))
+        almacen.guardar_produccion(registros_sinteticos(args.filas), PERIODO)
+        for nombre, procesos in (("secuencial", None), (f"{args.procesos} procesos", args.procesos)):
+            ruta = os.path.join(tmp, f"{nombre}.xlsx")
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ModeloTDABC().generar_archivo(ruta, streaming=args.streaming, almacen=almacen,
+                                              periodo=PERIODO, procesos=procesos)
+            segundos = time.perf_counter() - inicio
+            print(f"{nombre:<12} filas={args.filas:>9,}  tiempo={segundos:8.2f}s  "
+                  f"archivo={os.path.getsize(ruta) / 1e6:6.1f} MB")
+        almacen.cerrar()
+
+
+if __name__ == "__main__":
+    main()
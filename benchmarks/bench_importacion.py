@@ -0,0 +1,77 @@
+"""
+Benchmark: importación de producción completa vs por bloques.
+
+Simula un export de citas con SimuladorCitas (una fila por cita) y lo importa
+con ImportadorProduccion.cargar_desde_csv (todo el archivo en memoria) y con
+cargar_desde_csv_por_bloques (agregados acumulados). Cada modo corre en un
+subproceso separado para que la memoria pico (RSS) no se contamine.
+
+Uso:
+    python benchmarks/bench_importacion.py --meses 12
+    python benchmarks/bench_importacion.py --meses 12 --multiplicador 10 --modos bloques
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def correr_modo(modo, ruta, tamano_bloque):
+    """Importa `ruta` con el modo indicado y reporta métricas"""
+    from src.importador_produccion import ImportadorProduccion
+
+    importador = ImportadorProduccion()
+    inicio = time.perf_counter()
+    if modo == "bloques":
+        exito = importador.cargar_desde_csv_por_bloques(ruta, tamano_bloque=tamano_bloque)
+    else:
+        exito = importador.cargar_desde_csv(ruta)
+    registros = sum(1 for _ in importador.iterar_datos_produccion())
+    segundos = time.perf_counter() - inicio
+    if not exito:
+        raise SystemExit(importador.obtener_reporte())
+    # ru_maxrss está en KB en Linux
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{modo:<10} tiempo={segundos:8.2f}s  memoria_pico={pico_mb:8.1f} MB  "
+          f"registros_resultantes={registros:>9,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--meses", type=int, default=12)
+    parser.add_argument("--multiplicador", type=float, default=1.0,
+                        help="factor sobre el volumen mensual configurado")
+    parser.add_argument("--tamano-bloque", type=int, default=100_000)
+    parser.add_argument("--modos", nargs="+", default=["completa", "bloques"],
+                        choices=["completa", "bloques"])
+    parser.add_argument("--interno", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        correr_modo(args.interno[0], args.interno[1], args.tamano_bloque)
+        return
+
+    from src.generators.simulador_citas import SimuladorCitas
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "citas.csv")
+        filas = SimuladorCitas.desde_config(meses=args.meses, multiplicador_volumen=args.multiplicador,
+                                            semilla=2024).a_csv(ruta)
+        print(f"export simulado: {filas:,} citas, {os.path.getsize(ruta) / 1e6:.1f} MB")
+        for modo in args.modos:
+            subprocess.run(
+                [sys.executable, __file__, "--tamano-bloque", str(args.tamano_bloque),
+                 "--interno", modo, ruta],
+                check=True, cwd=RAIZ
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: motores de lectura de Excel para los importadores.
+
+Genera un auxiliar contable sintético (columnas del export real de
+ImportadorContabilidad.MAPEO_COLUMNAS más columnas que el importador no usa)
+y mide cuánto tarda en leerse con:
+
+- pd.read_excel sin restricciones (lectura anterior de los importadores)
+- cada motor de src/lector_excel.py disponible, leyendo solo las columnas
+  del mapeo
+
+Uso:
+    python benchmarks/bench_lector_excel.py --filas 500000
+    python benchmarks/bench_lector_excel.py --archivo auxiliar.xlsx   # reutiliza un archivo
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+# Columnas del export que el importador no usa
+COLUMNAS_EXTRA = ['Docto.', 'Fecha docto.', 'Detalle', 'Base', 'Nro. cruce', 'Usuario', 'Notas']
+
+
+def generar_auxiliar(ruta, filas):
+    """Escribe el auxiliar sintético en modo write-only (memoria acotada)"""
+    import numpy as np
+    from openpyxl import Workbook
+    from src.importador_contabilidad import ImportadorContabilidad
+
+    rng = np.random.default_rng(2024)
+    centros = [("001", "SEDE NORTE"), ("002", "SEDE SUR"), ("003", "SEDE CENTRO")]
+    cuentas = [(73130601 + i, f"CUENTA {i:03d}") for i in range(120)]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Auxiliar")
+    ws.append(list(ImportadorContabilidad.MAPEO_COLUMNAS) + COLUMNAS_EXTRA)
+    cuenta_idx = rng.integers(0, len(cuentas), filas)
+    centro_idx = rng.integers(0, len(centros), filas)
+    debitos = rng.integers(0, 5_000_000, filas)
+    for i in range(filas):
+        cuenta, nombre_cuenta = cuentas[cuenta_idx[i]]
+        centro, nombre_centro = centros[centro_idx[i]]
+        ws.append([
+            "7 - COSTOS SGSSS", f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}", cuenta, nombre_cuenta,
+            centro, nombre_centro, "01", "SALUD", 900000000 + i % 500, f"TERCERO {i % 500}",
+            int(debitos[i]), 0, int(debitos[i]),
+            f"CC-{i}", "2025-01-01", f"Movimiento {i}", 0, "", "usuario", "",
+        ])
+    wb.save(ruta)
+
+
+def medir(etiqueta, funcion):
+    inicio = time.perf_counter()
+    df = funcion()
+    segundos = time.perf_counter() - inicio
+    print(f"{etiqueta:<34} tiempo={segundos:8.2f}s  filas={len(df):>9,}  columnas={len(df.columns):>3}")
+    return segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=500_000)
+    parser.add_argument("--archivo", help="auxiliar existente (se genera si no existe)")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from src.importador_contabilidad import ImportadorContabilidad
+    from src.lector_excel import leer_excel, motores_disponibles
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = args.archivo or os.path.join(tmp, "auxiliar.xlsx")
+        if not os.path.exists(ruta):
+            inicio = time.perf_counter()
+            generar_auxiliar(ruta, args.filas)
+            print(f"auxiliar sintético: {args.filas:,} filas, {os.path.getsize(ruta) / 1e6:.1f} MB "
+                  f"({time.perf_counter() - inicio:.1f}s)")
+
+        columnas = list(ImportadorContabilidad.MAPEO_COLUMNAS)
+        base = medir("pd.read_excel (todas las columnas)", lambda: pd.read_excel(ruta))
+        for motor in motores_disponibles():
+            segundos = medir(f"{motor} (columnas del mapeo)",
+                             lambda: leer_excel(ruta, columnas=columnas, motor=motor))
+            print(f"{'':<34} {base / segundos:.1f}x más rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: generación de un lote de empresas con 1 y con N procesos.
+
+Copia ejemplos/clinica_dental.json N veces (con nombres distintos) a un
+directorio temporal y mide el tiempo de generar_lote con cada cantidad de
+procesos. El speedup esperado es cercano al número de núcleos libres
+mientras haya al menos una empresa por proceso.
+
+Uso:
+    python benchmarks/bench_lote.py --empresas 16
+    python benchmarks/bench_lote.py --empresas 32 --procesos 1 2 4 8 --streaming
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def crear_empresas(directorio, n):
+    """Escribe n variantes del JSON de ejemplo"""
+    with open(RAIZ / "ejemplos" / "clinica_dental.json", encoding="utf-8") as f:
+        ejemplo = json.load(f)
+    for i in range(n):
+        ejemplo["empresa"]["nombre_empresa"] = f"Clínica {i:03d} S.A.S."
+        with open(os.path.join(directorio, f"clinica_{i:03d}.json"), "w", encoding="utf-8") as f:
+            json.dump(ejemplo, f, ensure_ascii=False)
+
+
+def main():
+    from src.lote import generar_lote
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--empresas", type=int, default=16)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--streaming", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        entrada = os.path.join(tmp, "empresas")
+        os.mkdir(entrada)
+        crear_empresas(entrada, args.empresas)
+        base = None
+        for procesos in args.procesos:
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                manifiesto = generar_lote(entrada, os.path.join(tmp, f"salida_{procesos}"),
+                                          procesos=procesos, streaming=args.streaming)
+            segundos = time.perf_counter() - inicio
+            base = base or segundos
+            print(f"procesos={manifiesto['procesos']:>3}  empresas={args.empresas:>4}  "
+                  f"tiempo={segundos:7.2f}s  ({args.empresas / segundos:6.2f} empresas/s, "
+                  f"x{base / segundos:.2f})  fallidas={manifiesto['fallidas']}")
+
+
+if __name__ == "__main__":
+    main()
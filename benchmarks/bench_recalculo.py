@@ -0,0 +1,162 @@
+"""
+Benchmark: costo de recálculo del libro actual vs una revisión de referencia.
+
+Genera el modelo completo con N registros sintéticos de PRODUCCION en el
+árbol actual y en una revisión git de referencia, extraída en un worktree
+temporal. Por defecto es REFERENCIA, la última revisión con fórmulas sobre
+columnas completas ($D:$D), así que el resultado no depende de dónde esté
+el commit en la historia. Para cada libro reporta:
+
+- celdas referenciadas: suma, sobre todas las fórmulas, de las celdas que
+  abarca cada rango (una columna completa cuenta 1.048.576 filas, una
+  referencia de tabla cuenta solo sus filas de datos). Es una medida
+  determinista del trabajo de recálculo y no necesita Excel.
+- tiempo de recálculo en LibreOffice (si `soffice` está disponible): abre el
+  libro en modo headless forzando el recálculo al cargar y lo vuelve a
+  guardar.
+
+Uso:
+    python benchmarks/bench_recalculo.py
+    python benchmarks/bench_recalculo.py --referencia fcf8053 --filas 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from openpyxl import load_workbook
+from openpyxl.formula import Tokenizer
+from openpyxl.utils import range_boundaries
+
+# Última revisión con referencias a columnas completas (antes de las tablas estructuradas)
+REFERENCIA = "ebf2c28bddf784a10240d19e5006fbb026c85d9e"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_estilos import RAIZ, worktree  # noqa: E402
+
+FILAS_EXCEL = 1_048_576
+
+# Perfil de LibreOffice que recalcula siempre los .xlsx al cargarlos
+_PERFIL_RECALCULO = """<?xml version="1.0" encoding="UTF-8"?>
+<oor:items xmlns:oor="http://openoffice.org/2001/registry" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<item oor:path="/org.openoffice.Office.Calc/Formula/Load"><prop oor:name="OOXMLRecalcMode" oor:op="fuse"><value>0</value></prop></item>
+</oor:items>
+"""
+
+
+def generar(raiz, ruta, filas):
+    """Genera el modelo importando el paquete `src` desde `raiz`"""
+    sys.path.insert(0, raiz)
+    random.seed(2024)
+    from src.modelo_tdabc import ModeloTDABC
+    from src.sheets import produccion
+    # Después de importar `src`: bench_streaming antepone el árbol actual a sys.path
+    from bench_streaming import registros_sinteticos
+
+    def sinteticos(*_args, **_kwargs):
+        return list(registros_sinteticos(filas))
+
+    # El nombre del cargador de producción cambió entre revisiones
+    for nombre in ("obtener_datos_produccion", "_obtener_datos_produccion"):
+        if hasattr(produccion, nombre):
+            setattr(produccion, nombre, sinteticos)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ModeloTDABC().generar_archivo(ruta)
+
+
+def _celdas_rango(texto, tablas):
+    """Celdas que abarca una referencia de rango (A1, A:A, Hoja!A1:B9, Tabla[Col])"""
+    if "[" in texto:
+        nombre = texto.split("[", 1)[0]
+        min_col, min_row, max_col, max_row = range_boundaries(tablas[nombre])
+        return max_row - min_row
+    ref = texto.rsplit("!", 1)[-1].replace("$", "")
+    min_col, min_row, max_col, max_row = range_boundaries(ref)
+    if min_row is None:  # Columna completa
+        min_row, max_row = 1, FILAS_EXCEL
+    return (max_col - min_col + 1) * (max_row - min_row + 1)
+
+
+def celdas_referenciadas(ruta):
+    """Total de celdas que recorren las fórmulas del libro"""
+    wb = load_workbook(ruta)
+    tablas = {nombre: ref for ws in wb.worksheets for nombre, ref in ws.tables.items()}
+    total = formulas = 0
+    for ws in wb.worksheets:
+        for fila in ws.iter_rows():
+            for celda in fila:
+                if not (isinstance(celda.value, str) and celda.value.startswith("=")):
+                    continue
+                formulas += 1
+                for token in Tokenizer(celda.value).items:
+                    if token.type == "OPERAND" and token.subtype == "RANGE":
+                        total += _celdas_rango(token.value, tablas)
+    return formulas, total
+
+
+def recalcular(soffice, perfil, ruta):
+    """Abre y guarda el libro con LibreOffice headless; devuelve los segundos"""
+    with tempfile.TemporaryDirectory() as salida:
+        inicio = time.perf_counter()
+        subprocess.run(
+            [soffice, "--headless", "--norestore", f"-env:UserInstallation={perfil.as_uri()}",
+             "--convert-to", "xlsx", "--outdir", salida, ruta],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--referencia", default=REFERENCIA,
+                        help="revisión git contra la cual comparar (por defecto la última con columnas completas)")
+    parser.add_argument("--filas", type=int, default=20_000,
+                        help="registros sintéticos de PRODUCCION")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="recálculos por libro en LibreOffice (se reporta el mínimo)")
+    parser.add_argument("--soffice", default=shutil.which("soffice") or shutil.which("libreoffice"),
+                        help="ejecutable de LibreOffice (por defecto el del PATH)")
+    parser.add_argument("--interno", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        raiz, ruta = args.interno
+        generar(raiz, ruta, args.filas)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp, worktree(args.referencia) as ref:
+        libros = []
+        for raiz, etiqueta in ((ref, args.referencia[:10]), (str(RAIZ), "actual")):
+            ruta = os.path.join(tmp, f"{len(libros)}.xlsx")
+            subprocess.run([sys.executable, __file__, "--filas", str(args.filas),
+                            "--interno", raiz, ruta], check=True, cwd=raiz)
+            libros.append((etiqueta, ruta))
+
+        perfil = None
+        if args.soffice:
+            perfil = Path(tmp) / "perfil_lo"
+            (perfil / "user").mkdir(parents=True)
+            (perfil / "user" / "registrymodifications.xcu").write_text(_PERFIL_RECALCULO, encoding="utf-8")
+            recalcular(args.soffice, perfil, libros[0][1])  # Calentamiento: crea el perfil
+        else:
+            print("soffice no encontrado: se omite el tiempo de recálculo en LibreOffice")
+
+        for etiqueta, ruta in libros:
+            formulas, celdas = celdas_referenciadas(ruta)
+            linea = f"{etiqueta:<12} filas={args.filas:>8,}  formulas={formulas:>8,}  celdas_referenciadas={celdas:>15,}"
+            if perfil is not None:
+                segundos = min(recalcular(args.soffice, perfil, ruta) for _ in range(args.repeticiones))
+                linea += f"  recalculo_libreoffice={segundos:8.2f}s"
+            print(linea)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: hoja PRODUCCION en modo normal vs streaming (write-only).
+
+Genera N registros sintéticos de producción y mide tiempo total y memoria
+pico del proceso (RSS) para cada modo. Cada modo corre en un subproceso
+separado para que la memoria pico no se contamine entre mediciones.
+
+Uso:
+    python benchmarks/bench_streaming.py --filas 200000
+    python benchmarks/bench_streaming.py --filas 1000000 --modos streaming
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def registros_sinteticos(n):
+    """Genera registros de producción sin materializar la lista completa"""
+    from src import config
+    servicios = config.SERVICIOS
+    sedes = config.SEDES
+    aseguradoras = config.ASEGURADORAS
+    for i in range(n):
+        servicio = servicios[i % len(servicios)]
+        yield {
+            'codigo': f"SV{i % len(servicios) + 1:03d}",
+            'servicio': servicio,
+            'sede': sedes[i % len(sedes)],
+            'aseguradora': aseguradoras[i % len(aseguradoras)],
+            'cantidad': 1 + i % 7,
+            'valor_unitario': 100000 + (i % 50) * 1000,
+        }
+
+
+def correr_modo(modo, filas):
+    """Escribe solo la hoja PRODUCCION con `filas` registros y reporta métricas"""
+    from openpyxl import Workbook
+    from src.sheets.produccion import crear_hoja_produccion
+
+    inicio = time.perf_counter()
+    wb = Workbook(write_only=(modo == "streaming"))
+    if modo != "streaming":
+        wb.remove(wb.active)
+    crear_hoja_produccion(wb, datos_produccion=registros_sinteticos(filas))
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.xlsx")
+        wb.save(ruta)
+        tamano = os.path.getsize(ruta)
+    segundos = time.perf_counter() - inicio
+    # ru_maxrss está en KB en Linux
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{modo:<10} filas={filas:>9,}  tiempo={segundos:8.2f}s  "
+          f"memoria_pico={pico_mb:8.1f} MB  archivo={tamano / 1e6:6.1f} MB  "
+          f"({filas / segundos:,.0f} filas/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--modos", nargs="+", default=["normal", "streaming"],
+                        choices=["normal", "streaming"])
+    parser.add_argument("--interno", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        correr_modo(args.interno, args.filas)
+        return
+
+    for modo in args.modos:
+        subprocess.run(
+            [sys.executable, __file__, "--filas", str(args.filas), "--interno", modo],
+            check=True, cwd=RAIZ
+        )
+
+
+if __name__ == "__main__":
+    main()
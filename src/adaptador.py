@@ -391,54 +391,68 @@ def adaptar_empresa(config_path: str) -> bool:
     return True
 
 
-def _copiar_configuracion_a_sistema(config_data: Dict):
+# Archivo de src/config/ de cada parte de la configuración
+ARCHIVOS_CONFIGURACION = {
+    "empresa": "empresa_config.json",
+    "servicios": "servicios.json",
+    "centros_costo": "centros_costo.json",
+    "grupos_ocupacionales": "grupos_ocupacionales.json",
+}
+
+
+def configuracion_empresa(config_data: Dict) -> Dict[str, Dict]:
     """
-    Copia la configuración validada a los archivos del sistema.
+    Convierte el archivo de una empresa al formato de los JSON de src/config/.
     
     Args:
         config_data: Datos de configuración validados
+        
+    Returns:
+        Contenido de cada JSON por atributo de ConfigMapper (empresa, servicios,
+        centros_costo, grupos_ocupacionales); los que la empresa no define se omiten
     """
-    config_dir = Path("src/config")
-    
-    # Guardar empresa_config.json
-    empresa_config = {
-        "nombre_empresa": config_data['empresa']['nombre_empresa'],
-        "nit": config_data['empresa']['nit'],
-        "sector": config_data['empresa']['sector'],
-        "pais": config_data['empresa']['pais']
-    }
-    
-    with open(config_dir / "empresa_config.json", 'w', encoding='utf-8') as f:
-        json.dump(empresa_config, f, indent=4, ensure_ascii=False)
-    print(f"  ✓ Generado: empresa_config.json")
-    
-    # Guardar servicios.json
-    servicios_config = {
-        "servicios": config_data.get('servicios', []),
-        "categorias": config_data.get('categorias', {})
+    configuracion = {
+        "empresa": {
+            "nombre_empresa": config_data['empresa']['nombre_empresa'],
+            "nit": config_data['empresa']['nit'],
+            "sector": config_data['empresa']['sector'],
+            "pais": config_data['empresa']['pais']
+        },
+        "servicios": {
+            "servicios": config_data.get('servicios', []),
+            "categorias": config_data.get('categorias', {})
+        },
     }
     
-    with open(config_dir / "servicios.json", 'w', encoding='utf-8') as f:
-        json.dump(servicios_config, f, indent=4, ensure_ascii=False)
-    print(f"  ✓ Generado: servicios.json")
-    
-    # Guardar centros_costo.json si existe
     if 'centros' in config_data:
-        centros_config = {
+        configuracion["centros_costo"] = {
             "centros": config_data['centros'],
             "aseguradoras": config_data.get('aseguradoras', ["Cliente General"])
         }
-        
-        with open(config_dir / "centros_costo.json", 'w', encoding='utf-8') as f:
-            json.dump(centros_config, f, indent=4, ensure_ascii=False)
-        print(f"  ✓ Generado: centros_costo.json")
     
-    # Guardar grupos_ocupacionales.json si existe
     if 'grupos_ocupacionales' in config_data:
-        grupos_config = {
-            "grupos": config_data['grupos_ocupacionales']
+        # Los ejemplos traen [nombre, salario]; ConfigMapper lee {"nombre", "salario_base"}
+        configuracion["grupos_ocupacionales"] = {
+            "grupos": [
+                grupo if isinstance(grupo, dict) else {"nombre": grupo[0], "salario_base": grupo[1]}
+                for grupo in config_data['grupos_ocupacionales']
+            ]
         }
-        
-        with open(config_dir / "grupos_ocupacionales.json", 'w', encoding='utf-8') as f:
-            json.dump(grupos_config, f, indent=4, ensure_ascii=False)
-        print(f"  ✓ Generado: grupos_ocupacionales.json")
+    
+    return configuracion
+
+
+def _copiar_configuracion_a_sistema(config_data: Dict):
+    """
+    Copia la configuración validada a los archivos del sistema.
+    
+    Args:
+        config_data: Datos de configuración validados
+    """
+    config_dir = Path("src/config")
+    
+    for atributo, contenido in configuracion_empresa(config_data).items():
+        archivo = ARCHIVOS_CONFIGURACION[atributo]
+        with open(config_dir / archivo, 'w', encoding='utf-8') as f:
+            json.dump(contenido, f, indent=4, ensure_ascii=False)
+        print(f"  ✓ Generado: {archivo}")
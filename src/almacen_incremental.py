@@ -0,0 +1,329 @@
+"""
+Importación incremental contra un almacén local.
+
+Reimportar el año completo de auxiliares cada mes repite el trabajo de los
+meses que no cambiaron. El almacén guarda en disco los movimientos ya
+importados de una fuente, su marca de agua (la mayor Fecha o el mayor número de
+No Factura visto) y los agregados por llave (ej: cuenta, centro y periodo). Al aplicar un
+archivo nuevo:
+
+- Las filas posteriores a la marca de agua se agregan.
+- Las filas hasta la marca de agua se comparan, por grupo de corrección
+  (ej: cuenta/centro/periodo o número de factura), con lo guardado: si un grupo
+  cambió (correcciones tardías, movimientos que llegaron después) sus filas se
+  reemplazan por las del archivo; los grupos iguales o ausentes no se tocan.
+- Solo se recalculan los agregados de las llaves que tuvieron cambios.
+
+Se asume que un archivo trae completos los grupos que incluye (un auxiliar
+mensual trae todos los movimientos de su mes).
+
+El almacén es un archivo SQLite (tablas movimientos, agregados y estado)
+con índices por grupo de corrección, llave de agregado y marca. Aplicar un
+archivo solo lee los grupos y llaves que el archivo toca, inserta las filas
+nuevas y reemplaza los grupos corregidos y sus agregados dentro de una
+transacción: el costo depende del archivo, no de la historia acumulada.
+"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from .columnar import codificar_categoricas
+
+
+def _huellas(df: pd.DataFrame, grupo: List[str]) -> pd.DataFrame:
+    """Huella del contenido de cada grupo: filas y suma de hashes (no depende del orden)"""
+    columnas = {}
+    for columna in sorted(df.columns):
+        serie = df[columna]
+        # Mismo hash para 1000 y 1000.0, o para un texto y la misma categoría
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            columnas[columna] = serie.astype(float)
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            columnas[columna] = serie.astype('datetime64[ns]')
+        else:
+            # Nulos iguales (None, NaN, NaT) leídos del archivo o de SQLite
+            columnas[columna] = serie.astype(object).where(serie.notna(), None)
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(columnas), index=False)
+    tabla = pd.DataFrame({c: df[c].astype(object).to_numpy() for c in grupo})
+    tabla['hash'] = hashes.to_numpy()
+    tabla['filas'] = 1
+    return tabla.groupby(grupo, dropna=False)[['hash', 'filas']].sum()
+
+
+def _en_llaves(df: pd.DataFrame, columnas: List[str], llaves: pd.MultiIndex) -> pd.Series:
+    """Máscara de filas de `df` cuya combinación de `columnas` está en `llaves`"""
+    if df.empty or len(llaves) == 0:
+        return pd.Series(False, index=df.index)
+    indice = pd.MultiIndex.from_frame(df[columnas].astype(object))
+    return pd.Series(indice.isin(llaves), index=df.index)
+
+
+class AlmacenIncremental:
+    """Movimientos, marca de agua y agregados de una fuente, persistidos en SQLite"""
+
+    def __init__(self, ruta, columna_marca: str, grupo_correccion: List[str],
+                 llave_agregado: List[str], agregaciones: Dict[str, str]):
+        """
+        Args:
+            ruta: Archivo del almacén (se crea si no existe)
+            columna_marca: Columna ordenable de la marca de agua (fecha, número de factura;
+                           numérica, no texto: 'FE10' < 'FE9' al comparar textos)
+            grupo_correccion: Columnas que agrupan las filas comparadas como una unidad
+            llave_agregado: Columnas de los agregados que se mantienen
+            agregaciones: {columna: función} de los agregados (las columnas ausentes se omiten)
+        """
+        self.ruta = Path(ruta)
+        self.columna_marca = columna_marca
+        self.grupo_correccion = list(grupo_correccion)
+        self.llave_agregado = list(llave_agregado)
+        self.agregaciones = agregaciones
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Sin transacciones implícitas: cada aplicar() abre y cierra la suya (ver _transaccion)
+        self.conexion = sqlite3.connect(str(self.ruta), isolation_level=None)
+        self.conexion.execute("CREATE TABLE IF NOT EXISTS estado (clave TEXT PRIMARY KEY, valor TEXT)")
+        estado = {clave: json.loads(valor) for clave, valor in self.conexion.execute("SELECT clave, valor FROM estado")}
+        self.tipos: Dict[str, Dict[str, str]] = estado.get('tipos', {})  # {tabla: {columna: dtype}}
+        self.marca_agua = _marca_desde_json(estado.get('marca_agua'))
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    @property
+    def movimientos(self) -> Optional[pd.DataFrame]:
+        """Todos los movimientos guardados (None si el almacén está vacío)"""
+        df = self._leer('movimientos')
+        return codificar_categoricas(df) if df is not None else None
+
+    @property
+    def agregados(self) -> Optional[pd.DataFrame]:
+        """Todos los agregados guardados (None si el almacén está vacío)"""
+        return self._leer('agregados')
+
+    def aplicar(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Incorpora los movimientos de un archivo en una transacción.
+
+        Args:
+            df: Movimientos ya preparados por el importador (con las columnas de
+                la marca, del grupo de corrección y de la llave de agregados)
+
+        Returns:
+            {'nuevas': filas agregadas después de la marca, 'grupos_corregidos': n,
+             'filas_reemplazadas': filas guardadas que se quitaron,
+             'agregados_recalculados': llaves recalculadas, 'marca_agua': nueva marca}
+        """
+        if self.marca_agua is None:
+            posteriores = df[self.columna_marca].notna()
+        else:
+            # Las marcas nulas (ej: facturas sin número) no son posteriores: se comparan por grupo
+            posteriores = (df[self.columna_marca] > self.marca_agua).fillna(False).astype(bool)
+        nuevas = df[posteriores]
+        anteriores = df[~posteriores]
+
+        with self._transaccion():
+            self._asegurar_tabla('movimientos', df)
+            # Solo los grupos guardados que el archivo vuelve a traer
+            guardados = self._filas_de('movimientos', self.grupo_correccion, anteriores)
+            corregidos = self._grupos_cambiados(anteriores, guardados)
+            quitados = guardados[_en_llaves(guardados, self.grupo_correccion, corregidos)]
+            entrantes = pd.concat([anteriores[_en_llaves(anteriores, self.grupo_correccion, corregidos)], nuevas])
+
+            self._borrar('movimientos', self.grupo_correccion, corregidos.to_frame(index=False))
+            self._insertar('movimientos', entrantes)
+
+            afectadas = pd.concat([quitados[self.llave_agregado], entrantes[self.llave_agregado]]
+                                  ).astype(object).drop_duplicates()
+            self._recalcular_agregados(afectadas)
+
+            marca = self._maximo('movimientos', self.columna_marca)
+            if marca is not None:
+                self.marca_agua = marca
+            self._guardar_estado()
+        return {
+            'nuevas': len(nuevas),
+            'grupos_corregidos': len(corregidos),
+            'filas_reemplazadas': len(quitados),
+            'agregados_recalculados': len(afectadas),
+            'marca_agua': self.marca_agua,
+        }
+
+    def _grupos_cambiados(self, anteriores: pd.DataFrame, guardados: pd.DataFrame) -> pd.MultiIndex:
+        """Grupos de corrección de `anteriores` cuyo contenido difiere del guardado"""
+        if anteriores.empty:
+            return pd.MultiIndex.from_tuples([], names=self.grupo_correccion)
+        entrantes = _huellas(anteriores, self.grupo_correccion)
+        previos = _huellas(guardados.reindex(columns=anteriores.columns), self.grupo_correccion)
+        previos = previos.reindex(entrantes.index)
+        cambiados = entrantes.ne(previos).any(axis=1)
+        return _como_multiindex(entrantes.index[cambiados.to_numpy()])
+
+    def _recalcular_agregados(self, afectadas: pd.DataFrame):
+        """Reemplaza los agregados de las llaves afectadas por los de los movimientos actuales"""
+        if afectadas.empty:
+            return
+        filas = self._filas_de('movimientos', self.llave_agregado, afectadas)
+        agregaciones = {c: f for c, f in self.agregaciones.items() if c in filas.columns}
+        recalculados = (filas.astype({c: object for c in self.llave_agregado})
+                        .groupby(self.llave_agregado, dropna=False, sort=False).agg(agregaciones)
+                        .reset_index())
+        if 'agregados' in self.tipos:
+            self._borrar('agregados', self.llave_agregado, afectadas)
+        if not recalculados.empty:
+            self._asegurar_tabla('agregados', recalculados)
+            self._insertar('agregados', recalculados)
+
+    # ========== SQLite ==========
+
+    @contextmanager
+    def _transaccion(self) -> Iterator[None]:
+        """Todo o nada: ante un error se deshacen las tablas, el estado y la marca en memoria"""
+        tipos = json.loads(json.dumps(self.tipos))
+        marca = self.marca_agua
+        self.conexion.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            self.tipos, self.marca_agua = tipos, marca
+            raise
+        self.conexion.execute("COMMIT")
+
+    def _asegurar_tabla(self, tabla: str, df: pd.DataFrame):
+        """Crea la tabla (con sus índices) o le agrega las columnas nuevas de `df`"""
+        tipos = self.tipos.get(tabla)
+        if tipos is None:
+            # Sin tipo declarado: SQLite guarda cada valor como llega (textos, enteros, reales)
+            self.conexion.execute(f'CREATE TABLE "{tabla}" ({", ".join(map(_columna, df.columns))})')
+            indices = {'grupo': self.grupo_correccion, 'llave': self.llave_agregado,
+                       'marca': [self.columna_marca]} if tabla == 'movimientos' else {'llave': self.llave_agregado}
+            for nombre, columnas in indices.items():
+                if all(c in df.columns for c in columnas):
+                    self.conexion.execute(f'CREATE INDEX "ix_{tabla}_{nombre}" ON "{tabla}" '
+                                          f'({", ".join(map(_columna, columnas))})')
+            self.tipos[tabla] = {c: str(df[c].dtype) for c in df.columns}
+            return
+        for columna in df.columns:
+            if columna not in tipos:
+                self.conexion.execute(f'ALTER TABLE "{tabla}" ADD COLUMN {_columna(columna)}')
+                tipos[columna] = str(df[columna].dtype)
+
+    def _insertar(self, tabla: str, df: pd.DataFrame):
+        if df.empty:
+            return
+        columnas = list(self.tipos[tabla])
+        self.conexion.executemany(
+            f'INSERT INTO "{tabla}" ({", ".join(map(_columna, columnas))}) VALUES ({", ".join("?" * len(columnas))})',
+            _filas_sql(df.reindex(columns=columnas)))
+
+    def _cargar_llaves(self, columnas: List[str], llaves: pd.DataFrame) -> str:
+        """Copia las combinaciones de `columnas` a una tabla temporal y devuelve el JOIN que las usa"""
+        self.conexion.execute('DROP TABLE IF EXISTS temp."llaves"')
+        self.conexion.execute(f'CREATE TEMP TABLE "llaves" ({", ".join(map(_columna, columnas))})')
+        self.conexion.executemany(f'INSERT INTO temp."llaves" VALUES ({", ".join("?" * len(columnas))})',
+                                  _filas_sql(llaves[columnas].drop_duplicates()))
+        # IS en lugar de =: una llave con nulos también encuentra sus filas
+        return " AND ".join(f't.{_columna(c)} IS k.{_columna(c)}' for c in columnas)
+
+    def _filas_de(self, tabla: str, columnas: List[str], llaves: pd.DataFrame) -> pd.DataFrame:
+        """Filas guardadas de `tabla` cuya combinación de `columnas` aparece en `llaves` (por índice)"""
+        if tabla not in self.tipos or llaves.empty:
+            return pd.DataFrame({c: pd.Series(dtype=object) for c in self.tipos.get(tabla, llaves.columns)})
+        condicion = self._cargar_llaves(columnas, llaves)
+        seleccion = ", ".join(f't.{_columna(c)}' for c in self.tipos[tabla])
+        df = pd.read_sql(f'SELECT {seleccion} FROM temp."llaves" k JOIN "{tabla}" t ON {condicion}',
+                         self.conexion)
+        return _restaurar_tipos(df, self.tipos[tabla])
+
+    def _borrar(self, tabla: str, columnas: List[str], llaves: pd.DataFrame):
+        if llaves.empty:
+            return
+        condicion = self._cargar_llaves(columnas, llaves)
+        self.conexion.execute(f'DELETE FROM "{tabla}" WHERE rowid IN '
+                              f'(SELECT t.rowid FROM temp."llaves" k JOIN "{tabla}" t ON {condicion})')
+
+    def _maximo(self, tabla: str, columna: str):
+        """Mayor valor de la columna (por su índice), con el tipo con que se guardó"""
+        valor, = self.conexion.execute(f'SELECT MAX({_columna(columna)}) FROM "{tabla}"').fetchone()
+        if valor is None:
+            return None
+        if self.tipos[tabla][columna].startswith('datetime64'):
+            return pd.Timestamp(valor)
+        return valor
+
+    def _leer(self, tabla: str) -> Optional[pd.DataFrame]:
+        if tabla not in self.tipos:
+            return None
+        df = pd.read_sql(f'SELECT * FROM "{tabla}"', self.conexion)
+        return _restaurar_tipos(df, self.tipos[tabla])
+
+    def _guardar_estado(self):
+        self.conexion.executemany("INSERT OR REPLACE INTO estado VALUES (?, ?)", [
+            ('marca_agua', json.dumps(_marca_a_json(self.marca_agua))),
+            ('tipos', json.dumps(self.tipos)),
+        ])
+
+
+def _columna(nombre: str) -> str:
+    """Nombre de columna entre comillas para SQL"""
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+def _filas_sql(df: pd.DataFrame) -> Iterator[tuple]:
+    """Filas como tuplas de tipos de Python (nulos como NULL, fechas como texto ISO ordenable)"""
+    columnas = []
+    for columna in df.columns:
+        serie = df[columna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+        columnas.append(serie.astype(object).where(serie.notna(), None).tolist())
+    return zip(*columnas)
+
+
+def _restaurar_tipos(df: pd.DataFrame, tipos: Dict[str, str]) -> pd.DataFrame:
+    """Devuelve a cada columna leída de SQLite el dtype con que se guardó"""
+    for columna, tipo in tipos.items():
+        if tipo.startswith('datetime64'):
+            df[columna] = pd.to_datetime(df[columna])
+        elif tipo == 'category':
+            df[columna] = df[columna].astype('category')
+        elif tipo.startswith('float'):
+            df[columna] = df[columna].astype(float)
+        elif tipo in ('bool', 'Int64'):
+            df[columna] = df[columna].astype(tipo)
+    return df
+
+
+def _marca_a_json(marca) -> Optional[Dict[str, Any]]:
+    """Marca de agua con su tipo, para guardarla en la tabla estado"""
+    if marca is None or pd.isna(marca):
+        return None
+    if isinstance(marca, pd.Timestamp):
+        return {'tipo': 'fecha', 'valor': marca.isoformat()}
+    if isinstance(marca, str):
+        return {'tipo': 'texto', 'valor': marca}
+    return {'tipo': 'numero', 'valor': marca.item() if hasattr(marca, 'item') else marca}
+
+
+def _marca_desde_json(marca: Optional[Dict[str, Any]]):
+    if marca is None:
+        return None
+    if marca['tipo'] == 'fecha':
+        return pd.Timestamp(marca['valor'])
+    return marca['valor']
+
+
+def _como_multiindex(indice: pd.Index) -> pd.MultiIndex:
+    """Índice de un groupby como MultiIndex (también cuando agrupa por una sola columna)"""
+    if isinstance(indice, pd.MultiIndex):
+        return indice
+    return pd.MultiIndex.from_arrays([indice], names=[indice.name])
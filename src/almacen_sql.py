@@ -0,0 +1,315 @@
+"""
+Almacén analítico local en SQLite.
+
+Guarda por periodo (AAAA-MM) lo importado de producción, nómina y
+contabilidad, junto con los catálogos de servicios y ecuaciones de tiempo,
+en tablas indexadas por periodo y por las llaves de consulta. Los
+importadores escriben en bloque dentro de una transacción y las hojas leen
+agregados con SQL, sin volver a leer los Excel de origen ni cargar todos los
+registros: los meses históricos se consultan al instante.
+
+La nómina guardada de un periodo reemplaza a la simulada en la hoja NOMINA
+(ver ModeloTDABC.generar_archivo): el cargo es el grupo ocupacional. Con
+almacén, SERVICIOS, ECUACIONES_TIEMPO y COSTEO_SERVICIOS leen el catálogo y
+las ecuaciones de sus tablas, con los códigos de servicio de la configuración.
+
+Uso:
+    >>> almacen = AlmacenSQL("datos/tdabc.sqlite")
+    >>> importador.guardar_en_almacen(almacen, "2025-09")
+    >>> almacen.produccion_agregada("2025-09", config.SERVICIOS, config.SEDES)
+"""
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produccion (
+    periodo TEXT NOT NULL,
+    codigo TEXT,
+    servicio TEXT,
+    sede TEXT,
+    aseguradora TEXT,
+    cantidad REAL,
+    valor_unitario REAL
+);
+-- Índice de cobertura: el agregado por (servicio, sede) de un periodo no lee la tabla
+CREATE INDEX IF NOT EXISTS ix_produccion_periodo ON produccion (periodo, servicio, sede, cantidad, valor_unitario);
+
+CREATE TABLE IF NOT EXISTS nomina (
+    periodo TEXT NOT NULL,
+    identificacion TEXT,
+    nombre TEXT,
+    estado TEXT,
+    sede TEXT,
+    cargo TEXT,
+    salario REAL
+);
+-- Índices de cobertura de los agregados por grupo (cargo) y por centro (sede)
+CREATE INDEX IF NOT EXISTS ix_nomina_grupo ON nomina (periodo, cargo, sede, salario);
+CREATE INDEX IF NOT EXISTS ix_nomina_sede ON nomina (periodo, sede, salario);
+
+CREATE TABLE IF NOT EXISTS contabilidad (
+    periodo TEXT NOT NULL,
+    fecha TEXT,
+    clase TEXT,
+    codigo_cuenta TEXT,
+    nombre_cuenta TEXT,
+    nombre_centro TEXT,
+    debitos REAL,
+    creditos REAL,
+    neto REAL
+);
+-- Índices de cobertura de los agregados por cuenta, por centro y por periodo
+CREATE INDEX IF NOT EXISTS ix_contabilidad_cuenta ON contabilidad (periodo, codigo_cuenta, nombre_centro, neto);
+CREATE INDEX IF NOT EXISTS ix_contabilidad_centro ON contabilidad (periodo, nombre_centro, neto);
+
+CREATE TABLE IF NOT EXISTS servicios (
+    codigo TEXT PRIMARY KEY,
+    nombre TEXT,
+    categoria TEXT,
+    complejidad TEXT,
+    requiere_insumos INTEGER,
+    estado TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ecuaciones (
+    codigo_servicio TEXT,
+    servicio TEXT,
+    grupo TEXT,
+    minutos REAL,
+    factor REAL,
+    PRIMARY KEY (servicio, grupo)
+);
+"""
+
+# Columnas que se insertan de cada tabla (en el orden del esquema)
+COLUMNAS = {
+    'produccion': ['periodo', 'codigo', 'servicio', 'sede', 'aseguradora', 'cantidad', 'valor_unitario'],
+    'nomina': ['periodo', 'identificacion', 'nombre', 'estado', 'sede', 'cargo', 'salario'],
+    'contabilidad': ['periodo', 'fecha', 'clase', 'codigo_cuenta', 'nombre_cuenta', 'nombre_centro',
+                     'debitos', 'creditos', 'neto'],
+    'servicios': ['codigo', 'nombre', 'categoria', 'complejidad', 'requiere_insumos', 'estado'],
+    'ecuaciones': ['codigo_servicio', 'servicio', 'grupo', 'minutos', 'factor'],
+}
+
+
+def _filas_tabla(df: pd.DataFrame, columnas: List[str]) -> Iterator[tuple]:
+    """Filas de `df` en el orden de `columnas` (las ausentes como NULL, fechas como texto ISO)"""
+    salida = pd.DataFrame(index=df.index)
+    for columna in columnas:
+        if columna not in df.columns:
+            salida[columna] = None
+            continue
+        serie = df[columna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime('%Y-%m-%d')
+        # Sin tipos de numpy ni NaN: sqlite3 solo adapta tipos de Python
+        salida[columna] = serie.astype(object).where(serie.notna(), None)
+    return salida.itertuples(index=False, name=None)
+
+
+class AlmacenSQL:
+    """Base SQLite con las tablas de datos importados y catálogos"""
+
+    def __init__(self, ruta=":memory:"):
+        """
+        Args:
+            ruta: Archivo de la base (se crea si no existe); ":memory:" para una temporal
+        """
+        if ruta != ":memory:":
+            Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(str(ruta))
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # Escritura (cada llamada es una transacción)
+
+    def _reemplazar(self, tabla: str, filas: Iterable[tuple], periodos: Iterable[str] = None) -> int:
+        """Borra los periodos indicados (o toda la tabla si es None) e inserta `filas` en bloque"""
+        columnas = COLUMNAS[tabla]
+        insertar = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+        with self.conexion:
+            if periodos is None:
+                self.conexion.execute(f"DELETE FROM {tabla}")
+            else:
+                self.conexion.executemany(f"DELETE FROM {tabla} WHERE periodo = ?",
+                                          [(p,) for p in periodos])
+            return self.conexion.executemany(insertar, filas).rowcount
+
+    def guardar_produccion(self, registros: Iterable[Dict[str, Any]], periodo: str = None) -> int:
+        """
+        Reemplaza la producción de los periodos que traen los registros.
+
+        Cada registro va al periodo de su clave 'periodo' (el mes de su Fecha
+        Cita, ver ImportadorProduccion.iterar_datos_produccion); los que no la
+        tienen van a `periodo`. Todo en una transacción: si falta un periodo no
+        se guarda nada.
+
+        Args:
+            registros: Registros en el formato de ImportadorProduccion.iterar_datos_produccion;
+                       se insertan a medida que se recorren (puede ser un generador)
+            periodo: Periodo AAAA-MM de los registros sin fecha (obligatorio si hay
+                     alguno); también se reemplaza aunque no quede ningún registro en él
+
+        Returns:
+            Filas insertadas
+
+        Raises:
+            ValueError: Si un registro no tiene periodo y no se indicó `periodo`
+        """
+        columnas = COLUMNAS['produccion']
+        periodos = {periodo} if periodo is not None else set()
+
+        def filas():
+            for registro in registros:
+                periodo_registro = registro.get('periodo') or periodo
+                if periodo_registro is None:
+                    raise ValueError("Indique el periodo: hay registros de producción sin fecha")
+                periodos.add(periodo_registro)
+                yield (periodo_registro, *(registro.get(c) for c in columnas[1:]))
+
+        insertar = f"INSERT INTO produccion ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+        with self.conexion:
+            # Las filas nuevas tienen rowid mayor que `anterior`: se borran solo las guardadas antes
+            anterior = self.conexion.execute("SELECT COALESCE(MAX(rowid), 0) FROM produccion").fetchone()[0]
+            insertadas = self.conexion.executemany(insertar, filas()).rowcount
+            self.conexion.executemany("DELETE FROM produccion WHERE periodo = ? AND rowid <= ?",
+                                      [(p, anterior) for p in sorted(periodos)])
+        return insertadas
+
+    def guardar_nomina(self, tabla: pd.DataFrame, periodo: str) -> int:
+        """Reemplaza la nómina de un periodo con la tabla de ImportadorNomina"""
+        return self._reemplazar('nomina', _filas_tabla(tabla.assign(periodo=periodo), COLUMNAS['nomina']),
+                                [periodo])
+
+    def guardar_contabilidad(self, tabla: pd.DataFrame) -> int:
+        """Reemplaza los periodos presentes en la tabla (columna `periodo`) de ImportadorContabilidad"""
+        periodos = tabla['periodo'].dropna().unique().tolist()
+        return self._reemplazar('contabilidad', _filas_tabla(tabla, COLUMNAS['contabilidad']), periodos)
+
+    def guardar_servicios(self, servicios: Iterable[Dict[str, Any]]) -> int:
+        """Reemplaza el catálogo (formato de generar_datos_servicios)"""
+        filas = (tuple(servicio.get(c) for c in COLUMNAS['servicios']) for servicio in servicios)
+        return self._reemplazar('servicios', filas)
+
+    def guardar_ecuaciones(self, ecuaciones: Dict[str, List[Tuple[str, float, float]]],
+                           codigos: Dict[str, str] = None) -> int:
+        """
+        Reemplaza las ecuaciones de tiempo.
+
+        Args:
+            ecuaciones: {servicio: [(grupo, minutos, factor), ...]}
+            codigos: {servicio: código} del catálogo; un servicio sin código queda en NULL
+        """
+        codigos = codigos or {}
+        filas = ((codigos.get(servicio), servicio, grupo, minutos, factor)
+                 for servicio, lineas in ecuaciones.items()
+                 for grupo, minutos, factor in lineas)
+        return self._reemplazar('ecuaciones', filas)
+
+    # Consultas
+
+    def consultar(self, sql: str, parametros: Iterable = ()) -> pd.DataFrame:
+        """Resultado de una consulta SQL como DataFrame"""
+        return pd.read_sql_query(sql, self.conexion, params=tuple(parametros))
+
+    def periodos(self, tabla: str) -> List[str]:
+        """Periodos guardados de una tabla, en orden"""
+        cursor = self.conexion.execute(f"SELECT DISTINCT periodo FROM {tabla} ORDER BY periodo")
+        return [fila[0] for fila in cursor]
+
+    def ultimo_periodo(self, tabla: str) -> Optional[str]:
+        fila = self.conexion.execute(f"SELECT MAX(periodo) FROM {tabla}").fetchone()
+        return fila[0]
+
+    def catalogo_servicios(self) -> List[Dict[str, Any]]:
+        """Catálogo guardado, en el formato de generar_datos_servicios"""
+        columnas = COLUMNAS['servicios']
+        cursor = self.conexion.execute(f"SELECT {', '.join(columnas)} FROM servicios ORDER BY rowid")
+        return [dict(zip(columnas, fila), requiere_insumos=bool(fila[4])) for fila in cursor]
+
+    def ecuaciones_tiempo(self) -> Dict[str, List[Tuple[str, float, float]]]:
+        """Ecuaciones guardadas ({servicio: [(grupo, minutos, factor), ...]}), en el orden en que se guardaron"""
+        ecuaciones = {}
+        cursor = self.conexion.execute("SELECT servicio, grupo, minutos, factor FROM ecuaciones ORDER BY rowid")
+        for servicio, grupo, minutos, factor in cursor:
+            ecuaciones.setdefault(servicio, []).append((grupo, minutos, factor))
+        return ecuaciones
+
+    def iterar_produccion(self, periodo: str) -> Iterator[Dict[str, Any]]:
+        """Registros de producción del periodo (formato de la hoja PRODUCCION), sin cargarlos todos"""
+        columnas = COLUMNAS['produccion'][1:]
+        cursor = self.conexion.execute(
+            f"SELECT {', '.join(columnas)} FROM produccion WHERE periodo = ? ORDER BY rowid", (periodo,))
+        for fila in cursor:
+            yield dict(zip(columnas, fila))
+
+    def produccion_agregada(self, periodo: str, servicios: List[str], sedes: List[str]) -> pd.DataFrame:
+        """Volumen, precio y facturado por (servicio, sede), como AgregadorProduccion.resultado"""
+        from .sheets.produccion_agregada import completar_agregado
+
+        total = self.consultar(
+            "SELECT servicio, sede, SUM(cantidad) AS cantidad, SUM(cantidad * valor_unitario) AS facturado "
+            "FROM produccion WHERE periodo = ? GROUP BY servicio, sede ORDER BY MIN(rowid)", [periodo])
+        return completar_agregado(total.set_index(['servicio', 'sede']), servicios, sedes)
+
+    def nomina_por_grupo(self, periodo: str) -> List[Dict[str, Any]]:
+        """
+        Personal y salario promedio por (cargo, sede) de un periodo.
+
+        Returns:
+            Registros en el formato de generar_personal_nomina (el cargo es el
+            grupo); lista vacía si el periodo no tiene nómina
+        """
+        cursor = self.conexion.execute(
+            "SELECT cargo, sede, AVG(salario), COUNT(*) FROM nomina WHERE periodo = ? "
+            "GROUP BY cargo, sede ORDER BY cargo, sede", (periodo,))
+        return [{'id': f"G{i:03d}", 'grupo': grupo, 'salario': salario, 'sede': sede, 'cantidad': cantidad}
+                for i, (grupo, sede, salario, cantidad) in enumerate(cursor, 1)]
+
+    def contabilidad_agregada(self, periodo: str = None) -> pd.DataFrame:
+        """Neto contable por (periodo, cuenta, centro), de un periodo o de todos"""
+        sql = "SELECT periodo, codigo_cuenta, nombre_centro, SUM(neto) AS neto FROM contabilidad"
+        parametros = []
+        if periodo is not None:
+            sql += " WHERE periodo = ?"
+            parametros.append(periodo)
+        return self.consultar(sql + " GROUP BY periodo, codigo_cuenta, nombre_centro "
+                                    "ORDER BY periodo, codigo_cuenta, nombre_centro", parametros)
+
+    def costos_por_cuenta(self, periodo: str = None) -> Dict[str, float]:
+        """Neto contable por cuenta (de un periodo o de todos)"""
+        return self._suma_por('contabilidad', 'codigo_cuenta', 'neto', periodo)
+
+    def costos_por_centro(self, periodo: str = None) -> Dict[str, float]:
+        """Neto contable por centro de operación (de un periodo o de todos)"""
+        return self._suma_por('contabilidad', 'nombre_centro', 'neto', periodo)
+
+    def costo_nomina_por_sede(self, periodo: str) -> Dict[str, float]:
+        """Salarios por sede de un periodo"""
+        return self._suma_por('nomina', 'sede', 'salario', periodo)
+
+    def costo_nomina_por_cargo(self, periodo: str) -> Dict[str, float]:
+        """Salarios por cargo (grupo ocupacional) de un periodo"""
+        return self._suma_por('nomina', 'cargo', 'salario', periodo)
+
+    def _suma_por(self, tabla: str, llave: str, valor: str, periodo: str = None) -> Dict[str, float]:
+        sql = f"SELECT {llave}, SUM({valor}) FROM {tabla}"
+        parametros = ()
+        if periodo is not None:
+            sql += " WHERE periodo = ?"
+            parametros = (periodo,)
+        return dict(self.conexion.execute(sql + f" GROUP BY {llave} ORDER BY {llave}", parametros).fetchall())
@@ -0,0 +1,194 @@
+"""
+Caché de archivos importados.
+
+Leer un Excel grande (auxiliares contables, nómina, producción) con
+pd.read_excel toma minutos; lo que queda después de renombrar, limpiar y
+convertir tipos se guarda aquí para que las siguientes corridas con la misma
+fuente lo carguen en milisegundos.
+
+Las entradas se identifican por el hash del contenido del archivo (sha256) y
+por una variante que describe el procesamiento (importador, hoja, mapeo de
+columnas). Un índice guarda mtime y tamaño de cada ruta: si no cambiaron se
+reutiliza el hash ya calculado; si cambiaron se vuelve a calcular y, si el
+contenido es el mismo (ej: el archivo solo se copió), la entrada sigue
+siendo válida.
+
+Formato: Feather (Arrow IPC, leído con memory map) si pyarrow está
+instalado; si no, pickle de pandas. Lo que el procesamiento calculó además
+del DataFrame (ej: el reporte de validación) se guarda junto a la entrada en
+un JSON con el mismo nombre.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - depende del entorno
+    feather = None
+
+_BLOQUE_HASH = 1 << 20
+
+
+def directorio_por_defecto() -> Path:
+    """TDABC_CACHE_DIR, o tdabc dentro de XDG_CACHE_HOME (~/.cache por defecto)"""
+    if os.environ.get("TDABC_CACHE_DIR"):
+        return Path(os.environ["TDABC_CACHE_DIR"])
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "tdabc"
+
+
+def hash_archivo(ruta) -> str:
+    """sha256 del contenido, leído por bloques"""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(_BLOQUE_HASH), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _escribir_atomico(ruta: Path, escribir: Callable[[str], None]):
+    """Escribe a un temporal del mismo directorio y lo renombra (nunca queda a medias)"""
+    fd, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=".tmp-")
+    os.close(fd)
+    try:
+        escribir(temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+class CacheImportacion:
+    """Directorio de DataFrames procesados, indexados por contenido de la fuente"""
+
+    INDICE = "indice.json"
+
+    def __init__(self, directorio=None):
+        """
+        Args:
+            directorio: Carpeta de la caché (por defecto directorio_por_defecto())
+        """
+        self.directorio = Path(directorio) if directorio else directorio_por_defecto()
+
+    def hash_fuente(self, ruta) -> str:
+        """Hash del contenido de `ruta`, sin releerla si mtime y tamaño no cambiaron"""
+        ruta = Path(ruta).resolve()
+        info = ruta.stat()
+        indice = self._leer_indice()
+        previo = indice.get(str(ruta))
+        if previo and previo["mtime_ns"] == info.st_mtime_ns and previo["tamano"] == info.st_size:
+            return previo["hash"]
+
+        hash_contenido = hash_archivo(ruta)
+        indice[str(ruta)] = {"mtime_ns": info.st_mtime_ns, "tamano": info.st_size, "hash": hash_contenido}
+        self._guardar_indice(indice)
+        return hash_contenido
+
+    def _entrada(self, ruta, variante: str) -> Path:
+        """Ruta de la entrada sin extensión: hash del contenido y de la variante"""
+        clave_variante = hashlib.sha1(variante.encode("utf-8")).hexdigest()[:12]
+        return self.directorio / f"{self.hash_fuente(ruta)}-{clave_variante}"
+
+    def obtener(self, ruta, variante: str) -> Optional[pd.DataFrame]:
+        """DataFrame guardado para la fuente y variante, o None si no hay entrada válida"""
+        entrada = self._entrada(ruta, variante)
+        if feather is not None and entrada.with_suffix(".feather").exists():
+            return feather.read_table(entrada.with_suffix(".feather"), memory_map=True).to_pandas()
+        if entrada.with_suffix(".pkl").exists():
+            return pd.read_pickle(entrada.with_suffix(".pkl"))
+        return None
+
+    def obtener_metadatos(self, ruta, variante: str) -> Optional[dict]:
+        """Metadatos guardados con la entrada de la fuente y variante (None si no hay)"""
+        try:
+            with open(self._entrada(ruta, variante).with_suffix(".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def guardar(self, ruta, variante: str, df: pd.DataFrame, metadatos: dict = None) -> Path:
+        """Guarda el DataFrame procesado de la fuente (y sus metadatos); devuelve la ruta de la entrada"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        entrada = self._entrada(ruta, variante)
+        df = df.reset_index(drop=True)
+        if metadatos is not None:
+            # Antes que el DataFrame: una entrada nunca queda sin sus metadatos
+            def escribir(temporal):
+                with open(temporal, "w", encoding="utf-8") as f:
+                    json.dump(metadatos, f)
+
+            _escribir_atomico(entrada.with_suffix(".json"), escribir)
+        if feather is not None:
+            try:
+                _escribir_atomico(entrada.with_suffix(".feather"), lambda temporal: df.to_feather(temporal))
+                return entrada.with_suffix(".feather")
+            except (TypeError, ValueError, NotImplementedError):
+                pass  # Columnas que Arrow no puede tipar (ej: números y textos mezclados)
+        _escribir_atomico(entrada.with_suffix(".pkl"), lambda temporal: df.to_pickle(temporal))
+        return entrada.with_suffix(".pkl")
+
+    def limpiar(self):
+        """Elimina todas las entradas y el índice"""
+        if not self.directorio.exists():
+            return
+        for entrada in self.directorio.iterdir():
+            if entrada.suffix in (".feather", ".pkl", ".json"):
+                entrada.unlink()
+
+    def _leer_indice(self) -> dict:
+        try:
+            with open(self.directorio / self.INDICE, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _guardar_indice(self, indice: dict):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        def escribir(temporal):
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(indice, f, indent=1)
+
+        _escribir_atomico(self.directorio / self.INDICE, escribir)
+
+
+def cargar_con_cache(cache: Optional[CacheImportacion], ruta, variante: str,
+                     preparar: Callable[[], Optional[pd.DataFrame]],
+                     metadatos: Callable[[], dict] = None,
+                     restaurar: Callable[[dict], Any] = None) -> Tuple[Optional[pd.DataFrame], bool]:
+    """
+    Devuelve el DataFrame procesado de `ruta` desde la caché o llamando a `preparar`.
+
+    Args:
+        cache: Caché a usar (None: siempre se llama a `preparar`)
+        ruta: Archivo fuente
+        variante: Descripción del procesamiento (distintas variantes no se mezclan)
+        preparar: Lee y procesa la fuente; devuelve None si falla (no se guarda)
+        metadatos: Se llama después de `preparar`; lo que devuelve (serializable a
+                   JSON) se guarda con la entrada
+        restaurar: Se llama con esos metadatos cuando el DataFrame viene de la
+                   caché; si la entrada no los tiene se vuelve a preparar
+
+    Returns:
+        (DataFrame o None, True si vino de la caché)
+    """
+    if cache is None:
+        return preparar(), False
+    df = cache.obtener(ruta, variante)
+    if df is not None:
+        if restaurar is None:
+            return df, True
+        guardados = cache.obtener_metadatos(ruta, variante)
+        if guardados is not None:
+            restaurar(guardados)
+            return df, True
+    df = preparar()
+    if df is not None:
+        cache.guardar(ruta, variante, df, metadatos() if metadatos else None)
+    return df, False
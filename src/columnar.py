@@ -0,0 +1,75 @@
+"""
+Almacenamiento columnar de los datos importados.
+
+Los importadores guardan lo leído como un DataFrame (`tabla`) con las
+columnas de texto repetitivas codificadas como categorías: las consultas
+(costos por sede, por cuenta, ...) son group-bys sobre esa tabla y la lista
+de diccionarios de siempre solo se construye si alguien la pide.
+"""
+import pandas as pd
+
+
+def codificar_categoricas(df: pd.DataFrame, proporcion_maxima: float = 0.5) -> pd.DataFrame:
+    """
+    Convierte a categóricas las columnas de texto con pocos valores distintos.
+
+    Args:
+        df: Datos importados
+        proporcion_maxima: Se codifica una columna si sus valores distintos no
+                           superan esta proporción de las filas (las columnas casi
+                           únicas, como nombres o identificaciones, quedan igual)
+
+    Returns:
+        DataFrame nuevo con las columnas codificadas
+    """
+    df = df.copy()
+    limite = max(len(df) * proporcion_maxima, 1)
+    for columna in df.columns:
+        serie = df[columna]
+        if (pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)) \
+                and not isinstance(serie.dtype, pd.CategoricalDtype) and serie.nunique() <= limite:
+            df[columna] = serie.astype('category')
+    return df
+
+
+def contiene(serie: pd.Series, patron: str) -> pd.Series:
+    """
+    Máscara de filas cuyo texto contiene `patron` (sin distinguir mayúsculas).
+
+    En columnas categóricas el patrón se evalúa una vez por categoría y no
+    una vez por fila.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        return serie.isin(categorias[categorias.astype(str).str.contains(patron, case=False)])
+    return serie.str.contains(patron, case=False, na=False)
+
+
+class RegistrosPerezosos:
+    """
+    Vista de lista de diccionarios sobre la tabla columnar de un importador.
+
+    Se construye la primera vez que se lee y se reutiliza mientras la tabla
+    sea la misma. Asignar una lista (o None) reemplaza la tabla.
+    """
+
+    def __init__(self, atributo_tabla: str = 'tabla'):
+        self.atributo_tabla = atributo_tabla
+
+    def __set_name__(self, owner, nombre):
+        self.atributo_cache = f"_{nombre}_cache"
+
+    def __get__(self, obj, tipo=None):
+        if obj is None:
+            return self
+        tabla = getattr(obj, self.atributo_tabla, None)
+        if tabla is None:
+            return None
+        cache = obj.__dict__.get(self.atributo_cache)
+        if cache is None or cache[0] is not tabla:
+            cache = obj.__dict__[self.atributo_cache] = (tabla, tabla.to_dict('records'))
+        return cache[1]
+
+    def __set__(self, obj, registros):
+        tabla = None if registros is None else codificar_categoricas(pd.DataFrame(registros))
+        setattr(obj, self.atributo_tabla, tabla)
@@ -1,8 +1,19 @@
 """
 Configuración y constantes del Modelo TDABC
 Ahora carga desde archivos JSON con fallback a valores hardcodeados
+
+Los valores de la empresa (SEDES, SERVICIOS, CATEGORIAS, ...) no se calculan
+al importar el módulo: la primera vez que se pide uno se leen los JSON y se
+arma un ConfigSnapshot inmutable que queda en caché. `recargar()` vuelve a
+leer los JSON y `establecer()` cambia la configuración en uso.
+
+    >>> from src import config
+    >>> config.SEDES              # como siempre (lista)
+    >>> config.obtener().sedes    # el snapshot en uso (tupla)
+    >>> config.recargar()         # después de editar los JSON
 """
-from .mapper import get_mapper
+import sys
+from types import MappingProxyType
 
 # Colores corporativos (Azul médico y Gris) - NO parametrizables
 COLOR_HEADER = "003366"  # Azul oscuro
@@ -14,9 +25,6 @@ COLOR_CALCULO = "F2F2F2" # Gris para cálculos
 COLOR_RESULTADO = "DDEBF7" # Azul muy claro resultados
 FUENTE_BASE = "Arial Narrow" # Fuente solicitada
 
-# ========== CARGAR CONFIGURACIÓN DESDE JSON ==========
-_mapper = get_mapper()
-
 # ========== VALORES HARDCODEADOS (FALLBACK) ==========
 # Estos valores se usan SOLO si no existen los archivos JSON
 
@@ -115,40 +123,195 @@ _VALORES_FACTURACION_DEFAULT = {
     "Terapéutico": (5500000, 35000000)
 }
 
-# ========== VALORES PÚBLICOS (CON FALLBACK) ==========
-# Estos son los que usa el resto del código
+# ========== PARÁMETROS FIJOS ==========
+
+# Capacidad mensual en minutos (por sala)
+# 176 horas al mes (Estándar Colombia)
+CAPACIDAD_MENSUAL_MINUTOS = 10560
 
-# Sedes/Centros de Costo
-SEDES = _mapper.get_centros_lista() or _SEDES_DEFAULT
-ASEGURADORAS = _mapper.get_aseguradoras() or _ASEGURADORAS_DEFAULT
+# Porcentaje de capacidad práctica (se descuentan pausas, reuniones, etc.)
+PORCENTAJE_CAPACIDAD_PRACTICA = 85
 
-# Servicios
-SERVICIOS = _mapper.get_servicios_lista() or _SERVICIOS_DEFAULT
-CATEGORIAS_SERVICIOS = _mapper.get_categorias_servicios() or _CATEGORIAS_SERVICIOS_DEFAULT
-VALORES_FACTURACION = _mapper.get_valores_facturacion() or _VALORES_FACTURACION_DEFAULT
+# Factor prestacional sector salud (salario + 40.77% prestaciones)
+FACTOR_PRESTACIONAL = 1.4077
 
-# Construir CATEGORIAS desde servicios cargados
-_categorias_from_json = {}
-if _mapper.servicios:
-    for servicio in _mapper.get_servicios_completos() or []:
-        cat = servicio["categoria"]
-        if cat not in _categorias_from_json:
-            _categorias_from_json[cat] = []
-        _categorias_from_json[cat].append(servicio["nombre"])
-CATEGORIAS = _categorias_from_json if _categorias_from_json else _CATEGORIAS_DEFAULT
+_NOMBRE_EMPRESA_DEFAULT = "CardioCentro Diagnóstico Integral S.A.S."
 
-# Grupos Ocupacionales
-GRUPOS_OCUPACIONALES = _mapper.get_grupos_ocupacionales_lista() or _GRUPOS_OCUPACIONALES_DEFAULT
 
-# Plan Contable
-PRESUPUESTO_INDIRECTOS = _mapper.get_presupuesto_indirectos_dict() or _PRESUPUESTO_INDIRECTOS_DEFAULT
+# ========== CONFIGURACIÓN CARGADA DESDE JSON ==========
 
-# Salas por Sede
-SALAS_POR_SEDE = _mapper.get_salas_por_centro() or _SALAS_POR_SEDE_DEFAULT
+# Valores públicos con el nombre y el tipo de antes (listas y diccionarios):
+# config.SEDES, config.SERVICIOS, ... en el módulo y en cada ConfigSnapshot.
+# Cada acceso arma una copia nueva: quien la modifique no cambia el snapshot.
+_PUBLICOS = {
+    "SEDES": ("sedes", list),
+    "ASEGURADORAS": ("aseguradoras", list),
+    "SERVICIOS": ("servicios", list),
+    "CATEGORIAS_SERVICIOS": ("categorias_servicios", dict),
+    "VALORES_FACTURACION": ("valores_facturacion", dict),
+    "CATEGORIAS": ("categorias", lambda categorias: {c: list(s) for c, s in categorias.items()}),
+    "GRUPOS_OCUPACIONALES": ("grupos_ocupacionales", list),
+    "PRESUPUESTO_INDIRECTOS": ("presupuesto_indirectos", dict),
+    "SALAS_POR_SEDE": ("salas_por_sede", dict),
+    "NOMBRE_EMPRESA": ("nombre_empresa", str),
+    "_mapper": ("mapper", None),
+}
+
+
+def _congelar_listas(diccionario: dict) -> MappingProxyType:
+    """Diccionario de solo lectura con los valores (listas) como tuplas"""
+    return MappingProxyType({clave: tuple(valor) for clave, valor in diccionario.items()})
+
+
+class ConfigSnapshot:
+    """
+    Valores de configuración de una empresa, calculados una vez.
+
+    Es inmutable (tuplas y diccionarios de solo lectura): para cambiar la
+    configuración se arma otro snapshot y se pasa a `establecer()`.
+
+    También sirve de contexto de configuración para ModeloTDABC y las hojas:
+    expone los mismos nombres que el módulo (SEDES, SERVICIOS, _mapper,
+    COLOR_HEADER, ...), así que `config.SEDES` funciona igual si `config` es
+    el módulo o un snapshot de otra empresa.
+    """
+
+    CAMPOS = ("sedes", "aseguradoras", "servicios", "categorias_servicios", "valores_facturacion",
+              "categorias", "grupos_ocupacionales", "presupuesto_indirectos", "salas_por_sede",
+              "nombre_empresa", "mapper")
+    __slots__ = CAMPOS
+
+    def __init__(self, **valores):
+        for campo in self.CAMPOS:
+            object.__setattr__(self, campo, valores[campo])
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("ConfigSnapshot es inmutable: usa config.establecer() o config.recargar()")
+
+    def __delattr__(self, nombre):
+        raise AttributeError("ConfigSnapshot es inmutable: usa config.establecer() o config.recargar()")
+
+    def __getattr__(self, nombre):
+        """Nombres del módulo: valores públicos (copias de los campos) y constantes fijas"""
+        if nombre in _PUBLICOS:
+            campo, convertir = _PUBLICOS[nombre]
+            valor = getattr(self, campo)
+            return convertir(valor) if convertir else valor
+        if nombre.isupper() and not nombre.startswith("_") and nombre in globals():
+            return globals()[nombre]
+        raise AttributeError(f"'ConfigSnapshot' object has no attribute {nombre!r}")
+
+    def __reduce__(self):
+        """Se puede enviar a otro proceso: los diccionarios de solo lectura viajan como dict"""
+        valores = {campo: getattr(self, campo) for campo in self.CAMPOS}
+        return _snapshot_desde_valores, ({campo: dict(valor) if isinstance(valor, MappingProxyType) else valor
+                                          for campo, valor in valores.items()},)
+
+    @classmethod
+    def desde_mapper(cls, mapper) -> "ConfigSnapshot":
+        """Snapshot con los valores del ConfigMapper (o los hardcodeados si falta un JSON)"""
+        # Construir CATEGORIAS desde servicios cargados
+        categorias = {}
+        if mapper.servicios:
+            for servicio in mapper.get_servicios_completos() or []:
+                categorias.setdefault(servicio["categoria"], []).append(servicio["nombre"])
+
+        return cls(
+            sedes=tuple(mapper.get_centros_lista() or _SEDES_DEFAULT),
+            aseguradoras=tuple(mapper.get_aseguradoras() or _ASEGURADORAS_DEFAULT),
+            servicios=tuple(mapper.get_servicios_lista() or _SERVICIOS_DEFAULT),
+            categorias_servicios=MappingProxyType(
+                mapper.get_categorias_servicios() or dict(_CATEGORIAS_SERVICIOS_DEFAULT)),
+            valores_facturacion=_congelar_listas(mapper.get_valores_facturacion() or _VALORES_FACTURACION_DEFAULT),
+            categorias=_congelar_listas(categorias or _CATEGORIAS_DEFAULT),
+            grupos_ocupacionales=tuple(
+                tuple(grupo) for grupo in mapper.get_grupos_ocupacionales_lista() or _GRUPOS_OCUPACIONALES_DEFAULT),
+            presupuesto_indirectos=MappingProxyType(
+                mapper.get_presupuesto_indirectos_dict() or dict(_PRESUPUESTO_INDIRECTOS_DEFAULT)),
+            salas_por_sede=MappingProxyType(mapper.get_salas_por_centro() or dict(_SALAS_POR_SEDE_DEFAULT)),
+            nombre_empresa=mapper.get_nombre_empresa() or _NOMBRE_EMPRESA_DEFAULT,
+            mapper=mapper,
+        )
+
+    @classmethod
+    def desde_empresa(cls, empresa) -> "ConfigSnapshot":
+        """
+        Snapshot de una empresa a partir de su archivo de configuración
+        (formato de ejemplos/*.json y de AdaptadorEmpresa), sin escribir en src/config/.
+
+        Lo que el archivo no trae (plan contable, mapeo de columnas, ...) se
+        toma de la configuración de src/config/.
+
+        Args:
+            empresa: Ruta al JSON de la empresa o su contenido ya leído (dict)
+
+        Raises:
+            ValueError: Si el archivo no pasa la validación de AdaptadorEmpresa
+        """
+        from .adaptador import AdaptadorEmpresa, configuracion_empresa
+        from .mapper import ConfigMapper, get_mapper
+
+        adaptador = AdaptadorEmpresa()
+        if isinstance(empresa, dict):
+            adaptador.config_data = empresa
+            valida = adaptador.validar_configuracion()
+        else:
+            valida = adaptador.cargar_configuracion(str(empresa))
+        if not valida:
+            origen = "dict" if isinstance(empresa, dict) else empresa
+            raise ValueError(f"Configuración de empresa inválida ({origen}): " + "; ".join(adaptador.errores))
+        return cls.desde_mapper(ConfigMapper.en_memoria(get_mapper(), **configuracion_empresa(adaptador.config_data)))
+
+
+def _snapshot_desde_valores(valores: dict) -> ConfigSnapshot:
+    """Reconstruye un snapshot serializado con pickle"""
+    return ConfigSnapshot(**{campo: MappingProxyType(valor) if isinstance(valor, dict) else valor
+                             for campo, valor in valores.items()})
+
+
+_snapshot = None
+
+
+def obtener() -> ConfigSnapshot:
+    """Snapshot en uso (se arma desde los JSON la primera vez)"""
+    global _snapshot
+    if _snapshot is None:
+        from .mapper import get_mapper
+        _snapshot = ConfigSnapshot.desde_mapper(get_mapper())
+    return _snapshot
+
+
+def establecer(snapshot: ConfigSnapshot) -> ConfigSnapshot:
+    """Cambia la configuración en uso"""
+    global _snapshot
+    _snapshot = snapshot
+    return snapshot
+
+
+def recargar() -> ConfigSnapshot:
+    """Vuelve a leer los JSON de configuración y los deja en uso"""
+    from .mapper import get_mapper
+    return establecer(ConfigSnapshot.desde_mapper(get_mapper(recargar=True)))
+
+
+def config_en_uso(config=None):
+    """
+    Contexto de configuración para ModeloTDABC y las hojas: `config` si se
+    entrega (ConfigSnapshot de una empresa) o, si es None, este módulo (la
+    configuración en uso, incluidos los valores reemplazados en pruebas).
+    """
+    return config if config is not None else sys.modules[__name__]
+
+
+# ========== VALORES PÚBLICOS (CON FALLBACK) ==========
+# Estos son los que usa el resto del código: config.SEDES, config.SERVICIOS, ...
+# Se resuelven con __getattr__ del módulo (PEP 562) desde el snapshot en uso.
+
+def __getattr__(nombre):
+    if nombre not in _PUBLICOS:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    return getattr(obtener(), nombre)
 
-# Capacidad mensual en minutos (por sala)
-# 176 horas al mes (Estándar Colombia)
-CAPACIDAD_MENSUAL_MINUTOS = 10560
 
-# Nombre de empresa (NUEVO - antes estaba hardcodeado en sheets)
-NOMBRE_EMPRESA = _mapper.get_nombre_empresa() or "CardioCentro Diagnóstico Integral S.A.S."
+def __dir__():
+    return sorted(set(globals()) | set(_PUBLICOS))
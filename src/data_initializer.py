@@ -1,13 +1,18 @@
 """
 Inicializador de datos financieros
 """
-from . import config
+from .config import config_en_uso
 
 
 class DataInitializer:
     """Clase para inicializar y calcular datos financieros"""
     
-    def __init__(self):
+    def __init__(self, config=None):
+        """
+        Args:
+            config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+        """
+        config = config_en_uso(config)
         self.presupuesto_indirectos = config.PRESUPUESTO_INDIRECTOS.copy()
         self.total_indirectos_global = sum(self.presupuesto_indirectos.values())
         self.indirectos_por_sede = {}
@@ -0,0 +1,222 @@
+"""
+Detección automática de encabezados de los exports.
+
+Los exports del HIS y del ERP cambian la escritura de los encabezados
+("Descripcion C.O." / "Desc. C.O.", "Débitos" / "DEBITOS"), y el
+MAPEO_COLUMNAS de los importadores deja de encontrarlos. Aquí se comparan
+los encabezados del archivo con las columnas esperadas:
+
+- Se normalizan (sin tildes, minúsculas, solo letras y dígitos).
+- El puntaje es el mayor entre la similitud de trigramas (Dice) y la de
+  palabras, donde una abreviatura cuenta como la palabra que abrevia
+  ("desc" ~ "descripcion").
+- Cada columna esperada se asigna al encabezado con mayor puntaje, sin
+  repetir encabezados y solo si supera el umbral.
+
+Los mapeos confirmados se guardan en src/config/mapeo_columnas.json
+(sección "perfiles_importacion"), indexados por la firma del encabezado: la
+siguiente importación con los mismos encabezados lo resuelve con una
+búsqueda en un diccionario.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+RUTA_PERFILES = Path(__file__).parent / "config" / "mapeo_columnas.json"
+SECCION_PERFILES = "perfiles_importacion"
+
+
+def normalizar(texto) -> str:
+    """Texto sin tildes, en minúsculas y con solo letras y dígitos separados por un espacio"""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", texto))
+
+
+def _trigramas(texto: str) -> set:
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _similitud_palabras(a: List[str], b: List[str]) -> float:
+    """Dice sobre palabras; una palabra que es prefijo de otra (abreviatura) también coincide"""
+    if not a or not b:
+        return 0.0
+    libres = list(b)
+    coincidencias = 0
+    for palabra in a:
+        for i, otra in enumerate(libres):
+            if palabra == otra or (min(len(palabra), len(otra)) >= 3
+                                   and (otra.startswith(palabra) or palabra.startswith(otra))):
+                coincidencias += 1
+                del libres[i]
+                break
+    return 2 * coincidencias / (len(a) + len(b))
+
+
+def similitud(a, b) -> float:
+    """Puntaje entre 0 y 1 de dos encabezados"""
+    a, b = normalizar(a), normalizar(b)
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    ta, tb = _trigramas(a), _trigramas(b)
+    dice = 2 * len(ta & tb) / (len(ta) + len(tb))
+    return max(dice, _similitud_palabras(a.split(), b.split()))
+
+
+def emparejar(encabezados: Iterable, esperadas: Iterable[str],
+              umbral: float = 0.6) -> Tuple[Dict[str, str], Dict[str, float]]:
+    """
+    Asigna a cada columna esperada el encabezado del archivo más parecido.
+
+    Args:
+        encabezados: Encabezados del archivo
+        esperadas: Columnas que espera el importador (claves de su MAPEO_COLUMNAS)
+        umbral: Puntaje mínimo para aceptar un par
+
+    Returns:
+        ({encabezado: esperada}, {encabezado: puntaje})
+    """
+    encabezados = [e for e in encabezados if e is not None]
+    esperadas = list(esperadas)
+    pares = sorted(
+        ((similitud(encabezado, esperada), i, j)
+         for i, encabezado in enumerate(encabezados)
+         for j, esperada in enumerate(esperadas)),
+        key=lambda par: (-par[0], par[1], par[2]),
+    )
+    mapeo, puntajes = {}, {}
+    usadas = set()
+    for puntaje, i, j in pares:
+        if puntaje < umbral:
+            break
+        encabezado = encabezados[i]
+        if encabezado in mapeo or j in usadas:
+            continue
+        mapeo[encabezado] = esperadas[j]
+        puntajes[encabezado] = round(puntaje, 3)
+        usadas.add(j)
+    return mapeo, puntajes
+
+
+def firma_encabezados(tipo: str, encabezados: Iterable) -> str:
+    """Identifica una fuente por su tipo y sus encabezados exactos (en orden)"""
+    texto = "\x1f".join([tipo] + ["" if e is None else str(e) for e in encabezados])
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+class DetectorEncabezados:
+    """Resuelve los encabezados de un archivo con perfiles confirmados o por similitud"""
+
+    def __init__(self, ruta_perfiles=None, umbral: float = 0.6):
+        """
+        Args:
+            ruta_perfiles: JSON donde se guardan los perfiles (por defecto src/config/mapeo_columnas.json)
+            umbral: Puntaje mínimo de similitud para aceptar un par
+        """
+        self.ruta_perfiles = Path(ruta_perfiles) if ruta_perfiles else RUTA_PERFILES
+        self.umbral = umbral
+        self._perfiles: Optional[Dict[str, dict]] = None
+        # Última detección por similitud, lista para confirmar: (tipo, encabezados, mapeo)
+        self.pendiente = None
+        self.puntajes: Dict[str, float] = {}
+
+    def perfiles(self) -> Dict[str, dict]:
+        """Perfiles confirmados por firma (se leen una vez)"""
+        if self._perfiles is None:
+            self._perfiles = self._leer_json().get(SECCION_PERFILES, {})
+        return self._perfiles
+
+    def resolver(self, tipo: str, encabezados: List, esperadas: Iterable[str]) -> Tuple[Dict[str, str], bool]:
+        """
+        Mapeo {encabezado del archivo: columna esperada}.
+
+        Args:
+            tipo: Tipo de fuente (ej: "contabilidad")
+            encabezados: Primera fila del archivo
+            esperadas: Columnas que espera el importador
+
+        Returns:
+            (mapeo, True si vino de un perfil confirmado)
+        """
+        encabezados = list(encabezados)
+        perfil = self.perfiles().get(firma_encabezados(tipo, encabezados))
+        if perfil is not None:
+            self.pendiente, self.puntajes = None, {}
+            return dict(perfil["columnas"]), True
+
+        esperadas = list(esperadas)
+        exactas = {e: e for e in encabezados if e in esperadas}
+        faltantes = [e for e in esperadas if e not in exactas]
+        restantes = [e for e in encabezados if e not in exactas]
+        parecidas, self.puntajes = emparejar(restantes, faltantes, self.umbral)
+        mapeo = {**exactas, **parecidas}
+        self.pendiente = (tipo, encabezados, mapeo) if parecidas else None
+        return mapeo, False
+
+    def resolver_archivo(self, tipo: str, ruta_archivo, esperadas: Iterable[str], hoja=None,
+                         separador: str = ",") -> Tuple[Dict[str, str], bool]:
+        """Como resolver, con los encabezados de la primera fila del archivo (no lee el resto)"""
+        from .lector_excel import leer_encabezado
+
+        return self.resolver(tipo, leer_encabezado(ruta_archivo, hoja, separador), esperadas)
+
+    def descripcion_pendiente(self) -> Optional[str]:
+        """Pares detectados por similitud en la última resolución (None si no hubo)"""
+        if self.pendiente is None:
+            return None
+        _, _, mapeo = self.pendiente
+        pares = [f"'{encabezado}' -> '{mapeo[encabezado]}' ({puntaje:.2f})"
+                 for encabezado, puntaje in self.puntajes.items()]
+        return "Encabezados reconocidos por similitud: " + ", ".join(pares)
+
+    def confirmar(self, tipo: str = None, encabezados: List = None, mapeo: Dict[str, str] = None) -> str:
+        """
+        Guarda un mapeo como perfil (por defecto el de la última detección).
+
+        Returns:
+            Firma del perfil guardado
+        """
+        if tipo is None:
+            if self.pendiente is None:
+                raise ValueError("No hay un mapeo detectado pendiente de confirmar")
+            tipo, encabezados, mapeo = self.pendiente
+        firma = firma_encabezados(tipo, encabezados)
+        datos = self._leer_json()
+        datos.setdefault(SECCION_PERFILES, {})[firma] = {
+            "tipo": tipo,
+            "encabezados": ["" if e is None else str(e) for e in encabezados],
+            "columnas": dict(mapeo),
+        }
+        self._escribir_json(datos)
+        self._perfiles = datos[SECCION_PERFILES]
+        self.pendiente = None
+        return firma
+
+    def _leer_json(self) -> dict:
+        try:
+            with open(self.ruta_perfiles, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _escribir_json(self, datos: dict):
+        """Escribe con el formato del archivo (4 espacios, CRLF) y sin dejarlo a medias"""
+        self.ruta_perfiles.parent.mkdir(parents=True, exist_ok=True)
+        texto = json.dumps(datos, indent=4, ensure_ascii=False).replace("\n", "\r\n")
+        fd, temporal = tempfile.mkstemp(dir=self.ruta_perfiles.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(texto)
+            os.replace(temporal, self.ruta_perfiles)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
@@ -0,0 +1,12 @@
+"""
+Motor de cálculo TDABC con NumPy.
+
+Reproduce en Python la cadena de fórmulas del libro Excel
+(NOMINA → CAPACIDAD → COSTO_POR_MINUTO → ECUACIONES_TIEMPO →
+COSTEO_SERVICIOS → RESUMEN_EJECUTIVO) sobre arreglos NumPy, para obtener
+costos por minuto y costos unitarios sin abrir Excel.
+"""
+from .datos import DatosModelo
+from .calculo import ResultadosModelo, calcular_modelo
+
+__all__ = ["DatosModelo", "ResultadosModelo", "calcular_modelo"]
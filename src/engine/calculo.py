@@ -0,0 +1,284 @@
+"""
+Cálculo vectorizado de la cadena TDABC.
+
+Cada función corresponde a una hoja del libro y replica sus fórmulas
+(incluidos los casos borde: divisiones por cero que el libro resuelve con
+IF/IFERROR devuelven 0). Los resultados son diccionarios de arreglos NumPy
+cuyas claves siguen las columnas estándar de mapeo_columnas.json.
+"""
+from typing import Dict
+
+import numpy as np
+
+from .datos import DatosModelo
+
+
+def _dividir(numerador, denominador):
+    """numerador / denominador, o 0 donde el denominador no es positivo (IF(x>0, ...))"""
+    numerador = np.asarray(numerador, dtype=float)
+    denominador = np.asarray(denominador, dtype=float)
+    resultado = np.zeros(np.broadcast(numerador, denominador).shape)
+    np.divide(numerador, denominador, out=resultado, where=denominador > 0)
+    return resultado
+
+
+def _sumar_por(indices, pesos, n):
+    """Suma `pesos` agrupando por `indices` (0..n-1); los índices -1 se descartan"""
+    validos = indices >= 0
+    return np.bincount(indices[validos], weights=pesos[validos], minlength=n)
+
+
+def calcular_nomina(datos: DatosModelo) -> Dict[str, np.ndarray]:
+    """NOMINA: costo mensual por persona y por grupo, matrices (G, S)"""
+    costo_total = datos.salario * datos.factor_prestacional
+    return {
+        'costo_total': costo_total,
+        'total_grupo': costo_total * datos.personal,
+    }
+
+
+def calcular_capacidad(datos: DatosModelo) -> Dict[str, np.ndarray]:
+    """CAPACIDAD: minutos de capacidad práctica por persona y por grupo, vectores (G,)"""
+    minutos_practicos = datos.horas_mensuales * 60 * datos.porcentaje_capacidad / 100
+    personal = datos.personal.sum(axis=1)
+    return {
+        'minutos_practicos': np.full(len(datos.grupos), minutos_practicos),
+        'personal': personal,
+        'total_minutos': minutos_practicos * personal,
+    }
+
+
+def calcular_costo_minuto(datos: DatosModelo, nomina, capacidad) -> Dict[str, np.ndarray]:
+    """
+    COSTO_POR_MINUTO: costo por minuto por (grupo, sede) y promedio nacional.
+
+    El promedio nacional (columna H de la tabla cruzada) es el promedio simple
+    entre sedes, igual que AVERAGEIFS sobre TablaDetalleCostoMinuto.
+    """
+    costo_minuto = _dividir(nomina['costo_total'], capacidad['minutos_practicos'][:, None])
+    promedio = costo_minuto.mean(axis=1) if datos.sedes else np.zeros(len(datos.grupos))
+    return {
+        'costo_minuto': costo_minuto,
+        'promedio': promedio,
+    }
+
+
+def calcular_ecuaciones(datos: DatosModelo, costo_minuto) -> Dict[str, np.ndarray]:
+    """ECUACIONES_TIEMPO: minutos ajustados y costo de MO por línea de ecuación"""
+    minutos_ajustados = datos.ecuacion_minutos * datos.ecuacion_factor
+    # VLOOKUP del grupo en la tabla cruzada; IFERROR(...,0) si no existe
+    promedio = np.append(costo_minuto['promedio'], 0.0)
+    costo = promedio[datos.ecuacion_grupo]  # índice -1 → el 0 agregado al final
+    return {
+        'minutos_ajustados': minutos_ajustados,
+        'costo_minuto': costo,
+        'costo_mo': minutos_ajustados * costo,
+    }
+
+
+def calcular_insumos(datos: DatosModelo) -> Dict[str, np.ndarray]:
+    """INSUMOS: costo total por línea de insumo"""
+    return {'costo_total': datos.insumo_cantidad * datos.insumo_costo_unitario}
+
+
+def calcular_tasas_cif(datos: DatosModelo) -> Dict[str, np.ndarray]:
+    """
+    COSTOS_INDIRECTOS: distribución de la clase 73 por salas y tasa CIF por sede.
+
+    Returns:
+        'indirectos': matriz (conceptos, S) con el valor asignado a cada sede
+        'total_73', 'capacidad', 'tasa': vectores (S,) de la tabla de tasas;
+        una sede sin salas configuradas no tiene fila de tasa (tasa 0).
+    """
+    total_salas = sum(datos.salas_por_sede.values())
+    salas = np.array([datos.salas_por_sede.get(sede, 1) for sede in datos.sedes], dtype=float)
+    indirectos = datos.indirecto_valor[:, None] * (salas / total_salas)[None, :]
+
+    es_73 = np.array([codigo.startswith("73") for codigo in datos.indirecto_codigo], dtype=bool)
+    total_73 = indirectos[es_73].sum(axis=0) if es_73.any() else np.zeros(len(datos.sedes))
+    con_tasa = np.array([sede in datos.salas_por_sede for sede in datos.sedes], dtype=bool)
+    capacidad = np.where(con_tasa, datos.capacidad_mensual_minutos * salas, 0.0)
+    return {
+        'indirectos': indirectos,
+        'total_73': np.where(con_tasa, total_73, 0.0),
+        'capacidad': capacidad,
+        'tasa': _dividir(np.where(con_tasa, total_73, 0.0), capacidad),
+    }
+
+
+def agregar_produccion(datos: DatosModelo) -> Dict[str, np.ndarray]:
+    """
+    PRODUCCION agregada por (servicio, sede), por servicio y por sede.
+
+    'precio' es el promedio ponderado por cantidad (facturado / volumen), el
+    mismo que publica la hoja PRODUCCION_AGREGADA.
+    """
+    n_v, n_s = len(datos.servicios), len(datos.sedes)
+    servicio, sede = datos.produccion_servicio, datos.produccion_sede
+    cantidad, valor = datos.produccion_cantidad, datos.produccion_valor_unitario
+    facturado = cantidad * valor
+
+    cruce = np.where((servicio >= 0) & (sede >= 0), servicio * n_s + sede, -1)
+    volumen = _sumar_por(cruce, cantidad, n_v * n_s).reshape(n_v, n_s)
+    facturado_cruce = _sumar_por(cruce, facturado, n_v * n_s).reshape(n_v, n_s)
+    return {
+        'precio': _dividir(facturado_cruce, volumen),
+        'volumen': volumen,
+        'volumen_servicio': _sumar_por(servicio, cantidad, n_v),
+        'facturado_servicio': _sumar_por(servicio, facturado, n_v),
+        'facturado_sede': _sumar_por(sede, facturado, n_s),
+        'facturado': facturado.sum(),
+        'cantidad': cantidad.sum(),
+    }
+
+
+def calcular_costeo(datos: DatosModelo, ecuaciones, insumos, produccion, tasas) -> Dict[str, np.ndarray]:
+    """
+    COSTEO_SERVICIOS: costo unitario por (servicio, sede), matrices (V, S).
+
+    El CIF usa los minutos sin ajustar por complejidad, como la fórmula del libro.
+    """
+    n_v = len(datos.servicios)
+    mo = _sumar_por(datos.ecuacion_servicio, ecuaciones['costo_mo'], n_v)
+    costo_insumos = _sumar_por(datos.insumo_servicio, insumos['costo_total'], n_v)
+    minutos = _sumar_por(datos.ecuacion_servicio, datos.ecuacion_minutos, n_v)
+
+    n_s = len(datos.sedes)
+    mo = np.repeat(mo[:, None], n_s, axis=1)
+    costo_insumos = np.repeat(costo_insumos[:, None], n_s, axis=1)
+    cif = minutos[:, None] * tasas['tasa'][None, :]
+    total = mo + costo_insumos + cif
+    precio = produccion['precio']
+    margen = precio - total
+    return {
+        'mo': mo,
+        'insumos': costo_insumos,
+        'cif': cif,
+        'total': total,
+        'precio': precio,
+        'margen_moneda': margen,
+        'margen_pct': _dividir(margen, precio),
+        'volumen': produccion['volumen'],
+    }
+
+
+def calcular_costos_indirectos(datos: DatosModelo, nomina, costeo, tasas) -> Dict[str, np.ndarray]:
+    """
+    COSTOS_INDIRECTOS: auxiliar contable por sede (insumos 71, MO 72, CIF 73).
+
+    Returns:
+        'materia_prima', 'mano_obra': vectores (S,)
+        'cuentas': {codigo: vector (S,)} con todas las filas del auxiliar
+    """
+    materia_prima = (costeo['insumos'] * costeo['volumen']).sum(axis=0)
+    mano_obra = nomina['total_grupo'].sum(axis=0)
+
+    cuentas = {}
+    filas = [(datos.cuenta_materia_prima, materia_prima), (datos.cuenta_mano_obra, mano_obra)]
+    filas += list(zip(datos.indirecto_codigo, tasas['indirectos']))
+    for codigo, valores in filas:
+        cuentas[codigo] = cuentas.get(codigo, 0) + valores
+    return {
+        'materia_prima': materia_prima,
+        'mano_obra': mano_obra,
+        'cuentas': cuentas,
+    }
+
+
+def calcular_resumen(datos: DatosModelo, produccion, costeo, indirectos) -> Dict[str, object]:
+    """RESUMEN_EJECUTIVO: indicadores globales, conciliación y rentabilidad"""
+    volumen = costeo['volumen']
+    ingresos = produccion['facturado']
+    costos = (costeo['total'] * volumen).sum()
+    servicios_prestados = produccion['cantidad']
+    utilidad = ingresos - costos
+
+    # Conciliación: costo contable por clase vs costo asignado por TDABC
+    contable = {
+        clase: sum(valores.sum() for codigo, valores in indirectos['cuentas'].items()
+                   if codigo.startswith(clase))
+        for clase in ("71", "72", "73")
+    }
+    asignado = {
+        "71": (costeo['insumos'] * volumen).sum(),
+        "72": (costeo['mo'] * volumen).sum(),
+        "73": (costeo['cif'] * volumen).sum(),
+    }
+    total_contable = sum(contable.values())
+    total_asignado = sum(asignado.values())
+
+    costo_servicio = (costeo['total'] * volumen).sum(axis=1)
+    facturado_servicio = produccion['facturado_servicio']
+    costo_sede = (costeo['total'] * volumen).sum(axis=0)
+    facturado_sede = produccion['facturado_sede']
+    return {
+        'ingresos': ingresos,
+        'costos': costos,
+        'costo_mo': asignado["72"],
+        'costo_insumos': asignado["71"],
+        'costo_cif': asignado["73"],
+        'utilidad': utilidad,
+        'margen': float(_dividir(utilidad, ingresos)),
+        'servicios_prestados': servicios_prestados,
+        'precio_promedio': float(_dividir(ingresos, servicios_prestados)),
+        'costo_promedio': float(_dividir(costos, servicios_prestados)),
+        'contable': contable,
+        'asignado': asignado,
+        'capacidad_ociosa': total_contable - total_asignado,
+        'utilizacion': float(_dividir(total_asignado, total_contable)),
+        'por_servicio': {
+            'volumen': produccion['volumen_servicio'],
+            'costo': costo_servicio,
+            'facturacion': facturado_servicio,
+            'margen': facturado_servicio - costo_servicio,
+            'margen_pct': _dividir(facturado_servicio - costo_servicio, facturado_servicio),
+        },
+        'por_sede': {
+            'facturacion': facturado_sede,
+            'costos': costo_sede,
+            'margen': facturado_sede - costo_sede,
+            'margen_pct': _dividir(facturado_sede - costo_sede, facturado_sede),
+        },
+    }
+
+
+class ResultadosModelo:
+    """Resultados de cada etapa del modelo, un diccionario de arreglos por hoja"""
+
+    def __init__(self, datos, nomina, capacidad, costo_minuto, ecuaciones, insumos,
+                 tasas, produccion, costeo, indirectos, resumen):
+        self.datos = datos
+        self.nomina = nomina
+        self.capacidad = capacidad
+        self.costo_minuto = costo_minuto
+        self.ecuaciones = ecuaciones
+        self.insumos = insumos
+        self.tasas = tasas
+        self.produccion = produccion
+        self.costeo = costeo
+        self.indirectos = indirectos
+        self.resumen = resumen
+
+
+def calcular_modelo(datos: DatosModelo) -> ResultadosModelo:
+    """
+    Ejecuta la cadena completa NOMINA → ... → RESUMEN_EJECUTIVO.
+
+    Args:
+        datos: Entradas del modelo (ver DatosModelo.desde_config)
+
+    Returns:
+        ResultadosModelo con los resultados de cada hoja
+    """
+    nomina = calcular_nomina(datos)
+    capacidad = calcular_capacidad(datos)
+    costo_minuto = calcular_costo_minuto(datos, nomina, capacidad)
+    ecuaciones = calcular_ecuaciones(datos, costo_minuto)
+    insumos = calcular_insumos(datos)
+    tasas = calcular_tasas_cif(datos)
+    produccion = agregar_produccion(datos)
+    costeo = calcular_costeo(datos, ecuaciones, insumos, produccion, tasas)
+    indirectos = calcular_costos_indirectos(datos, nomina, costeo, tasas)
+    resumen = calcular_resumen(datos, produccion, costeo, indirectos)
+    return ResultadosModelo(datos, nomina, capacidad, costo_minuto, ecuaciones, insumos,
+                            tasas, produccion, costeo, indirectos, resumen)
@@ -0,0 +1,180 @@
+"""
+Entradas del motor de cálculo TDABC.
+
+DatosModelo convierte las estructuras que ya usan las hojas (listas de
+grupos, registros de nómina y producción, diccionarios de ecuaciones e
+insumos) en arreglos NumPy indexados por grupo, sede y servicio.
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .. import config
+from ..config import config_en_uso
+
+
+def _indices(nombres: List[str]) -> Dict[str, int]:
+    """Posición de cada nombre dentro de su lista"""
+    return {nombre: i for i, nombre in enumerate(nombres)}
+
+
+class DatosModelo:
+    """
+    Entradas del modelo TDABC en forma de arreglos NumPy.
+
+    Ejes: grupos ocupacionales (G), sedes (S) y servicios (V). Los registros
+    que mencionan un grupo, sede o servicio desconocido quedan con índice -1:
+    no participan en los cruces, igual que no coinciden en los SUMIFS del libro.
+    """
+
+    def __init__(
+        self,
+        grupos: List[Tuple[str, float]],
+        sedes: List[str],
+        servicios: List[str],
+        personal: Iterable[Dict[str, Any]],
+        produccion: Iterable[Dict[str, Any]],
+        ecuaciones: Dict[str, List[Tuple[str, float, float]]],
+        insumos: Dict[str, List[Tuple[str, float, float]]],
+        presupuesto_indirectos: Dict[str, float],
+        salas_por_sede: Dict[str, int],
+        cuenta_materia_prima: str = "7105",
+        cuenta_mano_obra: str = "7205",
+        horas_mensuales: float = config.CAPACIDAD_MENSUAL_MINUTOS / 60,
+        porcentaje_capacidad: float = config.PORCENTAJE_CAPACIDAD_PRACTICA,
+        factor_prestacional: float = config.FACTOR_PRESTACIONAL,
+        capacidad_mensual_minutos: float = config.CAPACIDAD_MENSUAL_MINUTOS,
+    ):
+        """
+        Args:
+            grupos: Lista de tuplas (grupo_ocupacional, salario_base)
+            sedes: Lista de sedes
+            servicios: Lista de servicios (filas de COSTEO_SERVICIOS)
+            personal: Registros de nómina (ver generar_personal_nomina)
+            produccion: Registros de producción (ver generar_datos_produccion)
+            ecuaciones: {servicio: [(grupo, minutos, factor_complejidad), ...]}
+            insumos: {servicio: [(tipo_insumo, cantidad, costo_unitario), ...]}
+            presupuesto_indirectos: {"codigo - nombre": valor_mensual}
+            salas_por_sede: {sede: salas}, driver de distribución de CIF
+            cuenta_materia_prima: Código contable de insumos (clase 71)
+            cuenta_mano_obra: Código contable de mano de obra directa (clase 72)
+            horas_mensuales: Horas mensuales por colaborador (PARAMETROS!B7)
+            porcentaje_capacidad: % de capacidad práctica (PARAMETROS!B9)
+            factor_prestacional: Factor prestacional (PARAMETROS!B10)
+            capacidad_mensual_minutos: Minutos mensuales por sala
+        """
+        self.grupos = [grupo for grupo, _ in grupos]
+        self.sedes = list(sedes)
+        self.servicios = list(servicios)
+        # Posición de cada nombre en su eje (para ubicar resultados por nombre)
+        self.indice_grupo = idx_grupo = _indices(self.grupos)
+        self.indice_sede = idx_sede = _indices(self.sedes)
+        self.indice_servicio = idx_servicio = _indices(self.servicios)
+
+        self.horas_mensuales = float(horas_mensuales)
+        self.porcentaje_capacidad = float(porcentaje_capacidad)
+        self.factor_prestacional = float(factor_prestacional)
+        self.capacidad_mensual_minutos = float(capacidad_mensual_minutos)
+
+        # NOMINA: salario y personal por (grupo, sede)
+        n_grupos, n_sedes = len(self.grupos), len(self.sedes)
+        salario_base = np.array([float(salario) for _, salario in grupos])
+        self.salario = np.repeat(salario_base[:, None], n_sedes, axis=1)
+        self.personal = np.zeros((n_grupos, n_sedes))
+        for registro in personal:
+            g = idx_grupo.get(registro['grupo'], -1)
+            s = idx_sede.get(registro['sede'], -1)
+            if g < 0 or s < 0:
+                continue
+            self.salario[g, s] = registro['salario']
+            self.personal[g, s] += registro['cantidad']
+
+        # ECUACIONES_TIEMPO: una posición por línea de ecuación
+        lineas = [
+            (servicio, grupo, minutos, factor)
+            for servicio, items in ecuaciones.items()
+            for grupo, minutos, factor in items
+        ]
+        self.ecuacion_servicio = np.array([idx_servicio.get(l[0], -1) for l in lineas], dtype=np.int64)
+        self.ecuacion_grupo = np.array([idx_grupo.get(l[1], -1) for l in lineas], dtype=np.int64)
+        self.ecuacion_minutos = np.array([l[2] for l in lineas], dtype=float)
+        self.ecuacion_factor = np.array([l[3] for l in lineas], dtype=float)
+
+        # INSUMOS: una posición por insumo
+        lineas = [
+            (servicio, cantidad, costo)
+            for servicio, items in insumos.items()
+            for _, cantidad, costo in items
+        ]
+        self.insumo_servicio = np.array([idx_servicio.get(l[0], -1) for l in lineas], dtype=np.int64)
+        self.insumo_cantidad = np.array([l[1] for l in lineas], dtype=float)
+        self.insumo_costo_unitario = np.array([l[2] for l in lineas], dtype=float)
+
+        # PRODUCCION: columnas (se recorre una sola vez, admite generadores)
+        servicio_col, sede_col, cantidad_col, valor_col = [], [], [], []
+        for registro in produccion:
+            servicio_col.append(idx_servicio.get(registro['servicio'], -1))
+            sede_col.append(idx_sede.get(registro['sede'], -1))
+            cantidad_col.append(registro['cantidad'])
+            valor_col.append(registro['valor_unitario'])
+        self.produccion_servicio = np.array(servicio_col, dtype=np.int64)
+        self.produccion_sede = np.array(sede_col, dtype=np.int64)
+        self.produccion_cantidad = np.array(cantidad_col, dtype=float)
+        self.produccion_valor_unitario = np.array(valor_col, dtype=float)
+
+        # COSTOS_INDIRECTOS: conceptos de la clase 73 y driver de salas
+        self.indirecto_codigo = []
+        valores = []
+        for concepto, valor in presupuesto_indirectos.items():
+            partes = concepto.split(" - ")
+            self.indirecto_codigo.append(partes[0] if len(partes) == 2 else "7399")
+            valores.append(float(valor))
+        self.indirecto_valor = np.array(valores)
+        self.salas_por_sede = dict(salas_por_sede)
+        self.cuenta_materia_prima = str(cuenta_materia_prima)
+        self.cuenta_mano_obra = str(cuenta_mano_obra)
+
+    @classmethod
+    def desde_config(cls, personal: Iterable[Dict[str, Any]] = None,
+                     produccion: Iterable[Dict[str, Any]] = None, config=None) -> "DatosModelo":
+        """
+        Construye las entradas desde la configuración activa (src.config) o
+        desde la de `config` (ConfigSnapshot de otra empresa).
+
+        Si no se entregan personal o producción se simulan con los mismos
+        generadores (y en el mismo orden) que usa ModeloTDABC.generar_archivo,
+        de modo que con la misma semilla de `random` se obtienen los mismos datos.
+        """
+        from ..data.ecuaciones_data import ECUACIONES_SERVICIOS
+        from ..data.insumos_data import INSUMOS_POR_SERVICIO
+        from ..generators.nomina_generator import generar_personal_nomina
+        from ..generators.produccion_generator import generar_datos_produccion
+
+        config = config_en_uso(config)
+        if personal is None:
+            personal = generar_personal_nomina(config.GRUPOS_OCUPACIONALES, config.SEDES)
+        if produccion is None:
+            servicios_completos = config._mapper.get_servicios_completos() or []
+            produccion = generar_datos_produccion(
+                config.SERVICIOS,
+                {s["nombre"]: s for s in servicios_completos},
+                config._mapper.get_categorias_info() or {},
+                config.SEDES,
+                config.ASEGURADORAS
+            )
+
+        cuenta_mp = config._mapper.get_cuenta_materia_prima() or {}
+        cuenta_mo = config._mapper.get_cuenta_mano_obra() or {}
+        return cls(
+            grupos=config.GRUPOS_OCUPACIONALES,
+            sedes=config.SEDES,
+            servicios=config.SERVICIOS,
+            personal=personal,
+            produccion=produccion,
+            ecuaciones=ECUACIONES_SERVICIOS,
+            insumos=INSUMOS_POR_SERVICIO,
+            presupuesto_indirectos=config.PRESUPUESTO_INDIRECTOS,
+            salas_por_sede=config.SALAS_POR_SEDE,
+            cuenta_materia_prima=cuenta_mp.get("codigo", "7105"),
+            cuenta_mano_obra=cuenta_mo.get("codigo", "7205"),
+        )
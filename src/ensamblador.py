@@ -0,0 +1,267 @@
+"""
+Generación de las hojas en procesos separados y ensamblado en un solo .xlsx.
+
+Las hojas solo dependen entre sí por las tablas que publican en el layout
+(ej: COSTEO_SERVICIOS usa el rango real de TablaProduccionAgregada); el
+resto de las referencias son texto de fórmulas. Cada hoja es una TareaHoja
+que un proceso del pool construye en un libro propio y guarda como un
+paquete sin comprimir. Una tarea se envía en cuanto las hojas que requiere
+terminaron, con las tablas que ellas publicaron, así que el tiempo total
+queda acotado por la hoja más lenta (PRODUCCION) y no por la suma.
+
+El ensamblado arma el libro final con el ExcelWriter de openpyxl, pero en
+lugar de serializar cada hoja copia el XML que produjo su proceso:
+
+- Los estilos de celda (atributo s="N") son índices del styles.xml de cada
+  paquete. El libro final parte de los estilos del paquete más grande, cuyo
+  XML se copia sin cambios; los demás se traducen a ese registro.
+- openpyxl 3.1 escribe los textos como inlineStr, así que no hay tabla de
+  textos compartidos que combinar (openpyxl 3.0 usaba sharedStrings.xml con
+  índices por paquete: por eso requirements.txt fija openpyxl 3.1 y este
+  módulo lo verifica al importarse, igual que los registros internos de
+  estilos que usa la traducción).
+- Las tablas se vuelven a numerar al escribir el libro (ids únicos).
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+import openpyxl
+from openpyxl import Workbook
+from openpyxl.packaging.relationship import Relationship, RelationshipList
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.stylesheet import Stylesheet, apply_stylesheet
+from openpyxl.worksheet.table import Table
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.xml.constants import ARC_STYLE
+from openpyxl.xml.functions import fromstring
+
+from .layout import TablaPublicada, layout_libro
+from .styles import registrar_estilos
+
+if tuple(int(parte) for parte in openpyxl.__version__.split(".")[:2]) != (3, 1):
+    raise ImportError(f"src.ensamblador requiere openpyxl 3.1 (instalado: {openpyxl.__version__})")
+
+# Partes del paquete de un libro con una sola hoja (nombres fijos de openpyxl)
+HOJA_XML = "xl/worksheets/sheet1.xml"
+HOJA_RELS = "xl/worksheets/_rels/sheet1.xml.rels"
+TEXTOS_COMPARTIDOS = "xl/sharedStrings.xml"
+
+# Atributo s="N" de una celda, en cualquier posición de la etiqueta <c ...>
+_ESTILO_CELDA = re.compile(rb'(<c\b[^>]*?\ss=")([0-9]+)"')
+_BLOQUE = 1 << 20
+
+
+class TareaHoja:
+    """Construcción de una hoja: `funcion(wb, *args, **kwargs)`"""
+
+    __slots__ = ("hoja", "funcion", "args", "kwargs", "requiere", "peso")
+
+    def __init__(self, hoja: str, funcion: Callable, *args, requiere: Iterable[str] = (),
+                 peso: int = 0, **kwargs):
+        """
+        Args:
+            hoja: Título de la hoja que crea la función
+            funcion: crear_hoja_* (módulo de src.sheets); recibe el libro primero
+            args, kwargs: Resto de argumentos (deben poder enviarse a otro proceso)
+            requiere: Hojas cuyas tablas publicadas usa (deben construirse antes)
+            peso: Tamaño estimado (ej: filas); las tareas listas más pesadas se envían primero
+        """
+        self.hoja = hoja
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.requiere = tuple(requiere)
+        self.peso = peso
+
+    def ejecutar(self, wb):
+        return self.funcion(wb, *self.args, **self.kwargs)
+
+
+def construir_hoja(tarea: TareaHoja, tablas: Dict[str, TablaPublicada], carpeta,
+                   streaming: bool = False) -> Tuple[str, Dict[str, TablaPublicada], float]:
+    """
+    Construye una hoja en un libro propio y lo guarda sin comprimir (se ejecuta en un proceso del pool).
+
+    Args:
+        tarea: Hoja a construir
+        tablas: Tablas publicadas por las hojas que requiere
+        carpeta: Carpeta del paquete temporal
+        streaming: Usa un Workbook write-only
+
+    Returns:
+        (ruta del paquete, tablas publicadas por la hoja, segundos)
+    """
+    inicio = time.perf_counter()
+    wb = Workbook(write_only=streaming)
+    if not streaming:
+        wb.remove(wb.active)
+    registrar_estilos(wb)
+    layout = layout_libro(wb)
+    layout.tablas.update(tablas)
+    tarea.ejecutar(wb)
+
+    ruta = os.path.join(carpeta, f"{tarea.hoja}.xlsx")
+    ExcelWriter(wb, ZipFile(ruta, "w", ZIP_STORED, allowZip64=True)).save()
+    publicadas = {nombre: tabla for nombre, tabla in layout.tablas.items() if tabla.hoja == tarea.hoja}
+    return ruta, publicadas, time.perf_counter() - inicio
+
+
+def generar_hojas(tareas: Iterable[TareaHoja], destino, procesos: int = None, streaming: bool = False,
+                  progreso: Callable[[str, float], Any] = None) -> Dict[str, float]:
+    """
+    Construye las hojas en un ProcessPoolExecutor y las ensambla en `destino`.
+
+    Args:
+        tareas: Hojas en el orden del libro
+        destino: Ruta del .xlsx
+        procesos: Procesos del pool (por defecto uno por núcleo)
+        streaming: Cada proceso usa un Workbook write-only
+        progreso: Se llama con (hoja, segundos) al terminar cada hoja
+
+    Returns:
+        Segundos de construcción de cada hoja (en su proceso)
+    """
+    tareas = list(tareas)
+    segundos: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="tdabc-hojas-") as carpeta:
+        partes: Dict[str, str] = {}
+        tablas: Dict[str, TablaPublicada] = {}
+        pendientes = list(tareas)
+        en_curso = {}
+        with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+            while pendientes or en_curso:
+                listas = [t for t in pendientes if all(r in partes for r in t.requiere)]
+                if not listas and not en_curso:
+                    faltan = sorted({r for t in pendientes for r in t.requiere} - set(partes))
+                    raise ValueError(f"Hojas requeridas que ninguna tarea construye: {', '.join(faltan)}")
+                for tarea in sorted(listas, key=lambda t: -t.peso):
+                    pendientes.remove(tarea)
+                    futuro = pool.submit(construir_hoja, tarea, dict(tablas), carpeta, streaming)
+                    en_curso[futuro] = tarea
+                terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    tarea = en_curso.pop(futuro)
+                    partes[tarea.hoja], publicadas, segundos[tarea.hoja] = futuro.result()
+                    tablas.update(publicadas)
+                    if progreso:
+                        progreso(tarea.hoja, segundos[tarea.hoja])
+        ensamblar_libro([(tarea.hoja, partes[tarea.hoja]) for tarea in tareas], destino)
+    return segundos
+
+
+class _ParteHoja:
+    """Paquete de un libro con una sola hoja, tal como lo guardó construir_hoja"""
+
+    def __init__(self, hoja: str, ruta):
+        self.hoja = hoja
+        self.zip = ZipFile(ruta)
+        if TEXTOS_COMPARTIDOS in self.zip.namelist():
+            self.zip.close()
+            raise ValueError(f"Hoja {hoja}: el paquete usa textos compartidos y el ensamblado espera inlineStr")
+        self.tamano = self.zip.getinfo(HOJA_XML).file_size
+        self.estilos = Stylesheet.from_tree(fromstring(self.zip.read(ARC_STYLE)))
+        self.mapa: Dict[bytes, bytes] = {}
+
+    def cerrar(self):
+        self.zip.close()
+
+    def traducir_estilos(self, wb):
+        """Registra los estilos de celda de la parte en `wb` y arma el mapa de índices"""
+        origen = self.estilos
+        nombres = wb._named_styles.names
+        for indice, xf in enumerate(origen.cell_styles):
+            nuevo = StyleArray(xf)
+            nuevo.fontId = wb._fonts.add(origen.fonts[xf.fontId])
+            nuevo.fillId = wb._fills.add(origen.fills[xf.fillId])
+            nuevo.borderId = wb._borders.add(origen.borders[xf.borderId])
+            nuevo.alignmentId = wb._alignments.add(origen.alignments[xf.alignmentId])
+            nuevo.protectionId = wb._protections.add(origen.protections[xf.protectionId])
+            if xf.numFmtId >= 164:
+                nuevo.numFmtId = wb._number_formats.add(origen.number_formats[xf.numFmtId - 164]) + 164
+            nuevo.xfId = nombres.index(origen.named_styles[xf.xfId].name)
+            destino = wb._cell_styles.add(nuevo)
+            if destino != indice:
+                self.mapa[str(indice).encode()] = str(destino).encode()
+
+    def tablas(self) -> Tuple[RelationshipList, List[Table]]:
+        """Relaciones de la hoja y sus tablas (con el id de relación que usa el XML de la hoja)"""
+        relaciones = RelationshipList()
+        tablas = []
+        if HOJA_RELS not in self.zip.namelist():
+            return relaciones, tablas
+        for rel in RelationshipList.from_tree(fromstring(self.zip.read(HOJA_RELS))):
+            if rel.Type != Table._rel_type:
+                raise ValueError(f"Hoja {self.hoja}: relación no soportada en el ensamblado ({rel.Type})")
+            tabla = Table.from_tree(fromstring(self.zip.read(rel.Target.lstrip("/"))))
+            tabla._rel_id = rel.Id
+            relaciones.append(Relationship(Id=rel.Id, Type=rel.Type, Target=""))
+            tablas.append(tabla)
+        return relaciones, tablas
+
+    def copiar_hoja(self, salida):
+        """Copia el XML de la hoja cambiando los índices de estilo (por bloques de filas completas)"""
+        def reemplazar(m):
+            return m.group(1) + self.mapa.get(m.group(2), m.group(2)) + b'"'
+
+        with self.zip.open(HOJA_XML) as entrada:
+            if not self.mapa:
+                shutil.copyfileobj(entrada, salida, _BLOQUE)
+                return
+            resto = b""
+            for bloque in iter(lambda: entrada.read(_BLOQUE), b""):
+                bloque = resto + bloque
+                corte = bloque.rfind(b"</row>")
+                corte = corte + len(b"</row>") if corte >= 0 else 0
+                resto = bloque[corte:]
+                salida.write(_ESTILO_CELDA.sub(reemplazar, bloque[:corte]))
+            salida.write(_ESTILO_CELDA.sub(reemplazar, resto))
+
+
+class _EscritorEnsamblado(ExcelWriter):
+    """ExcelWriter que escribe el XML ya generado de cada hoja en lugar de serializarla"""
+
+    def __init__(self, workbook, archive, partes: Dict[str, _ParteHoja]):
+        super().__init__(workbook, archive)
+        self.partes = partes
+
+    def write_worksheet(self, ws):
+        parte = self.partes[ws.title]
+        with self._archive.open(ws.path[1:], "w", force_zip64=True) as salida:
+            parte.copiar_hoja(salida)
+        self.manifest.append(ws)
+
+
+def ensamblar_libro(partes: List[Tuple[str, Any]], destino):
+    """
+    Une paquetes de una hoja (construir_hoja) en un solo .xlsx.
+
+    Args:
+        partes: [(hoja, ruta del paquete)] en el orden del libro
+        destino: Ruta del .xlsx
+    """
+    partes = [_ParteHoja(hoja, ruta) for hoja, ruta in partes]
+    try:
+        # Los estilos de la parte más grande quedan tal cual: su XML se copia sin reescribir
+        base = max(partes, key=lambda parte: parte.tamano)
+        wb = Workbook()
+        wb.remove(wb.active)
+        apply_stylesheet(base.zip, wb)
+        for parte in partes:
+            if parte is not base:
+                parte.traducir_estilos(wb)
+            ws = wb.create_sheet(parte.hoja)
+            ws._rels, tablas = parte.tablas()
+            for tabla in tablas:
+                ws._tables.add(tabla)
+
+        archivo = ZipFile(destino, "w", ZIP_DEFLATED, allowZip64=True)
+        _EscritorEnsamblado(wb, archivo, {parte.hoja: parte for parte in partes}).save()
+    finally:
+        for parte in partes:
+            parte.cerrar()
@@ -0,0 +1,175 @@
+"""
+Escritor de hojas fila por fila.
+
+Cada generador de hoja produce filas completas (número de fila + celdas) y
+este módulo las vuelca al libro. El mismo código sirve para un Workbook
+normal y para uno en modo streaming (``Workbook(write_only=True)``), en el
+que openpyxl escribe cada fila a disco en cuanto se agrega.
+"""
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import column_index_from_string
+
+from .layout import layout_libro
+from .styles import registrar_estilos, nombre_estilo, ajustar_columnas
+from .utils import crear_tabla
+
+
+class Celda:
+    """Valor de una celda junto con su presentación (estilo, formato, fuente)."""
+
+    __slots__ = ("valor", "estilo", "formato", "font", "alignment", "border", "calculado")
+
+    def __init__(self, valor: Any, estilo: str = None, formato: str = None,
+                 font: Font = None, alignment=None, border=None, calculado: Any = None):
+        """
+        Args:
+            valor: Valor o fórmula de la celda
+            estilo: "header", "seccion", "total", "input", "calculo", "resultado" o "normal"
+            formato: number_format de Excel (ej: '$#,##0')
+            font: Fuente explícita (tiene prioridad sobre la del estilo)
+            alignment: Alineación explícita (tiene prioridad sobre la del estilo)
+            border: Borde explícito (tiene prioridad sobre el del estilo)
+            calculado: Resultado precalculado de la fórmula `valor`; se escribe
+                       en su lugar cuando la hoja está en modo valores
+        """
+        self.valor = valor
+        self.estilo = estilo
+        self.formato = formato
+        self.font = font
+        self.alignment = alignment
+        self.border = border
+        self.calculado = calculado
+
+
+# Una fila es una lista posicional (columna A primero) o un dict {letra: celda}
+Fila = Union[List[Any], Dict[str, Any]]
+
+
+def valor_calculado(resultados: Dict[str, Any], clave: str, *indice) -> Any:
+    """
+    Valor precalculado por el motor para una celda, o None en modo fórmulas.
+
+    Args:
+        resultados: Diccionario de arreglos de una etapa del motor (o None)
+        clave: Columna estándar (ej: 'total')
+        indice: Posición dentro del arreglo (ej: servicio, sede)
+    """
+    if not resultados:
+        return None
+    return resultados[clave][indice] if indice else resultados[clave]
+
+
+class EscritorHoja:
+    """
+    Escribe una hoja agregando filas completas en orden creciente.
+
+    Funciona igual sobre un Workbook normal y sobre uno write-only. En modo
+    streaming los anchos de columna y altos de fila deben definirse antes de
+    escribir la fila correspondiente, por eso los anchos se reciben en el
+    constructor.
+
+    Los estilos de celda se aplican por nombre desde el registro de
+    NamedStyle del libro (ver styles.registrar_estilos).
+
+    Con valores=True las celdas que traen un resultado precalculado
+    (Celda.calculado) se escriben como números estáticos en lugar de fórmulas.
+
+    Las tablas creadas con `tabla` se publican en el layout del libro (ver
+    layout.layout_libro) para que las hojas siguientes usen su rango real.
+    """
+
+    def __init__(self, wb, titulo: str, anchos: Dict[str, float] = None, valores: bool = False):
+        registrar_estilos(wb)
+        self.layout = layout_libro(wb)
+        self.ws = wb.create_sheet(titulo)
+        self.streaming = getattr(wb, "write_only", False)
+        self.valores = valores
+        self.fila = 0  # Última fila escrita
+        self._combinaciones = []
+        if anchos:
+            ajustar_columnas(self.ws, anchos)
+
+    def escribir(self, filas: Iterable[Tuple[int, Fila]]):
+        """Consume un generador de tuplas (numero_fila, celdas)."""
+        for numero, celdas in filas:
+            self.agregar(numero, celdas)
+
+    def agregar(self, numero: int, celdas: Fila):
+        """Escribe la fila `numero`, rellenando con filas vacías si hay saltos."""
+        if numero <= self.fila:
+            raise ValueError(
+                f"Hoja {self.ws.title}: la fila {numero} ya fue escrita (última: {self.fila})"
+            )
+        while self.fila < numero - 1:
+            self.ws.append([])
+            self.fila += 1
+
+        if isinstance(celdas, dict):
+            celdas = self._dict_a_lista(celdas)
+        self.ws.append([self._crear_celda(c) for c in celdas])
+        self.fila = numero
+
+    def combinar(self, rango: str):
+        """Registra un rango combinado (se aplica al cerrar la hoja)."""
+        self._combinaciones.append(rango)
+
+    def alto_fila(self, numero: int, alto: float):
+        """Fija el alto de una fila (en streaming, antes de escribirla)."""
+        self.ws.row_dimensions[numero].height = alto
+
+    def tabla(self, nombre: str, rango: str, encabezados: List[str]):
+        """Crea una Tabla de Excel con los nombres de columna explícitos y la publica en el layout."""
+        self.layout.publicar(self.ws.title, nombre, rango, encabezados)
+        return crear_tabla(self.ws, nombre, rango, encabezados)
+
+    def cerrar(self):
+        """Aplica los rangos combinados pendientes."""
+        for rango in self._combinaciones:
+            if self.streaming:
+                self.ws.merged_cells.add(rango)
+            else:
+                self.ws.merge_cells(rango)
+        self._combinaciones = []
+
+    # ========== CONVERSIÓN DE CELDAS ==========
+
+    @staticmethod
+    def _dict_a_lista(celdas: Dict[str, Any]) -> List[Any]:
+        posiciones = {column_index_from_string(col): valor for col, valor in celdas.items()}
+        lista = [None] * max(posiciones)
+        for idx, valor in posiciones.items():
+            lista[idx - 1] = valor
+        return lista
+
+    def _crear_celda(self, spec):
+        if not isinstance(spec, Celda):
+            return spec
+
+        valor = spec.valor
+        if self.valores and spec.calculado is not None:
+            valor = spec.calculado
+        return aplicar_presentacion(WriteOnlyCell(self.ws, valor), spec)
+
+
+def aplicar_presentacion(cell, spec: Celda):
+    """Aplica a `cell` el estilo con nombre, formato, fuente, alineación y borde de `spec`."""
+    nombre, formato = nombre_estilo(spec.estilo, spec.formato)
+    if nombre:
+        cell.style = nombre
+    if formato:
+        cell.number_format = formato
+    if spec.font is not None:
+        cell.font = spec.font
+    if spec.alignment is not None:
+        cell.alignment = spec.alignment
+    if spec.border is not None:
+        cell.border = spec.border
+    return cell
+
+
+def fila_encabezados(headers: List[str]) -> List[Celda]:
+    """Construye una fila de encabezados con el estilo corporativo."""
+    return [Celda(h, "header") for h in headers]
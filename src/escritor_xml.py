@@ -0,0 +1,491 @@
+"""
+Escritor directo de SpreadsheetML para las hojas de muchas filas.
+
+openpyxl crea un objeto Cell con su estilo por cada celda y la serializa
+elemento por elemento; en PRODUCCION y COSTEO_SERVICIOS eso domina el tiempo
+y la memoria. EscritorXML tiene la misma interfaz que EscritorHoja
+(escribir, agregar, combinar, alto_fila, tabla, cerrar) pero arma el XML de
+las filas como texto y lo escribe directo en la entrada de la hoja dentro
+del .xlsx, por bloques de filas:
+
+- Los textos van a la tabla de textos compartidos del libro
+  (xl/sharedStrings.xml): servicio, sede y aseguradora se repiten en cada
+  fila y quedan escritos una sola vez.
+- Las fórmulas con la misma forma en filas consecutivas de una columna
+  (ej: =E4*F4, =E5*F5, ...) se escriben como fórmula compartida: la primera
+  del tramo lleva el texto y el rango, las demás solo el índice.
+- El índice de estilo de cada combinación (estilo, formato, fuente, ...) se
+  resuelve una vez con openpyxl sobre el mismo libro.
+- Los números se escriben sin perder precisión (repr del float, el entero
+  exacto) y las fechas como número de serie de Excel con el estilo de fecha
+  que les daría openpyxl.
+
+El resto del libro lo sigue escribiendo openpyxl: cada hoja directa tiene una
+hoja del libro que solo guarda su configuración (anchos, tablas), y las
+hojas pequeñas con estilos (PARAMETROS, RESUMEN_EJECUTIVO, ...) se escriben
+normalmente al guardar con LibroXML.guardar.
+
+La tabla de textos compartidos es la única del paquete porque openpyxl 3.1
+escribe sus textos como inlineStr (3.0 escribía su propio sharedStrings.xml),
+y el guardado se engancha en partes internas de su ExcelWriter: por eso
+requirements.txt fija openpyxl 3.1 y este módulo lo verifica al importarse.
+
+Uso (lo hace ModeloTDABC.generar_archivo(xml_directo=True)):
+    >>> libro = LibroXML(wb, "modelo.xlsx")
+    >>> crear_hoja_produccion(wb, ...)   # usa escritor_masivo(wb, ...)
+    >>> libro.guardar()
+"""
+import os
+import re
+from datetime import date, time, timedelta
+from decimal import Decimal
+from numbers import Integral
+from typing import Any, Dict, List, Tuple
+from weakref import WeakKeyDictionary
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.compat.numbers import NUMERIC_TYPES
+from openpyxl.packaging.relationship import Relationship, RelationshipList
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.worksheet.merge import MergeCell, MergeCells
+from openpyxl.worksheet.related import Related
+from openpyxl.worksheet.table import TablePartList
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.xml.constants import ARC_SHARED_STRINGS, ARC_WORKBOOK_RELS, SHARED_STRINGS, SHEET_MAIN_NS
+from openpyxl.xml.functions import fromstring, tostring
+
+from .escritor import Celda, EscritorHoja, aplicar_presentacion
+from .layout import layout_libro
+from .styles import registrar_estilos, ajustar_columnas
+from .utils import crear_tabla
+
+if tuple(int(parte) for parte in openpyxl.__version__.split(".")[:2]) != (3, 1):
+    raise ImportError(f"src.escritor_xml requiere openpyxl 3.1 (instalado: {openpyxl.__version__})")
+
+_LIBROS = WeakKeyDictionary()
+
+# Filas que se acumulan antes de escribirlas (y largo máximo de un tramo de fórmula compartida)
+_FILAS_BLOQUE = 4096
+
+# Referencia A1 fuera de textos entre comillas y de referencias estructuradas [..]
+_REFERENCIA = re.compile(r"(?<![A-Za-z0-9_.$])(\$?[A-Z]{1,3})(\$?)([0-9]+)(?![A-Za-z0-9_(!])")
+_LITERAL = re.compile(r"(\"[^\"]*\"|'[^']*'|\[[^\]]*\])")
+_NUMERO = re.compile(r"([0-9]+)")
+
+# Valores que se escriben como número de serie de Excel (datetime es un date)
+_FECHAS = (date, time, timedelta)
+
+
+def filas_relativas(formula: str) -> Tuple[bool, ...]:
+    """
+    Para cada número de la fórmula (en orden), si es la fila de una referencia relativa.
+
+    Ej: "E4*$F$4+10" -> (True, False, False). Solo depende del esqueleto de la
+    fórmula (los números reemplazados por #), así que se calcula una vez por
+    esqueleto.
+    """
+    inicios = set()
+    posicion = 0
+    for i, parte in enumerate(_LITERAL.split(formula)):
+        if i % 2 == 0:
+            inicios.update(posicion + m.start(3) for m in _REFERENCIA.finditer(parte) if not m.group(2))
+        posicion += len(parte)
+    return tuple(m.start() in inicios for m in _NUMERO.finditer(formula))
+
+
+def _numero(valor) -> str:
+    """Texto de un número que al leerlo da el mismo valor: el entero exacto o el repr más corto del float"""
+    if isinstance(valor, Integral):
+        return str(int(valor))
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return repr(float(valor))
+
+
+def escritor_masivo(wb, titulo: str, anchos: Dict[str, float] = None, valores: bool = False):
+    """
+    Escritor para una hoja de muchas filas: EscritorXML si el libro se guarda
+    con un LibroXML, si no EscritorHoja.
+    """
+    libro = _LIBROS.get(wb)
+    if libro is None:
+        return EscritorHoja(wb, titulo, anchos=anchos, valores=valores)
+    return EscritorXML(libro, titulo, anchos=anchos, valores=valores)
+
+
+class _ZipLibro(ZipFile):
+    """ZipFile que agrega la relación de sharedStrings.xml al escribir las relaciones del libro"""
+
+    textos_compartidos = False
+
+    def writestr(self, zinfo_or_arcname, data, *args, **kwargs):
+        if zinfo_or_arcname == ARC_SHARED_STRINGS and self.textos_compartidos:
+            raise ValueError("openpyxl escribió su propio sharedStrings.xml: el libro tendría dos tablas de textos")
+        if zinfo_or_arcname == ARC_WORKBOOK_RELS and self.textos_compartidos:
+            relaciones = RelationshipList.from_tree(fromstring(data))
+            relaciones.append(Relationship(type="sharedStrings", Target="sharedStrings.xml"))
+            data = tostring(relaciones.to_tree())
+        return super().writestr(zinfo_or_arcname, data, *args, **kwargs)
+
+
+class _TextosCompartidos:
+    """Parte xl/sharedStrings.xml para el manifiesto"""
+
+    path = "/" + ARC_SHARED_STRINGS
+    mime_type = SHARED_STRINGS
+
+
+class LibroXML:
+    """
+    Libro de openpyxl guardado en `destino` con sus hojas masivas escritas directo.
+
+    Se abre el .xlsx desde el inicio: cada EscritorXML escribe su hoja en el
+    archivo mientras se genera. Las hojas directas se escriben de a una (el
+    zip no admite dos entradas abiertas) y antes de guardar.
+    """
+
+    def __init__(self, wb, destino):
+        if wb in _LIBROS:
+            raise ValueError("El libro ya se está escribiendo con un LibroXML")
+        self.wb = wb
+        self.destino = destino
+        self.zip = _ZipLibro(destino, "w", ZIP_DEFLATED, allowZip64=True, compresslevel=3)
+        self.textos: Dict[str, int] = {}
+        self.hojas: Dict[str, "EscritorXML"] = {}
+        _LIBROS[wb] = self
+
+    def indice_texto(self, texto: str) -> int:
+        """Posición del texto en la tabla de textos compartidos (lo agrega si no está)"""
+        indice = self.textos.get(texto)
+        if indice is None:
+            indice = self.textos[texto] = len(self.textos)
+        return indice
+
+    def guardar(self):
+        """Escribe las hojas de openpyxl, estilos, textos compartidos y el resto del paquete"""
+        abiertas = [titulo for titulo, hoja in self.hojas.items() if not hoja.cerrada]
+        if abiertas:
+            raise ValueError(f"Hojas sin cerrar: {', '.join(abiertas)}")
+        try:
+            _EscritorLibroXML(self.wb, self.zip, self).save()
+        finally:
+            _LIBROS.pop(self.wb, None)
+
+    def descartar(self):
+        """Cierra y borra el archivo a medio escribir (tras un error)"""
+        _LIBROS.pop(self.wb, None)
+        for hoja in self.hojas.values():
+            if not hoja.cerrada:
+                hoja._salida.close()
+        self.zip.close()
+        if os.path.exists(self.destino):
+            os.remove(self.destino)
+
+    def _escribir_textos(self):
+        if not self.textos:
+            return
+        with self.zip.open(ARC_SHARED_STRINGS, "w", force_zip64=True) as salida:
+            salida.write((f'<sst xmlns="{SHEET_MAIN_NS}" uniqueCount="{len(self.textos)}">').encode())
+            bloque = []
+            for texto in self.textos:
+                espacio = ' xml:space="preserve"' if texto != texto.strip() else ""
+                bloque.append(f"<si><t{espacio}>{escape(texto)}</t></si>")
+                if len(bloque) == _FILAS_BLOQUE:
+                    salida.write("".join(bloque).encode())
+                    bloque = []
+            salida.write(("".join(bloque) + "</sst>").encode())
+        self.zip.textos_compartidos = True
+
+
+class _EscritorLibroXML(ExcelWriter):
+    """ExcelWriter que deja las hojas directas como ya están en el archivo"""
+
+    def __init__(self, workbook, archive, libro: LibroXML):
+        super().__init__(workbook, archive)
+        self.libro = libro
+
+    def write_data(self):
+        self.libro._escribir_textos()
+        if self._archive.textos_compartidos:
+            self.manifest.append(_TextosCompartidos)
+        super().write_data()
+
+    def write_worksheet(self, ws):
+        hoja = self.libro.hojas.get(ws.title)
+        if hoja is None:
+            return super().write_worksheet(ws)
+        if ws.path[1:] != hoja.parte:
+            raise ValueError(f"Hoja {ws.title}: escrita como {hoja.parte} pero el libro la ubica en {ws.path[1:]}")
+        ws._drawing = None
+        ws._rels = hoja.relaciones
+        self.manifest.append(ws)
+
+
+class _Formula:
+    """
+    Primera celda de un tramo de fórmulas con la misma forma en una columna.
+
+    Se escribe al volcar el bloque, cuando ya se sabe hasta qué fila llega el
+    tramo: sola es una fórmula normal, con más filas es la fórmula maestra.
+    """
+
+    __slots__ = ("letra", "fila", "estilo", "texto", "forma", "ultima", "indice")
+
+    def __init__(self, letra: str, fila: int, estilo: str, texto: str, forma):
+        self.letra = letra
+        self.fila = fila
+        self.estilo = estilo
+        self.texto = texto
+        self.forma = forma
+        self.ultima = fila
+        self.indice = None  # si="N" de la fórmula compartida
+
+    def xml(self) -> str:
+        ref = f"{self.letra}{self.fila}"
+        if self.indice is None:
+            return f'<c r="{ref}"{self.estilo}><f>{self.texto}</f></c>'
+        return (f'<c r="{ref}"{self.estilo}><f t="shared" ref="{ref}:{self.letra}{self.ultima}" '
+                f'si="{self.indice}">{self.texto}</f></c>')
+
+
+class EscritorXML:
+    """
+    Escribe una hoja de un LibroXML agregando filas completas en orden creciente.
+
+    Misma interfaz y mismas celdas (Celda o valores sueltos) que EscritorHoja;
+    los anchos se reciben en el constructor porque el encabezado de la hoja
+    se escribe de inmediato.
+    """
+
+    def __init__(self, libro: LibroXML, titulo: str, anchos: Dict[str, float] = None, valores: bool = False):
+        wb = libro.wb
+        registrar_estilos(wb)
+        self.libro = libro
+        self.layout = layout_libro(wb)
+        self.ws = wb.create_sheet(titulo)
+        self.valores = valores
+        self.fila = 0  # Última fila escrita
+        self.cerrada = False
+        self.relaciones = RelationshipList()
+        self._combinaciones = []
+        self._altos: Dict[int, float] = {}
+        self._estilos: Dict[Any, str] = {}
+        self._mascaras: Dict[Tuple[str, ...], Tuple[int, ...]] = {}  # Esqueleto -> posiciones de filas relativas
+        self._letras: List[str] = [""]
+        self._bloque: List[tuple] = []
+        self._tramos: Dict[str, _Formula] = {}
+        self._compartidas = 0
+        if anchos:
+            ajustar_columnas(self.ws, anchos)
+
+        self.parte = f"xl/worksheets/sheet{wb.worksheets.index(self.ws) + 1}.xml"
+        libro.hojas[titulo] = self
+        self._salida = libro.zip.open(self.parte, "w", force_zip64=True)
+        self._escribir_inicio()
+
+    def escribir(self, filas):
+        """Consume un generador de tuplas (numero_fila, celdas)."""
+        for numero, celdas in filas:
+            self.agregar(numero, celdas)
+
+    def agregar(self, numero: int, celdas):
+        """Escribe la fila `numero` (las filas omitidas quedan vacías)."""
+        if numero <= self.fila:
+            raise ValueError(
+                f"Hoja {self.ws.title}: la fila {numero} ya fue escrita (última: {self.fila})"
+            )
+        if isinstance(celdas, dict):
+            celdas = EscritorHoja._dict_a_lista(celdas)
+        while len(self._letras) <= len(celdas):
+            self._letras.append(get_column_letter(len(self._letras)))
+
+        # Es el ciclo de cada celda: los casos comunes (texto, número, fórmula) van en línea
+        partes = []
+        estilos = self._estilos
+        textos = self.libro.textos
+        letras = self._letras
+        valores = self.valores
+        for columna, spec in enumerate(celdas, 1):
+            if spec.__class__ is Celda:
+                estilo = estilos.get((spec.estilo, spec.formato, spec.font, spec.alignment, spec.border))
+                if estilo is None:
+                    estilo = self._estilo(spec)
+                valor = spec.valor
+                if valores and spec.calculado is not None:
+                    valor = spec.calculado
+            else:
+                estilo, valor = "", spec
+            tipo = valor.__class__
+            if tipo is str:
+                if valor[:1] == "=" and len(valor) > 1:
+                    partes.append(self._formula(letras[columna], numero, estilo, valor))
+                    continue
+                indice = textos.get(valor)
+                if indice is None:
+                    indice = self._texto_nuevo(f"{letras[columna]}{numero}", valor)
+                partes.append(f'<c r="{letras[columna]}{numero}"{estilo} t="s"><v>{indice}</v></c>')
+            elif tipo is int:
+                partes.append(f'<c r="{letras[columna]}{numero}"{estilo}><v>{valor}</v></c>')
+            elif valor is not None or estilo:
+                partes.append(self._celda(f"{letras[columna]}{numero}", estilo, valor, spec))
+        self._bloque.append((numero, partes))
+        self.fila = numero
+        if len(self._bloque) >= _FILAS_BLOQUE:
+            self._volcar()
+
+    def combinar(self, rango: str):
+        """Registra un rango combinado (se escribe al cerrar la hoja)."""
+        self._combinaciones.append(rango)
+
+    def alto_fila(self, numero: int, alto: float):
+        """Fija el alto de una fila (antes de escribirla)."""
+        self._altos[numero] = alto
+
+    def tabla(self, nombre: str, rango: str, encabezados: List[str]):
+        """Crea una Tabla de Excel con los nombres de columna explícitos y la publica en el layout."""
+        self.layout.publicar(self.ws.title, nombre, rango, encabezados)
+        return crear_tabla(self.ws, nombre, rango, encabezados)
+
+    def cerrar(self):
+        """Escribe las filas pendientes, los rangos combinados y las tablas, y cierra la hoja."""
+        if self.cerrada:
+            return
+        self._volcar()
+        cola = ["</sheetData>"]
+        if self._combinaciones:
+            combinadas = MergeCells(mergeCell=[MergeCell(rango) for rango in self._combinaciones])
+            cola.append(tostring(combinadas.to_tree()).decode())
+        cola.append(tostring(self.ws.page_margins.to_tree()).decode())
+        tablas = TablePartList()
+        for tabla in self.ws.tables.values():
+            relacion = Relationship(Type=tabla._rel_type, Target="")
+            self.relaciones.append(relacion)
+            tabla._rel_id = relacion.Id
+            tablas.append(Related(id=relacion.Id))
+        if tablas:
+            cola.append(tostring(tablas.to_tree()).decode())
+        cola.append("</worksheet>")
+        self._salida.write("".join(cola).encode())
+        self._salida.close()
+        self.cerrada = True
+
+    # ========== XML ==========
+
+    def _escribir_inicio(self):
+        ws = self.ws
+        partes = [f'<worksheet xmlns="{SHEET_MAIN_NS}">']
+        for elemento in (ws.sheet_properties, ws.views, ws.sheet_format):
+            partes.append(tostring(elemento.to_tree()).decode())
+        columnas = ws.column_dimensions.to_tree()
+        if columnas is not None:
+            partes.append(tostring(columnas).decode())
+        partes.append("<sheetData>")
+        self._salida.write("".join(partes).encode())
+
+    def _estilo(self, spec: Celda) -> str:
+        """Atributo s="N" de la presentación de la celda (se resuelve con openpyxl una vez por combinación)"""
+        indice = aplicar_presentacion(WriteOnlyCell(self.ws), spec).style_id
+        estilo = f' s="{indice}"' if indice else ""
+        self._estilos[(spec.estilo, spec.formato, spec.font, spec.alignment, spec.border)] = estilo
+        return estilo
+
+    def _estilo_fecha(self, spec, valor) -> str:
+        """
+        Estilo de una celda con fecha, como en EscritorHoja: al asignar el valor
+        openpyxl le da su formato de fecha (ej: yyyy-mm-dd), y después se aplica
+        la presentación de la Celda, si la hay.
+        """
+        clave = (valor.__class__,)
+        if spec.__class__ is Celda:
+            clave += (spec.estilo, spec.formato, spec.font, spec.alignment, spec.border)
+        estilo = self._estilos.get(clave)
+        if estilo is None:
+            celda = WriteOnlyCell(self.ws, valor)
+            if spec.__class__ is Celda:
+                aplicar_presentacion(celda, spec)
+            estilo = self._estilos[clave] = f' s="{celda.style_id}"' if celda.style_id else ""
+        return estilo
+
+    def _formula(self, letra: str, fila: int, estilo: str, valor: str):
+        """
+        Celda con fórmula: continúa el tramo de la columna si la fila anterior
+        tiene la misma forma (ej: E4*F4 en la fila 4 y E5*F5 en la fila 5), si
+        no abre un tramo nuevo.
+        """
+        texto = escape(valor[1:])
+        # Forma: el texto partido en sus números, con las filas relativas como desplazamiento
+        forma = _NUMERO.split(texto)
+        esqueleto = tuple(forma[::2])
+        relativas = self._mascaras.get(esqueleto)
+        if relativas is None:
+            # Los caracteres de control solo pueden estar en el esqueleto (no son dígitos)
+            self._validar_texto(f"{letra}{fila}", valor)
+            relativas = self._mascaras[esqueleto] = tuple(
+                2 * i + 1 for i, relativa in enumerate(filas_relativas(texto)) if relativa)
+        for i in relativas:
+            forma[i] = int(forma[i]) - fila
+
+        tramo = self._tramos.get(letra)
+        if tramo is not None and tramo.ultima == fila - 1 and tramo.forma == forma:
+            tramo.ultima = fila
+            if tramo.indice is None:
+                tramo.indice = self._compartidas
+                self._compartidas += 1
+            return f'<c r="{letra}{fila}"{estilo}><f t="shared" si="{tramo.indice}"/></c>'
+        tramo = self._tramos[letra] = _Formula(letra, fila, estilo, texto, forma)
+        return tramo
+
+    def _texto_nuevo(self, ref: str, texto: str) -> int:
+        """Agrega a los textos compartidos un texto que aún no está (validado como en openpyxl)"""
+        self._validar_texto(ref, texto)
+        return self.libro.indice_texto(texto)
+
+    def _validar_texto(self, ref: str, texto: str):
+        """
+        Rechaza los caracteres de control que XML no admite (ej: \\x0b), como
+        openpyxl al asignar el valor de una celda: escape() los dejaría y el
+        archivo quedaría dañado.
+        """
+        if ILLEGAL_CHARACTERS_RE.search(texto):
+            raise IllegalCharacterError(f"Hoja {self.ws.title}, celda {ref}: {texto!r} tiene caracteres "
+                                        "que no se pueden usar en una hoja")
+
+    def _celda(self, ref: str, estilo: str, valor, spec=None) -> str:
+        if valor is None:
+            return f'<c r="{ref}"{estilo}/>'
+        if isinstance(valor, str):
+            indice = self.libro.textos.get(valor)
+            if indice is None:
+                indice = self._texto_nuevo(ref, valor)
+            return f'<c r="{ref}"{estilo} t="s"><v>{indice}</v></c>'
+        if isinstance(valor, bool):
+            return f'<c r="{ref}"{estilo} t="b"><v>{int(valor)}</v></c>'
+        if isinstance(valor, NUMERIC_TYPES):
+            if valor != valor or valor in (float("inf"), float("-inf")):
+                return f'<c r="{ref}"{estilo}/>'
+            return f'<c r="{ref}"{estilo}><v>{_numero(valor)}</v></c>'
+        if isinstance(valor, _FECHAS):
+            if getattr(valor, "tzinfo", None) is not None:
+                raise TypeError(f"Hoja {self.ws.title}, celda {ref}: Excel no admite fechas con zona horaria")
+            serie = to_excel(valor, self.ws.parent.epoch)
+            return f'<c r="{ref}"{self._estilo_fecha(spec, valor)}><v>{_numero(serie)}</v></c>'
+        raise TypeError(f"Hoja {self.ws.title}, celda {ref}: tipo no soportado ({type(valor).__name__})")
+
+    def _volcar(self):
+        """Escribe el bloque de filas acumulado (los tramos de fórmulas terminan con el bloque)"""
+        filas = []
+        for numero, partes in self._bloque:
+            alto = self._altos.pop(numero, None)
+            atributos = f' ht="{alto}" customHeight="1"' if alto is not None else ""
+            filas.append(f'<row r="{numero}"{atributos}>')
+            filas.extend([p if p.__class__ is str else p.xml() for p in partes])
+            filas.append("</row>")
+        self._salida.write("".join(filas).encode())
+        self._bloque = []
+        self._tramos = {}
@@ -0,0 +1,47 @@
+"""
+Generador de datos para nómina.
+
+Funciones puras que generan el personal por grupo ocupacional y sede sin conocer Excel.
+"""
+import random
+from typing import List, Dict, Any, Tuple
+
+
+def generar_personal_nomina(
+    grupos: List[Tuple[str, float]],
+    sedes: List[str],
+    minimo: int = 2,
+    maximo: int = 8
+) -> List[Dict[str, Any]]:
+    """
+    Genera la cantidad de personal de cada grupo ocupacional en cada sede.
+    
+    Args:
+        grupos: Lista de tuplas (grupo_ocupacional, salario_base)
+        sedes: Lista de sedes
+        minimo: Personal mínimo por grupo y sede
+        maximo: Personal máximo por grupo y sede
+        
+    Returns:
+        Lista de diccionarios (un registro por grupo y sede, grupo por grupo):
+        {
+            'id': str,
+            'grupo': str,
+            'salario': float,
+            'sede': str,
+            'cantidad': int
+        }
+    """
+    personal = []
+    
+    for grupo, salario in grupos:
+        for sede in sedes:
+            personal.append({
+                'id': f"G{len(personal) + 1:03d}",
+                'grupo': grupo,
+                'salario': salario,
+                'sede': sede,
+                'cantidad': random.randint(minimo, maximo)
+            })
+    
+    return personal
@@ -4,7 +4,10 @@ Generador de datos para producción.
 Funciones puras que generan datos de producción sin conocer Excel.
 """
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 
 def generar_datos_produccion(
@@ -38,28 +41,15 @@ def generar_datos_produccion(
     """
     datos_produccion = []
     
-    for servicio in servicios_lista:
-        servicio_data = servicios_dict.get(servicio, {})
-        codigo = servicio_data.get("codigo", f"SV{servicios_lista.index(servicio)+1:03d}")
-        categoria = servicio_data.get("categoria", "Diagnóstico No Invasivo")
+    for posicion, servicio in enumerate(servicios_lista, 1):
+        codigo, categoria, (volumen_min, volumen_max), (valor_min, valor_max) = _parametros_servicio(
+            servicio, posicion, servicios_dict, categorias_info
+        )
 
         for sede in sedes:
             for aseguradora in aseguradoras:
-                # Obtener rangos de volumen del servicio o default de categoría
-                volumen_min = servicio_data.get("volumen_min")
-                volumen_max = servicio_data.get("volumen_max")
-                
-                if volumen_min is None or volumen_max is None:
-                    cat_info = categorias_info.get(categoria, {})
-                    volumen_min = cat_info.get("volumen_min_default", 10)
-                    volumen_max = cat_info.get("volumen_max_default", 30)
-                
                 cantidad = random.randint(volumen_min, volumen_max)
-
-                # Obtener rangos de valor del servicio
-                valor_min = servicio_data.get("valor_min", 100000)
-                valor_max = servicio_data.get("valor_max", 500000)
-                valor = random.randint(int(valor_min), int(valor_max))
+                valor = random.randint(valor_min, valor_max)
 
                 datos_produccion.append({
                     'codigo': codigo,
@@ -72,3 +62,112 @@ def generar_datos_produccion(
                 })
     
     return datos_produccion
+
+
+def _parametros_servicio(servicio: str, posicion: int, servicios_dict: Dict[str, Dict],
+                         categorias_info: Dict) -> Tuple[str, str, Tuple[int, int], Tuple[int, int]]:
+    """
+    Código, categoría y rangos de volumen y valor de un servicio.
+
+    Los rangos de volumen salen del servicio o, si no los tiene, del default
+    de su categoría.
+    """
+    servicio_data = servicios_dict.get(servicio, {})
+    codigo = servicio_data.get("codigo", f"SV{posicion:03d}")
+    categoria = servicio_data.get("categoria", "Diagnóstico No Invasivo")
+
+    volumen_min = servicio_data.get("volumen_min")
+    volumen_max = servicio_data.get("volumen_max")
+    if volumen_min is None or volumen_max is None:
+        cat_info = categorias_info.get(categoria, {})
+        volumen_min = cat_info.get("volumen_min_default", 10)
+        volumen_max = cat_info.get("volumen_max_default", 30)
+
+    valor_min = servicio_data.get("valor_min", 100000)
+    valor_max = servicio_data.get("valor_max", 500000)
+    return codigo, categoria, (int(volumen_min), int(volumen_max)), (int(valor_min), int(valor_max))
+
+
+def _categorica(valores: List[Any], eje: int, forma: Tuple[int, ...]) -> pd.Categorical:
+    """
+    Columna categórica de la grilla `forma` cuyo valor depende solo del eje
+    `eje` (valores[i] en la posición i de ese eje). Se expanden los códigos
+    enteros pequeños, no millones de strings.
+    """
+    categorias, codigos = np.unique(np.asarray(valores, dtype=object), return_inverse=True)
+    codigos = codigos.astype(np.min_scalar_type(max(len(categorias) - 1, 0)))
+    posicion = [1] * len(forma)
+    posicion[eje] = len(valores)
+    return pd.Categorical.from_codes(np.broadcast_to(codigos.reshape(posicion), forma).ravel(),
+                                     categories=categorias)
+
+
+def generar_produccion_columnar(
+    servicios_lista: List[str],
+    servicios_dict: Dict[str, Dict],
+    categorias_info: Dict,
+    sedes: List[str],
+    aseguradoras: List[str],
+    meses: int = 1,
+    semilla: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Versión vectorizada de generar_datos_produccion para datasets de estrés.
+
+    Construye la grilla mes × servicio × sede × aseguradora con broadcasting
+    de NumPy y sortea cantidades y valores con un Generator sembrado: la misma
+    semilla produce siempre los mismos datos (no usa el módulo `random`).
+    Solo recorre en Python la lista de servicios.
+
+    Args:
+        servicios_lista: Lista de nombres de servicios
+        servicios_dict: Diccionario {nombre_servicio: datos_completos}
+        categorias_info: Información de categorías
+        sedes: Lista de sedes
+        aseguradoras: Lista de aseguradoras
+        meses: Número de meses (grillas completas) a generar
+        semilla: Semilla de numpy.random.default_rng
+
+    Returns:
+        DataFrame con las columnas de generar_datos_produccion más 'mes'
+        (1..meses); las columnas de texto son categóricas. Para consumidores
+        que esperan diccionarios ver iterar_registros.
+    """
+    rng = np.random.default_rng(semilla)
+    parametros = [
+        _parametros_servicio(servicio, posicion, servicios_dict, categorias_info)
+        for posicion, servicio in enumerate(servicios_lista, 1)
+    ]
+    n_v, n_s, n_a = len(servicios_lista), len(sedes), len(aseguradoras)
+    forma = (meses, n_v, n_s, n_a)
+
+    # Rangos por servicio con forma (1, V, 1, 1) para que se expandan a la grilla
+    por_servicio = np.array([p[2] + p[3] for p in parametros], dtype=np.int64).reshape(1, n_v, 1, 1, 4)
+    volumen_min, volumen_max, valor_min, valor_max = (por_servicio[..., k] for k in range(4))
+    cantidad = rng.integers(volumen_min, volumen_max, size=forma, endpoint=True)
+    valor = rng.integers(valor_min, valor_max, size=forma, endpoint=True)
+
+    meses_grilla = np.arange(1, meses + 1, dtype=np.int16).reshape(meses, 1, 1, 1)
+    return pd.DataFrame({
+        'mes': np.broadcast_to(meses_grilla, forma).ravel(),
+        'codigo': _categorica([p[0] for p in parametros], 1, forma),
+        'servicio': _categorica(servicios_lista, 1, forma),
+        'sede': _categorica(sedes, 2, forma),
+        'aseguradora': _categorica(aseguradoras, 3, forma),
+        'cantidad': cantidad.ravel(),
+        'valor_unitario': valor.ravel(),
+        'categoria': _categorica([p[1] for p in parametros], 1, forma),
+    })
+
+
+def iterar_registros(columnas: pd.DataFrame, tamano_bloque: int = 100_000) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre un DataFrame de producción como diccionarios (formato de
+    generar_datos_produccion), por bloques para no duplicarlo en memoria.
+    Sirve para pasar datos columnares a crear_hoja_produccion o al motor.
+    """
+    nombres = list(columnas.columns)
+    for inicio in range(0, len(columnas), tamano_bloque):
+        bloque = columnas.iloc[inicio:inicio + tamano_bloque]
+        for valores in zip(*(bloque[nombre].tolist() for nombre in nombres)):
+            yield dict(zip(nombres, valores))
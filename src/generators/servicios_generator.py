@@ -53,3 +53,8 @@ def generar_datos_servicios(servicios_completos: List[Dict], categorias_info: Di
         })
     
     return servicios_procesados
+
+
+def codigos_servicios(servicios: List[Dict[str, Any]]) -> Dict[str, str]:
+    """{nombre: código} de un catálogo en el formato de generar_datos_servicios"""
+    return {servicio['nombre']: servicio['codigo'] for servicio in servicios}
@@ -0,0 +1,264 @@
+"""
+Simulador de producción a nivel de cita.
+
+Genera registros individuales (una fila por cita atendida) con las mismas
+columnas que exporta el sistema de información real y que lee
+ImportadorProduccion (ver MAPEO_COLUMNAS_REAL): 'Fecha Cita', 'No Factura',
+'Identificacion', etc. Sirve para probar y medir los importadores y las
+hojas con volúmenes de producción real sin depender de datos de pacientes.
+
+Los datos se generan por bloques y se pueden escribir a CSV o Parquet sin
+materializar el dataset completo.
+"""
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .produccion_generator import _parametros_servicio
+
+# Columnas del export real, en el orden del sistema de información
+COLUMNAS_CITA = [
+    'codigo_servicio', 'servicio', 'Sede', 'entidad', 'Fecha Cita',
+    'Valor Servicio', 'Valor Recaudo', 'No Factura', 'Identificacion',
+    'estado', 'area'
+]
+
+# Estado de la cita y fracción recaudada del valor facturado
+ESTADOS_CITA = {
+    "Atendida": 1.0,
+    "Glosada": 0.0,
+    "Recaudo Parcial": 0.6,
+}
+PROBABILIDAD_ESTADOS = (0.94, 0.03, 0.03)
+
+# Franja de atención: citas cada 20 minutos entre las 07:00 y las 18:00
+_MINUTO_INICIO, _MINUTO_FIN, _INTERVALO = 7 * 60, 18 * 60, 20
+
+
+class _Columna:
+    """Valores de texto por posición, expandidos como columna categórica"""
+
+    def __init__(self, valores: List[str]):
+        self.categorias, self.codigos = np.unique(np.asarray(valores, dtype=object), return_inverse=True)
+
+    def expandir(self, posiciones: np.ndarray) -> pd.Categorical:
+        return pd.Categorical.from_codes(self.codigos[posiciones], categories=self.categorias)
+
+
+class SimuladorCitas:
+    """
+    Simula citas individuales mes a mes.
+
+    Por cada mes, servicio, sede y aseguradora se sortea un volumen en el rango
+    del servicio (como generar_datos_produccion) multiplicado por el factor de
+    volumen de la sede; cada unidad de ese volumen es una cita con su fecha,
+    paciente y factura. La tarifa de un servicio es fija por aseguradora
+    (contrato) durante todo el periodo.
+    """
+
+    def __init__(
+        self,
+        servicios_lista: List[str],
+        servicios_dict: Dict[str, Dict],
+        categorias_info: Dict,
+        sedes: List[str],
+        aseguradoras: List[str],
+        meses: int = 12,
+        inicio: str = "2025-01",
+        multiplicador_volumen: Union[float, Dict[str, float]] = 1.0,
+        pacientes_por_cita: float = 0.35,
+        semilla: Optional[int] = None,
+        tamano_bloque: int = 100_000,
+    ):
+        """
+        Args:
+            servicios_lista: Lista de nombres de servicios
+            servicios_dict: Diccionario {nombre_servicio: datos_completos}
+            categorias_info: Información de categorías
+            sedes: Sedes a simular
+            aseguradoras: Lista de aseguradoras (columna 'entidad')
+            meses: Número de meses consecutivos a simular
+            inicio: Primer mes (AAAA-MM)
+            multiplicador_volumen: Factor sobre el volumen mensual configurado;
+                                   un número para todas las sedes o {sede: factor}
+            pacientes_por_cita: Pacientes distintos por cita (< 1: hay pacientes
+                                con varias citas en el periodo)
+            semilla: Semilla de numpy.random.default_rng
+            tamano_bloque: Filas máximas por bloque generado
+        """
+        self.servicios = list(servicios_lista)
+        self.sedes = list(sedes)
+        self.aseguradoras = list(aseguradoras)
+        self.meses = pd.period_range(inicio, periods=meses, freq="M")
+        self.pacientes_por_cita = pacientes_por_cita
+        self.semilla = semilla
+        self.tamano_bloque = tamano_bloque
+
+        parametros = [
+            _parametros_servicio(servicio, posicion, servicios_dict, categorias_info)
+            for posicion, servicio in enumerate(self.servicios, 1)
+        ]
+        self._codigos = _Columna([p[0] for p in parametros])
+        self._areas = _Columna([p[1] for p in parametros])
+        self._nombres = _Columna(self.servicios)
+        self._sedes = _Columna(self.sedes)
+        self._entidades = _Columna(self.aseguradoras)
+        rangos = np.array([p[2] + p[3] for p in parametros], dtype=np.int64).reshape(-1, 4)
+        self._volumen_min, self._volumen_max = rangos[:, 0], rangos[:, 1]
+        self._valor_min, self._valor_max = rangos[:, 2], rangos[:, 3]
+
+        if isinstance(multiplicador_volumen, dict):
+            self._multiplicador = np.array([multiplicador_volumen.get(s, 1.0) for s in self.sedes], dtype=float)
+        else:
+            self._multiplicador = np.full(len(self.sedes), float(multiplicador_volumen))
+
+    @classmethod
+    def desde_config(cls, **kwargs) -> "SimuladorCitas":
+        """Simulador con servicios, sedes y aseguradoras de la configuración activa"""
+        from .. import config
+        servicios_completos = config._mapper.get_servicios_completos() or []
+        kwargs.setdefault("sedes", config.SEDES)
+        return cls(
+            config.SERVICIOS,
+            {s["nombre"]: s for s in servicios_completos},
+            config._mapper.get_categorias_info() or {},
+            aseguradoras=config.ASEGURADORAS,
+            **kwargs
+        )
+
+    def iterar_bloques(self) -> Iterator[pd.DataFrame]:
+        """
+        Genera las citas en DataFrames de hasta `tamano_bloque` filas, en orden
+        cronológico también entre bloques (las facturas siguen ese orden). Con
+        la misma semilla se obtienen siempre los mismos bloques.
+        """
+        rng = np.random.default_rng(self.semilla)
+        n_v, n_s, n_a = len(self.servicios), len(self.sedes), len(self.aseguradoras)
+        if not (n_v and n_s and n_a):
+            return
+
+        # Tarifa contratada por (servicio, aseguradora), redondeada a centenas
+        tarifa = rng.integers(self._valor_min[:, None], self._valor_max[:, None],
+                              size=(n_v, n_a), endpoint=True) // 100 * 100
+        factura = 0
+        n_pacientes = 0
+        for mes in self.meses:
+            volumen = rng.integers(self._volumen_min[:, None, None], self._volumen_max[:, None, None],
+                                   size=(n_v, n_s, n_a), endpoint=True)
+            volumen = np.rint(volumen * self._multiplicador[None, :, None]).astype(np.int64)
+            celdas = np.repeat(np.arange(volumen.size), volumen.ravel())
+            # Pacientes: el universo crece con las citas y los ya atendidos vuelven
+            n_pacientes += max(int(len(celdas) * self.pacientes_por_cita), 1)
+
+            # Día y hora de todas las citas del mes; se ordena el mes completo
+            # antes de partirlo, así los bloques quedan en orden entre sí
+            dia = rng.integers(0, mes.days_in_month, size=len(celdas))
+            minuto = _MINUTO_INICIO + _INTERVALO * rng.integers(
+                0, (_MINUTO_FIN - _MINUTO_INICIO) // _INTERVALO, size=len(celdas))
+            desplazamiento = dia * 1440 + minuto
+            orden = np.argsort(desplazamiento, kind="stable")
+            desplazamiento, celdas = desplazamiento[orden], celdas[orden]
+
+            for inicio in range(0, len(celdas), self.tamano_bloque):
+                fin = inicio + self.tamano_bloque
+                yield self._bloque(rng, mes, celdas[inicio:fin], desplazamiento[inicio:fin],
+                                   tarifa, factura, n_pacientes)
+                factura += len(celdas[inicio:fin])
+
+    def _bloque(self, rng, mes, celdas, desplazamiento, tarifa, factura, n_pacientes) -> pd.DataFrame:
+        """Citas de un bloque ya ordenado (minutos desde el inicio del mes); las facturas siguen ese orden"""
+        n = len(celdas)
+        fecha = mes.to_timestamp() + pd.to_timedelta(desplazamiento, unit="m")
+        servicio, sede, aseguradora = np.unravel_index(
+            celdas, (len(self.servicios), len(self.sedes), len(self.aseguradoras)))
+
+        valor = tarifa[servicio, aseguradora]
+        estado = rng.choice(len(ESTADOS_CITA), size=n, p=PROBABILIDAD_ESTADOS)
+        recaudo = np.rint(valor * np.array(list(ESTADOS_CITA.values()))[estado]).astype(np.int64)
+        paciente = 10_000_000 + rng.integers(0, n_pacientes, size=n)
+
+        return pd.DataFrame({
+            'codigo_servicio': self._codigos.expandir(servicio),
+            'servicio': self._nombres.expandir(servicio),
+            'Sede': self._sedes.expandir(sede),
+            'entidad': self._entidades.expandir(aseguradora),
+            'Fecha Cita': fecha,
+            'Valor Servicio': valor,
+            'Valor Recaudo': recaudo,
+            'No Factura': [f"FE{numero:09d}" for numero in range(factura + 1, factura + n + 1)],
+            'Identificacion': paciente.astype(str),
+            'estado': pd.Categorical.from_codes(estado, categories=list(ESTADOS_CITA)),
+            'area': self._areas.expandir(servicio),
+        }, columns=COLUMNAS_CITA)
+
+    def a_csv(self, ruta: str, separador: str = ',') -> int:
+        """
+        Escribe las citas a CSV bloque por bloque.
+
+        Returns:
+            Número de filas escritas
+        """
+        filas = 0
+        for bloque in self.iterar_bloques():
+            bloque.to_csv(ruta, sep=separador, index=False, encoding='utf-8',
+                          mode='w' if filas == 0 else 'a', header=filas == 0,
+                          date_format='%Y-%m-%d %H:%M')
+            filas += len(bloque)
+        return filas
+
+    def a_parquet(self, ruta: str) -> int:
+        """
+        Escribe las citas a Parquet, un row group por bloque (requiere pyarrow).
+
+        Returns:
+            Número de filas escritas
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("La salida Parquet requiere pyarrow: pip install pyarrow") from e
+
+        filas = 0
+        escritor = None
+        try:
+            for bloque in self.iterar_bloques():
+                tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+                if escritor is None:
+                    escritor = pq.ParquetWriter(ruta, tabla.schema)
+                escritor.write_table(tabla.cast(escritor.schema))
+                filas += len(bloque)
+        finally:
+            if escritor is not None:
+                escritor.close()
+        return filas
+
+
+def main():
+    """Línea de comandos: python -m src.generators.simulador_citas salida.csv --meses 12"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Simula citas con las columnas del export real")
+    parser.add_argument("salida", help="archivo .csv o .parquet")
+    parser.add_argument("--meses", type=int, default=12)
+    parser.add_argument("--inicio", default="2025-01", help="primer mes (AAAA-MM)")
+    parser.add_argument("--multiplicador", type=float, default=1.0,
+                        help="factor sobre el volumen mensual configurado")
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args()
+
+    simulador = SimuladorCitas.desde_config(meses=args.meses, inicio=args.inicio,
+                                            multiplicador_volumen=args.multiplicador,
+                                            semilla=args.semilla)
+    inicio = time.perf_counter()
+    if args.salida.endswith(".parquet"):
+        filas = simulador.a_parquet(args.salida)
+    else:
+        filas = simulador.a_csv(args.salida)
+    print(f"[OK] {filas:,} citas escritas en {args.salida} ({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
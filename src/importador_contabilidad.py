@@ -3,9 +3,20 @@ Importador de datos contables (auxiliares contables).
 
 Importa movimientos contables desde el sistema contable de la empresa.
 """
+import glob
+import time
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional, Union
+
+from .almacen_incremental import AlmacenIncremental
+from .cache_importacion import CacheImportacion, cargar_con_cache
+from .detector_encabezados import DetectorEncabezados
+from .lector_excel import leer_excel
+from .columnar import RegistrosPerezosos, codificar_categoricas, contiene
+from .numeros import a_numero
+from .validacion import Regla, ValidadorColumnar
 
 
 class ImportadorContabilidad:
@@ -29,11 +40,44 @@ class ImportadorContabilidad:
         'Créditos': 'creditos',
         'Neto': 'neto'
     }
+
+    # Reglas sobre las columnas ya renombradas. Las filas que no las cumplen se
+    # conservan y se reportan como advertencia (las columnas son opcionales)
+    VALIDADOR = ValidadorColumnar([
+        Regla.obligatorio('codigo_cuenta', "la cuenta auxiliar es obligatoria", requerida=False),
+        Regla.obligatorio('nombre_centro', "el centro de operación es obligatorio", requerida=False),
+        Regla.no_negativo('debitos', "débitos no pueden ser negativos", requerida=False),
+        Regla.no_negativo('creditos', "créditos no pueden ser negativos", requerida=False),
+    ])
+
+    # Lista de diccionarios (formato anterior), construida desde `tabla` al pedirla
+    datos_contables = RegistrosPerezosos()
+    
+    # Versión de la limpieza de datos: subirla invalida la caché de importación
+    VERSION_PROCESAMIENTO = 3
+
+    # Importación incremental: marca de agua por fecha; las filas hasta la marca se
+    # comparan por cuenta/centro/periodo y esos mismos agregados se recalculan
+    GRUPO_INCREMENTAL = ['codigo_cuenta', 'nombre_centro', 'periodo']
+    AGREGACIONES_INCREMENTAL = {'debitos': 'sum', 'creditos': 'sum', 'neto': 'sum'}
     
-    def __init__(self):
-        self.datos_contables = None
+    def __init__(self, cache: CacheImportacion = None, motor_excel: str = "auto",
+                 detector: DetectorEncabezados = None):
+        """
+        Args:
+            cache: Caché de importación opcional para los Excel ya leídos
+            motor_excel: Motor de lectura de Excel (ver lector_excel.MOTORES)
+            detector: Reconoce encabezados escritos distinto al MAPEO_COLUMNAS (opcional)
+        """
+        self.cache = cache
+        self.motor_excel = motor_excel
+        self.detector = detector
+        self.tabla = None  # DataFrame columnar con los datos procesados
         self.errores = []
         self.advertencias = []
+        self.reporte_validacion = None
+        self.reporte_archivos = []  # Tiempo, filas y errores por archivo de cargar_multiples
+        self.almacen = None  # AlmacenIncremental de la última cargar_incremental
     
     def cargar_desde_excel(self, ruta_archivo: str, hoja: str = None) -> bool:
         """
@@ -47,12 +91,12 @@ class ImportadorContabilidad:
             True si la carga fue exitosa
         """
         try:
-            if hoja:
-                df = pd.read_excel(ruta_archivo, sheet_name=hoja)
-            else:
-                df = pd.read_excel(ruta_archivo)
-            
-            return self._procesar_dataframe(df, ruta_archivo)
+            df, desde_cache = self._leer_preparado(ruta_archivo, hoja)
+            if df is None:
+                return False
+            if desde_cache:
+                self.advertencias.append(f"Leído de la caché de importación ({ruta_archivo} sin cambios)")
+            return self._registrar(df)
         
         except FileNotFoundError:
             self.errores.append(f"Archivo no encontrado: {ruta_archivo}")
@@ -61,8 +105,138 @@ class ImportadorContabilidad:
             self.errores.append(f"Error al leer Excel: {e}")
             return False
     
+    def cargar_multiples(self, archivos: Union[str, Iterable[str]], hoja: str = None,
+                         procesos: int = None) -> bool:
+        """
+        Carga varios auxiliares (ej: uno por mes y centro de operación) en una sola tabla.
+
+        Los archivos se leen en paralelo en procesos separados (leer xlsx usa
+        CPU, no E/S) y se concatenan con una columna `periodo` (AAAA-MM de la
+        fecha del movimiento, o el nombre del archivo si la fecha no es válida).
+        El tiempo, las filas y los errores de cada archivo quedan en
+        `reporte_archivos`; un archivo con error no impide cargar los demás.
+
+        Args:
+            archivos: Patrón glob (ej: "auxiliares/2025-*.xlsx") o lista de rutas
+            hoja: Nombre de la hoja en todos los archivos (opcional)
+            procesos: Procesos de lectura (por defecto uno por CPU; 1 lee en este proceso)
+
+        Returns:
+            True si se cargó al menos un archivo
+        """
+        rutas = sorted(glob.glob(archivos)) if isinstance(archivos, str) else [str(a) for a in archivos]
+        if not rutas:
+            self.errores.append(f"No hay archivos para importar: {archivos}")
+            return False
+
+        argumentos = [(ruta, hoja, self.cache, self.motor_excel, self.detector) for ruta in rutas]
+        if procesos == 1 or len(rutas) == 1:
+            resultados = [_importar_archivo(*args) for args in argumentos]
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = [pool.submit(_importar_archivo, *args) for args in argumentos]
+                resultados = [_resultado_futuro(futuro, ruta) for futuro, ruta in zip(futuros, rutas)]
+
+        tablas = []
+        self.reporte_archivos = []
+        for resultado in resultados:
+            df = resultado.pop('df')
+            resultado['filas'] = 0 if df is None else len(df)
+            self.reporte_archivos.append(resultado)
+            self.errores.extend(f"{resultado['archivo']}: {error}" for error in resultado['errores'])
+            if df is not None:
+                tablas.append(df)
+
+        if not tablas:
+            return False
+        self.advertencias.append(f"Archivos cargados: {len(tablas)} de {len(rutas)}")
+        # Al concatenar, categorías distintas por archivo pasan a object: se recodifica
+        return self._registrar(codificar_categoricas(pd.concat(tablas, ignore_index=True)))
+
+    def cargar_incremental(self, ruta_archivo: str, ruta_almacen, hoja: str = None) -> bool:
+        """
+        Incorpora un auxiliar al almacén local y carga todos los movimientos acumulados.
+
+        Solo se agregan los movimientos con fecha posterior a la marca de agua
+        del almacén; los anteriores se comparan por (cuenta, centro, periodo)
+        y, si cambiaron (correcciones tardías), reemplazan a los guardados. Los
+        agregados por (cuenta, centro, periodo) se recalculan solo para las
+        llaves con cambios y quedan en `self.almacen.agregados`.
+
+        Args:
+            ruta_archivo: Auxiliar a incorporar (ej: el del último mes)
+            ruta_almacen: Archivo del almacén (se crea en la primera carga)
+            hoja: Nombre de la hoja (opcional)
+
+        Returns:
+            True si la carga fue exitosa
+        """
+        try:
+            df, _ = self._leer_preparado(ruta_archivo, hoja)
+        except FileNotFoundError:
+            self.errores.append(f"Archivo no encontrado: {ruta_archivo}")
+            return False
+        except Exception as e:
+            self.errores.append(f"Error al leer Excel: {e}")
+            return False
+        if df is None:
+            return False
+
+        faltantes = [c for c in ['fecha', 'codigo_cuenta', 'nombre_centro'] if c not in df.columns]
+        if faltantes:
+            self.errores.append(f"La importación incremental requiere las columnas: {', '.join(faltantes)}")
+            return False
+
+        df = _agregar_periodo(df, ruta_archivo).assign(fecha=lambda d: _fechas(d['fecha']))
+        self.almacen = AlmacenIncremental(ruta_almacen, 'fecha', self.GRUPO_INCREMENTAL,
+                                          self.GRUPO_INCREMENTAL, self.AGREGACIONES_INCREMENTAL)
+        resultado = self.almacen.aplicar(df)
+        self.advertencias.append(f"Importación incremental de {ruta_archivo}:")
+        self.advertencias.append(f"  - Movimientos nuevos: {resultado['nuevas']}")
+        self.advertencias.append(f"  - Grupos corregidos: {resultado['grupos_corregidos']}")
+        self.advertencias.append(f"  - Agregados recalculados: {resultado['agregados_recalculados']}")
+        return self._registrar(self.almacen.movimientos)
+
+    def _leer_preparado(self, ruta_archivo: str, hoja: str = None):
+        """DataFrame preparado del archivo (desde la caché si la hay) y si vino de ella"""
+        encabezados = self._resolver_encabezados(ruta_archivo, hoja)
+        return cargar_con_cache(
+            self.cache, ruta_archivo, self._variante_cache(hoja, encabezados),
+            lambda: self._preparar(self._leer_excel(ruta_archivo, hoja, encabezados), ruta_archivo)
+        )
+
+    def _resolver_encabezados(self, ruta_archivo: str, hoja: str = None) -> Optional[Dict[str, str]]:
+        """{encabezado del archivo: clave del MAPEO_COLUMNAS} según el detector (None sin detector)"""
+        if self.detector is None:
+            return None
+        encabezados, _ = self.detector.resolver_archivo('contabilidad', ruta_archivo, self.MAPEO_COLUMNAS, hoja)
+        descripcion = self.detector.descripcion_pendiente()
+        if descripcion:
+            self.advertencias.append(f"{descripcion} ({ruta_archivo})")
+        return encabezados
+
+    def _leer_excel(self, ruta_archivo: str, hoja: str = None,
+                    encabezados: Dict[str, str] = None) -> pd.DataFrame:
+        """Lee solo las columnas del mapeo (o las resueltas por el detector) con el motor configurado"""
+        if encabezados:
+            df = leer_excel(ruta_archivo, hoja, columnas=list(encabezados), motor=self.motor_excel)
+            return df.rename(columns=encabezados)
+        return leer_excel(ruta_archivo, hoja, columnas=list(self.MAPEO_COLUMNAS), motor=self.motor_excel)
+
+    def _variante_cache(self, hoja: str = None, encabezados: Dict[str, str] = None) -> str:
+        """Identifica el procesamiento en la caché: cambia si cambia el mapeo o la limpieza"""
+        variante = f"{type(self).__name__}|{self.VERSION_PROCESAMIENTO}|{self.motor_excel}|{hoja}|{self.MAPEO_COLUMNAS}"
+        return f"{variante}|{encabezados}" if encabezados else variante
+
     def _procesar_dataframe(self, df: pd.DataFrame, origen: str) -> bool:
         """Procesa y valida el DataFrame de contabilidad"""
+        df = self._preparar(df, origen)
+        if df is None:
+            return False
+        return self._registrar(df)
+
+    def _preparar(self, df: pd.DataFrame, origen: str) -> Optional[pd.DataFrame]:
+        """Renombra, limpia y codifica el DataFrame leído (None si no es válido)"""
         
         # Renombrar columnas según mapeo
         columnas_encontradas = {}
@@ -75,24 +249,26 @@ class ImportadorContabilidad:
                 f"No se encontraron columnas reconocidas en {origen}. "
                 f"Columnas esperadas: {list(self.MAPEO_COLUMNAS.keys())}"
             )
-            return False
+            return None
         
         # Renombrar columnas
         df = df.rename(columns=columnas_encontradas)
         
-        # Limpiar valores monetarios (quitar $ y comas)
+        # Valores monetarios: formato local ("1.234,56" o "1,234.56") detectado por columna
         for col in ['debitos', 'creditos', 'neto']:
             if col in df.columns:
-                df[col] = df[col].astype(str).str.replace('$', '').str.replace(',', '').str.replace('.', '')
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+                df[col] = a_numero(df[col]).fillna(0)
         
         # Validar datos
         if len(df) == 0:
             self.errores.append(f"El archivo {origen} no contiene datos")
-            return False
-        
-        # Guardar datos procesados
-        self.datos_contables = df.to_dict('records')
+            return None
+
+        return codificar_categoricas(df)
+
+    def _registrar(self, df: pd.DataFrame) -> bool:
+        """Guarda el DataFrame ya preparado y genera las estadísticas"""
+        self.tabla = df
         
         # Estadísticas
         total_registros = len(df)
@@ -105,9 +281,41 @@ class ImportadorContabilidad:
         self.advertencias.append(f"  - Cuentas únicas: {cuentas_unicas}")
         self.advertencias.append(f"  - Total débitos: ${total_debitos:,.0f}")
         self.advertencias.append(f"  - Total créditos: ${total_creditos:,.0f}")
+
+        self.reporte_validacion = self.VALIDADOR.validar(df)
+        for mensaje in self.reporte_validacion.mensajes():
+            self.advertencias.append(f"  - Revisar: {mensaje}")
         
         return True
     
+    def guardar_en_almacen(self, almacen, periodo: str = None) -> int:
+        """
+        Guarda la tabla cargada en el almacén SQLite.
+
+        Se reemplazan los periodos presentes: los de la columna `periodo`
+        (cargar_multiples, cargar_incremental) o el indicado para toda la tabla.
+
+        Args:
+            almacen: AlmacenSQL de destino
+            periodo: Periodo AAAA-MM (obligatorio si la tabla no tiene columna periodo)
+
+        Returns:
+            Filas guardadas
+        """
+        if not self._hay_datos():
+            return 0
+        tabla = self.tabla
+        if periodo is not None:
+            tabla = tabla.assign(periodo=periodo)
+        elif 'periodo' not in tabla.columns:
+            raise ValueError("Indique el periodo: la tabla no tiene columna periodo")
+        if 'fecha' in tabla.columns:
+            tabla = tabla.assign(fecha=_fechas(tabla['fecha']))
+        return almacen.guardar_contabilidad(tabla)
+
+    def _hay_datos(self) -> bool:
+        return self.tabla is not None and not self.tabla.empty
+
     def obtener_costos_por_cuenta(self) -> Dict[str, float]:
         """
         Obtiene costos agrupados por cuenta contable.
@@ -115,14 +323,14 @@ class ImportadorContabilidad:
         Returns:
             Diccionario {codigo_cuenta: monto_total}
         """
-        if not self.datos_contables:
+        if not self._hay_datos():
             return {}
         
-        df = pd.DataFrame(self.datos_contables)
+        df = self.tabla
         
         # Agrupar por cuenta
         if 'codigo_cuenta' in df.columns and 'neto' in df.columns:
-            costos = df.groupby('codigo_cuenta')['neto'].sum().to_dict()
+            costos = df.groupby('codigo_cuenta', observed=True)['neto'].sum().to_dict()
             return costos
         
         return {}
@@ -134,13 +342,13 @@ class ImportadorContabilidad:
         Returns:
             Diccionario {nombre_centro: monto_total}
         """
-        if not self.datos_contables:
+        if not self._hay_datos():
             return {}
         
-        df = pd.DataFrame(self.datos_contables)
+        df = self.tabla
         
         if 'nombre_centro' in df.columns and 'neto' in df.columns:
-            costos = df.groupby('nombre_centro')['neto'].sum().to_dict()
+            costos = df.groupby('nombre_centro', observed=True)['neto'].sum().to_dict()
             return costos
         
         return {}
@@ -155,13 +363,13 @@ class ImportadorContabilidad:
         Returns:
             Lista de movimientos filtrados
         """
-        if not self.datos_contables:
+        if not self._hay_datos():
             return []
         
-        df = pd.DataFrame(self.datos_contables)
+        df = self.tabla
         
         if 'clase' in df.columns:
-            filtrado = df[df['clase'].str.contains(clase, case=False, na=False)]
+            filtrado = df[contiene(df['clase'], clase)]
             return filtrado.to_dict('records')
         
         return []
@@ -187,6 +395,53 @@ class ImportadorContabilidad:
         return "\n".join(reporte)
 
 
+def _fechas(serie: pd.Series) -> pd.Series:
+    """Fechas del auxiliar como datetime (textos dd/mm/aaaa o fechas de Excel; inválidas: NaT)"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    return pd.to_datetime(serie.astype(object), dayfirst=True, errors='coerce')
+
+
+def _agregar_periodo(df: pd.DataFrame, ruta_archivo: str) -> pd.DataFrame:
+    """Columna `periodo` (AAAA-MM) desde la fecha del movimiento; sin fecha, el nombre del archivo"""
+    periodo = pd.Series(Path(ruta_archivo).stem, index=df.index)
+    if 'fecha' in df.columns:
+        periodo = _fechas(df['fecha']).dt.strftime('%Y-%m').fillna(periodo)
+    return df.assign(periodo=periodo)
+
+
+def _importar_archivo(ruta_archivo: str, hoja: Optional[str], cache: Optional[CacheImportacion],
+                      motor_excel: str, detector: Optional[DetectorEncabezados] = None) -> Dict[str, Any]:
+    """Lee y prepara un auxiliar (se ejecuta en los procesos de cargar_multiples)"""
+    inicio = time.perf_counter()
+    importador = ImportadorContabilidad(cache=cache, motor_excel=motor_excel, detector=detector)
+    df, desde_cache = None, False
+    try:
+        df, desde_cache = importador._leer_preparado(ruta_archivo, hoja)
+    except FileNotFoundError:
+        importador.errores.append("Archivo no encontrado")
+    except Exception as e:
+        importador.errores.append(f"Error al leer Excel: {e}")
+    if df is not None:
+        df = _agregar_periodo(df, ruta_archivo)
+    return {
+        'archivo': ruta_archivo,
+        'df': df,
+        'desde_cache': desde_cache,
+        'segundos': time.perf_counter() - inicio,
+        'errores': importador.errores,
+    }
+
+
+def _resultado_futuro(futuro, ruta_archivo: str) -> Dict[str, Any]:
+    """Resultado de un proceso; si el proceso mismo falló, se reporta como error del archivo"""
+    try:
+        return futuro.result()
+    except Exception as e:
+        return {'archivo': ruta_archivo, 'df': None, 'desde_cache': False, 'segundos': 0.0,
+                'errores': [f"Error en el proceso de lectura: {e}"]}
+
+
 def ejemplo_uso_contabilidad():
     """Ejemplo de uso del importador de contabilidad"""
     print("\n" + "="*60)
@@ -5,9 +5,16 @@ Importa datos de empleados y salarios desde el sistema de nómina.
 """
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from .cache_importacion import CacheImportacion, cargar_con_cache
+from .detector_encabezados import DetectorEncabezados
+from .lector_excel import leer_excel
+from .columnar import RegistrosPerezosos, codificar_categoricas, contiene
+from .numeros import a_numero
+from .validacion import Regla, ValidadorColumnar
+
 
 class ImportadorNomina:
     """
@@ -27,11 +34,35 @@ class ImportadorNomina:
         'Descripcion del cargo': 'cargo',
         'Salario': 'salario'
     }
+
+    # Reglas sobre las columnas ya renombradas. Las filas que no las cumplen se
+    # conservan y se reportan como advertencia (las columnas son opcionales)
+    VALIDADOR = ValidadorColumnar([
+        Regla.obligatorio('identificacion', "identificación del empleado es obligatoria", requerida=False),
+        Regla.positivo('salario', "salario debe ser mayor a 0", requerida=False),
+    ])
+
+    # Lista de diccionarios (formato anterior), construida desde `tabla` al pedirla
+    datos_nomina = RegistrosPerezosos()
+    
+    # Versión de la limpieza de datos: subirla invalida la caché de importación
+    VERSION_PROCESAMIENTO = 3
     
-    def __init__(self):
-        self.datos_nomina = None
+    def __init__(self, cache: CacheImportacion = None, motor_excel: str = "auto",
+                 detector: DetectorEncabezados = None):
+        """
+        Args:
+            cache: Caché de importación opcional para los Excel ya leídos
+            motor_excel: Motor de lectura de Excel (ver lector_excel.MOTORES)
+            detector: Reconoce encabezados escritos distinto al MAPEO_COLUMNAS (opcional)
+        """
+        self.cache = cache
+        self.motor_excel = motor_excel
+        self.detector = detector
+        self.tabla = None  # DataFrame columnar con los datos procesados
         self.errores = []
         self.advertencias = []
+        self.reporte_validacion = None
     
     def cargar_desde_excel(self, ruta_archivo: str, hoja: str = None) -> bool:
         """
@@ -45,12 +76,12 @@ class ImportadorNomina:
             True si la carga fue exitosa
         """
         try:
-            if hoja:
-                df = pd.read_excel(ruta_archivo, sheet_name=hoja)
-            else:
-                df = pd.read_excel(ruta_archivo)
-            
-            return self._procesar_dataframe(df, ruta_archivo)
+            df, desde_cache = self._leer_preparado(ruta_archivo, hoja)
+            if df is None:
+                return False
+            if desde_cache:
+                self.advertencias.append(f"Leído de la caché de importación ({ruta_archivo} sin cambios)")
+            return self._registrar(df)
         
         except FileNotFoundError:
             self.errores.append(f"Archivo no encontrado: {ruta_archivo}")
@@ -59,8 +90,46 @@ class ImportadorNomina:
             self.errores.append(f"Error al leer Excel: {e}")
             return False
     
+    def _leer_preparado(self, ruta_archivo: str, hoja: str = None):
+        """DataFrame preparado del archivo (desde la caché si la hay) y si vino de ella"""
+        encabezados = self._resolver_encabezados(ruta_archivo, hoja)
+        return cargar_con_cache(
+            self.cache, ruta_archivo, self._variante_cache(hoja, encabezados),
+            lambda: self._preparar(self._leer_excel(ruta_archivo, hoja, encabezados), ruta_archivo)
+        )
+
+    def _resolver_encabezados(self, ruta_archivo: str, hoja: str = None) -> Optional[Dict[str, str]]:
+        """{encabezado del archivo: clave del MAPEO_COLUMNAS} según el detector (None sin detector)"""
+        if self.detector is None:
+            return None
+        encabezados, _ = self.detector.resolver_archivo('nomina', ruta_archivo, self.MAPEO_COLUMNAS, hoja)
+        descripcion = self.detector.descripcion_pendiente()
+        if descripcion:
+            self.advertencias.append(f"{descripcion} ({ruta_archivo})")
+        return encabezados
+
+    def _leer_excel(self, ruta_archivo: str, hoja: str = None,
+                    encabezados: Dict[str, str] = None) -> pd.DataFrame:
+        """Lee solo las columnas del mapeo (o las resueltas por el detector) con el motor configurado"""
+        if encabezados:
+            df = leer_excel(ruta_archivo, hoja, columnas=list(encabezados), motor=self.motor_excel)
+            return df.rename(columns=encabezados)
+        return leer_excel(ruta_archivo, hoja, columnas=list(self.MAPEO_COLUMNAS), motor=self.motor_excel)
+
+    def _variante_cache(self, hoja: str = None, encabezados: Dict[str, str] = None) -> str:
+        """Identifica el procesamiento en la caché: cambia si cambia el mapeo o la limpieza"""
+        variante = f"{type(self).__name__}|{self.VERSION_PROCESAMIENTO}|{self.motor_excel}|{hoja}|{self.MAPEO_COLUMNAS}"
+        return f"{variante}|{encabezados}" if encabezados else variante
+
     def _procesar_dataframe(self, df: pd.DataFrame, origen: str) -> bool:
         """Procesa y valida el DataFrame de nómina"""
+        df = self._preparar(df, origen)
+        if df is None:
+            return False
+        return self._registrar(df)
+
+    def _preparar(self, df: pd.DataFrame, origen: str) -> Optional[pd.DataFrame]:
+        """Renombra, limpia y codifica el DataFrame leído (None si no es válido)"""
         
         # Renombrar columnas según mapeo
         columnas_encontradas = {}
@@ -73,27 +142,29 @@ class ImportadorNomina:
                 f"No se encontraron columnas reconocidas en {origen}. "
                 f"Columnas esperadas: {list(self.MAPEO_COLUMNAS.keys())}"
             )
-            return False
+            return None
         
         # Renombrar columnas
         df = df.rename(columns=columnas_encontradas)
         
-        # Limpiar salarios (quitar comas y convertir a número)
+        # Salarios: mismo formato local detectado que los montos contables
         if 'salario' in df.columns:
-            df['salario'] = df['salario'].astype(str).str.replace(',', '').str.replace('.', '')
-            df['salario'] = pd.to_numeric(df['salario'], errors='coerce').fillna(0)
+            df['salario'] = a_numero(df['salario']).fillna(0)
         
         # Validar datos
         if len(df) == 0:
             self.errores.append(f"El archivo {origen} no contiene datos")
-            return False
-        
-        # Guardar datos procesados
-        self.datos_nomina = df.to_dict('records')
+            return None
+
+        return codificar_categoricas(df)
+
+    def _registrar(self, df: pd.DataFrame) -> bool:
+        """Guarda el DataFrame ya preparado y genera las estadísticas"""
+        self.tabla = df
         
         # Estadísticas
         total_empleados = len(df)
-        empleados_activos = len(df[df['estado'].str.contains('Activo', case=False, na=False)]) if 'estado' in df.columns else 0
+        empleados_activos = int(contiene(df['estado'], 'Activo').sum()) if 'estado' in df.columns else 0
         sedes_unicas = df['sede'].nunique() if 'sede' in df.columns else 0
         costo_total = df['salario'].sum() if 'salario' in df.columns else 0
         
@@ -102,9 +173,31 @@ class ImportadorNomina:
         self.advertencias.append(f"  - Empleados activos: {empleados_activos}")
         self.advertencias.append(f"  - Sedes: {sedes_unicas}")
         self.advertencias.append(f"  - Costo total nómina: ${costo_total:,.0f}")
+
+        self.reporte_validacion = self.VALIDADOR.validar(df)
+        for mensaje in self.reporte_validacion.mensajes():
+            self.advertencias.append(f"  - Revisar: {mensaje}")
         
         return True
     
+    def guardar_en_almacen(self, almacen, periodo: str) -> int:
+        """
+        Guarda la tabla cargada en el almacén SQLite (reemplaza el periodo).
+
+        Args:
+            almacen: AlmacenSQL de destino
+            periodo: Periodo AAAA-MM de la nómina
+
+        Returns:
+            Filas guardadas
+        """
+        if not self._hay_datos():
+            return 0
+        return almacen.guardar_nomina(self.tabla, periodo)
+
+    def _hay_datos(self) -> bool:
+        return self.tabla is not None and not self.tabla.empty
+
     def filtrar_activos(self) -> List[Dict]:
         """
         Filtra solo empleados activos.
@@ -112,13 +205,13 @@ class ImportadorNomina:
         Returns:
             Lista de empleados activos
         """
-        if not self.datos_nomina:
+        if not self._hay_datos():
             return []
         
-        df = pd.DataFrame(self.datos_nomina)
+        df = self.tabla
         
         if 'estado' in df.columns:
-            activos = df[df['estado'].str.contains('Activo', case=False, na=False)]
+            activos = df[contiene(df['estado'], 'Activo')]
             return activos.to_dict('records')
         
         return self.datos_nomina
@@ -130,21 +223,18 @@ class ImportadorNomina:
         Returns:
             Diccionario {sede: [empleados]}
         """
-        if not self.datos_nomina:
+        if not self._hay_datos():
             return {}
         
-        df = pd.DataFrame(self.datos_nomina)
+        df = self.tabla
         
         if 'sede' not in df.columns:
             return {}
         
-        resultado = {}
-        for sede in df['sede'].unique():
-            if pd.notna(sede):
-                empleados = df[df['sede'] == sede].to_dict('records')
-                resultado[sede] = empleados
-        
-        return resultado
+        return {
+            sede: empleados.to_dict('records')
+            for sede, empleados in df.groupby('sede', sort=False, observed=True)
+        }
     
     def obtener_costo_por_sede(self) -> Dict[str, float]:
         """
@@ -153,13 +243,13 @@ class ImportadorNomina:
         Returns:
             Diccionario {sede: costo_total}
         """
-        if not self.datos_nomina:
+        if not self._hay_datos():
             return {}
         
-        df = pd.DataFrame(self.datos_nomina)
+        df = self.tabla
         
         if 'sede' in df.columns and 'salario' in df.columns:
-            costos = df.groupby('sede')['salario'].sum().to_dict()
+            costos = df.groupby('sede', observed=True)['salario'].sum().to_dict()
             return costos
         
         return {}
@@ -171,13 +261,13 @@ class ImportadorNomina:
         Returns:
             Diccionario {cargo: costo_total}
         """
-        if not self.datos_nomina:
+        if not self._hay_datos():
             return {}
         
-        df = pd.DataFrame(self.datos_nomina)
+        df = self.tabla
         
         if 'cargo' in df.columns and 'salario' in df.columns:
-            costos = df.groupby('cargo')['salario'].sum().to_dict()
+            costos = df.groupby('cargo', observed=True)['salario'].sum().to_dict()
             return costos
         
         return {}
@@ -189,10 +279,10 @@ class ImportadorNomina:
         Returns:
             Costo total
         """
-        if not self.datos_nomina:
+        if not self._hay_datos():
             return 0.0
         
-        df = pd.DataFrame(self.datos_nomina)
+        df = self.tabla
         
         if 'salario' in df.columns:
             return float(df['salario'].sum())
@@ -216,7 +306,7 @@ class ImportadorNomina:
             for adv in self.advertencias:
                 reporte.append(f"  {adv}")
         
-        if not self.errores and self.datos_nomina:
+        if not self.errores and self._hay_datos():
             reporte.append(f"\n[OK] Análisis por sede:")
             costos_sede = self.obtener_costo_por_sede()
             for sede, costo in sorted(costos_sede.items(), key=lambda x: x[1], reverse=True):
@@ -6,7 +6,13 @@ en lugar de generar datos aleatorios.
 """
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .almacen_incremental import AlmacenIncremental
+from .cache_importacion import CacheImportacion, cargar_con_cache
+from .detector_encabezados import DetectorEncabezados
+from .lector_excel import leer_excel
+from .validacion import Regla, ReporteValidacion, ValidadorColumnar
 
 
 class ImportadorProduccion:
@@ -37,18 +43,50 @@ class ImportadorProduccion:
         'entidad': 'EPS/Aseguradora/Cliente',
         'Valor Servicio': 'Valor facturado del servicio'
     }
-    
-    def __init__(self, ruta_archivo: str = None):
+
+    # Columnas que se leen como texto de los CSV (los códigos no son números)
+    COLUMNAS_TEXTO_CSV = ('codigo_servicio', 'servicio', 'Sede', 'entidad', 'No Factura')
+
+    # Llave de agregación de la importación por bloques
+    LLAVE_AGREGACION = ['codigo_servicio', 'sede', 'cliente']
+    # Agregación de cada combinación: el nombre del servicio es el primero leído
+    _AGREGACIONES = {'nombre_servicio': 'first', 'cantidad': 'sum', 'facturado': 'sum'}
+
+    # Reglas sobre las columnas ya normalizadas
+    VALIDADOR = ValidadorColumnar([
+        Regla.positivo('cantidad'),
+        Regla.positivo('valor_unitario'),
+        Regla.obligatorio('codigo_servicio'),
+        Regla.obligatorio('sede', "sede es obligatoria"),
+        Regla.obligatorio('cliente'),
+    ])
+
+    # Versión de la limpieza de datos: subirla invalida la caché de importación
+    VERSION_PROCESAMIENTO = 3
+
+    # Importación incremental: marca de agua y correcciones por número de factura
+    GRUPO_INCREMENTAL = ['numero_factura']
+
+    def __init__(self, ruta_archivo: str = None, cache: CacheImportacion = None,
+                 motor_excel: str = "auto", detector: DetectorEncabezados = None):
         """
         Inicializa el importador.
         
         Args:
             ruta_archivo: Ruta al archivo Excel/CSV con datos de producción
+            cache: Caché de importación opcional para los Excel ya leídos
+            motor_excel: Motor de lectura de Excel (ver lector_excel.MOTORES)
+            detector: Reconoce encabezados escritos distinto al MAPEO_COLUMNAS_REAL (opcional)
         """
         self.ruta_archivo = ruta_archivo
+        self.cache = cache
+        self.motor_excel = motor_excel
+        self.detector = detector
         self.datos_produccion = None
         self.errores = []
         self.advertencias = []
+        self.reporte_validacion = None
+        self.almacen = None  # AlmacenIncremental de la última cargar_incremental
     
     def cargar_desde_excel(self, ruta_archivo: str, hoja: str = None) -> bool:
         """
@@ -62,12 +100,12 @@ class ImportadorProduccion:
             True si la carga fue exitosa, False en caso contrario
         """
         try:
-            if hoja:
-                df = pd.read_excel(ruta_archivo, sheet_name=hoja)
-            else:
-                df = pd.read_excel(ruta_archivo)
-            
-            return self._procesar_dataframe(df, ruta_archivo)
+            df, desde_cache = self._leer_preparado(ruta_archivo, hoja)
+            if df is None:
+                return False
+            if desde_cache:
+                self.advertencias.append(f"Leído de la caché de importación ({ruta_archivo} sin cambios)")
+            return self._registrar(df)
         
         except FileNotFoundError:
             self.errores.append(f"Archivo no encontrado: {ruta_archivo}")
@@ -75,6 +113,115 @@ class ImportadorProduccion:
         except Exception as e:
             self.errores.append(f"Error al leer Excel: {e}")
             return False
+
+    def cargar_incremental(self, ruta_archivo: str, ruta_almacen, hoja: str = None) -> bool:
+        """
+        Incorpora un export de producción (Excel o CSV) al almacén local.
+
+        Solo se agregan las filas con No Factura posterior a la marca de agua
+        del almacén; las facturas anteriores que cambiaron (anuladas,
+        corregidas) reemplazan a las guardadas. Los agregados por
+        (codigo_servicio, sede, cliente) se recalculan solo para las llaves
+        afectadas y los registros quedan como en cargar_desde_csv_por_bloques.
+
+        Args:
+            ruta_archivo: Export a incorporar (ej: el del último mes)
+            ruta_almacen: Archivo del almacén (se crea en la primera carga)
+            hoja: Nombre de la hoja si es Excel (opcional)
+
+        Returns:
+            True si la carga fue exitosa
+        """
+        try:
+            if Path(ruta_archivo).suffix.lower() == '.csv':
+                encabezados = self._columnas_csv(ruta_archivo)
+                df = pd.read_csv(ruta_archivo, encoding='utf-8', dtype=self._texto_csv(encabezados))
+                df = self._preparar(df.rename(columns=encabezados), ruta_archivo)
+            else:
+                df, _ = self._leer_preparado(ruta_archivo, hoja)
+        except FileNotFoundError:
+            self.errores.append(f"Archivo no encontrado: {ruta_archivo}")
+            return False
+        except Exception as e:
+            self.errores.append(f"Error al leer {ruta_archivo}: {e}")
+            return False
+        if df is None:
+            return False
+        if 'numero_factura' not in df.columns:
+            self.errores.append("La importación incremental requiere la columna No Factura")
+            return False
+
+        df = df.assign(numero_factura=df['numero_factura'].astype(str),
+                       facturado=df['cantidad'] * df['valor_unitario'])
+        df['orden_factura'] = _orden_factura(df['numero_factura'])
+        if 'nombre_servicio' not in df.columns:
+            df['nombre_servicio'] = df['codigo_servicio']
+        self.almacen = AlmacenIncremental(ruta_almacen, 'orden_factura', self.GRUPO_INCREMENTAL,
+                                          self.LLAVE_AGREGACION, self._AGREGACIONES)
+        resultado = self.almacen.aplicar(df)
+
+        agregado = self.almacen.agregados
+        agregado = agregado.assign(valor_unitario=agregado['facturado'] / agregado['cantidad'])
+        self.datos_produccion = agregado.drop(columns='facturado').to_dict('records')
+
+        self.advertencias.append(f"Importación incremental de {ruta_archivo}:")
+        self.advertencias.append(f"  - Filas nuevas: {resultado['nuevas']}")
+        self.advertencias.append(f"  - Facturas corregidas: {resultado['grupos_corregidos']}")
+        self.advertencias.append(f"  - Agregados recalculados: {resultado['agregados_recalculados']}")
+        self.advertencias.append(f"  - Combinaciones servicio/sede/cliente: {len(agregado)}")
+        return True
+
+    def _leer_preparado(self, ruta_archivo: str, hoja: str = None):
+        """DataFrame preparado del archivo (desde la caché si la hay) y si vino de ella"""
+        encabezados = self._resolver_encabezados(ruta_archivo, hoja)
+        return cargar_con_cache(
+            self.cache, ruta_archivo, self._variante_cache(hoja, encabezados),
+            lambda: self._preparar(self._leer_excel(ruta_archivo, hoja, encabezados), ruta_archivo),
+            # El reporte de validación viaja con la entrada: una corrida desde la caché reporta lo mismo
+            metadatos=lambda: {'validacion': self.reporte_validacion.como_dict()},
+            restaurar=self._restaurar_validacion
+        )
+
+    def _restaurar_validacion(self, metadatos: Dict[str, Any]):
+        self.reporte_validacion = ReporteValidacion.desde_dict(
+            metadatos['validacion'], max_ejemplos=self.VALIDADOR.max_ejemplos)
+
+    def _resolver_encabezados(self, ruta_archivo: str, hoja: str = None,
+                              separador: str = ',') -> Optional[Dict[str, str]]:
+        """{encabezado del archivo: clave del MAPEO_COLUMNAS_REAL} según el detector (None sin detector)"""
+        if self.detector is None:
+            return None
+        encabezados, _ = self.detector.resolver_archivo(
+            'produccion', ruta_archivo, list(self.MAPEO_COLUMNAS_REAL) + ['cantidad'], hoja, separador)
+        descripcion = self.detector.descripcion_pendiente()
+        if descripcion:
+            self.advertencias.append(f"{descripcion} ({ruta_archivo})")
+        return encabezados
+
+    def _columnas_csv(self, ruta_archivo: str, separador: str = ',') -> Dict[str, str]:
+        """Columnas del CSV que se leen, {encabezado del archivo: clave del mapeo}"""
+        encabezados = self._resolver_encabezados(ruta_archivo, separador=separador)
+        if encabezados:
+            return encabezados
+        return {col: col for col in list(self.MAPEO_COLUMNAS_REAL) + ['cantidad']}
+
+    def _texto_csv(self, columnas: Dict[str, str]) -> Dict[str, type]:
+        """dtype de read_csv para las columnas de COLUMNAS_TEXTO_CSV, con su nombre en el archivo"""
+        return {original: str for original, col in columnas.items() if col in self.COLUMNAS_TEXTO_CSV}
+
+    def _leer_excel(self, ruta_archivo: str, hoja: str = None,
+                    encabezados: Dict[str, str] = None) -> pd.DataFrame:
+        """Lee solo las columnas del mapeo (o las resueltas por el detector) con el motor configurado"""
+        if encabezados:
+            df = leer_excel(ruta_archivo, hoja, columnas=list(encabezados), motor=self.motor_excel)
+            return df.rename(columns=encabezados)
+        return leer_excel(ruta_archivo, hoja, columnas=list(self.MAPEO_COLUMNAS_REAL) + ['cantidad'],
+                          motor=self.motor_excel)
+
+    def _variante_cache(self, hoja: str = None, encabezados: Dict[str, str] = None) -> str:
+        """Identifica el procesamiento en la caché: cambia si cambia el mapeo o la limpieza"""
+        variante = f"{type(self).__name__}|{self.VERSION_PROCESAMIENTO}|{self.motor_excel}|{hoja}|{self.MAPEO_COLUMNAS_REAL}"
+        return f"{variante}|{encabezados}" if encabezados else variante
     
     def cargar_desde_csv(self, ruta_archivo: str, separador: str = ',') -> bool:
         """
@@ -88,7 +235,10 @@ class ImportadorProduccion:
             True si la carga fue exitosa, False en caso contrario
         """
         try:
+            encabezados = self._resolver_encabezados(ruta_archivo, separador=separador)
             df = pd.read_csv(ruta_archivo, sep=separador, encoding='utf-8')
+            if encabezados:
+                df = df.rename(columns=encabezados)
             return self._procesar_dataframe(df, ruta_archivo)
         
         except FileNotFoundError:
@@ -97,24 +247,127 @@ class ImportadorProduccion:
         except Exception as e:
             self.errores.append(f"Error al leer CSV: {e}")
             return False
-    
-    def _procesar_dataframe(self, df: pd.DataFrame, origen: str) -> bool:
+
+    def cargar_desde_csv_por_bloques(self, ruta_archivo: str, separador: str = ',',
+                                     tamano_bloque: int = 100_000) -> bool:
         """
-        Procesa y valida el DataFrame cargado.
-        
+        Carga un CSV de producción por bloques, agregándolo a medida que se lee.
+
+        Cada bloque de `tamano_bloque` filas se valida y se agrega por
+        (codigo_servicio, sede, cliente) y mes de la Fecha Cita si la hay; solo se conservan los agregados
+        acumulados, de modo que la memoria no crece con el tamaño del archivo
+        (exports de varios GB con una fila por cita). Los registros resultantes
+        tienen la cantidad total y el valor unitario promedio ponderado de cada
+        combinación.
+
         Args:
-            df: DataFrame con datos de producción
+            ruta_archivo: Ruta al archivo CSV
+            separador: Separador de columnas (por defecto ',')
+            tamano_bloque: Filas leídas por bloque
+
+        Returns:
+            True si la carga fue exitosa, False en caso contrario
+        """
+        try:
+            columnas = self._columnas_csv(ruta_archivo, separador)
+            with pd.read_csv(ruta_archivo, sep=separador, encoding='utf-8', chunksize=tamano_bloque,
+                             usecols=lambda col: col in columnas,
+                             dtype=self._texto_csv(columnas)) as lector:
+                return self._procesar_bloques((bloque.rename(columns=columnas) for bloque in lector),
+                                              ruta_archivo)
+
+        except FileNotFoundError:
+            self.errores.append(f"Archivo no encontrado: {ruta_archivo}")
+            return False
+        except Exception as e:
+            self.errores.append(f"Error al leer CSV: {e}")
+            return False
+
+    def _procesar_bloques(self, bloques: Iterable[pd.DataFrame], origen: str) -> bool:
+        """
+        Valida y agrega bloques de datos de producción.
+
+        Args:
+            bloques: DataFrames con las columnas del archivo, en orden
             origen: Nombre del archivo de origen
-            
+
         Returns:
             True si el procesamiento fue exitoso
         """
-        # Validar columnas requeridas
+        agregado = None
+        total_registros = 0
+        self.reporte_validacion = reporte = self.VALIDADOR.nuevo_reporte()
+
+        for bloque in bloques:
+            if total_registros == 0 and not self._validar_columnas(bloque.columns, origen):
+                return False
+            total_registros += len(bloque)
+            bloque = self._normalizar_columnas(bloque)
+
+            self.VALIDADOR.validar(bloque, reporte)
+            if not reporte.valido:
+                # La importación ya falló: se siguen contando errores, no se agrega
+                continue
+
+            parcial = self._agregar_bloque(bloque)
+            if agregado is not None:
+                parcial = pd.concat([agregado, parcial]).groupby(
+                    level=parcial.index.names, sort=False, dropna=False).agg(self._AGREGACIONES)
+            agregado = parcial
+
+        if total_registros == 0:
+            self.errores.append(f"El archivo {origen} no contiene datos")
+            return False
+
+        if not reporte.valido:
+            self.errores.extend(reporte.mensajes())
+            return False
+
+        agregado = agregado.reset_index()
+        agregado['valor_unitario'] = agregado['facturado'] / agregado['cantidad']
+        self.datos_produccion = agregado.drop(columns='facturado').to_dict('records')
+
+        self.advertencias.append(f"Datos cargados exitosamente (por bloques):")
+        self.advertencias.append(f"  - Total registros: {total_registros}")
+        self.advertencias.append(f"  - Combinaciones servicio/sede/cliente: {len(agregado)}")
+        self.advertencias.append(f"  - Sedes: {agregado['sede'].nunique()}")
+        self.advertencias.append(f"  - Clientes/EPS: {agregado['cliente'].nunique()}")
+        self.advertencias.append(f"  - Servicios diferentes: {agregado['codigo_servicio'].nunique()}")
+
+        return True
+
+    def _agregar_bloque(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Totales de un bloque ya validado por (codigo_servicio, sede, cliente) y periodo si lo hay"""
+        df = df.assign(facturado=df['cantidad'] * df['valor_unitario'])
+        if 'nombre_servicio' not in df.columns:
+            df['nombre_servicio'] = df['codigo_servicio']
+        llave = self.LLAVE_AGREGACION + (['periodo'] if 'periodo' in df.columns else [])
+        return df.groupby(llave, sort=False, dropna=False).agg(self._AGREGACIONES)
+
+    def _normalizar_columnas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Renombra las columnas del sistema real a las estándar (MAPEO_COLUMNAS_REAL).
+
+        El export real tiene una fila por cita y no trae columna de cantidad:
+        en ese caso cada fila cuenta como 1. Con Fecha Cita se agrega el
+        periodo AAAA-MM de cada fila (nulo si la fecha no es válida).
+        """
+        df = df.rename(columns=self.MAPEO_COLUMNAS_REAL)
+        if 'cantidad' not in df.columns:
+            df['cantidad'] = 1
+        if 'fecha' in df.columns:
+            df['periodo'] = _periodos(df['fecha'])
+        for col in ('cantidad', 'valor_unitario'):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        return df
+
+    def _validar_columnas(self, columnas, origen: str) -> bool:
+        """Verifica que estén las columnas requeridas"""
         columnas_faltantes = []
         for col_requerida in self.COLUMNAS_REQUERIDAS.keys():
-            if col_requerida not in df.columns:
+            if col_requerida not in columnas:
                 columnas_faltantes.append(col_requerida)
-        
+
         if columnas_faltantes:
             self.errores.append(
                 f"Columnas faltantes en {origen}: {', '.join(columnas_faltantes)}"
@@ -123,69 +376,61 @@ class ImportadorProduccion:
                 f"Columnas requeridas: {', '.join(self.COLUMNAS_REQUERIDAS.keys())}"
             )
             return False
-        
+        return True
+
+    def _procesar_dataframe(self, df: pd.DataFrame, origen: str) -> bool:
+        """
+        Procesa y valida el DataFrame cargado.
+
+        Args:
+            df: DataFrame con datos de producción
+            origen: Nombre del archivo de origen
+
+        Returns:
+            True si el procesamiento fue exitoso
+        """
+        df = self._preparar(df, origen)
+        if df is None:
+            return False
+        return self._registrar(df)
+
+    def _preparar(self, df: pd.DataFrame, origen: str) -> Optional[pd.DataFrame]:
+        """Valida y normaliza el DataFrame leído (None si no es válido)"""
+        # Validar columnas requeridas
+        if not self._validar_columnas(df.columns, origen):
+            return None
+
         # Validar datos
         if len(df) == 0:
             self.errores.append(f"El archivo {origen} no contiene datos")
-            return False
-        
-        # Validar tipos de datos
-        errores_validacion = []
-        
-        for idx, row in df.iterrows():
-            # Validar cantidad
-            if pd.isna(row['cantidad']) or row['cantidad'] <= 0:
-                errores_validacion.append(
-                    f"Fila {idx+2}: cantidad debe ser mayor a 0"
-                )
-            
-            # Validar valor_unitario
-            if pd.isna(row['valor_unitario']) or row['valor_unitario'] <= 0:
-                errores_validacion.append(
-                    f"Fila {idx+2}: valor_unitario debe ser mayor a 0"
-                )
-            
-            # Validar campos obligatorios
-            if pd.isna(row['codigo_servicio']) or str(row['codigo_servicio']).strip() == '':
-                errores_validacion.append(
-                    f"Fila {idx+2}: codigo_servicio es obligatorio"
-                )
-            
-            if pd.isna(row['sede']) or str(row['sede']).strip() == '':
-                errores_validacion.append(
-                    f"Fila {idx+2}: sede es obligatoria"
-                )
-            
-            if pd.isna(row['cliente']) or str(row['cliente']).strip() == '':
-                errores_validacion.append(
-                    f"Fila {idx+2}: cliente es obligatorio"
-                )
-        
-        if errores_validacion:
-            self.errores.extend(errores_validacion[:10])  # Mostrar solo primeros 10
-            if len(errores_validacion) > 10:
-                self.errores.append(
-                    f"... y {len(errores_validacion) - 10} errores más"
-                )
-            return False
-        
+            return None
+
+        df = self._normalizar_columnas(df)
+        self.reporte_validacion = self.VALIDADOR.validar(df)
+        if not self.reporte_validacion.valido:
+            self.errores.extend(self.reporte_validacion.mensajes())
+            return None
+        return df
+
+    def _registrar(self, df: pd.DataFrame) -> bool:
+        """Guarda el DataFrame ya validado y genera las estadísticas"""
         # Guardar datos procesados
         self.datos_produccion = df.to_dict('records')
-        
+
         # Generar advertencias informativas
         total_registros = len(df)
         sedes_unicas = df['sede'].nunique()
         clientes_unicos = df['cliente'].nunique()
         servicios_unicos = df['codigo_servicio'].nunique()
-        
+
         self.advertencias.append(f"Datos cargados exitosamente:")
         self.advertencias.append(f"  - Total registros: {total_registros}")
         self.advertencias.append(f"  - Sedes: {sedes_unicas}")
         self.advertencias.append(f"  - Clientes/EPS: {clientes_unicos}")
         self.advertencias.append(f"  - Servicios diferentes: {servicios_unicos}")
-        
+
         return True
-    
+
     def obtener_datos_produccion(self) -> List[Dict[str, Any]]:
         """
         Obtiene los datos de producción procesados.
@@ -193,22 +438,50 @@ class ImportadorProduccion:
         Returns:
             Lista de diccionarios con datos de producción
         """
+        return list(self.iterar_datos_produccion())
+
+    def iterar_datos_produccion(self) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los datos de producción procesados registro por registro.
+
+        A diferencia de obtener_datos_produccion, no construye la lista completa,
+        lo que permite escribir la hoja PRODUCCION en modo streaming.
+
+        Yields:
+            Diccionarios con datos de producción
+        """
         if not self.datos_produccion:
-            return []
-        
-        return [
-            {
+            return
+
+        for row in self.datos_produccion:
+            periodo = row.get('periodo')
+            yield {
                 'codigo': str(row['codigo_servicio']),
                 'servicio': row.get('nombre_servicio', row['codigo_servicio']),
                 'sede': str(row['sede']),
                 'aseguradora': str(row['cliente']),
                 'cantidad': int(row['cantidad']),
                 'valor_unitario': float(row['valor_unitario']),
-                'categoria': row.get('categoria', '')
+                'categoria': row.get('categoria', ''),
+                'periodo': periodo if isinstance(periodo, str) else None,  # Mes de la Fecha Cita
             }
-            for row in self.datos_produccion
-        ]
     
+    def guardar_en_almacen(self, almacen, periodo: str = None) -> int:
+        """
+        Guarda los datos cargados en el almacén SQLite.
+
+        Se reemplazan los meses de la Fecha Cita de los registros; los que no
+        tienen fecha van a `periodo`.
+
+        Args:
+            almacen: AlmacenSQL de destino
+            periodo: Periodo AAAA-MM de los registros sin fecha (obligatorio si hay alguno)
+
+        Returns:
+            Filas guardadas
+        """
+        return almacen.guardar_produccion(self.iterar_datos_produccion(), periodo)
+
     def generar_plantilla_excel(self, ruta_salida: str):
         """
         Genera un archivo Excel plantilla con las columnas requeridas.
@@ -301,6 +574,23 @@ class ImportadorProduccion:
         return "\n".join(reporte)
 
 
+def _periodos(fechas: pd.Series) -> pd.Series:
+    """Periodo AAAA-MM de cada Fecha Cita (textos dd/mm/aaaa o fechas de Excel; inválidas: nulo)"""
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        textos = fechas.astype(object)
+        # ISO (aaaa-mm-dd, como los CSV exportados) primero; el resto, día primero
+        fechas = pd.to_datetime(textos, format='ISO8601', errors='coerce')
+        faltantes = fechas.isna() & textos.notna()
+        if faltantes.any():
+            fechas[faltantes] = pd.to_datetime(textos[faltantes], dayfirst=True, errors='coerce')
+    return fechas.dt.strftime('%Y-%m')
+
+
+def _orden_factura(numeros: pd.Series) -> pd.Series:
+    """Consecutivo numérico de cada No Factura (ej: 'FE10' -> 10; nulo si no tiene dígitos)"""
+    return pd.to_numeric(numeros.str.extract(r'(\d+)\D*$', expand=False)).astype('Int64')
+
+
 def ejemplo_uso():
     """Ejemplo de cómo usar el importador"""
     print("\n" + "="*60)
@@ -0,0 +1,90 @@
+"""
+Registro de la disposición (layout) de las hojas de un libro.
+
+Cada hoja publica aquí sus tablas al escribirlas (EscritorHoja.tabla): hoja,
+rango real y encabezados. Las hojas que se escriben después construyen sus
+fórmulas con esos rangos exactos en lugar de suponer filas fijas
+(ej: $C$5:$C$500), de modo que las referencias crecen con los datos reales.
+"""
+import re
+from typing import Dict, List
+from weakref import WeakKeyDictionary
+
+from openpyxl.utils import get_column_letter, range_boundaries
+
+_LAYOUTS = WeakKeyDictionary()
+
+
+def _referencia_hoja(hoja: str) -> str:
+    """Nombre de hoja para una fórmula (entre comillas solo si hace falta)"""
+    if re.fullmatch(r"[A-Za-z_][\w.]*", hoja):
+        return hoja
+    return "'" + hoja.replace("'", "''") + "'"
+
+
+class TablaPublicada:
+    """Extensión real de una tabla escrita en el libro"""
+
+    def __init__(self, hoja: str, nombre: str, rango: str, encabezados: List[str]):
+        self.hoja = hoja
+        self.nombre = nombre
+        self.rango_tabla = rango
+        self.encabezados = [str(e) for e in encabezados]
+        self.min_col, fila_encabezado, self.max_col, self.ultima_fila = range_boundaries(rango)
+        self.primera_fila = fila_encabezado + 1
+
+    @property
+    def filas(self) -> int:
+        """Número de filas de datos (sin encabezado)"""
+        return self.ultima_fila - self.primera_fila + 1
+
+    def letra(self, encabezado: str) -> str:
+        """Letra de la columna con ese encabezado"""
+        try:
+            return get_column_letter(self.min_col + self.encabezados.index(encabezado))
+        except ValueError:
+            raise KeyError(f"La tabla {self.nombre} no tiene la columna '{encabezado}'") from None
+
+    def celda(self, encabezado: str, fila: int) -> str:
+        """Referencia absoluta a una celda de la columna (ej: HOJA!$D$12)"""
+        return f"{_referencia_hoja(self.hoja)}!${self.letra(encabezado)}${fila}"
+
+    def rango(self, encabezado: str) -> str:
+        """Rango absoluto de los datos de una columna (ej: HOJA!$C$5:$C$64)"""
+        col = self.letra(encabezado)
+        return f"{_referencia_hoja(self.hoja)}!${col}${self.primera_fila}:${col}${self.ultima_fila}"
+
+
+class LayoutLibro:
+    """Tablas publicadas por las hojas de un libro, en orden de escritura"""
+
+    def __init__(self):
+        self.tablas: Dict[str, TablaPublicada] = {}
+
+    def publicar(self, hoja: str, nombre: str, rango: str, encabezados: List[str]) -> TablaPublicada:
+        tabla = TablaPublicada(hoja, nombre, rango, encabezados)
+        self.tablas[nombre] = tabla
+        return tabla
+
+    def tabla(self, nombre: str) -> TablaPublicada:
+        try:
+            return self.tablas[nombre]
+        except KeyError:
+            raise KeyError(
+                f"La tabla {nombre} no se ha publicado: la hoja que la contiene debe escribirse antes"
+            ) from None
+
+    def hojas(self) -> Dict[str, List[str]]:
+        """Tablas agrupadas por hoja"""
+        resumen: Dict[str, List[str]] = {}
+        for tabla in self.tablas.values():
+            resumen.setdefault(tabla.hoja, []).append(tabla.nombre)
+        return resumen
+
+
+def layout_libro(wb) -> LayoutLibro:
+    """Registro de layout del libro (se crea la primera vez que se pide)"""
+    layout = _LAYOUTS.get(wb)
+    if layout is None:
+        layout = _LAYOUTS[wb] = LayoutLibro()
+    return layout
@@ -0,0 +1,294 @@
+"""
+Lectura rápida de hojas Excel para los importadores.
+
+pd.read_excel con el motor openpyxl por defecto convierte celda por celda y
+lee todas las columnas. Aquí hay varios motores intercambiables que leen solo
+las columnas pedidas:
+
+- calamine: lector en Rust (paquete python-calamine, vía pandas), el más
+  rápido cuando está instalado.
+- lxml: recorre el XML de la hoja con lxml.iterparse y convierte los tipos
+  por columna; descarta las celdas de columnas no pedidas sin convertirlas.
+- openpyxl: openpyxl en modo read-only recorriendo valores (values_only),
+  sin objetos de celda; siempre disponible.
+- pandas: pd.read_excel con su motor por defecto (referencia y último recurso).
+
+Con motor="auto" se usa el primero disponible de MOTORES_AUTO; si uno falla
+se intenta con el siguiente.
+"""
+import importlib.util
+import zipfile
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Orden de preferencia para motor="auto"
+MOTORES_AUTO = ["calamine", "lxml", "openpyxl", "pandas"]
+
+
+def _seleccion(columnas: Optional[Iterable[str]]):
+    if columnas is None:
+        return None
+    columnas = set(columnas)
+    return lambda columna: columna in columnas
+
+
+def leer_calamine(ruta: str, hoja=None, columnas: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """pd.read_excel con engine="calamine" (requiere python-calamine)"""
+    if importlib.util.find_spec("python_calamine") is None:
+        raise ImportError("El motor calamine requiere python-calamine: pip install python-calamine")
+    return pd.read_excel(ruta, sheet_name=hoja if hoja else 0, engine="calamine",
+                         usecols=_seleccion(columnas))
+
+
+def leer_openpyxl(ruta: str, hoja=None, columnas: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Recorre la hoja con openpyxl read-only (values_only) y arma las columnas.
+
+    La primera fila es el encabezado, como en pd.read_excel; se omiten las
+    filas vacías.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(ruta, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[hoja] if hoja else wb.worksheets[0]
+        ws.reset_dimensions()  # Algunos exportadores escriben una dimensión incorrecta
+        filas = ws.iter_rows(values_only=True)
+        encabezado = next(filas, ())
+        incluir = _seleccion(columnas)
+        posiciones = [i for i, nombre in enumerate(encabezado)
+                      if nombre is not None and (incluir is None or incluir(nombre))]
+        valores: List[list] = [[] for _ in posiciones]
+        for fila in filas:
+            if not any(v is not None for v in fila):
+                continue
+            ancho = len(fila)
+            for lista, i in zip(valores, posiciones):
+                lista.append(fila[i] if i < ancho else None)
+    finally:
+        wb.close()
+
+    df = pd.DataFrame({encabezado[i]: lista for i, lista in zip(posiciones, valores)})
+    return df.infer_objects()
+
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _letra_columna(celda, posicion: int) -> str:
+    """Letra de la columna de un <c> (por posición si no trae atributo r)"""
+    referencia = celda.get("r")
+    if referencia is None:
+        from openpyxl.utils import get_column_letter
+        return get_column_letter(posicion + 1)
+    return referencia.rstrip("0123456789")
+
+
+_V, _IS = _NS + "v", _NS + "is"
+
+
+def _texto_celda(celda):
+    """Texto crudo de un <c>: el de <v> o el del texto en línea (None si está vacía)"""
+    for hijo in celda:
+        if hijo.tag == _V:
+            return hijo.text or ""
+        if hijo.tag == _IS:
+            return "".join(hijo.itertext())
+    return None
+
+
+def _metadatos_libro(ruta: str, hoja=None):
+    """
+    Ruta del XML de la hoja, textos compartidos, estilos de fecha y época.
+
+    Usa el lector de openpyxl sin abrir las hojas (en modo read-only, pedir
+    una hoja recorre todo su XML si el archivo no declara sus dimensiones).
+    """
+    from openpyxl.reader.excel import ExcelReader
+    from openpyxl.styles.stylesheet import apply_stylesheet
+
+    lector = ExcelReader(ruta, read_only=True, data_only=True, keep_links=False)
+    try:
+        lector.read_manifest()
+        lector.read_strings()
+        lector.read_workbook()
+        apply_stylesheet(lector.archive, lector.wb)
+        hojas = [(h.name, rel.target) for h, rel in lector.parser.find_sheets()]
+    finally:
+        lector.archive.close()
+    if hoja:
+        hojas = [h for h in hojas if h[0] == hoja]
+        if not hojas:
+            raise KeyError(f"Worksheet {hoja} does not exist.")
+    return hojas[0][1], lector.wb.shared_strings, lector.wb._date_formats, lector.wb.epoch
+
+
+def _convertir_columna(textos, tipos, estilos, compartidos, fechas, epoca) -> pd.Series:
+    """Convierte los textos crudos de una columna según el tipo y el estilo de cada celda"""
+    textos = np.array(textos, dtype=object)
+    tipos = np.array(tipos, dtype=object)
+    valores = textos.copy()
+
+    numericas = (tipos == None) | (tipos == "n")  # noqa: E711 (comparación elemento a elemento)
+    if numericas.any():
+        numeros = pd.to_numeric(pd.Series(textos[numericas]), errors="coerce").to_numpy()
+        es_fecha = np.fromiter((int(e) in fechas for e in np.array(estilos, dtype=object)[numericas]),
+                               dtype=bool, count=int(numericas.sum()))
+        convertidos = np.empty(len(numeros), dtype=object)
+        enteros = ~es_fecha & (numeros == np.floor(numeros))
+        convertidos[enteros] = numeros[enteros].astype(np.int64)
+        decimales = ~es_fecha & ~enteros
+        convertidos[decimales] = numeros[decimales]
+        if es_fecha.any():
+            convertidos[es_fecha] = list(pd.to_datetime(numeros[es_fecha], unit="D", origin=epoca))
+        valores[numericas] = convertidos
+
+    compartidas = tipos == "s"
+    if compartidas.any():
+        valores[compartidas] = [compartidos[int(i)] for i in textos[compartidas]]
+    booleanas = tipos == "b"
+    if booleanas.any():
+        valores[booleanas] = textos[booleanas] == "1"
+    fechas_iso = tipos == "d"
+    if fechas_iso.any():
+        valores[fechas_iso] = list(pd.to_datetime(textos[fechas_iso]))
+    valores[tipos == "e"] = None  # Errores de fórmula (#N/A, #DIV/0!, ...)
+    return pd.Series(valores, dtype=object)
+
+
+def leer_lxml(ruta: str, hoja=None, columnas: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Recorre el XML de la hoja con lxml.iterparse, fila por fila.
+
+    openpyxl solo se usa para los metadatos del libro (hojas, textos
+    compartidos, estilos de fecha). Las celdas de columnas no pedidas se
+    descartan sin convertirlas y la conversión de tipos se hace por columna.
+    """
+    from lxml import etree
+
+    ruta_hoja, compartidos, fechas, epoca = _metadatos_libro(ruta, hoja)
+
+    incluir = _seleccion(columnas)
+    encabezados: Dict[str, str] = {}
+    datos: Dict[str, tuple] = {}
+    filas: List[int] = []  # Filas de datos con algún valor (en orden)
+    with zipfile.ZipFile(ruta) as archivo, archivo.open(ruta_hoja) as xml:
+        for numero, (_, fila) in enumerate(etree.iterparse(xml, events=("end",), tag=_NS + "row")):
+            if numero == 0:
+                for posicion, celda in enumerate(fila):
+                    nombre = _texto_celda(celda)
+                    if celda.get("t") == "s" and nombre is not None:
+                        nombre = compartidos[int(nombre)]
+                    if nombre is not None and (incluir is None or incluir(nombre)):
+                        encabezados[_letra_columna(celda, posicion)] = nombre
+                datos = {letra: ([], [], [], []) for letra in encabezados}
+            else:
+                con_valor = False
+                for posicion, celda in enumerate(fila):
+                    if not len(celda):
+                        continue  # Celda sin valor (solo formato)
+                    con_valor = True
+                    columna = datos.get(_letra_columna(celda, posicion))
+                    if columna is None:
+                        continue
+                    texto = _texto_celda(celda)
+                    if texto is not None:
+                        columna[0].append(numero)
+                        columna[1].append(texto)
+                        columna[2].append(celda.get("t"))
+                        columna[3].append(celda.get("s", 0))
+                if con_valor:
+                    filas.append(numero)
+            # Libera lo ya procesado: la memoria no crece con el tamaño de la hoja
+            fila.clear()
+            while fila.getprevious() is not None:
+                del fila.getparent()[0]
+
+    indice = pd.Index(filas)
+    df = pd.DataFrame(index=indice)
+    for letra, nombre in encabezados.items():
+        posiciones, textos, tipos, estilos = datos[letra]
+        serie = _convertir_columna(textos, tipos, estilos, compartidos, fechas, epoca)
+        serie.index = posiciones
+        df[nombre] = serie.reindex(indice)
+    return df.reset_index(drop=True).infer_objects()
+
+
+def leer_pandas(ruta: str, hoja=None, columnas: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """pd.read_excel con el motor por defecto"""
+    return pd.read_excel(ruta, sheet_name=hoja if hoja else 0, usecols=_seleccion(columnas))
+
+
+MOTORES: Dict[str, Callable[..., pd.DataFrame]] = {
+    "calamine": leer_calamine,
+    "lxml": leer_lxml,
+    "openpyxl": leer_openpyxl,
+    "pandas": leer_pandas,
+}
+
+
+# Paquete opcional que necesita cada motor
+_DEPENDENCIAS = {"calamine": "python_calamine", "lxml": "lxml"}
+
+
+def motores_disponibles() -> List[str]:
+    """Motores que se pueden usar en este entorno, en orden de preferencia"""
+    return [m for m in MOTORES_AUTO
+            if m not in _DEPENDENCIAS or importlib.util.find_spec(_DEPENDENCIAS[m]) is not None]
+
+
+def leer_encabezado(ruta: str, hoja=None, separador: str = ",") -> list:
+    """
+    Primera fila de un Excel o CSV, sin leer el resto del archivo.
+
+    Args:
+        ruta: Archivo .xlsx o .csv
+        hoja: Nombre de la hoja si es Excel (por defecto la primera)
+        separador: Separador de columnas si es CSV
+
+    Returns:
+        Encabezados en el orden del archivo (las celdas vacías se omiten)
+    """
+    if str(ruta).lower().endswith((".csv", ".txt")):
+        return list(pd.read_csv(ruta, sep=separador, encoding="utf-8", nrows=0).columns)
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(ruta, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[hoja] if hoja else wb.worksheets[0]
+        ws.reset_dimensions()
+        encabezado = next(ws.iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    return [nombre for nombre in encabezado if nombre is not None]
+
+
+def leer_excel(ruta: str, hoja=None, columnas: Optional[Iterable[str]] = None,
+               motor: str = "auto") -> pd.DataFrame:
+    """
+    Lee una hoja de Excel con el motor indicado.
+
+    Args:
+        ruta: Archivo .xlsx
+        hoja: Nombre de la hoja (por defecto la primera)
+        columnas: Encabezados a leer; las demás columnas se descartan al leer
+        motor: "auto" o una clave de MOTORES
+
+    Returns:
+        DataFrame con las columnas encontradas (las pedidas que no existan se omiten)
+    """
+    if motor != "auto":
+        return MOTORES[motor](ruta, hoja, columnas)
+
+    ultimo_error = None
+    for nombre in motores_disponibles():
+        try:
+            return MOTORES[nombre](ruta, hoja, columnas)
+        except (FileNotFoundError, KeyError):
+            raise  # Archivo u hoja inexistente: ningún otro motor lo va a encontrar
+        except Exception as e:
+            ultimo_error = e
+    raise ultimo_error
@@ -0,0 +1,193 @@
+"""
+Generación de modelos TDABC para varias empresas.
+
+Cada empresa se describe con un archivo como ejemplos/clinica_dental.json
+(formato de AdaptadorEmpresa). Su configuración se arma en memoria
+(ConfigSnapshot.desde_empresa) y se pasa a ModeloTDABC: no se escribe en
+src/config/ ni se cambia la configuración en uso del proceso, así que todas
+las empresas se generan en un mismo proceso.
+
+La generación con openpyxl usa un solo núcleo. generar_lote reparte las
+empresas en un ProcessPoolExecutor (a cada proceso se le pasa la ruta del
+JSON, no la configuración) y deja un manifiesto con el tiempo, las filas por
+hoja y el error de cada empresa. Cada .xlsx se escribe a un temporal y se
+renombra: nunca queda un archivo a medias.
+
+Uso:
+    >>> generar_empresas("clientes/", "salida/")
+    [PosixPath('salida/Modelo_TDABC_clinica_a.xlsx'), ...]
+    >>> generar_lote("clientes/", "salida/", procesos=4)["fallidas"]
+    0
+"""
+import contextlib
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Union
+
+from openpyxl import load_workbook
+
+from .cache_importacion import _escribir_atomico
+from .config import ConfigSnapshot
+from .modelo_tdabc import ModeloTDABC
+
+MANIFIESTO = "manifiesto_lote.json"
+
+
+def rutas_empresas(empresas: Union[str, Path, Iterable]) -> List[Path]:
+    """
+    Archivos de empresa a generar.
+
+    Args:
+        empresas: Directorio (se toman sus *.json), patrón glob o lista de rutas
+    """
+    if isinstance(empresas, (str, Path)):
+        if Path(empresas).is_dir():
+            return sorted(Path(empresas).glob("*.json"))
+        return [Path(ruta) for ruta in sorted(glob.glob(str(empresas)))]
+    return [Path(ruta) for ruta in empresas]
+
+
+def ruta_salida(ruta_empresa: Path, carpeta_salida) -> Path:
+    """Archivo .xlsx de una empresa (por el nombre de su JSON)"""
+    return Path(carpeta_salida) / f"Modelo_TDABC_{Path(ruta_empresa).stem}.xlsx"
+
+
+def generar_empresa(ruta_empresa, carpeta_salida, silencioso: bool = True, **opciones) -> Path:
+    """
+    Genera el modelo de una empresa con su configuración en memoria.
+
+    Args:
+        ruta_empresa: JSON de la empresa
+        carpeta_salida: Carpeta del .xlsx
+        silencioso: Omite los mensajes de progreso de generar_archivo
+        opciones: Argumentos de ModeloTDABC.generar_archivo (modo, streaming, ...)
+
+    Returns:
+        Ruta del archivo generado
+    """
+    snapshot = ConfigSnapshot.desde_empresa(ruta_empresa)
+    salida = ruta_salida(ruta_empresa, carpeta_salida)
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    mensajes = contextlib.redirect_stdout(io.StringIO()) if silencioso else contextlib.nullcontext()
+    with mensajes:
+        _escribir_atomico(salida, lambda temporal: ModeloTDABC(config=snapshot).generar_archivo(
+            temporal, **opciones))
+    return salida
+
+
+def filas_por_hoja(ruta) -> Dict[str, int]:
+    """Última fila de cada hoja de un .xlsx (sin cargar las celdas si el archivo trae sus dimensiones)"""
+    wb = load_workbook(ruta, read_only=True)
+    try:
+        filas = {}
+        for ws in wb.worksheets:
+            # Las hojas write-only no guardan sus dimensiones: se recorren sus filas
+            ws.calculate_dimension(force=True)
+            filas[ws.title] = ws.max_row or 0
+        return filas
+    finally:
+        wb.close()
+
+
+def generar_empresas(empresas, carpeta_salida, **opciones) -> List[Path]:
+    """
+    Genera en este proceso el modelo de cada empresa, una tras otra.
+
+    Args:
+        empresas: Directorio de JSON de empresas, patrón glob o lista de rutas
+        carpeta_salida: Carpeta de los .xlsx (Modelo_TDABC_<nombre del JSON>.xlsx)
+        opciones: Argumentos de generar_empresa / ModeloTDABC.generar_archivo
+
+    Returns:
+        Rutas de los archivos generados
+    """
+    generados = []
+    for ruta in rutas_empresas(empresas):
+        generados.append(generar_empresa(ruta, carpeta_salida, **opciones))
+        print(f"[OK] {ruta.name} -> {generados[-1]}")
+    return generados
+
+
+def procesar_empresa(ruta_empresa, carpeta_salida, opciones: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Genera una empresa y devuelve su entrada del manifiesto (un error no se propaga).
+
+    Returns:
+        {'empresa', 'archivo', 'segundos', 'filas': {hoja: filas}, 'error'}
+    """
+    ruta_empresa = Path(ruta_empresa)
+    entrada = {'empresa': ruta_empresa.name, 'archivo': None, 'segundos': 0.0, 'filas': {}, 'error': None}
+    inicio = time.perf_counter()
+    try:
+        salida = generar_empresa(ruta_empresa, carpeta_salida, **(opciones or {}))
+        entrada['segundos'] = round(time.perf_counter() - inicio, 3)
+        entrada['archivo'] = str(salida)
+        entrada['filas'] = filas_por_hoja(salida)
+    except Exception as e:
+        entrada['segundos'] = round(time.perf_counter() - inicio, 3)
+        entrada['error'] = f"{type(e).__name__}: {e}"
+    return entrada
+
+
+def generar_lote(empresas, carpeta_salida, procesos: int = None, **opciones) -> Dict[str, Any]:
+    """
+    Genera el modelo de cada empresa en procesos separados y escribe el manifiesto.
+
+    Args:
+        empresas: Directorio de JSON de empresas, patrón glob o lista de rutas
+        carpeta_salida: Carpeta de los .xlsx y de manifiesto_lote.json
+        procesos: Procesos del pool (por defecto uno por núcleo, sin pasar del
+                  número de empresas); con 1 se genera en este proceso
+        opciones: Argumentos de ModeloTDABC.generar_archivo (modo, streaming, ...)
+
+    Returns:
+        Manifiesto: {'inicio', 'procesos', 'segundos', 'exitosas', 'fallidas',
+        'empresas': [entrada de procesar_empresa por empresa, en orden]}
+    """
+    rutas = rutas_empresas(empresas)
+    carpeta_salida = Path(carpeta_salida)
+    carpeta_salida.mkdir(parents=True, exist_ok=True)
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(rutas) or 1))
+
+    inicio = time.perf_counter()
+    marca = datetime.now().isoformat(timespec='seconds')
+    if procesos == 1:
+        entradas = [procesar_empresa(ruta, carpeta_salida, opciones) for ruta in rutas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = [pool.submit(procesar_empresa, ruta, carpeta_salida, opciones) for ruta in rutas]
+            entradas = []
+            for ruta, futuro in zip(rutas, futuros):
+                try:
+                    entradas.append(futuro.result())
+                except Exception as e:  # El proceso murió (ej: sin memoria)
+                    entradas.append({'empresa': ruta.name, 'archivo': None, 'segundos': 0.0,
+                                     'filas': {}, 'error': f"{type(e).__name__}: {e}"})
+
+    fallidas = sum(1 for entrada in entradas if entrada['error'])
+    manifiesto = {
+        'inicio': marca,
+        'procesos': procesos,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'exitosas': len(entradas) - fallidas,
+        'fallidas': fallidas,
+        'empresas': entradas,
+    }
+
+    def escribir(temporal):
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=4, ensure_ascii=False)
+
+    _escribir_atomico(carpeta_salida / MANIFIESTO, escribir)
+    for entrada in entradas:
+        if entrada['error']:
+            print(f"[ERROR] {entrada['empresa']}: {entrada['error']}")
+        else:
+            print(f"[OK] {entrada['empresa']} -> {entrada['archivo']} ({entrada['segundos']:.2f}s)")
+    return manifiesto
@@ -3,10 +3,74 @@ Módulo de mapeo para cargar configuraciones externas
 Permite adaptar el sistema TDABC a diferentes empresas del sector salud
 """
 import json
+from operator import itemgetter
 from pathlib import Path
 import warnings
 
 
+class MapeoCompilado:
+    """
+    Mapeo de columnas resuelto una vez contra un encabezado.
+
+    Sabe qué columna (o posición) corresponde a cada llave estándar; aplicarlo
+    a un DataFrame es un solo select/rename y a filas es un itemgetter, sin
+    buscar columna por columna en cada fila.
+    """
+
+    def __init__(self, tipo_datos, mapeo, columnas):
+        """
+        Args:
+            tipo_datos: Tipo del mapeo (ej: 'nomina'), para los mensajes
+            mapeo: {llave_estandar: columna_original}
+            columnas: Encabezado de los datos (nombres de columna en orden)
+        """
+        columnas = list(columnas)
+        posiciones = {columna: i for i, columna in enumerate(columnas)}
+        self.tipo_datos = tipo_datos
+        self.llaves = list(mapeo)
+        self.resueltas = {llave: col for llave, col in mapeo.items() if col in posiciones}
+        self.faltantes = {llave: col for llave, col in mapeo.items() if col not in posiciones}
+        self._posiciones = [posiciones[col] for col in self.resueltas.values()]
+
+    def mensaje_faltantes(self):
+        """Descripción de las columnas no encontradas (None si todas se resolvieron)"""
+        if not self.faltantes:
+            return None
+        detalle = ", ".join(f"{llave} ('{col}')" for llave, col in self.faltantes.items())
+        return f"Columnas no encontradas para '{self.tipo_datos}': {detalle}"
+
+    def aplicar_dataframe(self, df):
+        """DataFrame con una columna por llave estándar (None en las no encontradas)"""
+        resultado = df[list(self.resueltas.values())]
+        resultado.columns = list(self.resueltas)
+        return resultado.reindex(columns=self.llaves)
+
+    def extractor(self, por_posicion=False):
+        """
+        Función fila → tupla con los valores de las columnas resueltas.
+
+        Args:
+            por_posicion: True para filas tupla/lista (en el orden del encabezado),
+                          False para filas diccionario
+        """
+        claves = self._posiciones if por_posicion else list(self.resueltas.values())
+        if not claves:
+            return lambda fila: ()
+        if len(claves) == 1:
+            obtener = itemgetter(claves[0])
+            return lambda fila: (obtener(fila),)
+        return itemgetter(*claves)
+
+    def aplicar_filas(self, filas, por_posicion=False):
+        """Lista de diccionarios con todas las llaves estándar (None en las no encontradas)"""
+        extraer = self.extractor(por_posicion)
+        resueltas = list(self.resueltas)
+        if not self.faltantes:
+            return [dict(zip(resueltas, extraer(fila))) for fila in filas]
+        base = dict.fromkeys(self.llaves)
+        return [{**base, **dict(zip(resueltas, extraer(fila)))} for fila in filas]
+
+
 class ConfigMapper:
     """Carga y gestiona configuraciones desde archivos JSON"""
     
@@ -38,6 +102,26 @@ class ConfigMapper:
         self.grupos_ocupacionales = self._cargar_json("grupos_ocupacionales.json")
         self.mapeo_columnas = self._cargar_json("mapeo_columnas.json")
         self._loaded = True
+
+    @classmethod
+    def en_memoria(cls, base=None, **configuracion):
+        """
+        Mapper con la configuración entregada, sin leer ni escribir archivos.
+
+        Args:
+            base: ConfigMapper del que se toma lo que no venga en `configuracion`
+            configuracion: Contenido de cada JSON por atributo (empresa, servicios,
+                           centros_costo, plan_contable, grupos_ocupacionales, mapeo_columnas)
+        """
+        mapper = cls()
+        for atributo in ("empresa", "servicios", "centros_costo", "plan_contable",
+                         "grupos_ocupacionales", "mapeo_columnas"):
+            valor = configuracion.get(atributo)
+            if valor is None and base is not None:
+                valor = getattr(base, atributo)
+            setattr(mapper, atributo, valor)
+        mapper._loaded = True
+        return mapper
         
     def _cargar_json(self, filename):
         """
@@ -75,39 +159,71 @@ class ConfigMapper:
             )
             return None
 
+    def compilar_mapeo(self, tipo_datos, columnas):
+        """
+        Resuelve el mapeo de un tipo de datos contra un encabezado.
+
+        Args:
+            tipo_datos (str): El tipo de datos ('nomina', 'contabilidad', 'produccion', 'servicios')
+            columnas: Nombres de columna de los datos, en orden
+
+        Returns:
+            MapeoCompilado, o None si no hay mapeo para el tipo de datos
+        """
+        if not self.mapeo_columnas or tipo_datos not in self.mapeo_columnas:
+            return None
+        return MapeoCompilado(tipo_datos, self.mapeo_columnas[tipo_datos], columnas)
+
     def aplicar_mapeo(self, datos_originales, tipo_datos):
         """
-        Convierte un diccionario de datos originales a un dataframe estándar interno (df_std)
+        Convierte datos originales a las llaves estándar internas
         basado en el mapeo de columnas configurado.
-        
+
+        El mapeo se resuelve una vez contra el encabezado (las columnas del
+        DataFrame o las llaves de las filas); las columnas que no se
+        encuentran se reportan con una sola advertencia y quedan en None.
+        Si las filas no tienen todas las mismas llaves, se resuelve una vez
+        por cada conjunto de llaves distinto.
+
         Args:
-            datos_originales (dict/list): Los datos recibidos (ej: una fila o lista de filas)
+            datos_originales (dict/list/DataFrame): Los datos recibidos (ej: una fila o lista de filas)
             tipo_datos (str): El tipo de datos ('nomina', 'contabilidad', 'produccion', 'servicios')
             
         Returns:
-            dict/list: Datos con las llaves estándar internas
+            dict/list/DataFrame: Datos con las llaves estándar internas
         """
-        if not self.mapeo_columnas or tipo_datos not in self.mapeo_columnas:
+        if isinstance(datos_originales, dict):
+            return self.aplicar_mapeo([datos_originales], tipo_datos)[0]
+
+        es_dataframe = hasattr(datos_originales, "columns")
+        if es_dataframe:
+            columnas = datos_originales.columns
+        else:
+            columnas = datos_originales[0].keys() if datos_originales else []
+        compilado = self.compilar_mapeo(tipo_datos, columnas)
+        if compilado is None:
             return datos_originales
-            
-        mapeo = self.mapeo_columnas[tipo_datos]
-        # Invertir mapeo para buscar por columna original
-        # mapeo_inv = {valor: llave_estandar for llave_estandar, valor in mapeo.items()}
-        
-        def procesar_fila(fila):
-            fila_std = {}
-            for llave_std, columna_original in mapeo.items():
-                if columna_original in fila:
-                    fila_std[llave_std] = fila[columna_original]
-                else:
-                    # Fallback si no encuentra la columna (warning preventivo)
-                    # print(f"⚠️ Columna '{columna_original}' no encontrada para '{llave_std}'")
-                    fila_std[llave_std] = None
-            return fila_std
+        uniformes = es_dataframe or all(fila.keys() == columnas for fila in datos_originales)
+        if not uniformes:
+            # Las faltantes son las que no aparecen en ninguna fila
+            compilado = self.compilar_mapeo(
+                tipo_datos, dict.fromkeys(llave for fila in datos_originales for llave in fila))
+        if compilado.faltantes and len(datos_originales):
+            warnings.warn(compilado.mensaje_faltantes(), UserWarning, stacklevel=2)
 
-        if isinstance(datos_originales, list):
-            return [procesar_fila(f) for f in datos_originales]
-        return procesar_fila(datos_originales)
+        if es_dataframe:
+            return compilado.aplicar_dataframe(datos_originales)
+        if uniformes:
+            return compilado.aplicar_filas(datos_originales)
+        # Filas con llaves distintas: un mapeo por cada conjunto de llaves
+        por_llaves = {}
+        resultado = []
+        for fila in datos_originales:
+            llaves = frozenset(fila)
+            if llaves not in por_llaves:
+                por_llaves[llaves] = self.compilar_mapeo(tipo_datos, fila.keys())
+            resultado.extend(por_llaves[llaves].aplicar_filas([fila]))
+        return resultado
 
     # ========== MÉTODOS DE ACCESO A COLUMNAS ==========
     
@@ -266,15 +382,18 @@ class ConfigMapper:
 _mapper_instance = None
 
 
-def get_mapper():
+def get_mapper(recargar=False):
     """
     Obtiene la instancia global del mapper (patrón singleton)
     
+    Args:
+        recargar: Crea una instancia nueva y vuelve a leer los JSON
+    
     Returns:
         ConfigMapper: Instancia del mapper
     """
     global _mapper_instance
-    if _mapper_instance is None:
+    if _mapper_instance is None or recargar:
         _mapper_instance = ConfigMapper()
         _mapper_instance.cargar_configuracion()
     return _mapper_instance
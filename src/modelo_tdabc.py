@@ -2,64 +2,154 @@
 Clase principal del Modelo TDABC
 """
 from openpyxl import Workbook
+from .config import ConfigSnapshot, config_en_uso, obtener
 from .data_initializer import DataInitializer
+from .ensamblador import TareaHoja, generar_hojas
+from .escritor_xml import LibroXML
+from .styles import registrar_estilos
+from .generators.nomina_generator import generar_personal_nomina
+from .generators.servicios_generator import codigos_servicios
 from .sheets import (
     parametros, nomina, capacidad, costo_por_minuto,
-    servicios, ecuaciones_tiempo, insumos, produccion,
-    costos_indirectos, costeo_servicios, resumen_ejecutivo
+    servicios, ecuaciones_tiempo, insumos, produccion, produccion_agregada,
+    costos_indirectos, costeo_servicios, resumen_ejecutivo, resultados
 )
 
+# Modos de exportación de generar_archivo
+MODOS = ("formulas", "valores", "ambos")
+
 
 class ModeloTDABC:
     """Generador del Modelo TDABC para CardioCentro Diagnóstico Integral S.A.S."""
     
-    def __init__(self):
+    def __init__(self, config=None):
+        """
+        Args:
+            config: ConfigSnapshot de la empresa (ver ConfigSnapshot.desde_empresa);
+                    por defecto la configuración de src/config/
+        """
+        self.config = config_en_uso(config)
         self.wb = Workbook()
         self.wb.remove(self.wb.active)  # Remover hoja por defecto
-        self.data_init = DataInitializer()
+        self.data_init = DataInitializer(self.config)
     
-    def generar_archivo(self, nombre_archivo="Modelo_TDABC_CardioCentro.xlsx"):
-        """Genera el archivo Excel completo"""
-        print("Iniciando generación del modelo TDABC...")
-        print("="*60)
-        
-        # Crear todas las hojas en orden
-        print("[OK] Creando hoja PARAMETROS...")
-        parametros.crear_hoja_parametros(self.wb)
-        
-        print("[OK] Creando hoja NOMINA...")
-        nomina.crear_hoja_nomina(self.wb)
-        
-        print("[OK] Creando hoja CAPACIDAD...")
-        capacidad.crear_hoja_capacidad(self.wb)
+    def generar_archivo(self, nombre_archivo="Modelo_TDABC_CardioCentro.xlsx",
+                        streaming=False, datos_reales_path=None, modo="formulas",
+                        almacen=None, periodo=None, procesos=None, xml_directo=False):
+        """
+        Genera el archivo Excel completo
         
-        print("[OK] Creando hoja COSTO_POR_MINUTO...")
-        costo_por_minuto.crear_hoja_costo_por_minuto(self.wb)
+        Args:
+            nombre_archivo: Ruta del archivo .xlsx a generar
+            streaming: Si es True usa un Workbook write-only: cada hoja se escribe
+                       fila por fila a disco y la memoria no crece con el volumen
+                       de PRODUCCION. Recomendado para producción real de un año.
+            datos_reales_path: Ruta opcional a Excel/CSV con producción real
+                               (ver ImportadorProduccion)
+            modo: "formulas" (por defecto) escribe fórmulas vivas.
+                  "valores" calcula el modelo en Python (src.engine) y escribe
+                  números estáticos en lugar de fórmulas.
+                  "ambos" mantiene las fórmulas y agrega la hoja RESULTADOS con
+                  los valores calculados.
+                  En "valores" y "ambos" la producción se carga completa en memoria.
+            almacen: AlmacenSQL opcional. PRODUCCION y PRODUCCION_AGREGADA se leen
+                     de sus tablas (la agregación es una consulta SQL), y SERVICIOS,
+                     ECUACIONES_TIEMPO y COSTEO_SERVICIOS del catálogo y las ecuaciones
+                     que se guardan en él al empezar; si además se
+                     indica datos_reales_path, lo importado se guarda antes en el periodo.
+                     Si el almacén tiene nómina del periodo, NOMINA y el cálculo usan
+                     el personal por (cargo, sede) en lugar del simulado.
+                     Los datos simulados nunca se guardan: si el almacén no tiene
+                     producción ni se pudo importar, el libro usa la simulación.
+            periodo: Periodo AAAA-MM del almacén (por defecto el último con producción,
+                     o el último mes importado). Lo importado se guarda en el mes de
+                     su Fecha Cita; los registros sin fecha van a este periodo, que
+                     entonces es obligatorio.
+            procesos: Si se indica, cada hoja se construye en un proceso de un pool de
+                      ese tamaño y el .xlsx se ensambla al final (ver src.ensamblador);
+                      la producción se carga completa en memoria.
+            xml_directo: Si es True PRODUCCION y COSTEO_SERVICIOS se escriben como XML
+                         directo en el .xlsx, con textos y fórmulas compartidas (ver
+                         src.escritor_xml); el resto de las hojas las escribe openpyxl.
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo '{modo}' no válido. Opciones: {', '.join(MODOS)}")
+        if xml_directo and procesos:
+            raise ValueError("xml_directo no se combina con procesos")
+        if streaming:
+            self.wb = Workbook(write_only=True)
+        # Estilos con nombre: se registran una vez y todas las hojas los reutilizan
+        registrar_estilos(self.wb)
         
-        print("[OK] Creando hoja SERVICIOS...")
-        servicios.crear_hoja_servicios(self.wb)
-        
-        print("[OK] Creando hoja ECUACIONES_TIEMPO...")
-        ecuaciones_tiempo.crear_hoja_ecuaciones_tiempo(self.wb)
-        
-        print("[OK] Creando hoja INSUMOS...")
-        insumos.crear_hoja_insumos(self.wb)
-        
-        print("[OK] Creando hoja PRODUCCION...")
-        produccion.crear_hoja_produccion(self.wb)
-        
-        print("[OK] Creando hoja COSTEO_SERVICIOS...")
-        costeo_servicios.crear_hoja_costeo_servicios(self.wb, self.data_init)
+        print("Iniciando generación del modelo TDABC...")
+        if streaming:
+            print("[INFO] Modo streaming (write-only) activado")
+        if modo != "formulas":
+            print(f"[INFO] Modo de exportación: {modo}")
+        print("="*60)
         
-        print("[OK] Creando hoja COSTOS_INDIRECTOS...")
-        costos_indirectos.crear_hoja_costos_indirectos(self.wb, self.data_init)
+        # Datos de entrada (personal primero, luego producción: mismo orden
+        # de números aleatorios que cuando cada hoja los generaba)
+        config = self.config
+        personal = generar_personal_nomina(config.GRUPOS_OCUPACIONALES, config.SEDES)
+        if almacen is not None:
+            periodo = self._preparar_almacen(almacen, datos_reales_path, periodo, config)
+            if periodo is None:
+                # La simulación nunca se guarda en el almacén: se usa solo en este libro
+                print("[WARN] El almacén no tiene producción: se usan datos simulados sin guardarlos")
+                almacen = datos_reales_path = None
+        if almacen is None:
+            datos_produccion = produccion.obtener_datos_produccion(datos_reales_path, config)
+        else:
+            print(f"[INFO] Producción del periodo {periodo} leída del almacén {almacen.ruta}")
+            datos_produccion = almacen.iterar_produccion(periodo)
+            nomina_periodo = almacen.nomina_por_grupo(periodo)
+            if nomina_periodo:
+                print(f"[INFO] Nómina del periodo {periodo} leída del almacén")
+                personal = nomina_periodo
         
-        print("[OK] Creando hoja RESUMEN_EJECUTIVO...")
-        resumen_ejecutivo.crear_hoja_resumen_ejecutivo(self.wb)
+        calculados = None
+        if modo != "formulas":
+            from .engine import DatosModelo, calcular_modelo
+            print("[OK] Calculando modelo en Python...")
+            datos_produccion = list(datos_produccion)
+            calculados = calcular_modelo(DatosModelo.desde_config(personal, datos_produccion, config))
+        # La producción se agrega por (servicio, sede) mientras PRODUCCION la escribe
+        # (con almacén, el agregado sale de una consulta SQL)
+        agregador = produccion_agregada.AgregadorProduccion()
+        if almacen is None:
+            datos_produccion = agregador.acumular(datos_produccion)
+        if procesos:
+            # Cada proceso recibe sus datos completos y una configuración que se pueda enviar
+            datos_produccion = list(datos_produccion)
+            if not isinstance(config, ConfigSnapshot):
+                config = obtener()
+        tareas = self._tareas_hojas(config, modo, personal, datos_produccion, calculados,
+                                    agregador, almacen, periodo)
         
-        print("="*60)
-        print(f"Guardando archivo {nombre_archivo}...")
-        self.wb.save(nombre_archivo)
+        if procesos:
+            print(f"[INFO] Hojas en {procesos} procesos")
+            generar_hojas(tareas, nombre_archivo, procesos, streaming,
+                          progreso=lambda hoja, segundos: print(f"[OK] Hoja {hoja} ({segundos:.2f}s)"))
+            print("="*60)
+        else:
+            # Con xml_directo las hojas masivas se escriben en el archivo mientras se crean
+            libro = LibroXML(self.wb, nombre_archivo) if xml_directo else None
+            try:
+                # Crear todas las hojas en orden
+                for tarea in tareas:
+                    print(f"[OK] Creando hoja {tarea.hoja}...")
+                    tarea.ejecutar(self.wb)
+                print("="*60)
+                print(f"Guardando archivo {nombre_archivo}...")
+                if libro:
+                    libro.guardar()
+                else:
+                    self.wb.save(nombre_archivo)
+            except BaseException:
+                if libro:
+                    libro.descartar()
+                raise
         print(f"[SUCCESS] Archivo generado exitosamente: {nombre_archivo}")
         print("="*60)
         print("\nESTRUCTURA DEL MODELO:")
@@ -72,6 +162,85 @@ class ModeloTDABC:
         print("  7. INSUMOS - Costos de materiales")
         print("  8. COSTOS_INDIRECTOS - Costos administrativos")
         print("  9. PRODUCCION - Volúmenes y facturación")
-        print(" 10. COSTEO_SERVICIOS - Costo total por servicio")
-        print(" 11. RESUMEN_EJECUTIVO - Dashboard de rentabilidad")
+        print(" 10. PRODUCCION_AGREGADA - Volumen y precio por servicio y sede")
+        print(" 11. COSTEO_SERVICIOS - Costo total por servicio")
+        print(" 12. RESUMEN_EJECUTIVO - Dashboard de rentabilidad")
+        if modo == "ambos":
+            print(" 13. RESULTADOS - Valores calculados en Python")
         print("="*60)
+
+    def _tareas_hojas(self, config, modo, personal, datos_produccion, calculados,
+                      agregador, almacen=None, periodo=None):
+        """
+        Hojas del libro en orden, como TareaHoja.
+
+        Es un generador: la tarea de PRODUCCION_AGREGADA se arma después de
+        construir PRODUCCION, cuando el agregador ya recorrió la producción.
+        """
+        # Resultados que reemplazan fórmulas (solo en modo "valores")
+        valores = calculados if modo == "valores" else None
+        yield TareaHoja("PARAMETROS", parametros.crear_hoja_parametros, config)
+        yield TareaHoja("NOMINA", nomina.crear_hoja_nomina, personal, valores, config)
+        yield TareaHoja("CAPACIDAD", capacidad.crear_hoja_capacidad, valores, config)
+        yield TareaHoja("COSTO_POR_MINUTO", costo_por_minuto.crear_hoja_costo_por_minuto, valores, config)
+        # Catálogo y ecuaciones: del almacén si lo hay, si no de la configuración
+        if almacen is None:
+            catalogo, ecuaciones = servicios.catalogo_servicios(config), None
+        else:
+            catalogo, ecuaciones = almacen.catalogo_servicios(), almacen.ecuaciones_tiempo()
+        codigos = codigos_servicios(catalogo)
+        yield TareaHoja("SERVICIOS", servicios.crear_hoja_servicios, config, catalogo)
+        yield TareaHoja("ECUACIONES_TIEMPO", ecuaciones_tiempo.crear_hoja_ecuaciones_tiempo, valores, config,
+                        ecuaciones, codigos)
+        yield TareaHoja("INSUMOS", insumos.crear_hoja_insumos, valores, config)
+        yield TareaHoja("PRODUCCION", produccion.crear_hoja_produccion, datos_produccion=datos_produccion,
+                        valores=valores is not None, config=config,
+                        peso=len(datos_produccion) if isinstance(datos_produccion, list) else 0)
+        if almacen is None:
+            agregado = agregador.resultado(config.SERVICIOS, config.SEDES)
+        else:
+            agregado = almacen.produccion_agregada(periodo, config.SERVICIOS, config.SEDES)
+        yield TareaHoja("PRODUCCION_AGREGADA", produccion_agregada.crear_hoja_produccion_agregada,
+                        agregado, config)
+        yield TareaHoja("COSTEO_SERVICIOS", costeo_servicios.crear_hoja_costeo_servicios,
+                        self.data_init, valores, config, codigos, requiere=["PRODUCCION_AGREGADA"])
+        yield TareaHoja("COSTOS_INDIRECTOS", costos_indirectos.crear_hoja_costos_indirectos,
+                        self.data_init, valores, config, requiere=["COSTEO_SERVICIOS"])
+        yield TareaHoja("RESUMEN_EJECUTIVO", resumen_ejecutivo.crear_hoja_resumen_ejecutivo, valores, config)
+        if modo == "ambos":
+            yield TareaHoja("RESULTADOS", resultados.crear_hoja_resultados, calculados, config)
+
+    @staticmethod
+    def _preparar_almacen(almacen, datos_reales_path=None, periodo=None, config=None):
+        """
+        Guarda en el almacén los catálogos y, si hay archivo, la producción importada.
+
+        Returns:
+            Periodo cuya producción se usa, o None si el almacén no tiene producción
+        """
+        from .data.ecuaciones_data import ECUACIONES_SERVICIOS
+
+        config = config_en_uso(config)
+        catalogo = servicios.catalogo_servicios(config)
+        almacen.guardar_servicios(catalogo)
+        almacen.guardar_ecuaciones(ECUACIONES_SERVICIOS, codigos_servicios(catalogo))
+
+        if datos_reales_path:
+            importados = produccion.importar_datos_reales(datos_reales_path)
+            if importados is not None:
+                # Cada mes de la Fecha Cita reemplaza su periodo; `periodo` recibe los registros sin fecha
+                periodos = set()
+
+                def anotar(registros):
+                    for registro in registros:
+                        periodos.add(registro.get('periodo') or periodo)
+                        yield registro
+
+                almacen.guardar_produccion(anotar(importados), periodo)
+                if periodo is None and len(periodos) > 1:
+                    print(f"[INFO] Producción guardada en los periodos {', '.join(sorted(periodos))}")
+                return periodo or max(periodos, default=None)
+            print("[WARN] La producción no se importó; el almacén queda como estaba")
+        if almacen.ultimo_periodo("produccion") is None:
+            return None
+        return periodo or almacen.ultimo_periodo("produccion")
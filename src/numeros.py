@@ -0,0 +1,96 @@
+"""
+Conversión de columnas de montos a números.
+
+Los exports contables y de nómina traen los valores como texto con el
+formato local de quien los generó: "$ 1.234.567,89" (es-CO) o "1,234,567.89"
+(en-US). El separador decimal se detecta una vez por columna a partir de una
+muestra y la columna completa se convierte en una sola pasada vectorizada;
+las columnas que ya son numéricas no se tocan.
+"""
+import re
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# Deja dígitos y separadores para detectar el formato (quita $, espacios, etc.)
+_NO_NUMERICO = re.compile(r"[^\d.,]")
+
+
+def detectar_decimal(textos: Iterable[str]) -> Optional[str]:
+    """
+    Separador decimal ("." o ",") más probable en una muestra de montos.
+
+    Cada valor vota: si tiene ambos separadores, el último es el decimal; si
+    un separador se repite, es de miles; si aparece una vez seguido de una
+    cantidad de dígitos distinta de 3, es decimal. "1.234" es ambiguo y no
+    vota; si solo hay valores así se toma como separador de miles (montos con
+    tres decimales exactos son raros).
+
+    Returns:
+        "." o ",", o None si ningún valor tiene separadores
+    """
+    votos = {".": 0, ",": 0}
+    ambiguos = set()
+    for texto in textos:
+        texto = _NO_NUMERICO.sub("", texto)
+        punto, coma = texto.rfind("."), texto.rfind(",")
+        if punto >= 0 and coma >= 0:
+            votos["." if punto > coma else ","] += 1
+        elif punto >= 0 or coma >= 0:
+            separador = "." if punto >= 0 else ","
+            otro = "," if separador == "." else "."
+            partes = texto.split(separador)
+            if len(partes) > 2:
+                votos[otro] += 1
+            elif len(partes[1]) != 3:
+                votos[separador] += 1
+            else:
+                ambiguos.add(otro)
+    if votos["."] or votos[","]:
+        return "." if votos["."] >= votos[","] else ","
+    if len(ambiguos) == 1:
+        return ambiguos.pop()
+    return None
+
+
+def a_numero(serie: pd.Series, decimal: str = None, tamano_muestra: int = 1000) -> pd.Series:
+    """
+    Convierte una columna de montos a números.
+
+    Acepta símbolos de moneda, espacios, signo "-" y negativos entre
+    paréntesis "(1.234,56)". Los valores que no se pueden convertir quedan NaN.
+
+    Args:
+        serie: Columna a convertir
+        decimal: Separador decimal ("." o ","); por defecto se detecta con detectar_decimal
+        tamano_muestra: Valores de texto (repartidos en la columna) usados para detectar
+
+    Returns:
+        Serie numérica con el mismo índice
+    """
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie
+
+    if pd.api.types.is_string_dtype(serie) and not pd.api.types.is_object_dtype(serie):
+        es_texto = serie.notna()
+    else:
+        # En columnas object (Excel) puede haber números ya convertidos mezclados con textos
+        es_texto = serie.map(lambda v: isinstance(v, str)).astype(bool)
+    textos = serie[es_texto].astype(str)
+    if decimal is None:
+        paso = max(len(textos) // tamano_muestra, 1)
+        decimal = detectar_decimal(textos.iloc[::paso].head(tamano_muestra)) or "."
+
+    # Los montos se repiten mucho (salarios, cuotas): cada texto distinto se convierte una vez
+    codigos, distintos = pd.factorize(textos)
+    limpio = pd.Series(distintos, dtype=object).str.replace(f"[^0-9{re.escape(decimal)}()-]", "", regex=True)
+    negativo = limpio.str.startswith("(")
+    limpio = limpio.str.strip("()")
+    if decimal != ".":
+        limpio = limpio.str.replace(decimal, ".", regex=False)
+    valores = pd.to_numeric(limpio, errors="coerce")
+    valores = valores.where(~negativo, -valores).to_numpy(dtype=float)
+
+    resultado = pd.to_numeric(serie.where(~es_texto), errors="coerce").astype(float)
+    resultado[es_texto] = valores[codigos]
+    return resultado
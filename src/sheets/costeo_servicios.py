@@ -2,21 +2,45 @@
 Generador de la hoja COSTEO_SERVICIOS
 """
 from openpyxl.styles import Font
-from .. import config
-from ..styles import crear_estilo_header, aplicar_estilo_celda, ajustar_columnas
-from ..utils import crear_tabla
+from ..config import config_en_uso
+from ..escritor import Celda, fila_encabezados, valor_calculado
+from ..escritor_xml import escritor_masivo
+from ..generators.servicios_generator import codigos_servicios
+from ..layout import layout_libro
+from .servicios import catalogo_servicios
 
 
-def crear_hoja_costeo_servicios(wb, data_init):
-    """Calcula el costo unitario por servicio usando TASAS CIF REALES."""
-    ws = wb.create_sheet("COSTEO_SERVICIOS")
-    
+def crear_hoja_costeo_servicios(wb, data_init, resultados=None, config=None, codigos=None):
+    """
+    Calcula el costo unitario por servicio usando TASAS CIF REALES.
+
+    Args:
+        wb: Workbook de openpyxl
+        data_init: DataInitializer con la distribución de indirectos
+        resultados: ResultadosModelo opcional; si se entrega, las fórmulas se
+                    reemplazan por sus valores calculados
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+        codigos: {servicio: código} (ej: del catálogo del almacén); por defecto
+                 los del catálogo de la configuración
+    """
+    config = config_en_uso(config)
+    if codigos is None:
+        codigos = codigos_servicios(catalogo_servicios(config))
+    hoja = escritor_masivo(wb, "COSTEO_SERVICIOS", anchos={
+        'A': 10, 'B': 30, 'C': 20, 'D': 15, 'E': 15, 'F': 15,
+        'G': 18, 'H': 18, 'I': 18, 'J': 12, 'K': 15
+    }, valores=resultados is not None)
+    hoja.escribir(_filas_costeo_servicios(config, hoja, codigos, resultados, layout_libro(wb)))
+    hoja.cerrar()
+
+
+def _filas_costeo_servicios(config, hoja, codigos, resultados=None, layout=None):
+    """Genera las filas de la hoja COSTEO_SERVICIOS"""
     # Títulos
-    ws['A1'] = "HOJA DE COSTEO UNITARIO POR SERVICIO (TDABC)"
-    ws['A1'].font = Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER)
-    
-    ws['A2'] = "Nota: Costo CIF calculado con Tasa Real basada en Capacidad Instalada por Sede."
-    ws['A2'].font = Font(name=config.FUENTE_BASE, size=10, italic=True)
+    yield 1, [Celda("HOJA DE COSTEO UNITARIO POR SERVICIO (TDABC)",
+                    font=Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER))]
+    yield 2, [Celda("Nota: Costo CIF calculado con Tasa Real basada en Capacidad Instalada por Sede.",
+                    font=Font(name=config.FUENTE_BASE, size=10, italic=True))]
 
     # Encabezados dinámicos desde el mapeo
     _m = config._mapper.get_columnas_estandar("costeo_servicios")
@@ -33,73 +57,59 @@ def crear_hoja_costeo_servicios(wb, data_init):
         _m.get("margen_pct", "Margen %"),
         _m.get("volumen", "Volumen Mes")
     ]
+    yield 4, fila_encabezados(headers)
+
+    # Columnas de las tablas de origen: cada criterio recorre solo las filas
+    # de datos de su tabla, no la columna completa de la hoja
+    m_e = config._mapper.get_columnas_estandar("ecuaciones_tiempo")
+    m_i = config._mapper.get_columnas_estandar("insumos")
+    ecuaciones_servicio = f"TablaEcuaciones[{m_e.get('nombre_servicio', 'Nombre Servicio')}]"
+    ecuaciones_minutos = f"TablaEcuaciones[{m_e.get('minutos', 'Minutos Requeridos')}]"
+    insumos_servicio = f"TablaInsumos[{m_i.get('nombre_servicio', 'Nombre Servicio')}]"
+    insumos_costo = f"TablaInsumos[{m_i.get('costo_total', 'Costo Total Insumo')}]"
 
-    # Estilo headers
-    row = 4
-    for i, header in enumerate(headers):
-        col = chr(65 + i)
-        ws[f'{col}{row}'] = header
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].alignment = alignment
-        ws[f'{col}{row}'].border = border
+    # PRODUCCION_AGREGADA lista los pares servicio × sede en el mismo orden que esta hoja
+    agregada = layout.tabla("TablaProduccionAgregada")
 
     # Datos
+    costeo = resultados and resultados.costeo
     row = 5
-    for servicio in config.SERVICIOS:
-        for sede in config.SEDES:
-            ws[f'A{row}'] = "SV00"
-            ws[f'B{row}'] = servicio
-            ws[f'C{row}'] = sede
-            
+    for v, servicio in enumerate(config.SERVICIOS):
+        for s, sede in enumerate(config.SEDES):
+            # Fila del mismo par (servicio, sede) en PRODUCCION_AGREGADA
+            fila_agregada = agregada.primera_fila + v * len(config.SEDES) + s
+
             # Definir referencia de minutos (necesaria para CIF)
-            minutes_ref = f"SUMIFS(ECUACIONES_TIEMPO!$D:$D,ECUACIONES_TIEMPO!$B:$B,B{row})"
-            
-            # MO Directa: Suma del Costo MO Total calculado en ECUACIONES_TIEMPO (Columna H)
-            # Esto considera el mix exacto de especialistas vs técnicos para cada servicio
-            ws[f'D{row}'] = f"=SUMIFS(ECUACIONES_TIEMPO!$H:$H,ECUACIONES_TIEMPO!$B:$B,B{row})"
-            
-            # Costo Insumos: Sumar si existe
-            ws[f'E{row}'] = f"=SUMIFS(INSUMOS!$F:$F,INSUMOS!$B:$B,B{row})"
-            
-            # Costo CIF (Indirecto): Minutos * Tasa CIF Real calculada por Sede
-            # Buscamos la tasa en la tabla de tasas al final de COSTOS_INDIRECTOS
-            # Usamos SUMIFS en Col A (Sede) y Col D (Tasa), ya que en la tabla principal Col A son Cuentas
-            cif_rate_ref = f"SUMIFS(COSTOS_INDIRECTOS!$D:$D,COSTOS_INDIRECTOS!$A:$A,C{row})"
-            ws[f'F{row}'] = f"={minutes_ref}*{cif_rate_ref}"
+            minutes_ref = f"SUMIFS({ecuaciones_minutos},{ecuaciones_servicio},B{row})"
 
-            # Total Unitario
-            ws[f'G{row}'] = f"=D{row}+E{row}+F{row}"
-            
-            # Precio Venta (Promedio de PRODUCCION)
-            ws[f'H{row}'] = f"=IFERROR(AVERAGEIFS(PRODUCCION!$F:$F,PRODUCCION!$B:$B,B{row},PRODUCCION!$C:$C,C{row}),0)"
-            
-            # Margen
-            ws[f'I{row}'] = f"=H{row}-G{row}"
-            ws[f'J{row}'] = f"=IF(H{row}>0,I{row}/H{row},0)"
-            
-            # Volumen (Suma de PRODUCCION)
-            ws[f'K{row}'] = f"=SUMIFS(PRODUCCION!$E:$E,PRODUCCION!$B:$B,B{row},PRODUCCION!$C:$C,C{row})"
+            # Costo CIF (Indirecto): Minutos * Tasa CIF Real calculada por Sede
+            # Buscamos la tasa en la tabla de tasas al final de COSTOS_INDIRECTOS (TablaTasasCIF)
+            cif_rate_ref = f"SUMIFS(TablaTasasCIF[Tasa CIF Real / Min],TablaTasasCIF[Sede],C{row})"
 
-            # Estilos
-            aplicar_estilo_celda(ws[f'A{row}'], "normal")
-            aplicar_estilo_celda(ws[f'B{row}'], "normal")
-            aplicar_estilo_celda(ws[f'C{row}'], "normal")
-            for col in ['D', 'E', 'F', 'G', 'H', 'I', 'J', 'K']:
-                aplicar_estilo_celda(ws[f'{col}{row}'], "calculo")
-                if col == 'J':
-                    ws[f'{col}{row}'].number_format = '0.0%'
-                elif col == 'K':
-                    ws[f'{col}{row}'].number_format = '#,##0'
-                else:
-                    ws[f'{col}{row}'].number_format = '$#,##0'
-            
+            yield row, [
+                Celda(codigos.get(servicio, ""), "normal"),
+                Celda(servicio, "normal"),
+                Celda(sede, "normal"),
+                # MO Directa: Suma del Costo MO Total calculado en ECUACIONES_TIEMPO (Columna H)
+                # Esto considera el mix exacto de especialistas vs técnicos para cada servicio
+                Celda(f"=SUMIFS(TablaEcuaciones[Costo MO Total],{ecuaciones_servicio},B{row})", "calculo", '$#,##0',
+                      calculado=valor_calculado(costeo, 'mo', v, s)),
+                # Costo Insumos: Sumar si existe
+                Celda(f"=SUMIFS({insumos_costo},{insumos_servicio},B{row})", "calculo", '$#,##0',
+                      calculado=valor_calculado(costeo, 'insumos', v, s)),
+                Celda(f"={minutes_ref}*{cif_rate_ref}", "calculo", '$#,##0', calculado=valor_calculado(costeo, 'cif', v, s)),
+                # Total Unitario
+                Celda(f"=D{row}+E{row}+F{row}", "calculo", '$#,##0', calculado=valor_calculado(costeo, 'total', v, s)),
+                # Precio Venta (Promedio ponderado de PRODUCCION, ya agregado por par)
+                Celda(f"={agregada.celda('Precio Promedio Ponderado', fila_agregada)}", "calculo", '$#,##0',
+                      calculado=valor_calculado(costeo, 'precio', v, s)),
+                # Margen
+                Celda(f"=H{row}-G{row}", "calculo", '$#,##0', calculado=valor_calculado(costeo, 'margen_moneda', v, s)),
+                Celda(f"=IF(H{row}>0,I{row}/H{row},0)", "calculo", '0.0%', calculado=valor_calculado(costeo, 'margen_pct', v, s)),
+                # Volumen (Suma de PRODUCCION, ya agregada por par)
+                Celda(f"={agregada.celda('Volumen', fila_agregada)}", "calculo", '#,##0',
+                      calculado=valor_calculado(costeo, 'volumen', v, s)),
+            ]
             row += 1
 
-    crear_tabla(ws, "TablaCosteo", f"A4:K{row-1}")
-
-    ajustar_columnas(ws, {
-        'A': 10, 'B': 30, 'C': 20, 'D': 15, 'E': 15, 'F': 15, 
-        'G': 18, 'H': 18, 'I': 18, 'J': 12, 'K': 15
-    })
+    hoja.tabla("TablaCosteo", f"A4:K{row-1}", headers)
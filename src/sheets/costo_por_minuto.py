@@ -1,119 +1,143 @@
 """
 Generador de la hoja COSTO_POR_MINUTO
 """
-from openpyxl.styles import Font, Alignment
+from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
-from .. import config
-from ..styles import crear_estilo_header, aplicar_estilo_celda, ajustar_columnas
-from ..utils import crear_tabla
+from ..config import config_en_uso
+from ..escritor import EscritorHoja, Celda, fila_encabezados, valor_calculado
 
 
-def crear_hoja_costo_por_minuto(wb):
-    """Crea la hoja COSTO_POR_MINUTO"""
-    ws = wb.create_sheet("COSTO_POR_MINUTO")
-    
+def crear_hoja_costo_por_minuto(wb, resultados=None, config=None):
+    """
+    Crea la hoja COSTO_POR_MINUTO
+
+    Args:
+        wb: Workbook de openpyxl
+        resultados: ResultadosModelo opcional; si se entrega, las fórmulas se
+                    reemplazan por sus valores calculados
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+    """
+    config = config_en_uso(config)
+    # Ajustar columnas de la tabla cruzada
+    anchos = {'G': 35, 'H': 20}
+    for i in range(len(config.SEDES)):
+        col = get_column_letter(9 + i)
+        anchos[col] = 18
+
+    hoja = EscritorHoja(wb, "COSTO_POR_MINUTO", anchos=anchos, valores=resultados is not None)
+    hoja.escribir(_filas_costo_por_minuto(config, hoja, resultados))
+    hoja.cerrar()
+
+
+def _filas_costo_por_minuto(config, hoja, resultados=None):
+    """
+    Genera las filas de la hoja COSTO_POR_MINUTO.
+
+    La hoja tiene dos bloques lado a lado: el detalle por grupo y sede
+    (columnas A:E, desde la fila 3) y la tabla cruzada por sede (columnas G en
+    adelante, desde la fila 3). Cada fila emitida combina ambos bloques.
+    """
     # Título
-    ws['A1'] = "COSTO POR MINUTO - NÚCLEO DEL MODELO TDABC"
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER)
-    ws.merge_cells('A1:E1')
-    
+    yield 1, [Celda("COSTO POR MINUTO - NÚCLEO DEL MODELO TDABC", font=Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:E1')
+
     # Encabezados
     headers = [
-        "Grupo Ocupacional", "Costo Total Mensual", 
+        "Grupo Ocupacional", "Costo Total Mensual",
         "Minutos Capacidad Práctica", "Costo por Minuto", "Sede"
     ]
-    
+
+    detalle = _filas_detalle(config, headers, resultados)
+    cruzada = _filas_tabla_cruzada(config, resultados)
+
+    # Intercalar ambos bloques fila por fila (los dos empiezan en la fila 3)
     row = 3
-    for i, header in enumerate(headers):
-        col = get_column_letter(i + 1)
-        ws[f'{col}{row}'] = header
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-        ws[f'{col}{row}'].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    
-    # Datos
+    ultima_detalle = row
+    while True:
+        izquierda = next(detalle, None)
+        derecha = next(cruzada, None)
+        if izquierda is None and derecha is None:
+            break
+        celdas = list(izquierda) if izquierda is not None else [None] * 5
+        if izquierda is not None:
+            ultima_detalle = row
+        if derecha is not None:
+            celdas += [None] + derecha
+        yield row, celdas
+        row += 1
+
+    # Crear Tabla Estructurada para facilitar Tablas Dinámicas manuales
+    # Rango A3:E{ultima} (Desde headers hasta última fila de datos)
+    hoja.tabla("TablaDetalleCostoMinuto", f"A3:E{ultima_detalle}", headers)
+
+    # Tabla cruzada como tabla estructurada: ECUACIONES_TIEMPO busca aquí el promedio nacional
+    encabezados_cruzada = ["Grupo Ocupacional", "Promedio Nacional"] + config.SEDES
+    ultima_col = get_column_letter(6 + len(encabezados_cruzada))
+    hoja.tabla("TablaCostoMinutoGrupo", f"G4:{ultima_col}{4 + len(config.GRUPOS_OCUPACIONALES)}",
+               encabezados_cruzada)
+
+
+def _filas_detalle(config, headers, resultados=None):
+    """Bloque A:E - costo por minuto por grupo ocupacional y sede"""
+    yield fila_encabezados(headers)
+
+    # Referencias a las tablas de NOMINA y CAPACIDAD (solo sus filas de datos)
+    m_n = config._mapper.get_columnas_estandar("nomina")
+    nomina_costo = f"TablaNomina[{m_n.get('costo_total', 'Costo Total Mensual')}]"
+    nomina_grupo = f"TablaNomina[{m_n.get('grupo', 'Grupo Ocupacional')}]"
+    nomina_sede = f"TablaNomina[{m_n.get('centro', 'Sede')}]"
+
+    nomina = resultados and resultados.nomina
+    capacidad = resultados and resultados.capacidad
+    costo = resultados and resultados.costo_minuto
     row = 4
-    for grupo, _ in config.GRUPOS_OCUPACIONALES:
-        for sede in config.SEDES:
-            ws[f'A{row}'] = grupo
-            # Buscar costo total mensual de este grupo en esta sede
-            ws[f'B{row}'] = f'=SUMIFS(NOMINA!$E:$E,NOMINA!$B:$B,A{row},NOMINA!$H:$H,E{row})'
-            # Minutos capacidad práctica por persona
-            ws[f'C{row}'] = f'=VLOOKUP(A{row},CAPACIDAD!$A:$E,5,FALSE)'
-            # Costo por minuto = Costo Total / Minutos Capacidad Práctica
-            ws[f'D{row}'] = f'=IF(C{row}>0,B{row}/C{row},0)'
-            ws[f'E{row}'] = sede
-            
-            # Aplicar estilos
-            aplicar_estilo_celda(ws[f'A{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'B{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'C{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'D{row}'], "resultado")
-            aplicar_estilo_celda(ws[f'E{row}'], "calculo")
-            
-            # Formato
-            ws[f'B{row}'].number_format = '$#,##0'
-            ws[f'C{row}'].number_format = '#,##0'
-            ws[f'D{row}'].number_format = '$#,##0.00'
-            
+    for g, (grupo, _) in enumerate(config.GRUPOS_OCUPACIONALES):
+        for s, sede in enumerate(config.SEDES):
+            yield [
+                Celda(grupo, "calculo"),
+                # Buscar costo total mensual de este grupo en esta sede
+                Celda(f'=SUMIFS({nomina_costo},{nomina_grupo},A{row},{nomina_sede},E{row})', "calculo", '$#,##0',
+                      calculado=valor_calculado(nomina, 'costo_total', g, s)),
+                # Minutos capacidad práctica por persona
+                Celda(f'=INDEX(TablaCapacidad[Minutos Capacidad Práctica],MATCH(A{row},TablaCapacidad[Grupo Ocupacional],0))',
+                      "calculo", '#,##0',
+                      calculado=valor_calculado(capacidad, 'minutos_practicos', g)),
+                # Costo por minuto = Costo Total / Minutos Capacidad Práctica
+                Celda(f'=IF(C{row}>0,B{row}/C{row},0)', "resultado", '$#,##0.00',
+                      calculado=valor_calculado(costo, 'costo_minuto', g, s)),
+                Celda(sede, "calculo"),
+            ]
             row += 1
-    
-    row += 1
-    
-    # Crear Tabla Estructurada para facilitar Tablas Dinámicas manuales
-    # Rango A3:E{row-1} (Desde headers hasta última fila de datos)
-    crear_tabla(ws, "TablaDetalleCostoMinuto", f"A3:E{row-1}")
-    
-    row += 2
-    
-    # ==============================================================================
-    # TABLA MAESTRA CRUZADA (Simulación de Tabla Dinámica)
-    # Filas: Grupos Ocupacionales
-    # Columnas: Promedio Nacional (H) + Detalle por Sede (I, J, K...)
-    # ==============================================================================
-    
-    ws['G3'] = "TABLA DINÁMICA DE COSTOS (Costo Minuto Real)"
-    ws['G3'].font = Font(bold=True, size=11, color="2E86C1")
-    
-    # Encabezados
-    headers_crosstab = ["Grupo Ocupacional", "Promedio Nacional"] + config.SEDES
-    
-    for i, h in enumerate(headers_crosstab):
-        col = get_column_letter(7 + i) # G=7
-        celda = ws[f'{col}4']
-        celda.value = h
-        estilo = crear_estilo_header()
-        celda.font = estilo[0]
-        celda.fill = estilo[1]
-        celda.alignment = Alignment(horizontal="center", wrap_text=True)
-        
+
+
+def _filas_tabla_cruzada(config, resultados=None):
+    """
+    Bloque G: - TABLA MAESTRA CRUZADA (Simulación de Tabla Dinámica)
+    Filas: Grupos Ocupacionales
+    Columnas: Promedio Nacional (H) + Detalle por Sede (I, J, K...)
+    """
+    yield [Celda("TABLA DINÁMICA DE COSTOS (Costo Minuto Real)", font=Font(bold=True, size=11, color="2E86C1"))]
+
+    # Encabezados (mismos que la tabla TablaCostoMinutoGrupo)
+    yield fila_encabezados(["Grupo Ocupacional", "Promedio Nacional"] + config.SEDES)
+
+    costo = resultados and resultados.costo_minuto
     row = 5
-    for grupo, _ in config.GRUPOS_OCUPACIONALES:
-        ws[f'G{row}'] = grupo
-        aplicar_estilo_celda(ws[f'G{row}'], "normal")
-        
-        # Col H: Promedio Nacional (Mantenemos compatibilidad con ECUACIONES_TIEMPO)
-        ws[f'H{row}'] = f"=IFERROR(AVERAGEIFS(TablaDetalleCostoMinuto[Costo por Minuto], TablaDetalleCostoMinuto[Grupo Ocupacional], G{row}), 0)"
-        ws[f'H{row}'].number_format = '$#,##0.00'
-        aplicar_estilo_celda(ws[f'H{row}'], "resultado")
-        
+    for g, (grupo, _) in enumerate(config.GRUPOS_OCUPACIONALES):
+        celdas = [
+            Celda(grupo, "normal"),
+            # Col H: Promedio Nacional (Mantenemos compatibilidad con ECUACIONES_TIEMPO)
+            Celda(f"=IFERROR(AVERAGEIFS(TablaDetalleCostoMinuto[Costo por Minuto], TablaDetalleCostoMinuto[Grupo Ocupacional], G{row}), 0)",
+                  "resultado", '$#,##0.00', calculado=valor_calculado(costo, 'promedio', g)),
+        ]
         # Cols I...: Costo por Sede Específica
-        for i, sede in enumerate(config.SEDES):
-            col = get_column_letter(9 + i) # I=9
+        for s, sede in enumerate(config.SEDES):
             # Buscamos el costo específico interceptando Grupo y Sede
             # SUMIFS(Costo, Grupo=G, Sede=Header)
             # Como es único por sede/grupo, SUMIFS o AVERAGEIFS da lo mismo
-            ws[f'{col}{row}'] = f"=SUMIFS(TablaDetalleCostoMinuto[Costo por Minuto], TablaDetalleCostoMinuto[Grupo Ocupacional], G{row}, TablaDetalleCostoMinuto[Sede], \"{sede}\")"
-            ws[f'{col}{row}'].number_format = '$#,##0.00'
-            aplicar_estilo_celda(ws[f'{col}{row}'], "calculo")
-            
+            celdas.append(Celda(
+                f"=SUMIFS(TablaDetalleCostoMinuto[Costo por Minuto], TablaDetalleCostoMinuto[Grupo Ocupacional], G{row}, TablaDetalleCostoMinuto[Sede], \"{sede}\")",
+                "calculo", '$#,##0.00', calculado=valor_calculado(costo, 'costo_minuto', g, s)
+            ))
+        yield celdas
         row += 1
-
-    # Ajustar columnas de la tabla cruzada
-    anchos = {'G': 35, 'H': 20}
-    for i in range(len(config.SEDES)):
-        col = get_column_letter(9 + i)
-        anchos[col] = 18
-    ajustar_columnas(ws, anchos)
@@ -2,30 +2,55 @@
 Generador de la hoja ECUACIONES_TIEMPO
 """
 from openpyxl.styles import Font, Alignment
-from openpyxl.utils import get_column_letter
-from .. import config
-from ..styles import crear_estilo_header, aplicar_estilo_celda, ajustar_columnas
+from ..config import config_en_uso
+from ..escritor import EscritorHoja, Celda, fila_encabezados, valor_calculado
 from ..data.ecuaciones_data import ECUACIONES_SERVICIOS
+from ..generators.servicios_generator import codigos_servicios
+from .servicios import catalogo_servicios
 
 
-def crear_hoja_ecuaciones_tiempo(wb):
-    """Crea la hoja ECUACIONES_TIEMPO - núcleo del TDABC"""
-    ws = wb.create_sheet("ECUACIONES_TIEMPO")
-    
+def crear_hoja_ecuaciones_tiempo(wb, resultados=None, config=None, ecuaciones=None, codigos=None):
+    """
+    Crea la hoja ECUACIONES_TIEMPO - núcleo del TDABC
+
+    Args:
+        wb: Workbook de openpyxl
+        resultados: ResultadosModelo opcional; si se entrega, las fórmulas se
+                    reemplazan por sus valores calculados
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+        ecuaciones: {servicio: [(grupo, minutos, factor), ...]} (ej: leídas del
+                    almacén); por defecto ECUACIONES_SERVICIOS
+        codigos: {servicio: código}; por defecto los del catálogo de la configuración
+    """
+    config = config_en_uso(config)
+    if ecuaciones is None:
+        ecuaciones = ECUACIONES_SERVICIOS
+    if codigos is None:
+        codigos = codigos_servicios(catalogo_servicios(config))
+    hoja = EscritorHoja(wb, "ECUACIONES_TIEMPO", anchos={
+        'A': 15, 'B': 38, 'C': 30, 'D': 20, 'E': 20, 'F': 20, 'G': 20, 'H': 20
+    }, valores=resultados is not None)
+    hoja.escribir(_filas_ecuaciones_tiempo(config, hoja, ecuaciones, codigos, resultados))
+    hoja.cerrar()
+
+
+def _filas_ecuaciones_tiempo(config, hoja, ecuaciones_servicios, codigos, resultados=None):
+    """Genera las filas de la hoja ECUACIONES_TIEMPO"""
     # Título
-    ws['A1'] = "ECUACIONES DE TIEMPO TDABC"
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER)
-    ws.merge_cells('A1:F1')
-    
-    ws['A2'] = "Núcleo del modelo: Cada servicio consume tiempo de diferentes grupos ocupacionales"
-    ws['A2'].font = Font(name='Calibri', size=10, italic=True)
-    ws.merge_cells('A2:F2')
-    
-    ws['A3'] = "FACTOR DE COMPLEJIDAD: Ajusta el tiempo según dificultad del caso. 1.0=normal, 1.2-1.5=complejo, 2.0+=muy complejo. Es AJUSTABLE según su realidad."
-    ws['A3'].font = Font(name='Calibri', size=9, italic=True, color="D35400")
-    ws['A3'].alignment = Alignment(wrap_text=True)
-    ws.merge_cells('A3:F3')
-    
+    yield 1, [Celda("ECUACIONES DE TIEMPO TDABC", font=Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:F1')
+
+    yield 2, [Celda("Núcleo del modelo: Cada servicio consume tiempo de diferentes grupos ocupacionales",
+                    font=Font(name='Calibri', size=10, italic=True))]
+    hoja.combinar('A2:F2')
+
+    yield 3, [Celda(
+        "FACTOR DE COMPLEJIDAD: Ajusta el tiempo según dificultad del caso. 1.0=normal, 1.2-1.5=complejo, 2.0+=muy complejo. Es AJUSTABLE según su realidad.",
+        font=Font(name='Calibri', size=9, italic=True, color="D35400"),
+        alignment=Alignment(wrap_text=True)
+    )]
+    hoja.combinar('A3:F3')
+
     # Encabezados dinámicos desde el mapeo
     _m = config._mapper.get_columnas_estandar("ecuaciones_tiempo")
     headers = [
@@ -35,58 +60,37 @@ def crear_hoja_ecuaciones_tiempo(wb):
         _m.get("minutos", "Minutos Requeridos"),
         _m.get("factor", "Factor Complejidad"),
         _m.get("minutos_ajustados", "Minutos Ajustados"),
-        "Costo Minuto (Promedio)", 
+        "Costo Minuto (Promedio)",
         "Costo MO Total"
     ]
-    
-    row = 5
-    for i, header in enumerate(headers):
-        col = get_column_letter(i + 1)
-        ws[f'{col}{row}'] = header
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-        ws[f'{col}{row}'].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    
+    yield 5, fila_encabezados(headers)
+
+    tiempos = resultados and resultados.ecuaciones
+    linea = 0  # Posición de la línea en los arreglos del motor
     row = 6  # Iniciar después de headers (row 5)
-    for servicio, ecuaciones in ECUACIONES_SERVICIOS.items():
-        # Buscar código del servicio
-        codigo = f"SV{list(ECUACIONES_SERVICIOS.keys()).index(servicio) + 1:03d}"
-        
+    for idx_servicio, (servicio, ecuaciones) in enumerate(ecuaciones_servicios.items(), 1):
+        # Código del catálogo; un servicio fuera del catálogo usa su posición en las ecuaciones
+        codigo = codigos.get(servicio) or f"SV{idx_servicio:03d}"
+
         for grupo, minutos, factor in ecuaciones:
-            ws[f'A{row}'] = codigo
-            ws[f'B{row}'] = servicio
-            ws[f'C{row}'] = grupo
-            ws[f'D{row}'] = minutos
-            ws[f'E{row}'] = factor
-            ws[f'F{row}'] = f"=D{row}*E{row}"  # Minutos ajustados
-            
-            # Buscar costo por minuto del grupo en la Tabla Maestra de COSTO_POR_MINUTO
-            # AHORA BUSCAMOS EN COLUMNAS G:H donde está la tabla correcta de promedios por minuto
-            ws[f'G{row}'] = f"=IFERROR(VLOOKUP(C{row},COSTO_POR_MINUTO!$G:$H,2,FALSE),0)"
-            
-            # Costo Total MO de este recurso para este servicio
-            ws[f'H{row}'] = f"=F{row}*G{row}"
-            
-            # Aplicar estilos
-            aplicar_estilo_celda(ws[f'A{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'B{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'C{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'D{row}'], "input")
-            aplicar_estilo_celda(ws[f'E{row}'], "input")
-            aplicar_estilo_celda(ws[f'F{row}'], "resultado")
-            aplicar_estilo_celda(ws[f'G{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'H{row}'], "resultado")
-            
-            # Formato
-            ws[f'F{row}'].number_format = '#,##0.0'
-            ws[f'G{row}'].number_format = '$#,##0'
-            ws[f'H{row}'].number_format = '$#,##0'
-            
+            yield row, [
+                Celda(codigo, "calculo"),
+                Celda(servicio, "calculo"),
+                Celda(grupo, "calculo"),
+                Celda(minutos, "input"),
+                Celda(factor, "input"),
+                Celda(f"=D{row}*E{row}", "resultado", '#,##0.0',
+                      calculado=valor_calculado(tiempos, 'minutos_ajustados', linea)),  # Minutos ajustados
+                # Buscar costo por minuto del grupo en la Tabla Maestra de COSTO_POR_MINUTO
+                # (TablaCostoMinutoGrupo, columnas G:H: promedio nacional por grupo)
+                Celda(f"=IFERROR(INDEX(TablaCostoMinutoGrupo[Promedio Nacional],"
+                      f"MATCH(C{row},TablaCostoMinutoGrupo[Grupo Ocupacional],0)),0)", "calculo", '$#,##0',
+                      calculado=valor_calculado(tiempos, 'costo_minuto', linea)),
+                # Costo Total MO de este recurso para este servicio
+                Celda(f"=F{row}*G{row}", "resultado", '$#,##0',
+                      calculado=valor_calculado(tiempos, 'costo_mo', linea)),
+            ]
             row += 1
-    
-    ajustar_columnas(ws, {
-        'A': 15, 'B': 38, 'C': 30, 'D': 20, 'E': 20, 'F': 20, 'G': 20, 'H': 20
-    })
+            linea += 1
 
+    hoja.tabla("TablaEcuaciones", f"A5:H{row-1}", headers)
@@ -2,21 +2,41 @@
 Generador de la hoja NOMINA
 """
 from openpyxl.styles import Font
-from openpyxl.utils import get_column_letter
-import random
-from .. import config
-from ..styles import crear_estilo_header, aplicar_estilo_celda, ajustar_columnas
+from typing import Any, Dict, List
+from ..config import config_en_uso
+from ..escritor import EscritorHoja, Celda, fila_encabezados
+from ..generators.nomina_generator import generar_personal_nomina
 
 
-def crear_hoja_nomina(wb):
-    """Crea la hoja NOMINA con estructura salarial"""
-    ws = wb.create_sheet("NOMINA")
-    
+def crear_hoja_nomina(wb, personal: List[Dict[str, Any]] = None, resultados=None, config=None):
+    """
+    Crea la hoja NOMINA con estructura salarial
+
+    Args:
+        wb: Workbook de openpyxl
+        personal: Registros de personal por grupo y sede (ver
+                  generar_personal_nomina). Si no se proporciona, se simulan.
+        resultados: ResultadosModelo opcional; si se entrega, las fórmulas se
+                    reemplazan por sus valores calculados
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+    """
+    config = config_en_uso(config)
+    hoja = EscritorHoja(wb, "NOMINA", anchos={
+        'A': 10, 'B': 30, 'C': 20, 'D': 18,
+        'E': 20, 'F': 18, 'G': 20, 'H': 25
+    }, valores=resultados is not None)
+    if personal is None:
+        personal = generar_personal_nomina(config.GRUPOS_OCUPACIONALES, config.SEDES)
+    hoja.escribir(_filas_nomina(config, hoja, personal, resultados))
+    hoja.cerrar()
+
+
+def _filas_nomina(config, hoja, personal, resultados=None):
+    """Genera las filas de la hoja NOMINA"""
     # Título
-    ws['A1'] = "ESTRUCTURA SALARIAL Y NÓMINA"
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER)
-    ws.merge_cells('A1:H1')
-    
+    yield 1, [Celda("ESTRUCTURA SALARIAL Y NÓMINA", font=Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:H1')
+
     # Encabezados dinámicos desde el mapeo
     _m = config._mapper.get_columnas_estandar("nomina")
     headers = [
@@ -29,63 +49,33 @@ def crear_hoja_nomina(wb):
         _m.get("total_grupo", "Costo Total Grupo"),
         _m.get("centro", "Sede")
     ]
-    
-    row = 3
-    for i, header in enumerate(headers):
-        col = get_column_letter(i + 1)
-        ws[f'{col}{row}'] = header
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-        ws[f'{col}{row}'].alignment = alignment
-    
+    yield 3, fila_encabezados(headers)
+
     # Datos de nómina
     row = 4
-    id_counter = 1
-    for grupo, salario in config.GRUPOS_OCUPACIONALES:
-        for sede in config.SEDES:
-            cantidad = random.randint(2, 8)
-            
-            ws[f'A{row}'] = f"G{id_counter:03d}"
-            ws[f'B{row}'] = grupo
-            ws[f'C{row}'] = salario
-            ws[f'D{row}'] = "=PARAMETROS!$B$10"  # Factor prestacional sector salud (40.77%)
-            ws[f'E{row}'] = f"=C{row}*D{row}"  # Costo total mensual
-            ws[f'F{row}'] = cantidad
-            ws[f'G{row}'] = f"=E{row}*F{row}"  # Costo total grupo
-            ws[f'H{row}'] = sede
-            
-            # Aplicar estilos
-            aplicar_estilo_celda(ws[f'A{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'B{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'C{row}'], "input")
-            aplicar_estilo_celda(ws[f'D{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'E{row}'], "resultado")
-            aplicar_estilo_celda(ws[f'F{row}'], "input")
-            aplicar_estilo_celda(ws[f'G{row}'], "resultado")
-            aplicar_estilo_celda(ws[f'H{row}'], "calculo")
-            
-            # Formato moneda
-            ws[f'C{row}'].number_format = '$#,##0'
-            ws[f'E{row}'].number_format = '$#,##0'
-            ws[f'G{row}'].number_format = '$#,##0'
-            
-            row += 1
-            id_counter += 1
-    
+    factor = resultados and resultados.datos.factor_prestacional
+    total_nomina = 0
+    for registro in personal:
+        costo_total = factor and registro['salario'] * factor
+        costo_grupo = factor and costo_total * registro['cantidad']
+        total_nomina += costo_grupo or 0
+        yield row, [
+            Celda(registro['id'], "calculo"),
+            Celda(registro['grupo'], "calculo"),
+            Celda(registro['salario'], "input", '$#,##0'),
+            Celda("=PARAMETROS!$B$10", "calculo", calculado=factor),  # Factor prestacional sector salud (40.77%)
+            Celda(f"=C{row}*D{row}", "resultado", '$#,##0', calculado=costo_total),  # Costo total mensual
+            Celda(registro['cantidad'], "input"),
+            Celda(f"=E{row}*F{row}", "resultado", '$#,##0', calculado=costo_grupo),  # Costo total grupo
+            Celda(registro['sede'], "calculo"),
+        ]
+        row += 1
+
+    hoja.tabla("TablaNomina", f"A3:H{row-1}", headers)
+
     # Totales
-    ws[f'B{row}'] = "TOTAL NÓMINA MENSUAL"
-    ws[f'B{row}'].font = Font(bold=True)
-    ws[f'G{row}'] = f"=SUM(G4:G{row-1})"
-    ws[f'G{row}'].font = Font(bold=True)
-    ws[f'G{row}'].number_format = '$#,##0'
-    font, fill, alignment, border = crear_estilo_header()
-    ws[f'B{row}'].fill = fill
-    ws[f'G{row}'].fill = fill
-    ws.merge_cells(f'B{row}:F{row}')
-    
-    ajustar_columnas(ws, {
-        'A': 10, 'B': 30, 'C': 20, 'D': 18, 
-        'E': 20, 'F': 18, 'G': 20, 'H': 25
-    })
+    yield row, {
+        'B': Celda("TOTAL NÓMINA MENSUAL", "total"),
+        'G': Celda(f"=SUM(G4:G{row-1})", "total", '$#,##0', calculado=factor and total_nomina),
+    }
+    hoja.combinar(f'B{row}:F{row}')
@@ -1,15 +1,18 @@
 """
 Generador de la hoja PRODUCCION
 """
-from openpyxl.styles import Font, Alignment
+from openpyxl.styles import Font
 from pathlib import Path
-from .. import config
-from ..styles import crear_estilo_header, aplicar_estilo_celda, ajustar_columnas
-from ..utils import crear_tabla
+from typing import Any, Dict, Iterable
+from ..config import config_en_uso
+from ..escritor import Celda, fila_encabezados
+from ..escritor_xml import escritor_masivo
 from ..generators.produccion_generator import generar_datos_produccion
 
 
-def crear_hoja_produccion(wb, datos_reales_path: str = None):
+def crear_hoja_produccion(wb, datos_reales_path: str = None,
+                          datos_produccion: Iterable[Dict[str, Any]] = None,
+                          valores: bool = False, config=None):
     """
     Crea la hoja PRODUCCION con volúmenes y facturación.
     
@@ -17,14 +20,71 @@ def crear_hoja_produccion(wb, datos_reales_path: str = None):
         wb: Workbook de openpyxl
         datos_reales_path: Ruta opcional a archivo Excel/CSV con datos reales de producción.
                           Si no se proporciona, genera datos simulados.
+        datos_produccion: Iterable opcional de registros ya cargados (mismo formato que
+                          ImportadorProduccion.obtener_datos_produccion). Se consume una
+                          sola vez, fila por fila, por lo que puede ser un generador.
+        valores: Si es True escribe el total facturado como número en lugar de fórmula
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
     """
-    """Crea la hoja PRODUCCION con volúmenes y facturación"""
-    ws = wb.create_sheet("PRODUCCION")
+    config = config_en_uso(config)
+    hoja = escritor_masivo(wb, "PRODUCCION", anchos={
+        'A': 12, 'B': 35, 'C': 22, 'D': 20, 'E': 12, 'F': 18, 'G': 18
+    }, valores=valores)
+    if datos_produccion is None:
+        datos_produccion = obtener_datos_produccion(datos_reales_path, config)
+    hoja.escribir(_filas_produccion(config, hoja, datos_produccion))
+    hoja.cerrar()
+
+
+def obtener_datos_produccion(datos_reales_path: str = None, config=None):
+    """Determina la fuente de datos: reales o simulados (con la configuración indicada)"""
+    if datos_reales_path:
+        datos = importar_datos_reales(datos_reales_path)
+        if datos is not None:
+            return datos
+        print("[WARN] Generando datos simulados como fallback...")
+    return _generar_datos_simulados(config)
+
+
+def importar_datos_reales(datos_reales_path: str):
+    """
+    Importa la producción real de un Excel o CSV.
+
+    Returns:
+        Iterador de registros, o None si el archivo no existe o no se pudo importar
+    """
+    if not Path(datos_reales_path).exists():
+        print(f"[WARN] Archivo no encontrado: {datos_reales_path}")
+        return None
+
+    from ..cache_importacion import CacheImportacion
+    from ..importador_produccion import ImportadorProduccion
+    
+    # Los Excel ya leídos se cargan de la caché mientras no cambien
+    importador = ImportadorProduccion(cache=CacheImportacion())
+    
+    # Detectar tipo de archivo
+    if datos_reales_path.endswith('.csv'):
+        # Por bloques: el export real trae una fila por cita y puede pesar varios GB
+        exito = importador.cargar_desde_csv_por_bloques(datos_reales_path)
+    else:
+        exito = importador.cargar_desde_excel(datos_reales_path)
+    
+    if exito:
+        print(f"[INFO] Datos reales importados desde: {datos_reales_path}")
+        print(importador.obtener_reporte())
+        return importador.iterar_datos_produccion()
 
+    print(f"[ERROR] No se pudieron importar datos reales:")
+    print(importador.obtener_reporte())
+    return None
+
+
+def _filas_produccion(config, hoja, datos_produccion):
+    """Genera las filas de la hoja PRODUCCION a partir de los registros de producción"""
     # Título
-    ws['A1'] = "PRODUCCIÓN MENSUAL Y FACTURACIÓN"
-    ws['A1'].font = Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER)
-    ws.merge_cells('A1:G1')
+    yield 1, [Celda("PRODUCCIÓN MENSUAL Y FACTURACIÓN", font=Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:G1')
 
     # Encabezados dinámicos desde el mapeo
     _m = config._mapper.get_columnas_estandar("produccion")
@@ -37,102 +97,49 @@ def crear_hoja_produccion(wb, datos_reales_path: str = None):
         _m.get("valor_unitario", "Valor Facturado Promedio"),
         _m.get("valor_total", "Total Facturado")
     ]
-
-    row = 3
-    for i, header in enumerate(headers):
-        col = chr(65 + i)
-        ws[f'{col}{row}'] = header
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-        ws[f'{col}{row}'].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-
-    # Determinar fuente de datos: reales o simulados
-    if datos_reales_path and Path(datos_reales_path).exists():
-        # Importar datos reales
-        from ..importador_produccion import ImportadorProduccion
-        
-        importador = ImportadorProduccion()
-        
-        # Detectar tipo de archivo
-        if datos_reales_path.endswith('.csv'):
-            exito = importador.cargar_desde_csv(datos_reales_path)
-        else:
-            exito = importador.cargar_desde_excel(datos_reales_path)
-        
-        if exito:
-            datos_produccion = importador.obtener_datos_produccion()
-            print(f"[INFO] Datos reales importados desde: {datos_reales_path}")
-            print(importador.obtener_reporte())
-        else:
-            print(f"[ERROR] No se pudieron importar datos reales:")
-            print(importador.obtener_reporte())
-            print("[WARN] Generando datos simulados como fallback...")
-            datos_produccion = _generar_datos_simulados()
-    else:
-        # Generar datos simulados
-        if datos_reales_path:
-            print(f"[WARN] Archivo no encontrado: {datos_reales_path}")
-            print("[INFO] Generando datos simulados...")
-        datos_produccion = _generar_datos_simulados()
+    yield 3, fila_encabezados(headers)
 
     # Presentación: escribir datos en Excel
     row = 4
+    total_cantidad = total_facturado = 0
     for dato in datos_produccion:
-        ws[f'A{row}'] = dato['codigo']
-        ws[f'B{row}'] = dato['servicio']
-        ws[f'C{row}'] = dato['sede']
-        ws[f'D{row}'] = dato['aseguradora']
-        ws[f'E{row}'] = dato['cantidad']
-        ws[f'F{row}'] = dato['valor_unitario']
-        ws[f'G{row}'] = f"=E{row}*F{row}"
-
-        # Aplicar estilos
-        aplicar_estilo_celda(ws[f'A{row}'], "calculo")
-        aplicar_estilo_celda(ws[f'B{row}'], "calculo")
-        aplicar_estilo_celda(ws[f'C{row}'], "calculo")
-        aplicar_estilo_celda(ws[f'D{row}'], "calculo")
-        aplicar_estilo_celda(ws[f'E{row}'], "input")
-        aplicar_estilo_celda(ws[f'F{row}'], "input")
-        aplicar_estilo_celda(ws[f'G{row}'], "resultado")
-
-        # Formato
-        ws[f'F{row}'].number_format = '$#,##0'
-        ws[f'G{row}'].number_format = '$#,##0'
-
+        facturado = dato['cantidad'] * dato['valor_unitario']
+        total_cantidad += dato['cantidad']
+        total_facturado += facturado
+        yield row, [
+            Celda(dato['codigo'], "calculo"),
+            Celda(dato['servicio'], "calculo"),
+            Celda(dato['sede'], "calculo"),
+            Celda(dato['aseguradora'], "calculo"),
+            Celda(dato['cantidad'], "input"),
+            Celda(dato['valor_unitario'], "input", '$#,##0'),
+            Celda(f"=E{row}*F{row}", "resultado", '$#,##0', calculado=facturado),
+        ]
         row += 1
 
     # Crear Tabla Oficial
-    crear_tabla(ws, "TablaProduccion", f"A3:G{row-1}")
+    hoja.tabla("TablaProduccion", f"A3:G{row-1}", headers)
 
     # Totales
-    ws[f'B{row}'] = "TOTAL FACTURACIÓN MENSUAL"
-    ws[f'B{row}'].font = Font(bold=True)
-    ws[f'E{row}'] = f"=SUM(E4:E{row-1})"
-    ws[f'E{row}'].font = Font(bold=True)
-    ws[f'G{row}'] = f"=SUM(G4:G{row-1})"
-    ws[f'G{row}'].font = Font(bold=True)
-    ws[f'G{row}'].number_format = '$#,##0'
-    font, fill, alignment, border = crear_estilo_header()
-    ws[f'B{row}'].fill = fill
-    ws[f'E{row}'].fill = fill
-    ws[f'G{row}'].fill = fill
-    ws.merge_cells(f'B{row}:D{row}')
-
-    ajustar_columnas(ws, {
-        'A': 12, 'B': 35, 'C': 22, 'D': 20, 'E': 12, 'F': 18, 'G': 18
-    })
+    yield row, {
+        'B': Celda("TOTAL FACTURACIÓN MENSUAL", "total"),
+        'E': Celda(f"=SUM(E4:E{row-1})", "total", calculado=total_cantidad),
+        'G': Celda(f"=SUM(G4:G{row-1})", "total", '$#,##0', calculado=total_facturado),
+    }
+    hoja.combinar(f'B{row}:D{row}')
 
 
-def _generar_datos_simulados():
+def _generar_datos_simulados(config=None):
     """
     Genera datos simulados de producción para demostración.
     
+    Args:
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+    
     Returns:
         Lista de diccionarios con datos de producción simulados
     """
+    config = config_en_uso(config)
     servicios_completos = config._mapper.get_servicios_completos() or []
     categorias_info = config._mapper.get_categorias_info() or {}
     servicios_dict = {s["nombre"]: s for s in servicios_completos}
@@ -0,0 +1,140 @@
+"""
+Generador de la hoja PRODUCCION_AGREGADA
+"""
+from typing import Any, Dict, Iterable, Iterator, List
+
+import pandas as pd
+from openpyxl.styles import Font
+from ..config import config_en_uso
+from ..escritor import EscritorHoja, Celda, fila_encabezados
+
+# Primera fila de datos. El par (servicio v, sede s) de config queda en la
+# fila FILA_DATOS + v * len(config.SEDES) + s, el mismo orden de COSTEO_SERVICIOS
+FILA_DATOS = 4
+
+
+class AgregadorProduccion:
+    """
+    Agrega registros de producción por (servicio, sede) con pandas.
+
+    Los registros pasan por `acumular` mientras la hoja PRODUCCION los
+    escribe; se agregan por bloques, de modo que la producción nunca se
+    materializa completa en memoria (compatible con el modo streaming).
+    """
+
+    def __init__(self, tamano_bloque: int = 50_000):
+        self.tamano_bloque = tamano_bloque
+        self._parciales: List[pd.DataFrame] = []
+
+    def acumular(self, registros: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Devuelve los mismos registros, agregándolos a medida que se consumen"""
+        bloque = []
+        for registro in registros:
+            bloque.append(registro)
+            if len(bloque) >= self.tamano_bloque:
+                self._agregar(bloque)
+                bloque = []
+            yield registro
+        self._agregar(bloque)
+
+    def _agregar(self, bloque: List[Dict[str, Any]]):
+        if not bloque:
+            return
+        df = pd.DataFrame.from_records(bloque, columns=['servicio', 'sede', 'cantidad', 'valor_unitario'])
+        df['facturado'] = df['cantidad'] * df['valor_unitario']
+        self._parciales.append(
+            df.groupby(['servicio', 'sede'], sort=False)[['cantidad', 'facturado']].sum()
+        )
+
+    def resultado(self, servicios: List[str], sedes: List[str]) -> pd.DataFrame:
+        """
+        Agregado final indexado por (servicio, sede).
+
+        Primero todos los pares servicios × sedes en ese orden (con ceros si no
+        hubo producción) y luego los pares que no están en la configuración.
+
+        Returns:
+            DataFrame con columnas volumen, precio (promedio ponderado por
+            cantidad) y facturado
+        """
+        if self._parciales:
+            total = pd.concat(self._parciales).groupby(level=['servicio', 'sede'], sort=False).sum()
+        else:
+            total = pd.DataFrame({'cantidad': [], 'facturado': []},
+                                 index=pd.MultiIndex.from_tuples([], names=['servicio', 'sede']))
+        return completar_agregado(total, servicios, sedes)
+
+
+def completar_agregado(total: pd.DataFrame, servicios: List[str], sedes: List[str]) -> pd.DataFrame:
+    """
+    Ordena los totales por (servicio, sede) como los espera la hoja.
+
+    Args:
+        total: cantidad y facturado indexados por (servicio, sede)
+        servicios: Servicios de la configuración, en orden
+        sedes: Sedes de la configuración, en orden
+
+    Returns:
+        DataFrame con volumen, precio y facturado (ver AgregadorProduccion.resultado)
+    """
+    orden = pd.MultiIndex.from_product([servicios, sedes], names=['servicio', 'sede'])
+    total = total.reindex(orden.append(total.index.difference(orden, sort=False)), fill_value=0)
+
+    total = total.rename(columns={'cantidad': 'volumen'})
+    total['precio'] = (total['facturado'] / total['volumen']).where(total['volumen'] > 0, 0.0)
+    return total[['volumen', 'precio', 'facturado']]
+
+
+def crear_hoja_produccion_agregada(wb, agregado: pd.DataFrame, config=None):
+    """
+    Crea la hoja PRODUCCION_AGREGADA: volumen, precio promedio ponderado y
+    facturación por (servicio, sede).
+
+    COSTEO_SERVICIOS lee el precio y el volumen de cada par directamente de su
+    fila, en lugar de recorrer PRODUCCION con AVERAGEIFS/SUMIFS.
+
+    Args:
+        wb: Workbook de openpyxl
+        agregado: Resultado de AgregadorProduccion.resultado
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+    """
+    config = config_en_uso(config)
+    hoja = EscritorHoja(wb, "PRODUCCION_AGREGADA", anchos={
+        'A': 35, 'B': 22, 'C': 14, 'D': 22, 'E': 20
+    })
+    hoja.escribir(_filas_produccion_agregada(config, hoja, agregado))
+    hoja.cerrar()
+
+
+def _filas_produccion_agregada(config, hoja, agregado):
+    """Genera las filas de la hoja PRODUCCION_AGREGADA"""
+    yield 1, [Celda("PRODUCCIÓN AGREGADA POR SERVICIO Y SEDE",
+                    font=Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:E1')
+    yield 2, [Celda("Calculada al generar el modelo a partir de PRODUCCION; no se recalcula al editar esa hoja.",
+                    font=Font(name=config.FUENTE_BASE, size=10, italic=True))]
+    hoja.combinar('A2:E2')
+
+    _m = config._mapper.get_columnas_estandar("produccion")
+    headers = [
+        _m.get("servicio", "Servicio"),
+        _m.get("centro", "Sede"),
+        "Volumen",
+        "Precio Promedio Ponderado",
+        _m.get("valor_total", "Total Facturado"),
+    ]
+    yield FILA_DATOS - 1, fila_encabezados(headers)
+
+    row = FILA_DATOS
+    for (servicio, sede), volumen, precio, facturado in zip(
+            agregado.index, agregado['volumen'], agregado['precio'], agregado['facturado']):
+        yield row, [
+            Celda(servicio, "calculo"),
+            Celda(sede, "calculo"),
+            Celda(volumen, "resultado", '#,##0'),
+            Celda(precio, "resultado", '$#,##0'),
+            Celda(facturado, "resultado", '$#,##0'),
+        ]
+        row += 1
+
+    hoja.tabla("TablaProduccionAgregada", f"A{FILA_DATOS - 1}:E{row-1}", headers)
@@ -0,0 +1,94 @@
+"""
+Generador de la hoja RESULTADOS (valores precalculados por el motor)
+"""
+from openpyxl.styles import Font
+from ..config import config_en_uso
+from ..escritor import EscritorHoja, Celda, fila_encabezados
+
+
+def crear_hoja_resultados(wb, resultados, config=None):
+    """
+    Crea la hoja RESULTADOS con los valores del motor de cálculo.
+
+    Acompaña a las hojas con fórmulas (modo "ambos"): quien lea el archivo con
+    pandas o una herramienta BI encuentra aquí los números sin recalcular.
+
+    Args:
+        wb: Workbook de openpyxl
+        resultados: ResultadosModelo (ver src.engine.calcular_modelo)
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+    """
+    config = config_en_uso(config)
+    hoja = EscritorHoja(wb, "RESULTADOS", anchos={
+        'A': 38, 'B': 22, 'C': 15, 'D': 15, 'E': 15,
+        'F': 18, 'G': 18, 'H': 18, 'I': 12, 'J': 15
+    })
+    hoja.escribir(_filas_resultados(config, hoja, resultados))
+    hoja.cerrar()
+
+
+def _filas_resultados(config, hoja, resultados):
+    """Genera las filas de la hoja RESULTADOS"""
+    yield 1, [Celda("RESULTADOS CALCULADOS (VALORES ESTÁTICOS)",
+                    font=Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:J1')
+    yield 2, [Celda("Calculados en Python con el mismo modelo que las fórmulas; no se recalculan al editar el libro.",
+                    font=Font(name=config.FUENTE_BASE, size=10, italic=True))]
+    hoja.combinar('A2:J2')
+
+    # Costeo unitario por servicio y sede
+    _m = config._mapper.get_columnas_estandar("costeo_servicios")
+    columnas = [
+        ('mo', "Costo MO Directa", '$#,##0'),
+        ('insumos', "Costo Insumos", '$#,##0'),
+        ('cif', "Costo CIF (Indirecto)", '$#,##0'),
+        ('total', "Costo Unitario Total", '$#,##0'),
+        ('precio', "Precio Venta Prom.", '$#,##0'),
+        ('margen_moneda', "Margen Unitario", '$#,##0'),
+        ('margen_pct', "Margen %", '0.0%'),
+        ('volumen', "Volumen Mes", '#,##0'),
+    ]
+    headers = [_m.get("servicio", "Servicio"), _m.get("centro", "Sede")]
+    headers += [_m.get(clave, nombre) for clave, nombre, _ in columnas]
+    yield 4, fila_encabezados(headers)
+
+    datos = resultados.datos
+    costeo = resultados.costeo
+    row = 5
+    for v, servicio in enumerate(datos.servicios):
+        for s, sede in enumerate(datos.sedes):
+            yield row, [Celda(servicio, "calculo"), Celda(sede, "calculo")] + [
+                Celda(float(costeo[clave][v, s]), "resultado", formato)
+                for clave, _, formato in columnas
+            ]
+            row += 1
+    hoja.tabla("TablaResultados", f"A4:J{row-1}", headers)
+
+    # Indicadores globales
+    row += 2
+    yield row, [Celda("INDICADORES GLOBALES", "seccion")]
+    hoja.combinar(f'A{row}:B{row}')
+
+    row += 1
+    yield row, fila_encabezados(["Indicador", "Valor"])
+
+    indicadores = [
+        ("Ingresos Operacionales (Facturación)", 'ingresos', '$#,##0'),
+        ("Total Costos Asignados (TDABC)", 'costos', '$#,##0'),
+        ("Costo MO Directa", 'costo_mo', '$#,##0'),
+        ("Costo Insumos", 'costo_insumos', '$#,##0'),
+        ("Costo CIF (Indirecto)", 'costo_cif', '$#,##0'),
+        ("UTILIDAD OPERACIONAL", 'utilidad', '$#,##0'),
+        ("MARGEN OPERACIONAL %", 'margen', '0.0%'),
+        ("Total Servicios Prestados", 'servicios_prestados', '#,##0'),
+        ("Precio Promedio por Servicio", 'precio_promedio', '$#,##0'),
+        ("Costo Promedio por Servicio", 'costo_promedio', '$#,##0'),
+        ("Capacidad Ociosa (Contable - Asignado)", 'capacidad_ociosa', '$#,##0'),
+        ("% Utilización de Capacidad", 'utilizacion', '0.0%'),
+    ]
+    for indicador, clave, formato in indicadores:
+        row += 1
+        yield row, [
+            Celda(indicador, "calculo"),
+            Celda(float(resultados.resumen[clave]), "resultado", formato),
+        ]
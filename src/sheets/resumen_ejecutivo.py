@@ -3,152 +3,138 @@ Generador de la hoja RESUMEN_EJECUTIVO
 """
 from openpyxl.styles import Font, Alignment
 from datetime import datetime
-from .. import config
-from ..styles import crear_estilo_header, aplicar_estilo_celda, ajustar_columnas
+from ..config import config_en_uso
+from ..escritor import EscritorHoja, Celda, fila_encabezados, valor_calculado
+from ..styles import crear_estilo_header
 
 
-def crear_hoja_resumen_ejecutivo(wb):
-    """Crea la hoja RESUMEN_EJECUTIVO con análisis consolidado y Conciliación"""
-    ws = wb.create_sheet("RESUMEN_EJECUTIVO")
-    
+def crear_hoja_resumen_ejecutivo(wb, resultados=None, config=None):
+    """
+    Crea la hoja RESUMEN_EJECUTIVO con análisis consolidado y Conciliación
+
+    Args:
+        wb: Workbook de openpyxl
+        resultados: ResultadosModelo opcional; si se entrega, las fórmulas se
+                    reemplazan por sus valores calculados
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+    """
+    config = config_en_uso(config)
+    hoja = EscritorHoja(wb, "RESUMEN_EJECUTIVO", anchos={
+        'A': 45, 'B': 20, 'C': 20, 'D': 20, 'E': 15, 'F': 15
+    }, valores=resultados is not None)
+    hoja.escribir(_filas_resumen_ejecutivo(config, hoja, resultados))
+    hoja.cerrar()
+
+
+def _filas_resumen_ejecutivo(config, hoja, resultados=None):
+    """Genera las filas de la hoja RESUMEN_EJECUTIVO"""
     # Título principal
-    ws['A1'] = config.NOMBRE_EMPRESA
-    ws['A1'].font = Font(name=config.FUENTE_BASE, size=18, bold=True, color=config.COLOR_HEADER)
-    ws.merge_cells('A1:F1')
-    
-    ws['A2'] = "RESUMEN EJECUTIVO - ANÁLISIS DE RENTABILIDAD (Enero)"
-    ws['A2'].font = Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER)
-    ws.merge_cells('A2:F2')
-    
-    ws['A3'] = f"Período: {datetime.now().strftime('%B %Y')}"
-    ws['A3'].font = Font(name=config.FUENTE_BASE, size=11, italic=True)
-    ws.merge_cells('A3:F3')
-    
+    yield 1, [Celda(config.NOMBRE_EMPRESA, font=Font(name=config.FUENTE_BASE, size=18, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:F1')
+
+    yield 2, [Celda("RESUMEN EJECUTIVO - ANÁLISIS DE RENTABILIDAD (Enero)",
+                    font=Font(name=config.FUENTE_BASE, size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A2:F2')
+
+    yield 3, [Celda(f"Período: {datetime.now().strftime('%B %Y')}", font=Font(name=config.FUENTE_BASE, size=11, italic=True))]
+    hoja.combinar('A3:F3')
+
     # SECCIÓN 1: Indicadores Globales
     row = 5
-    ws[f'A{row}'] = "INDICADORES GLOBALES DE RESULTADOS"
-    font, fill, alignment, border = crear_estilo_header()
-    ws[f'A{row}'].font = font
-    ws[f'A{row}'].fill = fill
-    ws.merge_cells(f'A{row}:B{row}')
-    
+    yield row, [Celda("INDICADORES GLOBALES DE RESULTADOS", "seccion")]
+    hoja.combinar(f'A{row}:B{row}')
+
     # Obtener mapeos para fórmulas
     m_p = config._mapper.get_columnas_estandar("produccion")
     m_c = config._mapper.get_columnas_estandar("costeo_servicios")
     m_i = config._mapper.get_columnas_estandar("contabilidad")
 
+    resumen = resultados and resultados.resumen
+
+    # (indicador, fórmula, formato, clave del resultado en el motor)
     indicadores = [
-        ("Ingresos Operacionales (Facturación)", f"=SUM(TablaProduccion[{m_p.get('valor_total', 'Total Facturado')}])", '$#,##0'),
-        ("Total Costos Asignados (TDABC)", f"=SUMPRODUCT(TablaCosteo[{m_c.get('total', 'Costo Unitario Total')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0'),
-        (f"   - {m_c.get('mo', 'Costo Personal Directo')}", f"=SUMPRODUCT(TablaCosteo[{m_c.get('mo', 'Costo MO Directa')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0'),
-        (f"   - {m_c.get('insumos', 'Costo Insumos')}", f"=SUMPRODUCT(TablaCosteo[{m_c.get('insumos', 'Costo Insumos')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0'),
-        (f"   - {m_c.get('cif', 'Costos Indirectos (CIF)')}", f"=SUMPRODUCT(TablaCosteo[{m_c.get('cif', 'Costo CIF (Indirecto)')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0'),
-        ("", "", ""),  # Línea en blanco
-        ("UTILIDAD OPERACIONAL", "=B7-B8", '$#,##0'),
-        ("MARGEN OPERACIONAL %", "=IF(B7>0,B13/B7,0)", '0.0%'),
-        ("", "", ""),  # Línea en blanco
-        ("Total Servicios Prestados", f"=SUM(TablaProduccion[{m_p.get('cantidad', 'Cantidad')}])", '#,##0'),
-        ("Precio Promedio por Servicio", "=IF(B16>0,B7/B16,0)", '$#,##0'),
-        ("Costo Promedio por Servicio", "=IF(B16>0,B8/B16,0)", '$#,##0'),
+        ("Ingresos Operacionales (Facturación)", f"=SUM(TablaProduccion[{m_p.get('valor_total', 'Total Facturado')}])", '$#,##0', 'ingresos'),
+        ("Total Costos Asignados (TDABC)", f"=SUMPRODUCT(TablaCosteo[{m_c.get('total', 'Costo Unitario Total')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0', 'costos'),
+        (f"   - {m_c.get('mo', 'Costo Personal Directo')}", f"=SUMPRODUCT(TablaCosteo[{m_c.get('mo', 'Costo MO Directa')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0', 'costo_mo'),
+        (f"   - {m_c.get('insumos', 'Costo Insumos')}", f"=SUMPRODUCT(TablaCosteo[{m_c.get('insumos', 'Costo Insumos')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0', 'costo_insumos'),
+        (f"   - {m_c.get('cif', 'Costos Indirectos (CIF)')}", f"=SUMPRODUCT(TablaCosteo[{m_c.get('cif', 'Costo CIF (Indirecto)')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", '$#,##0', 'costo_cif'),
+        ("", "", "", None),  # Línea en blanco
+        ("UTILIDAD OPERACIONAL", "=B7-B8", '$#,##0', 'utilidad'),
+        ("MARGEN OPERACIONAL %", "=IF(B7>0,B13/B7,0)", '0.0%', 'margen'),
+        ("", "", "", None),  # Línea en blanco
+        ("Total Servicios Prestados", f"=SUM(TablaProduccion[{m_p.get('cantidad', 'Cantidad')}])", '#,##0', 'servicios_prestados'),
+        ("Precio Promedio por Servicio", "=IF(B16>0,B7/B16,0)", '$#,##0', 'precio_promedio'),
+        ("Costo Promedio por Servicio", "=IF(B16>0,B8/B16,0)", '$#,##0', 'costo_promedio'),
     ]
 
-    
     row += 1
-    ws[f'A{row}'] = "Indicador"
-    ws[f'B{row}'] = "Valor"
-    ws[f'C{row}'] = ""
-    for col in ['A', 'B']:
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-    
-    for indicador, formula, formato in indicadores:
+    yield row, fila_encabezados(["Indicador", "Valor"])
+
+    for indicador, formula, formato, clave in indicadores:
         row += 1
-        ws[f'A{row}'] = indicador
-        ws[f'B{row}'] = formula
-        ws[f'B{row}'].number_format = formato
-        
-        if "MARGEN" in indicador:
-            aplicar_estilo_celda(ws[f'A{row}'], "resultado")
-            aplicar_estilo_celda(ws[f'B{row}'], "resultado")
-        else:
-            aplicar_estilo_celda(ws[f'A{row}'], "calculo")
-            aplicar_estilo_celda(ws[f'B{row}'], "calculo")
-        
+        tipo = "resultado" if "MARGEN" in indicador else "calculo"
         # Sangría visual
-        if indicador.startswith("   -"):
-             ws[f'A{row}'].alignment = Alignment(indent=2)
+        sangria = Alignment(indent=2) if indicador.startswith("   -") else None
+        yield row, [
+            Celda(indicador or None, tipo, alignment=sangria),
+            Celda(formula or None, tipo, formato or None,
+                  calculado=valor_calculado(resumen, clave) if clave else None),
+        ]
 
     # SECCIÓN 1.5: CONCILIACIÓN DE COSTOS
     row += 3
-    ws[f'A{row}'] = "CONCILIACIÓN DE COSTOS (CONTABLE VS DISTRIBUIDO)"
-    font, fill, alignment, border = crear_estilo_header()
-    ws[f'A{row}'].font = font
-    ws[f'A{row}'].fill = fill
-    ws.merge_cells(f'A{row}:C{row}')
-    
+    yield row, [Celda("CONCILIACIÓN DE COSTOS (CONTABLE VS DISTRIBUIDO)", "seccion")]
+    hoja.combinar(f'A{row}:C{row}')
+
     row += 1
-    ws[f'A{row}'] = f"Concepto (Fuente: COSTOS_INDIRECTOS)"
-    ws[f'B{row}'] = "Costo Contable (Gastado)"
-    ws[f'C{row}'] = "Costo Asignado (TDABC)"
-    
-    for col in ['A', 'B', 'C']:
-         ws[f'{col}{row}'].font = Font(name=config.FUENTE_BASE, size=10, bold=True)
-         ws[f'{col}{row}'].border = border
-         
+    fuente_sub = Font(name=config.FUENTE_BASE, size=10, bold=True)
+    borde = crear_estilo_header()[3]
+    yield row, [
+        Celda(titulo, font=fuente_sub, border=borde)
+        for titulo in ("Concepto (Fuente: COSTOS_INDIRECTOS)", "Costo Contable (Gastado)", "Costo Asignado (TDABC)")
+    ]
+
     # Cuentas dinámicas
-    cuenta_mp = config._mapper.get_cuenta_materia_prima().get("codigo", "7105")[:2] + "*"
-    cuenta_mo = config._mapper.get_cuenta_mano_obra().get("codigo", "7205")[:2] + "*"
+    valor_ind = m_i.get("valor", "Valor Mensual")
+    cuenta_ind = m_i.get("cuenta", "Código Cuenta")
+    conciliacion = [
+        ("Materia Prima / Insumos (71)", "71", m_c.get('insumos', 'Costo Insumos')),
+        ("Mano de Obra Directa (72)", "72", m_c.get('mo', 'Costo MO Directa')),
+        ("Costos Indirectos CIF (73)", "73", m_c.get('cif', 'Costo CIF (Indirecto)')),
+    ]
 
-    row += 1
-    ws[f'A{row}'] = "Materia Prima / Insumos (71)"
-    ws[f'B{row}'] = f'=SUMIFS(TablaIndirectos[{m_i.get("valor", "Valor Mensual")}],TablaIndirectos[{m_i.get("cuenta", "Código Cuenta")}],"71*")' 
-    ws[f'C{row}'] = f"=SUMPRODUCT(TablaCosteo[{m_c.get('insumos', 'Costo Insumos')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])"
-    
-    row += 1
-    ws[f'A{row}'] = "Mano de Obra Directa (72)"
-    ws[f'B{row}'] = f'=SUMIFS(TablaIndirectos[{m_i.get("valor", "Valor Mensual")}],TablaIndirectos[{m_i.get("cuenta", "Código Cuenta")}],"72*")'
-    ws[f'C{row}'] = f"=SUMPRODUCT(TablaCosteo[{m_c.get('mo', 'Costo MO Directa')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])"
-    
-    row += 1
-    ws[f'A{row}'] = "Costos Indirectos CIF (73)"
-    ws[f'B{row}'] = f'=SUMIFS(TablaIndirectos[{m_i.get("valor", "Valor Mensual")}],TablaIndirectos[{m_i.get("cuenta", "Código Cuenta")}],"73*")'
-    ws[f'C{row}'] = f"=SUMPRODUCT(TablaCosteo[{m_c.get('cif', 'Costo CIF (Indirecto)')}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])"
-    
-    # Aplicar formatos
-    for r in range(row-2, row+1):
-        for col in ['B', 'C']:
-            ws[f'{col}{r}'].number_format = '$#,##0'
-            aplicar_estilo_celda(ws[f'{col}{r}'], "calculo")
-        aplicar_estilo_celda(ws[f'A{r}'])
+    r_start = row + 1
+    for concepto, clase, columna_costeo in conciliacion:
+        row += 1
+        yield row, [
+            Celda(concepto),
+            Celda(f'=SUMIFS(TablaIndirectos[{valor_ind}],TablaIndirectos[{cuenta_ind}],"{clase}*")', "calculo", '$#,##0',
+                  calculado=resumen and resumen['contable'][clase]),
+            Celda(f"=SUMPRODUCT(TablaCosteo[{columna_costeo}],TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}])", "calculo", '$#,##0',
+                  calculado=resumen and resumen['asignado'][clase]),
+        ]
+    r_end = row
 
     row += 1
-    ws[f'A{row}'] = "DIFERENCIA (CAPACIDAD OCIOSA)"
-    ws[f'A{row}'].font = Font(name=config.FUENTE_BASE, bold=True, color="FF0000")
-    
-    r_start = row-3
-    r_end = row-1
-    ws[f'B{row}'] = f"=SUM(B{r_start}:B{r_end})-SUM(C{r_start}:C{r_end})"
-    
-    ws.merge_cells(f'B{row}:C{row}')
-    ws[f'B{row}'].alignment = Alignment(horizontal="center")
-    ws[f'B{row}'].number_format = '$#,##0'
-    
+    yield row, [
+        Celda("DIFERENCIA (CAPACIDAD OCIOSA)", font=Font(name=config.FUENTE_BASE, bold=True, color="FF0000")),
+        Celda(f"=SUM(B{r_start}:B{r_end})-SUM(C{r_start}:C{r_end})", formato='$#,##0',
+              alignment=Alignment(horizontal="center"), calculado=valor_calculado(resumen, 'capacidad_ociosa')),
+    ]
+    hoja.combinar(f'B{row}:C{row}')
+
     # Agregar % de utilización de capacidad
     row += 1
-    ws[f'A{row}'] = "% UTILIZACIÓN DE CAPACIDAD"
-    ws[f'A{row}'].font = Font(name=config.FUENTE_BASE, bold=True, color="0070C0")
-    ws[f'B{row}'] = f"=IF(SUM(B{r_start}:B{r_end})>0,SUM(C{r_start}:C{r_end})/SUM(B{r_start}:B{r_end}),0)"
-    ws[f'B{row}'].number_format = '0.0%'
-    ws.merge_cells(f'B{row}:C{row}')
-    ws[f'B{row}'].alignment = Alignment(horizontal="center")
-    aplicar_estilo_celda(ws[f'B{row}'], "resultado")
-    
+    yield row, [
+        Celda("% UTILIZACIÓN DE CAPACIDAD", font=Font(name=config.FUENTE_BASE, bold=True, color="0070C0")),
+        Celda(f"=IF(SUM(B{r_start}:B{r_end})>0,SUM(C{r_start}:C{r_end})/SUM(B{r_start}:B{r_end}),0)", "resultado", '0.0%',
+              alignment=Alignment(horizontal="center"), calculado=valor_calculado(resumen, 'utilizacion')),
+    ]
+    hoja.combinar(f'B{row}:C{row}')
+
     row += 1
-    ws[f'A{row}'] = "NOTA IMPORTANTE SOBRE CAPACIDAD OCIOSA:"
-    ws[f'A{row}'].font = Font(name=config.FUENTE_BASE, bold=True, color="CC0000")
-    
+    yield row, [Celda("NOTA IMPORTANTE SOBRE CAPACIDAD OCIOSA:", font=Font(name=config.FUENTE_BASE, bold=True, color="CC0000"))]
+
     row += 1
     nota = (
         "1. Diferencia en '72' (Mano de Obra): CAPACIDAD OCIOSA DE PERSONAL. "
@@ -158,101 +144,60 @@ def crear_hoja_resumen_ejecutivo(wb):
         "3. Valores Positivos (+) = Pérdida por Capacidad Ociosa (Gasto > Uso).\n"
         "4. Valores Negativos (-) = Sobre-ejecución / Eficiencia superior a la estándar."
     )
-    ws[f'A{row}'] = nota
-    ws[f'A{row}'].font = Font(name=config.FUENTE_BASE, italic=True, size=9)
-    ws[f'A{row}'].alignment = Alignment(wrap_text=True)
-    ws.row_dimensions[row].height = 75
-    ws.merge_cells(f'A{row}:F{row}')
+    hoja.alto_fila(row, 75)
+    yield row, [Celda(nota, font=Font(name=config.FUENTE_BASE, italic=True, size=9), alignment=Alignment(wrap_text=True))]
+    hoja.combinar(f'A{row}:F{row}')
 
     # SECCIÓN 2: RENTABILIDAD POR SERVICIO
     row += 3
-    ws[f'A{row}'] = "RENTABILIDAD POR SERVICIO (TODOS)"
-    font, fill, alignment, border = crear_estilo_header()
-    ws[f'A{row}'].font = font
-    ws[f'A{row}'].fill = fill
-    ws.merge_cells(f'A{row}:F{row}')
-    
+    yield row, [Celda("RENTABILIDAD POR SERVICIO (TODOS)", "seccion")]
+    hoja.combinar(f'A{row}:F{row}')
+
     row += 1
-    ws[f'A{row}'] = "Servicio"
-    ws[f'B{row}'] = "Volumen"
-    ws[f'C{row}'] = "Costo Total"
-    ws[f'D{row}'] = "Facturación Total"
-    ws[f'E{row}'] = "Margen Total"
-    ws[f'F{row}'] = "Margen %"
-    for col in ['A', 'B', 'C', 'D', 'E', 'F']:
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-    
+    yield row, fila_encabezados(["Servicio", "Volumen", "Costo Total", "Facturación Total", "Margen Total", "Margen %"])
+
     # Listar TODOS los servicios
-    for servicio in config.SERVICIOS:
+    por_servicio = resumen and resumen['por_servicio']
+    for v, servicio in enumerate(config.SERVICIOS):
         row += 1
-        ws[f'A{row}'] = servicio
-        ws[f'B{row}'] = f"=SUMIFS(TablaProduccion[{m_p.get('cantidad', 'Cantidad')}],TablaProduccion[{m_p.get('servicio', 'Servicio')}],A{row})"
-        ws[f'C{row}'] = f"=SUMPRODUCT((TablaCosteo[{m_c.get('servicio', 'Servicio')}]=A{row})*(TablaCosteo[{m_c.get('total', 'Costo Unitario Total')}])*(TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}]))"
-        ws[f'D{row}'] = f"=SUMIFS(TablaProduccion[{m_p.get('valor_total', 'Total Facturado')}],TablaProduccion[{m_p.get('servicio', 'Servicio')}],A{row})"
-        ws[f'E{row}'] = f"=D{row}-C{row}"
-        ws[f'F{row}'] = f"=IF(D{row}>0,E{row}/D{row},0)"
-        
-        for col in ['A']:
-            aplicar_estilo_celda(ws[f'{col}{row}'], "calculo")
-        for col in ['B', 'C', 'D', 'E', 'F']:
-            aplicar_estilo_celda(ws[f'{col}{row}'], "resultado")
-        
-        ws[f'B{row}'].number_format = '#,##0'
-        ws[f'C{row}'].number_format = '$#,##0'
-        ws[f'D{row}'].number_format = '$#,##0'
-        ws[f'E{row}'].number_format = '$#,##0'
-        ws[f'F{row}'].number_format = '0.0%'
-    
+        yield row, [
+            Celda(servicio, "calculo"),
+            Celda(f"=SUMIFS(TablaProduccion[{m_p.get('cantidad', 'Cantidad')}],TablaProduccion[{m_p.get('servicio', 'Servicio')}],A{row})", "resultado", '#,##0',
+                  calculado=valor_calculado(por_servicio, 'volumen', v)),
+            Celda(f"=SUMPRODUCT((TablaCosteo[{m_c.get('servicio', 'Servicio')}]=A{row})*(TablaCosteo[{m_c.get('total', 'Costo Unitario Total')}])*(TablaCosteo[{m_c.get('volumen', 'Volumen Mes')}]))", "resultado", '$#,##0',
+                  calculado=valor_calculado(por_servicio, 'costo', v)),
+            Celda(f"=SUMIFS(TablaProduccion[{m_p.get('valor_total', 'Total Facturado')}],TablaProduccion[{m_p.get('servicio', 'Servicio')}],A{row})", "resultado", '$#,##0',
+                  calculado=valor_calculado(por_servicio, 'facturacion', v)),
+            Celda(f"=D{row}-C{row}", "resultado", '$#,##0', calculado=valor_calculado(por_servicio, 'margen', v)),
+            Celda(f"=IF(D{row}>0,E{row}/D{row},0)", "resultado", '0.0%', calculado=valor_calculado(por_servicio, 'margen_pct', v)),
+        ]
+
     # SECCIÓN 3: Análisis por Sede
     row += 3
-    ws[f'A{row}'] = "ANÁLISIS POR SEDE"
-    font, fill, alignment, border = crear_estilo_header()
-    ws[f'A{row}'].font = font
-    ws[f'A{row}'].fill = fill
-    ws.merge_cells(f'A{row}:E{row}')
-    
+    yield row, [Celda("ANÁLISIS POR SEDE", "seccion")]
+    hoja.combinar(f'A{row}:E{row}')
+
     row += 1
-    ws[f'A{row}'] = m_p.get("centro", "Sede")
-    ws[f'B{row}'] = "Facturación"
-    ws[f'C{row}'] = "Costos"
-    ws[f'D{row}'] = "Margen"
-    ws[f'E{row}'] = "Margen %"
-    for col in ['A', 'B', 'C', 'D', 'E']:
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-    
-    for sede in config.SEDES:
+    yield row, fila_encabezados([m_p.get("centro", "Sede"), "Facturación", "Costos", "Margen", "Margen %"])
+
+    por_sede = resumen and resumen['por_sede']
+    for s, sede in enumerate(config.SEDES):
         row += 1
-        ws[f'A{row}'] = sede
-        ws[f'B{row}'] = f'=SUMIFS(TablaProduccion[{m_p.get("valor_total", "Total Facturado")}],TablaProduccion[{m_p.get("centro", "Sede")}],A{row})'
-        ws[f'C{row}'] = f'=SUMPRODUCT((TablaCosteo[{m_c.get("centro", "Sede")}]=A{row})*(TablaCosteo[{m_c.get("total", "Costo Unitario Total")}])*(TablaCosteo[{m_c.get("volumen", "Volumen Mes")}]))'
-        ws[f'D{row}'] = f'=B{row}-C{row}'
-        ws[f'E{row}'] = f'=IF(B{row}>0,D{row}/B{row},0)'
-        
-        for col in ['A']:
-            aplicar_estilo_celda(ws[f'{col}{row}'], "calculo")
-        for col in ['B', 'C', 'D', 'E']:
-            aplicar_estilo_celda(ws[f'{col}{row}'], "resultado")
-        
-        ws[f'B{row}'].number_format = '$#,##0'
-        ws[f'C{row}'].number_format = '$#,##0'
-        ws[f'D{row}'].number_format = '$#,##0'
-        ws[f'E{row}'].number_format = '0.0%'
-    
+        yield row, [
+            Celda(sede, "calculo"),
+            Celda(f'=SUMIFS(TablaProduccion[{m_p.get("valor_total", "Total Facturado")}],TablaProduccion[{m_p.get("centro", "Sede")}],A{row})', "resultado", '$#,##0',
+                  calculado=valor_calculado(por_sede, 'facturacion', s)),
+            Celda(f'=SUMPRODUCT((TablaCosteo[{m_c.get("centro", "Sede")}]=A{row})*(TablaCosteo[{m_c.get("total", "Costo Unitario Total")}])*(TablaCosteo[{m_c.get("volumen", "Volumen Mes")}]))', "resultado", '$#,##0',
+                  calculado=valor_calculado(por_sede, 'costos', s)),
+            Celda(f'=B{row}-C{row}', "resultado", '$#,##0', calculado=valor_calculado(por_sede, 'margen', s)),
+            Celda(f'=IF(B{row}>0,D{row}/B{row},0)', "resultado", '0.0%', calculado=valor_calculado(por_sede, 'margen_pct', s)),
+        ]
+
     # SECCIÓN 4: Notas importantes
     row += 3
-    ws[f'A{row}'] = "NOTAS ADICIONALES:"
-    ws[f'A{row}'].font = Font(name=config.FUENTE_BASE, bold=True)
-    ws[f'A{row}'].alignment = Alignment(vertical='top')
-    ws.merge_cells(f'A{row}:F{row+3}')
-    ws[f'A{row}'] = "1. El modelo utiliza referencias directas para cálculo de materiales, asegurando integridad referencial.\n2. La Tabla 'COSTOS_INDIRECTOS' centraliza toda la contabilidad (Insumos 71 + MO 72 + Indirectos 73).\n3. La Capacidad Ociosa refleja la diferencia entre los recursos pagados y los consumidos."
-    ws[f'A{row}'].alignment = Alignment(wrap_text=True, vertical='top')
-                     
-    ajustar_columnas(ws, {
-        'A': 45, 'B': 20, 'C': 20, 'D': 20, 'E': 15, 'F': 15
-    })
+    yield row, [Celda(
+        "1. El modelo utiliza referencias directas para cálculo de materiales, asegurando integridad referencial.\n2. La Tabla 'COSTOS_INDIRECTOS' centraliza toda la contabilidad (Insumos 71 + MO 72 + Indirectos 73).\n3. La Capacidad Ociosa refleja la diferencia entre los recursos pagados y los consumidos.",
+        font=Font(name=config.FUENTE_BASE, bold=True),
+        alignment=Alignment(wrap_text=True, vertical='top')
+    )]
+    hoja.combinar(f'A{row}:F{row+3}')
@@ -1,22 +1,42 @@
 """
 Generador de la hoja SERVICIOS
 """
-from openpyxl.styles import Font, Alignment
-from openpyxl.utils import get_column_letter
-from .. import config
-from ..styles import crear_estilo_header, aplicar_estilo_celda, ajustar_columnas
+from openpyxl.styles import Font
+from ..config import config_en_uso
+from ..escritor import EscritorHoja, Celda, fila_encabezados
 from ..generators.servicios_generator import generar_datos_servicios
 
 
-def crear_hoja_servicios(wb):
-    """Crea la hoja SERVICIOS con catálogo de servicios"""
-    ws = wb.create_sheet("SERVICIOS")
-    
+def crear_hoja_servicios(wb, config=None, catalogo=None):
+    """
+    Crea la hoja SERVICIOS con catálogo de servicios
+
+    Args:
+        wb: Workbook de openpyxl
+        config: ConfigSnapshot de la empresa (por defecto la configuración en uso)
+        catalogo: Servicios en el formato de generar_datos_servicios (ej: leídos
+                  del almacén); por defecto se generan desde la configuración
+    """
+    config = config_en_uso(config)
+    hoja = EscritorHoja(wb, "SERVICIOS", anchos={
+        'A': 12, 'B': 38, 'C': 25, 'D': 15, 'E': 18, 'F': 12
+    })
+    hoja.escribir(_filas_servicios(config, hoja, catalogo))
+    hoja.cerrar()
+
+
+def catalogo_servicios(config) -> list:
+    """Catálogo de servicios de la configuración (formato de generar_datos_servicios)"""
+    return generar_datos_servicios(config._mapper.get_servicios_completos() or [],
+                                   config._mapper.get_categorias_info() or {})
+
+
+def _filas_servicios(config, hoja, catalogo=None):
+    """Genera las filas de la hoja SERVICIOS"""
     # Título
-    ws['A1'] = "CATÁLOGO DE SERVICIOS"
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER)
-    ws.merge_cells('A1:F1')
-    
+    yield 1, [Celda("CATÁLOGO DE SERVICIOS", font=Font(name='Calibri', size=14, bold=True, color=config.COLOR_HEADER))]
+    hoja.combinar('A1:F1')
+
     # Encabezados dinámicos desde el mapeo
     _m = config._mapper.get_columnas_estandar("servicios")
     headers = [
@@ -27,38 +47,21 @@ def crear_hoja_servicios(wb):
         _m.get("insumos", "Requiere Insumos"),
         _m.get("estado", "Estado")
     ]
-    
-    row = 3
-    for i, header in enumerate(headers):
-        col = get_column_letter(i + 1)
-        ws[f'{col}{row}'] = header
-        font, fill, alignment, border = crear_estilo_header()
-        ws[f'{col}{row}'].font = font
-        ws[f'{col}{row}'].fill = fill
-        ws[f'{col}{row}'].border = border
-        ws[f'{col}{row}'].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    
+    yield 3, fila_encabezados(headers)
+
     # Generar datos usando el generador (lógica de negocio separada)
-    servicios_completos = config._mapper.get_servicios_completos() or []
-    categorias_info = config._mapper.get_categorias_info() or {}
-    servicios_data = generar_datos_servicios(servicios_completos, categorias_info)
-    
+    servicios_data = catalogo if catalogo is not None else catalogo_servicios(config)
+
     # Presentación: escribir datos en Excel
     row = 4
     for servicio in servicios_data:
-        ws[f'A{row}'] = servicio['codigo']
-        ws[f'B{row}'] = servicio['nombre']
-        ws[f'C{row}'] = servicio['categoria']
-        ws[f'D{row}'] = servicio['complejidad']
-        ws[f'E{row}'] = "Sí" if servicio['requiere_insumos'] else "No"
-        ws[f'F{row}'] = servicio['estado']
-        
-        # Aplicar estilos
-        for col in ['A', 'B', 'C', 'D', 'E', 'F']:
-            aplicar_estilo_celda(ws[f'{col}{row}'], "calculo")
-        
+        valores = [
+            servicio['codigo'],
+            servicio['nombre'],
+            servicio['categoria'],
+            servicio['complejidad'],
+            "Sí" if servicio['requiere_insumos'] else "No",
+            servicio['estado'],
+        ]
+        yield row, [Celda(v, "calculo") for v in valores]
         row += 1
-    
-    ajustar_columnas(ws, {
-        'A': 12, 'B': 38, 'C': 25, 'D': 15, 'E': 18, 'F': 12
-    })
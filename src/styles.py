@@ -1,32 +1,118 @@
 """
 Utilidades de estilos para Excel
+
+Los estilos del modelo se registran una sola vez por libro como NamedStyle
+y las celdas los referencian por nombre. Así openpyxl no tiene que crear y
+deduplicar un Font/Fill/Border/Alignment nuevo por cada celda.
 """
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from . import config
 
 
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+# Objetos de estilo compartidos (se crean una sola vez por proceso)
+_FUENTE_HEADER = Font(name=config.FUENTE_BASE, size=11, bold=True, color="FFFFFF")
+_FUENTE_TOTAL = Font(bold=True)
+_RELLENO_HEADER = _relleno(config.COLOR_HEADER)
+_ALINEACION_HEADER = Alignment(horizontal="center", vertical="center", wrap_text=True)
+_BORDE_FINO = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
+RELLENOS = {
+    "input": _relleno(config.COLOR_INPUT),
+    "calculo": _relleno(config.COLOR_CALCULO),
+    "resultado": _relleno(config.COLOR_RESULTADO),
+}
+
+# Formatos numéricos con nombre propio en el registro de estilos
+FORMATOS = {
+    '$#,##0': "moneda",
+    '$#,##0.00': "moneda_decimal",
+    '#,##0': "entero",
+    '#,##0.0': "decimal",
+    '0%': "porcentaje",
+    '0.0%': "porcentaje_decimal",
+}
+
+# Tipos de celda que admiten combinación con un formato numérico
+_TIPOS_CON_FORMATO = ("input", "calculo", "resultado", "total")
+
+
 def crear_estilo_header():
-    """Crea el estilo para encabezados"""
-    font = Font(name=config.FUENTE_BASE, size=11, bold=True, color="FFFFFF")
-    fill = PatternFill(start_color=config.COLOR_HEADER, end_color=config.COLOR_HEADER, fill_type="solid")
-    alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    return font, fill, alignment, border
+    """Devuelve (font, fill, alignment, border) del estilo de encabezados"""
+    return _FUENTE_HEADER, _RELLENO_HEADER, _ALINEACION_HEADER, _BORDE_FINO
+
+
+def _definir_estilos():
+    """Construye la lista de NamedStyle del modelo"""
+    estilos = [
+        NamedStyle(name="header", font=_FUENTE_HEADER, fill=_RELLENO_HEADER,
+                   alignment=_ALINEACION_HEADER, border=_BORDE_FINO),
+        NamedStyle(name="seccion", font=_FUENTE_HEADER, fill=_RELLENO_HEADER),
+        NamedStyle(name="total", font=_FUENTE_TOTAL, fill=_RELLENO_HEADER),
+    ]
+    for tipo, relleno in RELLENOS.items():
+        estilos.append(NamedStyle(name=tipo, fill=relleno))
+
+    base = {estilo.name: estilo for estilo in estilos}
+    for formato, sufijo in FORMATOS.items():
+        # Formato sin relleno (celdas "normal")
+        estilos.append(NamedStyle(name=sufijo, number_format=formato))
+        for tipo in _TIPOS_CON_FORMATO:
+            estilos.append(NamedStyle(
+                name=f"{tipo}_{sufijo}",
+                font=base[tipo].font,
+                fill=base[tipo].fill,
+                number_format=formato
+            ))
+    return estilos
+
+
+def registrar_estilos(wb):
+    """
+    Registra los estilos con nombre del modelo en el libro.
+
+    Es idempotente: si el libro ya los tiene, no hace nada.
+    """
+    if "header" in wb.named_styles:
+        return
+    for estilo in _definir_estilos():
+        wb.add_named_style(estilo)
+
+
+def nombre_estilo(tipo=None, formato=None):
+    """
+    Resuelve el NamedStyle registrado para un tipo de celda y un formato.
+
+    Returns:
+        (nombre, formato_pendiente): nombre del estilo (o None) y el formato
+        numérico que no quedó cubierto por el estilo y hay que fijar aparte.
+    """
+    if tipo == "normal":
+        tipo = None
+    sufijo = FORMATOS.get(formato) if formato else None
+
+    if tipo is None:
+        if sufijo:
+            return sufijo, None
+        return None, formato
+    if sufijo and tipo in _TIPOS_CON_FORMATO:
+        return f"{tipo}_{sufijo}", None
+    return tipo, formato
 
 
 def aplicar_estilo_celda(cell, tipo="normal"):
     """Aplica estilo a una celda según su tipo"""
-    if tipo == "input":
-        cell.fill = PatternFill(start_color=config.COLOR_INPUT, end_color=config.COLOR_INPUT, fill_type="solid")
-    elif tipo == "calculo":
-        cell.fill = PatternFill(start_color=config.COLOR_CALCULO, end_color=config.COLOR_CALCULO, fill_type="solid")
-    elif tipo == "resultado":
-        cell.fill = PatternFill(start_color=config.COLOR_RESULTADO, end_color=config.COLOR_RESULTADO, fill_type="solid")
+    relleno = RELLENOS.get(tipo)
+    if relleno is not None:
+        cell.fill = relleno
 
 
 def ajustar_columnas(ws, columnas_info):
@@ -1,11 +1,19 @@
 """
 Utilidades generales del modelo TDABC
 """
-from openpyxl.worksheet.table import Table, TableStyleInfo
+import warnings
+from openpyxl.utils import range_boundaries
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
 
 
-def crear_tabla(ws, nombre_tabla, rango_datos):
-    """Convierte un rango de celdas en una Tabla de Excel oficial"""
+def crear_tabla(ws, nombre_tabla, rango_datos, encabezados=None):
+    """
+    Convierte un rango de celdas en una Tabla de Excel oficial.
+
+    Si se pasan los encabezados, los nombres de columna se fijan aquí mismo
+    (necesario en hojas write-only, donde openpyxl no puede releer la fila
+    de encabezados al guardar).
+    """
     tab = Table(displayName=nombre_tabla, ref=rango_datos)
     style = TableStyleInfo(
         name="TableStyleMedium9",
@@ -15,5 +23,17 @@ def crear_tabla(ws, nombre_tabla, rango_datos):
         showColumnStripes=False
     )
     tab.tableStyleInfo = style
-    ws.add_table(tab)
+    if encabezados:
+        min_col, _, max_col, _ = range_boundaries(rango_datos)
+        nombres = [str(nombre) for nombre in encabezados]
+        tab.tableColumns = [
+            TableColumn(id=idx, name=nombres[idx - 1] if idx <= len(nombres) else f"Column{idx}")
+            for idx in range(1, max_col - min_col + 2)
+        ]
+        with warnings.catch_warnings():
+            # openpyxl avisa siempre en write-only aunque las columnas ya estén definidas
+            warnings.filterwarnings("ignore", message="In write-only mode")
+            ws.add_table(tab)
+    else:
+        ws.add_table(tab)
     return tab
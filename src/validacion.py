@@ -0,0 +1,179 @@
+"""
+Validación columnar de datos importados.
+
+Cada regla se evalúa sobre la columna completa como una máscara booleana de
+filas inválidas (sin recorrer filas en Python). El resultado es un
+ReporteValidacion con el conteo de filas inválidas por regla y los índices
+de las primeras filas de cada una; un mismo reporte puede acumular varios
+bloques de un archivo leído por partes.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+
+class Regla:
+    """Regla de validación sobre una columna"""
+
+    def __init__(self, nombre: str, columna: str, mensaje: str,
+                 invalidas: Callable[[pd.Series], pd.Series], requerida: bool = True):
+        """
+        Args:
+            nombre: Identificador de la regla en el reporte
+            columna: Columna (ya normalizada) que valida
+            mensaje: Descripción del error (ej: "cantidad debe ser mayor a 0")
+            invalidas: Función que recibe la columna y devuelve la máscara de filas inválidas
+            requerida: Si es False y la columna no existe, la regla no se evalúa;
+                       si es True, todas las filas se cuentan como inválidas
+        """
+        self.nombre = nombre
+        self.columna = columna
+        self.mensaje = mensaje
+        self.invalidas = invalidas
+        self.requerida = requerida
+
+    @classmethod
+    def positivo(cls, columna: str, mensaje: str = None, **kwargs) -> "Regla":
+        """Valores numéricos mayores a 0 (vacíos y textos no numéricos son inválidos)"""
+        return cls(f"{columna}_positivo", columna, mensaje or f"{columna} debe ser mayor a 0",
+                   lambda serie: ~(_numerica(serie) > 0), **kwargs)
+
+    @classmethod
+    def no_negativo(cls, columna: str, mensaje: str = None, **kwargs) -> "Regla":
+        """Valores numéricos mayores o iguales a 0"""
+        return cls(f"{columna}_no_negativo", columna, mensaje or f"{columna} no puede ser negativo",
+                   lambda serie: ~(_numerica(serie) >= 0), **kwargs)
+
+    @classmethod
+    def obligatorio(cls, columna: str, mensaje: str = None, **kwargs) -> "Regla":
+        """Valores no vacíos (ni nulos ni texto en blanco)"""
+        return cls(f"{columna}_obligatorio", columna, mensaje or f"{columna} es obligatorio",
+                   _vacias, **kwargs)
+
+    def evaluar(self, df: pd.DataFrame) -> Optional[pd.Series]:
+        """Máscara de filas inválidas alineada con el índice de `df` (None si no aplica)"""
+        if self.columna not in df.columns:
+            if not self.requerida:
+                return None
+            return pd.Series(True, index=df.index)
+        return self.invalidas(df[self.columna]).fillna(True).astype(bool)
+
+
+def _numerica(serie: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    return pd.to_numeric(serie, errors='coerce')
+
+
+def _vacias(serie: pd.Series) -> pd.Series:
+    vacias = serie.isna()
+    if not pd.api.types.is_numeric_dtype(serie):
+        vacias |= serie.astype(str).str.strip().eq('')
+    return vacias
+
+
+class ReporteValidacion:
+    """Conteo de filas inválidas por regla y primeras filas de cada una"""
+
+    def __init__(self, max_ejemplos: int = 10, desplazamiento_fila: int = 2):
+        """
+        Args:
+            max_ejemplos: Índices de fila que se guardan por regla
+            desplazamiento_fila: Se suma al índice para mostrar la fila del archivo
+                                 (2: encabezado en la fila 1 e índice desde 0)
+        """
+        self.max_ejemplos = max_ejemplos
+        self.desplazamiento_fila = desplazamiento_fila
+        self.filas_validadas = 0
+        self.conteos: Dict[str, int] = {}
+        self.ejemplos: Dict[str, List[Any]] = {}
+        self._mensajes: Dict[str, str] = {}
+
+    def registrar(self, regla: Regla, invalidas: pd.Series):
+        """Suma las filas inválidas de una regla en un bloque"""
+        cantidad = int(invalidas.sum())
+        if not cantidad:
+            return
+        self.conteos[regla.nombre] = self.conteos.get(regla.nombre, 0) + cantidad
+        self._mensajes[regla.nombre] = regla.mensaje
+        ejemplos = self.ejemplos.setdefault(regla.nombre, [])
+        faltan = self.max_ejemplos - len(ejemplos)
+        if faltan > 0:
+            ejemplos.extend(invalidas.index[invalidas.to_numpy()][:faltan].tolist())
+
+    @property
+    def valido(self) -> bool:
+        return not self.conteos
+
+    @property
+    def total_errores(self) -> int:
+        """Errores por regla sumados (una fila puede fallar varias reglas)"""
+        return sum(self.conteos.values())
+
+    def mensajes(self) -> List[str]:
+        """Una línea por regla incumplida, con las primeras filas del archivo"""
+        lineas = []
+        for nombre, cantidad in self.conteos.items():
+            filas = ", ".join(str(indice + self.desplazamiento_fila) for indice in self.ejemplos[nombre])
+            if cantidad > len(self.ejemplos[nombre]):
+                filas += ", ..."
+            lineas.append(f"{self._mensajes[nombre]}: {cantidad} fila(s) (filas {filas})")
+        return lineas
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any], **kwargs) -> "ReporteValidacion":
+        """Reporte reconstruido desde como_dict (ej: el guardado con la caché de importación)"""
+        reporte = cls(**kwargs)
+        reporte.filas_validadas = datos['filas_validadas']
+        for nombre, regla in datos['reglas'].items():
+            reporte.conteos[nombre] = regla['conteo']
+            reporte.ejemplos[nombre] = list(regla['filas'])
+            reporte._mensajes[nombre] = regla['mensaje']
+        return reporte
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Reporte estructurado (serializable a JSON)"""
+        return {
+            'filas_validadas': self.filas_validadas,
+            'total_errores': self.total_errores,
+            'reglas': {
+                nombre: {
+                    'mensaje': self._mensajes[nombre],
+                    'conteo': cantidad,
+                    'filas': list(self.ejemplos[nombre]),
+                }
+                for nombre, cantidad in self.conteos.items()
+            },
+        }
+
+
+class ValidadorColumnar:
+    """Conjunto de reglas que se aplican juntas a un DataFrame"""
+
+    def __init__(self, reglas: Iterable[Regla], max_ejemplos: int = 10):
+        self.reglas = list(reglas)
+        self.max_ejemplos = max_ejemplos
+
+    def nuevo_reporte(self) -> ReporteValidacion:
+        return ReporteValidacion(self.max_ejemplos)
+
+    def validar(self, df: pd.DataFrame, reporte: ReporteValidacion = None) -> ReporteValidacion:
+        """
+        Evalúa todas las reglas sobre `df`.
+
+        Args:
+            df: Datos con columnas normalizadas. El índice identifica la fila
+                (en lecturas por bloques pandas lo mantiene continuo)
+            reporte: Reporte a acumular (por ejemplo, el de los bloques anteriores)
+
+        Returns:
+            El reporte con los errores de este DataFrame sumados
+        """
+        if reporte is None:
+            reporte = self.nuevo_reporte()
+        reporte.filas_validadas += len(df)
+        for regla in self.reglas:
+            invalidas = regla.evaluar(df)
+            if invalidas is not None:
+                reporte.registrar(regla, invalidas)
+        return reporte
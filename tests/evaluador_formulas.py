@@ -0,0 +1,328 @@
+"""
+Evaluador mínimo de fórmulas Excel para los tests.
+
+Soporta solo lo que usa el libro TDABC: referencias (locales, entre hojas,
+columnas completas y tablas estructuradas), aritmética, comparaciones y las
+funciones SUM, SUMIF, SUMIFS, AVERAGEIFS, SUMPRODUCT, VLOOKUP, INDEX, MATCH,
+IF e IFERROR.
+Permite comparar el motor NumPy contra el libro sin depender de Excel ni
+de LibreOffice.
+"""
+import fnmatch
+import operator
+import re
+
+import numpy as np
+from openpyxl.utils import column_index_from_string, range_boundaries
+
+_TOKENS = re.compile(r'''
+    (?P<espacio>\s+)
+  | (?P<texto>"(?:[^"]|"")*")
+  | (?P<tabla>[A-Za-z_]\w*\[[^\]]+\])
+  | (?P<ref_hoja>(?:'[^']+'|[A-Za-z_][\w.]*)!\$?[A-Z]{1,3}\$?\d*(?::\$?[A-Z]{1,3}\$?\d*)?)
+  | (?P<funcion>[A-Z][A-Z0-9.]*(?=\())
+  | (?P<booleano>TRUE|FALSE)
+  | (?P<ref>\$?[A-Z]{1,3}\$?\d+(?::\$?[A-Z]{1,3}\$?\d+)?|\$?[A-Z]{1,3}:\$?[A-Z]{1,3})
+  | (?P<numero>\d+(?:\.\d+)?)
+  | (?P<op><>|>=|<=|[-+*/&=<>(),])
+''', re.VERBOSE)
+
+
+class Rango:
+    """Referencia perezosa a un rango: las celdas se evalúan solo al pedirlas"""
+
+    def __init__(self, evaluador, hoja, min_col, min_row, max_col, max_row):
+        self.evaluador = evaluador
+        self.hoja = hoja
+        self.min_col, self.min_row = min_col, min_row
+        self.max_col, self.max_row = max_col, max_row
+
+    @property
+    def filas(self):
+        return self.max_row - self.min_row + 1
+
+    def celda(self, i, j=0):
+        return self.evaluador.valor_celda(self.hoja, self.min_row + i, self.min_col + j)
+
+    def columna(self, j=0):
+        return [self.celda(i, j) for i in range(self.filas)]
+
+    def arreglo(self):
+        """Valores como arreglo NumPy (vacíos → 0)"""
+        return np.array([[0 if v is None else v for v in fila] for fila in
+                         ([self.celda(i, j) for j in range(self.max_col - self.min_col + 1)]
+                          for i in range(self.filas))], dtype=object)
+
+
+def _numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _cumple(valor, criterio):
+    """Criterio de SUMIFS: igualdad (sin distinguir mayúsculas) o comodín '*'"""
+    if isinstance(criterio, str) and "*" in criterio:
+        return valor is not None and fnmatch.fnmatchcase(str(valor).lower(), criterio.lower())
+    if _numero(criterio) or _numero(valor):
+        return valor == criterio
+    if isinstance(valor, str) and isinstance(criterio, str):
+        return valor.lower() == criterio.lower()
+    return False
+
+
+def _filas_que_cumplen(pares):
+    n = pares[0][0].filas
+    return [i for i in range(n)
+            if all(_cumple(rango.celda(i), criterio) for rango, criterio in pares)]
+
+
+def _pares(args):
+    return [(args[k], args[k + 1]) for k in range(0, len(args), 2)]
+
+
+def _a_valor(x):
+    if isinstance(x, Rango):
+        return x.arreglo()
+    return 0 if x is None else x
+
+
+def SUM(*args):
+    total = 0
+    for arg in args:
+        valores = arg.arreglo().ravel() if isinstance(arg, Rango) else [arg]
+        total += sum(v for v in valores if _numero(v))
+    return total
+
+
+def SUMIF(rango, criterio, rango_suma):
+    return SUMIFS(rango_suma, rango, criterio)
+
+
+def SUMIFS(rango_suma, *args):
+    filas = _filas_que_cumplen(_pares(args))
+    return sum(v for v in (rango_suma.celda(i) for i in filas) if _numero(v))
+
+
+def AVERAGEIFS(rango_promedio, *args):
+    valores = [v for v in (rango_promedio.celda(i) for i in _filas_que_cumplen(_pares(args))) if _numero(v)]
+    return sum(valores) / len(valores)  # ZeroDivisionError ≈ #DIV/0!
+
+
+def SUMPRODUCT(*args):
+    producto = np.ones_like(_a_valor(args[0]), dtype=object)
+    for arg in args:
+        producto = producto * _a_valor(arg)
+    return float(np.sum(producto.astype(float)))
+
+
+def VLOOKUP(buscado, rango, columna, exacto=False):
+    for i in range(rango.filas):
+        if _cumple(rango.celda(i), buscado):
+            return rango.celda(i, int(columna) - 1)
+    raise LookupError(f"#N/A: {buscado}")
+
+
+def INDEX(rango, fila, columna=1):
+    return rango.celda(int(fila) - 1, int(columna) - 1)
+
+
+def MATCH(buscado, rango, tipo=1):
+    if tipo != 0:
+        raise ValueError("Solo se soporta MATCH exacto (tipo 0)")
+    for i in range(rango.filas):
+        if _cumple(rango.celda(i), buscado):
+            return i + 1
+    raise LookupError(f"#N/A: {buscado}")
+
+
+def IF(condicion, si, no):
+    return si() if condicion else no()
+
+
+def IFERROR(valor, alternativa):
+    try:
+        return valor()
+    except (ZeroDivisionError, LookupError):
+        return alternativa()
+
+
+_PEREZOSAS = {"IF": (1, 2), "IFERROR": (0, 1)}
+
+
+def _operar(op, a, b):
+    a, b = _a_valor(a), _a_valor(b)
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        return a / b
+    if op == "&":
+        return f"{a}{b}"
+    comparar = _COMPARACIONES[op]
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.vectorize(lambda x, y: _comparar(comparar, x, y), otypes=[bool])(a, b)
+    return _comparar(comparar, a, b)
+
+
+_COMPARACIONES = {"=": operator.eq, "<>": operator.ne, ">": operator.gt,
+                  "<": operator.lt, ">=": operator.ge, "<=": operator.le}
+
+
+def _comparar(comparar, a, b):
+    """Compara como Excel en lo que importa aquí: texto vs número nunca es igual"""
+    if isinstance(a, str) != isinstance(b, str):
+        return comparar is operator.ne
+    if isinstance(a, str):
+        a, b = a.lower(), b.lower()
+    return bool(comparar(a, b))
+
+
+class _Parser:
+    """Traduce una fórmula a una expresión Python sobre el evaluador"""
+
+    def __init__(self, formula):
+        self.tokens = []
+        pos = 0
+        while pos < len(formula):
+            m = _TOKENS.match(formula, pos)
+            if not m:
+                raise ValueError(f"Fórmula no soportada: {formula!r} (posición {pos})")
+            pos = m.end()
+            if m.lastgroup != "espacio":
+                self.tokens.append((m.lastgroup, m.group()))
+        self.i = 0
+
+    def _ver(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def _tomar(self, esperado=None):
+        token = self._ver()
+        if esperado is not None and token[1] != esperado:
+            raise ValueError(f"Se esperaba {esperado!r}, llegó {token[1]!r}")
+        self.i += 1
+        return token
+
+    def traducir(self):
+        codigo = self._comparacion()
+        if self.i != len(self.tokens):
+            raise ValueError(f"Tokens sin consumir: {self.tokens[self.i:]}")
+        return codigo
+
+    def _binaria(self, operadores, siguiente):
+        izquierda = siguiente()
+        while self._ver()[1] in operadores:
+            op = self._tomar()[1]
+            izquierda = f"_operar({op!r}, {izquierda}, {siguiente()})"
+        return izquierda
+
+    def _comparacion(self):
+        return self._binaria(("=", "<>", ">", "<", ">=", "<="), self._concatenacion)
+
+    def _concatenacion(self):
+        return self._binaria(("&",), self._suma)
+
+    def _suma(self):
+        return self._binaria(("+", "-"), self._producto)
+
+    def _producto(self):
+        return self._binaria(("*", "/"), self._unario)
+
+    def _unario(self):
+        if self._ver()[1] == "-":
+            self._tomar()
+            return f"_operar('-', 0, {self._unario()})"
+        return self._primario()
+
+    def _primario(self):
+        tipo, texto = self._tomar()
+        if tipo == "numero":
+            return texto
+        if tipo == "texto":
+            return repr(texto[1:-1].replace('""', '"'))
+        if tipo == "booleano":
+            return str(texto == "TRUE")
+        if tipo == "ref":
+            return f"_ref(None, {texto!r})"
+        if tipo == "ref_hoja":
+            hoja, ref = texto.rsplit("!", 1)
+            return f"_ref({hoja.strip(chr(39))!r}, {ref!r})"
+        if tipo == "tabla":
+            nombre, columna = texto[:-1].split("[", 1)
+            return f"_tabla({nombre!r}, {columna!r})"
+        if tipo == "funcion":
+            self._tomar("(")
+            args = []
+            while self._ver()[1] != ")":
+                args.append(self._comparacion())
+                if self._ver()[1] == ",":
+                    self._tomar()
+            self._tomar(")")
+            perezosas = _PEREZOSAS.get(texto, ())
+            args = [f"lambda: {a}" if k in perezosas else a for k, a in enumerate(args)]
+            return f"{texto}({', '.join(args)})"
+        if texto == "(":
+            codigo = self._comparacion()
+            self._tomar(")")
+            return f"({codigo})"
+        raise ValueError(f"Token inesperado: {texto!r}")
+
+
+class EvaluadorLibro:
+    """Evalúa celdas de un libro openpyxl cargado con fórmulas (data_only=False)"""
+
+    def __init__(self, wb):
+        self.wb = wb
+        self.cache = {}
+        self.tablas = {}
+        for ws in wb.worksheets:
+            for tabla in ws.tables.values():
+                self.tablas[tabla.displayName] = (ws.title, tabla.ref)
+
+    def valor(self, hoja, coordenada):
+        ws = self.wb[hoja]
+        celda = ws[coordenada]
+        return self.valor_celda(hoja, celda.row, celda.column)
+
+    def valor_celda(self, hoja, fila, columna):
+        clave = (hoja, fila, columna)
+        if clave not in self.cache:
+            valor = self.wb[hoja].cell(row=fila, column=columna).value
+            if isinstance(valor, str) and valor.startswith("="):
+                valor = self._evaluar(hoja, valor[1:])
+            self.cache[clave] = valor
+        return self.cache[clave]
+
+    def _evaluar(self, hoja, formula):
+        codigo = _Parser(formula).traducir()
+        entorno = {
+            "_operar": _operar,
+            "_ref": lambda h, ref: self._ref(h or hoja, ref),
+            "_tabla": self._tabla,
+            "SUM": SUM, "SUMIF": SUMIF, "SUMIFS": SUMIFS, "AVERAGEIFS": AVERAGEIFS,
+            "SUMPRODUCT": SUMPRODUCT, "VLOOKUP": VLOOKUP, "INDEX": INDEX, "MATCH": MATCH,
+            "IF": IF, "IFERROR": IFERROR,
+        }
+        return eval(codigo, entorno)
+
+    def _ref(self, hoja, ref):
+        ref = ref.replace("$", "")
+        if ":" not in ref:
+            valor = self.valor(hoja, ref)
+            return 0 if valor is None else valor
+        inicio, fin = ref.split(":")
+        if inicio.isalpha():  # Columna completa (A:A) → hasta la última fila usada
+            max_row = self.wb[hoja].max_row
+            return Rango(self, hoja, column_index_from_string(inicio), 1, column_index_from_string(fin), max_row)
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        return Rango(self, hoja, min_col, min_row, max_col, max_row)
+
+    def _tabla(self, nombre, columna):
+        hoja, ref = self.tablas[nombre]
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        ws = self.wb[hoja]
+        for col in range(min_col, max_col + 1):
+            if ws.cell(row=min_row, column=col).value == columna:
+                return Rango(self, hoja, col, min_row + 1, col, max_row)
+        raise KeyError(f"{nombre}[{columna}]")
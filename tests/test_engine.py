@@ -0,0 +1,186 @@
+"""
+Tests del motor de cálculo NumPy (src/engine).
+
+El motor debe coincidir con el libro generado por fórmulas: se generan ambos
+con la misma semilla y las fórmulas del libro se evalúan con un evaluador
+mínimo (tests/evaluador_formulas.py), sin necesidad de Excel.
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from src import config
+from src.data.ecuaciones_data import ECUACIONES_SERVICIOS
+from src.engine import DatosModelo, calcular_modelo
+from tests.evaluador_formulas import EvaluadorLibro
+from tests.test_modelo_tdabc import generar_libro
+
+
+class TestMotorContraLibro(unittest.TestCase):
+    """Cada resultado del motor debe coincidir con la fórmula equivalente del libro"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        wb = generar_libro(os.path.join(cls.tmp.name, "modelo.xlsx"))
+        cls.libro = EvaluadorLibro(wb)
+
+        random.seed(2024)
+        cls.res = calcular_modelo(DatosModelo.desde_config())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def assertCelda(self, hoja, coordenada, esperado):
+        self.assertAlmostEqual(self.libro.valor(hoja, coordenada), float(esperado), places=4,
+                               msg=f"{hoja}!{coordenada}")
+
+    def _fila_con(self, hoja, texto, desde=1):
+        ws = self.libro.wb[hoja]
+        for fila in range(desde, ws.max_row + 1):
+            if ws.cell(row=fila, column=1).value == texto:
+                return fila
+        raise AssertionError(f"'{texto}' no está en {hoja}")
+
+    def test_costo_por_minuto(self):
+        costo = self.res.costo_minuto
+        row = 4
+        for g in range(len(config.GRUPOS_OCUPACIONALES)):
+            self.assertCelda("COSTO_POR_MINUTO", f"H{g + 5}", costo['promedio'][g])
+            for s in range(len(config.SEDES)):
+                self.assertCelda("COSTO_POR_MINUTO", f"D{row}", costo['costo_minuto'][g, s])
+                row += 1
+
+    def test_ecuaciones_tiempo(self):
+        total_lineas = sum(len(v) for v in ECUACIONES_SERVICIOS.values())
+        for i in range(total_lineas):
+            self.assertCelda("ECUACIONES_TIEMPO", f"F{i + 6}", self.res.ecuaciones['minutos_ajustados'][i])
+            self.assertCelda("ECUACIONES_TIEMPO", f"H{i + 6}", self.res.ecuaciones['costo_mo'][i])
+
+    def test_costeo_servicios(self):
+        columnas = {
+            'D': 'mo', 'E': 'insumos', 'F': 'cif', 'G': 'total', 'H': 'precio',
+            'I': 'margen_moneda', 'J': 'margen_pct', 'K': 'volumen'
+        }
+        row = 5
+        for v in range(len(config.SERVICIOS)):
+            for s in range(len(config.SEDES)):
+                for col, clave in columnas.items():
+                    self.assertCelda("COSTEO_SERVICIOS", f"{col}{row}", self.res.costeo[clave][v, s])
+                row += 1
+
+    def test_costos_indirectos(self):
+        for s, sede in enumerate(config.SEDES):
+            self.assertCelda("COSTOS_INDIRECTOS", f"D{5 + 2 * s}", self.res.indirectos['materia_prima'][s])
+            self.assertCelda("COSTOS_INDIRECTOS", f"D{6 + 2 * s}", self.res.indirectos['mano_obra'][s])
+
+        inicio = self._fila_con("COSTOS_INDIRECTOS", "Sede")
+        for s, sede in enumerate(config.SEDES):
+            fila = self._fila_con("COSTOS_INDIRECTOS", sede, desde=inicio)
+            self.assertCelda("COSTOS_INDIRECTOS", f"D{fila}", self.res.tasas['tasa'][s])
+
+    def test_resumen_indicadores_globales(self):
+        resumen = self.res.resumen
+        indicadores = {
+            7: 'ingresos', 8: 'costos', 9: 'costo_mo', 10: 'costo_insumos', 11: 'costo_cif',
+            13: 'utilidad', 14: 'margen', 16: 'servicios_prestados',
+            17: 'precio_promedio', 18: 'costo_promedio'
+        }
+        for fila, clave in indicadores.items():
+            self.assertCelda("RESUMEN_EJECUTIVO", f"B{fila}", resumen[clave])
+
+    def test_resumen_conciliacion(self):
+        resumen = self.res.resumen
+        fila = self._fila_con("RESUMEN_EJECUTIVO", "Materia Prima / Insumos (71)")
+        for i, clase in enumerate(("71", "72", "73")):
+            self.assertCelda("RESUMEN_EJECUTIVO", f"B{fila + i}", resumen['contable'][clase])
+            self.assertCelda("RESUMEN_EJECUTIVO", f"C{fila + i}", resumen['asignado'][clase])
+        self.assertCelda("RESUMEN_EJECUTIVO", f"B{fila + 3}", resumen['capacidad_ociosa'])
+        self.assertCelda("RESUMEN_EJECUTIVO", f"B{fila + 4}", resumen['utilizacion'])
+
+    def test_resumen_por_servicio_y_sede(self):
+        por_servicio = self.res.resumen['por_servicio']
+        inicio = self._fila_con("RESUMEN_EJECUTIVO", "RENTABILIDAD POR SERVICIO (TODOS)")
+        for v, servicio in enumerate(config.SERVICIOS):
+            fila = self._fila_con("RESUMEN_EJECUTIVO", servicio, desde=inicio)
+            for col, clave in zip("BCDEF", ('volumen', 'costo', 'facturacion', 'margen', 'margen_pct')):
+                self.assertCelda("RESUMEN_EJECUTIVO", f"{col}{fila}", por_servicio[clave][v])
+
+        por_sede = self.res.resumen['por_sede']
+        inicio = self._fila_con("RESUMEN_EJECUTIVO", "ANÁLISIS POR SEDE")
+        for s, sede in enumerate(config.SEDES):
+            fila = self._fila_con("RESUMEN_EJECUTIVO", sede, desde=inicio)
+            for col, clave in zip("BCDE", ('facturacion', 'costos', 'margen', 'margen_pct')):
+                self.assertCelda("RESUMEN_EJECUTIVO", f"{col}{fila}", por_sede[clave][s])
+
+
+class TestMotorCasosBorde(unittest.TestCase):
+    """Casos pequeños calculados a mano"""
+
+    def setUp(self):
+        self.datos = DatosModelo(
+            grupos=[("Médico", 1000), ("Técnico", 500)],
+            sedes=["Norte", "Sur"],
+            servicios=["Consulta", "Sin Producción"],
+            personal=[
+                {'grupo': "Médico", 'sede': "Norte", 'salario': 1000, 'cantidad': 2},
+                {'grupo': "Médico", 'sede': "Sur", 'salario': 1200, 'cantidad': 1},
+                {'grupo': "Técnico", 'sede': "Norte", 'salario': 500, 'cantidad': 3},
+            ],
+            produccion=[
+                {'servicio': "Consulta", 'sede': "Norte", 'cantidad': 1, 'valor_unitario': 100},
+                {'servicio': "Consulta", 'sede': "Norte", 'cantidad': 3, 'valor_unitario': 300},
+                {'servicio': "Desconocido", 'sede': "Norte", 'cantidad': 5, 'valor_unitario': 10},
+            ],
+            ecuaciones={
+                "Consulta": [("Médico", 10, 1.5), ("Grupo Inexistente", 5, 1.0)],
+            },
+            insumos={"Consulta": [("Guantes", 2, 3)]},
+            presupuesto_indirectos={"7305 - Arriendo": 3000, "7105 - Otro": 999},
+            salas_por_sede={"Norte": 2, "Sur": 1},
+            horas_mensuales=100,
+            porcentaje_capacidad=50,
+            factor_prestacional=2,
+            capacidad_mensual_minutos=1000,
+        )
+        self.res = calcular_modelo(self.datos)
+
+    def test_costo_minuto_y_promedio_entre_sedes(self):
+        # 100 h * 60 * 50% = 3000 minutos prácticos por persona
+        costo = self.res.costo_minuto['costo_minuto']
+        np.testing.assert_allclose(costo[0], [2000 / 3000, 2400 / 3000])
+        # Técnico sin personal en Sur: su costo por persona sigue siendo salario * factor
+        np.testing.assert_allclose(costo[1], [1000 / 3000, 1000 / 3000])
+        self.assertAlmostEqual(self.res.costo_minuto['promedio'][0], 2200 / 3000)
+
+    def test_grupo_inexistente_cuesta_cero(self):
+        np.testing.assert_allclose(self.res.ecuaciones['costo_minuto'], [2200 / 3000, 0])
+        np.testing.assert_allclose(self.res.costeo['mo'][0], [15 * 2200 / 3000] * 2)
+
+    def test_tasa_cif_solo_cuentas_73(self):
+        # Norte: 3000 * 2/3 = 2000 sobre 2 salas * 1000 min
+        np.testing.assert_allclose(self.res.tasas['tasa'], [1.0, 1.0])
+        # El CIF usa minutos sin ajustar (10 + 5)
+        np.testing.assert_allclose(self.res.costeo['cif'][0], [15.0, 15.0])
+
+    def test_precio_promedio_ponderado_y_servicio_sin_produccion(self):
+        costeo = self.res.costeo
+        self.assertEqual(costeo['precio'][0, 0], 250)  # (1 * 100 + 3 * 300) / 4
+        self.assertEqual(costeo['volumen'][0, 0], 4)
+        self.assertEqual(costeo['precio'][1, 0], 0)
+        self.assertEqual(costeo['margen_pct'][1, 0], 0)
+
+    def test_resumen_incluye_servicios_desconocidos_en_ingresos(self):
+        resumen = self.res.resumen
+        self.assertEqual(resumen['ingresos'], 100 + 900 + 50)
+        self.assertEqual(resumen['servicios_prestados'], 9)
+        self.assertEqual(resumen['por_servicio']['facturacion'][0], 1000)
+        self.assertEqual(resumen['contable']["71"], 999 + 6 * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,9 +4,19 @@ Tests unitarios para generadores de datos.
 Estos tests demuestran el beneficio de separar la lógica de negocio
 de la presentación: podemos testear la lógica sin necesidad de Excel.
 """
+import importlib.util
+import os
+import tempfile
 import unittest
+
+import pandas as pd
+
+from src.importador_produccion import ImportadorProduccion
+from src.generators.simulador_citas import SimuladorCitas
 from src.generators.servicios_generator import generar_datos_servicios
-from src.generators.produccion_generator import generar_datos_produccion
+from src.generators.produccion_generator import (
+    generar_datos_produccion, generar_produccion_columnar, iterar_registros
+)
 
 
 class TestServiciosGenerator(unittest.TestCase):
@@ -144,5 +154,124 @@ class TestProduccionGenerator(unittest.TestCase):
                 self.assertIn(campo, dato)
 
 
+class TestProduccionColumnar(unittest.TestCase):
+    """Tests para el generador vectorizado"""
+
+    setUp = TestProduccionGenerator.setUp  # Mismos datos de prueba
+
+    def _generar(self, **kwargs):
+        return generar_produccion_columnar(
+            self.servicios_lista,
+            self.servicios_dict,
+            self.categorias_info,
+            self.sedes,
+            self.aseguradoras,
+            **kwargs
+        )
+
+    def test_grilla_completa_por_mes(self):
+        """Test: un registro por mes y combinación servicio-sede-aseguradora"""
+        df = self._generar(meses=3, semilla=7)
+        self.assertEqual(len(df), 3 * 2 * 2 * 2)
+        self.assertEqual(df.groupby(['mes', 'servicio', 'sede', 'aseguradora'], observed=True).size().max(), 1)
+
+    def test_reproducible_con_semilla(self):
+        """Test: la misma semilla produce los mismos datos"""
+        self.assertTrue(self._generar(meses=5, semilla=11).equals(self._generar(meses=5, semilla=11)))
+        self.assertFalse(self._generar(meses=5, semilla=11).equals(self._generar(meses=5, semilla=12)))
+
+    def test_rangos_y_codigos_por_servicio(self):
+        """Test: volúmenes y valores dentro de los rangos de cada servicio"""
+        df = self._generar(meses=50, semilla=1)
+        for servicio, datos in self.servicios_dict.items():
+            filas = df[df['servicio'] == servicio]
+            self.assertTrue(filas['cantidad'].between(datos['volumen_min'], datos['volumen_max']).all())
+            self.assertTrue(filas['valor_unitario'].between(datos['valor_min'], datos['valor_max']).all())
+            self.assertEqual(set(filas['codigo']), {datos['codigo']})
+            self.assertEqual(set(filas['categoria']), {datos['categoria']})
+
+    def test_registros_con_estructura_de_diccionarios(self):
+        """Test: iterar_registros entrega el formato de generar_datos_produccion"""
+        df = self._generar(semilla=3)
+        registros = list(iterar_registros(df, tamano_bloque=3))
+        self.assertEqual(len(registros), len(df))
+        self.assertEqual(registros[-1]['servicio'], "Cateterismo")
+        self.assertEqual(registros[-1]['cantidad'], df['cantidad'].iloc[-1])
+        for campo in ['codigo', 'servicio', 'sede', 'aseguradora', 'cantidad', 'valor_unitario', 'categoria']:
+            self.assertIn(campo, registros[0])
+
+
+class TestSimuladorCitas(unittest.TestCase):
+    """Tests para el simulador de citas individuales"""
+
+    setUp = TestProduccionGenerator.setUp  # Mismos servicios de prueba
+
+    def _simulador(self, **kwargs):
+        kwargs.setdefault("semilla", 5)
+        return SimuladorCitas(self.servicios_lista, self.servicios_dict, self.categorias_info,
+                              self.sedes, self.aseguradoras, **kwargs)
+
+    def _citas(self, **kwargs):
+        return pd.concat(list(self._simulador(**kwargs).iterar_bloques()), ignore_index=True)
+
+    def test_columnas_del_export_real(self):
+        """Test: las columnas son las que mapea ImportadorProduccion"""
+        citas = self._citas(meses=1)
+        self.assertEqual(set(citas.columns), set(ImportadorProduccion.MAPEO_COLUMNAS_REAL))
+
+    def test_volumen_mensual_en_rango(self):
+        """Test: citas por mes, servicio, sede y aseguradora dentro del rango del servicio"""
+        citas = self._citas(meses=3, inicio="2024-11")
+        meses = citas['Fecha Cita'].dt.to_period("M")
+        self.assertEqual(sorted(meses.astype(str).unique()), ["2024-11", "2024-12", "2025-01"])
+        volumen = citas.groupby([meses, 'servicio', 'Sede', 'entidad'], observed=True).size()
+        for (_, servicio, _, _), cantidad in volumen.items():
+            datos = self.servicios_dict[servicio]
+            self.assertGreaterEqual(cantidad, datos['volumen_min'])
+            self.assertLessEqual(cantidad, datos['volumen_max'])
+
+    def test_multiplicador_por_sede(self):
+        """Test: el factor de volumen se aplica a cada sede"""
+        citas = self._citas(meses=2, multiplicador_volumen={"Sede A": 3, "Sede B": 0})
+        self.assertEqual(set(citas['Sede']), {"Sede A"})
+        self.assertGreaterEqual(len(citas), 2 * 3 * (15 + 2) * 2)
+
+    def test_bloques_reproducibles_con_facturas_unicas(self):
+        """Test: bloques acotados, misma semilla mismos datos y facturas consecutivas"""
+        bloques = list(self._simulador(meses=2, tamano_bloque=50).iterar_bloques())
+        self.assertTrue(all(len(b) <= 50 for b in bloques))
+        citas = pd.concat(bloques, ignore_index=True)
+        self.assertTrue(citas.equals(self._citas(meses=2, tamano_bloque=50)))
+        self.assertTrue(citas['No Factura'].is_unique)
+        self.assertEqual(citas['No Factura'].iloc[-1], f"FE{len(citas):09d}")
+        self.assertTrue((citas['Valor Recaudo'] <= citas['Valor Servicio']).all())
+
+    def test_orden_cronologico_entre_bloques(self):
+        """Test: con bloques pequeños las fechas y facturas siguen en orden dentro de cada mes"""
+        citas = self._citas(meses=2, tamano_bloque=37)
+        self.assertTrue(citas['Fecha Cita'].is_monotonic_increasing)
+        self.assertTrue(citas['No Factura'].is_monotonic_increasing)
+
+    def test_csv_por_bloques(self):
+        """Test: el CSV tiene un solo encabezado y todas las filas"""
+        simulador = self._simulador(meses=2, tamano_bloque=40)
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = os.path.join(tmp, "citas.csv")
+            filas = simulador.a_csv(ruta)
+            leido = pd.read_csv(ruta, dtype={'Identificacion': str})
+        self.assertEqual(len(leido), filas)
+        self.assertEqual(list(leido.columns), list(self._citas(meses=1).columns))
+        self.assertEqual(leido['Valor Servicio'].sum(), self._citas(meses=2)['Valor Servicio'].sum())
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "requiere pyarrow")
+    def test_parquet_por_bloques(self):
+        """Test: el Parquet conserva todas las filas"""
+        simulador = self._simulador(meses=2, tamano_bloque=40)
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = os.path.join(tmp, "citas.parquet")
+            filas = simulador.a_parquet(ruta)
+            self.assertEqual(len(pd.read_parquet(ruta)), filas)
+
+
 if __name__ == '__main__':
     unittest.main()
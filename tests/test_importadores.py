@@ -0,0 +1,690 @@
+"""
+Tests unitarios para los importadores de datos reales.
+
+Los archivos de prueba se generan con SimuladorCitas, que escribe las mismas
+columnas que el export del sistema de información.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from src.almacen_sql import AlmacenSQL
+from src.cache_importacion import CacheImportacion
+from src.detector_encabezados import DetectorEncabezados, emparejar, normalizar
+from src.importador_contabilidad import ImportadorContabilidad
+from src.importador_nomina import ImportadorNomina
+from src.importador_produccion import ImportadorProduccion
+from src.lector_excel import MOTORES, leer_encabezado, leer_excel, motores_disponibles
+from src.numeros import a_numero, detectar_decimal
+from src.validacion import Regla, ReporteValidacion, ValidadorColumnar
+from src.generators.simulador_citas import SimuladorCitas
+
+
+class TestImportadorProduccionBloques(unittest.TestCase):
+    """Tests para la importación de producción por bloques"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.ruta = os.path.join(self.tmp.name, "citas.csv")
+        servicios = {
+            "Ecocardiograma": {"codigo": "SV001", "categoria": "Diagnóstico No Invasivo",
+                               "volumen_min": 15, "volumen_max": 40,
+                               "valor_min": 120000, "valor_max": 350000},
+            "Cateterismo": {"codigo": "SV002", "categoria": "Diagnóstico Invasivo",
+                            "volumen_min": 2, "volumen_max": 6,
+                            "valor_min": 1500000, "valor_max": 4500000},
+        }
+        self.filas = SimuladorCitas(list(servicios), servicios, {}, ["Sede A", "Sede B"],
+                                    ["EPS 1", "EPS 2"], meses=2, semilla=3).a_csv(self.ruta)
+
+    def _esperado(self):
+        """Totales por (codigo, sede, cliente, mes de la cita) calculados sobre el archivo completo"""
+        df = pd.read_csv(self.ruta)
+        df['periodo'] = df['Fecha Cita'].str[:7]
+        return df.groupby(['codigo_servicio', 'Sede', 'entidad', 'periodo']).agg(
+            cantidad=('Valor Servicio', 'size'), facturado=('Valor Servicio', 'sum'))
+
+    def _agregado(self, datos):
+        df = pd.DataFrame(datos)
+        df['facturado'] = df['cantidad'] * df['valor_unitario']
+        return df.set_index(['codigo', 'sede', 'aseguradora', 'periodo'])[['cantidad', 'facturado']].sort_index()
+
+    def test_agregado_igual_al_archivo_completo(self):
+        """Test: cantidad y facturado por combinación no dependen del tamaño de bloque"""
+        esperado = self._esperado()
+        for tamano in (37, 100_000):
+            importador = ImportadorProduccion()
+            self.assertTrue(importador.cargar_desde_csv_por_bloques(self.ruta, tamano_bloque=tamano),
+                            importador.errores)
+            datos = importador.obtener_datos_produccion()
+            self.assertEqual(len(datos), len(esperado))
+            agregado = self._agregado(datos)
+            self.assertEqual(agregado['cantidad'].tolist(), esperado['cantidad'].tolist())
+            for obtenido, total in zip(agregado['facturado'], esperado['facturado']):
+                self.assertAlmostEqual(obtenido, total, places=2)
+        self.assertIn(f"  - Total registros: {self.filas}", importador.advertencias)
+
+    def test_nombre_del_servicio(self):
+        """Test: los registros agregados conservan el nombre del servicio"""
+        importador = ImportadorProduccion()
+        importador.cargar_desde_csv_por_bloques(self.ruta, tamano_bloque=50)
+        nombres = {r['codigo']: r['servicio'] for r in importador.iterar_datos_produccion()}
+        self.assertEqual(nombres, {"SV001": "Ecocardiograma", "SV002": "Cateterismo"})
+
+    def test_errores_con_fila_del_archivo(self):
+        """Test: los errores de cualquier bloque se reportan con su fila en el archivo"""
+        df = pd.read_csv(self.ruta)
+        df.loc[[5, 120], 'Valor Servicio'] = 0
+        df.to_csv(self.ruta, index=False)
+        importador = ImportadorProduccion()
+        self.assertFalse(importador.cargar_desde_csv_por_bloques(self.ruta, tamano_bloque=50))
+        self.assertEqual(importador.errores, [
+            "valor_unitario debe ser mayor a 0: 2 fila(s) (filas 7, 122)",
+        ])
+        self.assertEqual(importador.reporte_validacion.ejemplos, {'valor_unitario_positivo': [5, 120]})
+        self.assertIsNone(importador.datos_produccion)
+
+    def test_columnas_faltantes(self):
+        """Test: sin las columnas requeridas la importación falla"""
+        pd.read_csv(self.ruta).drop(columns=['entidad']).to_csv(self.ruta, index=False)
+        importador = ImportadorProduccion()
+        self.assertFalse(importador.cargar_desde_csv_por_bloques(self.ruta))
+        self.assertIn("entidad", importador.errores[0])
+
+    def test_carga_completa_del_export_real(self):
+        """Test: la carga completa renombra las columnas del export (una fila por cita)"""
+        importador = ImportadorProduccion()
+        self.assertTrue(importador.cargar_desde_csv(self.ruta), importador.errores)
+        datos = importador.obtener_datos_produccion()
+        self.assertEqual(len(datos), self.filas)
+        self.assertEqual({r['cantidad'] for r in datos}, {1})
+
+
+class TestValidacionColumnar(unittest.TestCase):
+    """Tests para las reglas de validación por columnas"""
+
+    def setUp(self):
+        self.validador = ValidadorColumnar([
+            Regla.positivo('cantidad'),
+            Regla.obligatorio('sede'),
+            Regla.no_negativo('descuento', requerida=False),
+        ], max_ejemplos=3)
+
+    def test_conteo_y_primeras_filas_por_regla(self):
+        """Test: cada regla cuenta todas sus filas y guarda solo las primeras"""
+        df = pd.DataFrame({
+            'cantidad': [1, 0, -2, None, 'x', 5, 0],
+            'sede': ['A', ' ', 'B', None, 'C', 'D', 'E'],
+        })
+        reporte = self.validador.validar(df)
+        self.assertFalse(reporte.valido)
+        self.assertEqual(reporte.conteos, {'cantidad_positivo': 5, 'sede_obligatorio': 2})
+        self.assertEqual(reporte.ejemplos, {'cantidad_positivo': [1, 2, 3], 'sede_obligatorio': [1, 3]})
+        self.assertEqual(reporte.mensajes(), [
+            "cantidad debe ser mayor a 0: 5 fila(s) (filas 3, 4, 5, ...)",
+            "sede es obligatorio: 2 fila(s) (filas 3, 5)",
+        ])
+        self.assertEqual(reporte.como_dict()['total_errores'], 7)
+        copia = ReporteValidacion.desde_dict(json.loads(json.dumps(reporte.como_dict())), max_ejemplos=3)
+        self.assertEqual(copia.mensajes(), reporte.mensajes())
+
+    def test_acumula_bloques(self):
+        """Test: el reporte suma bloques y conserva los índices de cada uno"""
+        reporte = self.validador.nuevo_reporte()
+        for inicio in (0, 4):
+            bloque = pd.DataFrame({'cantidad': [1, 0, 1, 1], 'sede': 'A', 'descuento': [0, 0, -1, 0]},
+                                  index=range(inicio, inicio + 4))
+            self.validador.validar(bloque, reporte)
+        self.assertEqual(reporte.filas_validadas, 8)
+        self.assertEqual(reporte.conteos, {'cantidad_positivo': 2, 'descuento_no_negativo': 2})
+        self.assertEqual(reporte.ejemplos['cantidad_positivo'], [1, 5])
+
+    def test_columna_requerida_ausente(self):
+        """Test: una columna requerida ausente invalida todas las filas; una opcional se omite"""
+        reporte = self.validador.validar(pd.DataFrame({'cantidad': [1, 2]}))
+        self.assertEqual(reporte.conteos, {'sede_obligatorio': 2})
+
+    def test_nomina_y_contabilidad_reportan_advertencias(self):
+        """Test: los importadores de nómina y contabilidad usan el mismo validador"""
+        nomina = ImportadorNomina()
+        self.assertTrue(nomina._procesar_dataframe(pd.DataFrame({
+            'Empleado': ['1', None], 'Salario': ['2500000', '']}), "nomina.xlsx"))
+        self.assertEqual(nomina.reporte_validacion.conteos,
+                         {'identificacion_obligatorio': 1, 'salario_positivo': 1})
+        self.assertIn("  - Revisar: salario debe ser mayor a 0: 1 fila(s) (filas 3)", nomina.advertencias)
+
+        contabilidad = ImportadorContabilidad()
+        self.assertTrue(contabilidad._procesar_dataframe(pd.DataFrame({
+            'Auxiliar': ['73130601', ''], 'Débitos': ['100', '-5']}), "auxiliar.xlsx"))
+        self.assertEqual(contabilidad.reporte_validacion.conteos,
+                         {'codigo_cuenta_obligatorio': 1, 'debitos_no_negativo': 1})
+
+
+class TestAlmacenColumnar(unittest.TestCase):
+    """Tests para la tabla columnar de los importadores de nómina y contabilidad"""
+
+    def setUp(self):
+        self.nomina = ImportadorNomina()
+        self.nomina._procesar_dataframe(pd.DataFrame({
+            'Empleado': [str(10 + i) for i in range(6)],
+            'Descripcion estado': ['Activo', 'Retirado', 'Activo', 'ACTIVO', None, 'Activo'],
+            'Descripcion C.O.': ['Norte', 'Sur', 'Norte', 'Sur', 'Norte', 'Norte'],
+            'Descripcion del cargo': ['Médico', 'Enfermera', 'Médico', 'Enfermera', 'Médico', 'Médico'],
+            'Salario': ['1,000', '2,000', '3,000', '4,000', '5,000', '6,000'],
+        }), "nomina.xlsx")
+
+    def test_tabla_categorica(self):
+        """Test: las columnas de texto repetitivas quedan como categorías"""
+        tipos = self.nomina.tabla.dtypes
+        for columna in ('estado', 'sede', 'cargo'):
+            self.assertIsInstance(tipos[columna], pd.CategoricalDtype)
+        self.assertNotIsInstance(tipos['identificacion'], pd.CategoricalDtype)
+
+    def test_consultas_sin_lista_de_diccionarios(self):
+        """Test: las consultas agrupan la tabla sin construir la lista de registros"""
+        self.assertEqual(self.nomina.obtener_costo_por_sede(), {'Norte': 15000, 'Sur': 6000})
+        self.assertEqual(self.nomina.obtener_costo_por_cargo(), {'Enfermera': 6000, 'Médico': 15000})
+        self.assertEqual(self.nomina.obtener_costo_total_nomina(), 21000.0)
+        self.assertEqual([e['identificacion'] for e in self.nomina.filtrar_activos()], ['10', '12', '13', '15'])
+        self.assertEqual({s: len(e) for s, e in self.nomina.obtener_empleados_por_sede().items()},
+                         {'Norte': 4, 'Sur': 2})
+        self.assertNotIn('_datos_nomina_cache', vars(self.nomina))
+
+    def test_registros_perezosos(self):
+        """Test: la lista de diccionarios se construye una vez y sigue a la tabla"""
+        registros = self.nomina.datos_nomina
+        self.assertIs(self.nomina.datos_nomina, registros)
+        self.assertEqual(registros[0], {'identificacion': '10', 'estado': 'Activo', 'sede': 'Norte',
+                                        'cargo': 'Médico', 'salario': 1000})
+        self.nomina.datos_nomina = registros[:2]
+        self.assertEqual(self.nomina.obtener_costo_total_nomina(), 3000.0)
+        self.nomina.datos_nomina = None
+        self.assertIsNone(self.nomina.tabla)
+        self.assertEqual(self.nomina.obtener_costo_por_sede(), {})
+
+    def test_contabilidad(self):
+        """Test: costos por cuenta, por centro y filtro por clase sobre la tabla"""
+        contabilidad = ImportadorContabilidad()
+        contabilidad._procesar_dataframe(pd.DataFrame({
+            'CLASE': ['7 - COSTOS SGSSS', '5 - GASTOS', '7 - COSTOS SGSSS'],
+            'Auxiliar': ['73130601', '51050601', '73130601'],
+            'Desc. C.O. movto.': ['Norte', 'Sur', 'Norte'],
+            'Neto': ['10', '20', '30'],
+        }), "auxiliar.xlsx")
+        self.assertEqual(contabilidad.obtener_costos_por_cuenta(), {'51050601': 20, '73130601': 40})
+        self.assertEqual(contabilidad.obtener_costos_por_centro(), {'Norte': 40, 'Sur': 20})
+        self.assertEqual(len(contabilidad.filtrar_por_clase("costos")), 2)
+        self.assertEqual(len(contabilidad.datos_contables), 3)
+
+
+class TestCacheImportacion(unittest.TestCase):
+    """Tests para la caché de Excel importados"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = CacheImportacion(os.path.join(self.tmp.name, "cache"))
+        self.ruta = os.path.join(self.tmp.name, "auxiliar.xlsx")
+        pd.DataFrame({
+            'CLASE': ['7 - COSTOS SGSSS'] * 3,
+            'Auxiliar': [73130601, 73130601, 73150501],
+            'Desc. C.O. movto.': ['Norte', 'Sur', 'Norte'],
+            'Neto': [1000, 2000, 3000],
+        }).to_excel(self.ruta, index=False)
+
+    def _importar(self, **kwargs):
+        importador = ImportadorContabilidad(cache=self.cache)
+        self.assertTrue(importador.cargar_desde_excel(self.ruta, **kwargs), importador.errores)
+        return importador
+
+    def _importar_sin_leer_excel(self):
+        with mock.patch("src.importador_contabilidad.leer_excel",
+                        side_effect=AssertionError("no debía leer el Excel")):
+            return self._importar()
+
+    def test_segunda_importacion_desde_cache(self):
+        """Test: con la fuente sin cambios no se vuelve a leer el Excel"""
+        primera = self._importar()
+        segunda = self._importar_sin_leer_excel()
+        self.assertTrue(any("caché" in a for a in segunda.advertencias))
+        pd.testing.assert_frame_equal(segunda.tabla, primera.tabla)
+        self.assertEqual(segunda.obtener_costos_por_cuenta(), {73130601: 3000, 73150501: 3000})
+
+    def test_contenido_modificado_invalida(self):
+        """Test: si cambia el contenido se vuelve a leer el archivo"""
+        self._importar()
+        pd.read_excel(self.ruta).assign(Neto=5).to_excel(self.ruta, index=False)
+        self.assertEqual(self._importar().obtener_costos_por_cuenta(), {73130601: 10, 73150501: 5})
+
+    def test_mtime_distinto_mismo_contenido(self):
+        """Test: tocar el archivo obliga a recalcular el hash, pero la entrada sigue siendo válida"""
+        self._importar()
+        info = os.stat(self.ruta)
+        os.utime(self.ruta, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+        self._importar_sin_leer_excel()
+        indice = self.cache._leer_indice()
+        self.assertEqual(indice[str(os.path.realpath(self.ruta))]['mtime_ns'], info.st_mtime_ns + 10**9)
+
+    def test_reporte_de_validacion_desde_cache(self):
+        """Test: el reporte de validación de producción se restaura con la entrada de la caché"""
+        ruta = os.path.join(self.tmp.name, "produccion.xlsx")
+        pd.DataFrame({'codigo_servicio': ['890201', '890301'], 'servicio': ['Consulta', 'Control'],
+                      'Sede': ['Norte', 'Sur'], 'entidad': ['EPS1', 'EPS2'],
+                      'Valor Servicio': [100, 80]}).to_excel(ruta, index=False)
+        primera = ImportadorProduccion(cache=self.cache)
+        self.assertTrue(primera.cargar_desde_excel(ruta), primera.errores)
+        segunda = ImportadorProduccion(cache=self.cache)
+        with mock.patch("src.importador_produccion.leer_excel",
+                        side_effect=AssertionError("no debía leer el Excel")):
+            self.assertTrue(segunda.cargar_desde_excel(ruta), segunda.errores)
+        self.assertTrue(any("caché" in a for a in segunda.advertencias))
+        self.assertEqual(segunda.reporte_validacion.como_dict(), primera.reporte_validacion.como_dict())
+        self.assertEqual(segunda.reporte_validacion.filas_validadas, 2)
+
+    def test_variantes_separadas(self):
+        """Test: otra hoja u otro importador no reutilizan la entrada"""
+        self._importar()
+        self.assertFalse(any("caché" in a for a in self._importar(hoja="Sheet1").advertencias))
+        nomina = ImportadorNomina(cache=self.cache)
+        self.assertFalse(nomina.cargar_desde_excel(self.ruta))  # Sin columnas de nómina
+
+
+class TestImportacionMultiple(unittest.TestCase):
+    """Tests para la carga en paralelo de varios auxiliares contables"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for mes, centro in ((1, 'Norte'), (2, 'Sur')):
+            pd.DataFrame({
+                'Fecha': [f'{dia:02d}/{mes:02d}/2025' for dia in (5, 20)],
+                'Auxiliar': ['73130601', '51050601'],
+                'Desc. C.O. movto.': [centro, centro],
+                'Neto': ['1.000', '2.500,50'],
+            }).to_excel(os.path.join(self.tmp.name, f"aux-2025-{mes:02d}.xlsx"), index=False)
+        self.patron = os.path.join(self.tmp.name, "aux-*.xlsx")
+
+    def test_glob_en_paralelo(self):
+        """Test: los archivos del patrón se leen en procesos y quedan en una tabla con periodo"""
+        importador = ImportadorContabilidad()
+        self.assertTrue(importador.cargar_multiples(self.patron, procesos=2), importador.errores)
+        self.assertEqual(importador.tabla['periodo'].tolist(), ['2025-01'] * 2 + ['2025-02'] * 2)
+        self.assertEqual(importador.obtener_costos_por_centro(), {'Norte': 3500.5, 'Sur': 3500.5})
+        self.assertIsInstance(importador.tabla['nombre_centro'].dtype, pd.CategoricalDtype)
+        self.assertEqual([r['filas'] for r in importador.reporte_archivos], [2, 2])
+        self.assertTrue(all(r['segundos'] > 0 for r in importador.reporte_archivos))
+
+    def test_error_por_archivo(self):
+        """Test: un archivo que falla se reporta y los demás se cargan"""
+        roto = os.path.join(self.tmp.name, "roto.xlsx")
+        with open(roto, "w") as f:
+            f.write("no es un xlsx")
+        archivos = [os.path.join(self.tmp.name, "aux-2025-01.xlsx"), roto]
+
+        importador = ImportadorContabilidad()
+        self.assertTrue(importador.cargar_multiples(archivos, procesos=1))
+        self.assertEqual(len(importador.tabla), 2)
+        self.assertEqual(importador.reporte_archivos[1]['filas'], 0)
+        self.assertTrue(importador.errores[0].startswith(roto))
+
+    def test_periodo_desde_el_archivo_sin_fecha(self):
+        """Test: sin fecha válida el periodo es el nombre del archivo"""
+        ruta = os.path.join(self.tmp.name, "cierre.xlsx")
+        pd.DataFrame({'Auxiliar': ['73130601'], 'Neto': [10]}).to_excel(ruta, index=False)
+        importador = ImportadorContabilidad()
+        self.assertTrue(importador.cargar_multiples([ruta]))
+        self.assertEqual(importador.tabla['periodo'].tolist(), ['cierre'])
+
+
+class TestImportacionIncremental(unittest.TestCase):
+    """Tests para la importación incremental con marca de agua"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.almacen = os.path.join(self.tmp.name, "contabilidad.sqlite")
+
+    def _auxiliar(self, nombre, filas):
+        ruta = os.path.join(self.tmp.name, nombre)
+        pd.DataFrame(filas, columns=['Fecha', 'Auxiliar', 'Desc. C.O. movto.', 'Neto']).to_excel(ruta, index=False)
+        return ruta
+
+    def _cargar(self, ruta):
+        importador = ImportadorContabilidad()
+        self.assertTrue(importador.cargar_incremental(ruta, self.almacen), importador.errores)
+        return importador
+
+    def _agregados(self, importador):
+        agregados = importador.almacen.agregados.set_index(['codigo_cuenta', 'nombre_centro', 'periodo'])
+        return agregados['neto'].to_dict()
+
+    def test_solo_movimientos_nuevos_y_correcciones(self):
+        """Test: se agregan los posteriores a la marca y se reemplazan los grupos corregidos"""
+        enero = [['10/01/2025', '7313', 'Norte', 100], ['20/01/2025', '7313', 'Norte', 50],
+                 ['15/01/2025', '5105', 'Sur', 30]]
+        febrero = [['05/02/2025', '7313', 'Norte', 70]]
+        self._cargar(self._auxiliar("enero.xlsx", enero))
+
+        importador = self._cargar(self._auxiliar("febrero.xlsx", febrero))
+        self.assertIn("  - Movimientos nuevos: 1", importador.advertencias)
+        self.assertIn("  - Agregados recalculados: 1", importador.advertencias)
+        self.assertEqual(importador.almacen.marca_agua, pd.Timestamp('2025-02-05'))
+
+        # Reimportación del año: enero/Norte llega corregido, el resto igual
+        corregido = [['10/01/2025', '7313', 'Norte', 100], ['20/01/2025', '7313', 'Norte', 45]]
+        importador = self._cargar(self._auxiliar("anual.xlsx", corregido + enero[2:] + febrero))
+        self.assertIn("  - Movimientos nuevos: 0", importador.advertencias)
+        self.assertIn("  - Grupos corregidos: 1", importador.advertencias)
+        self.assertIn("  - Agregados recalculados: 1", importador.advertencias)
+        self.assertEqual(self._agregados(importador), {
+            ('7313', 'Norte', '2025-01'): 145, ('5105', 'Sur', '2025-01'): 30, ('7313', 'Norte', '2025-02'): 70})
+        self.assertEqual(importador.obtener_costos_por_cuenta(), {'5105': 30, '7313': 215})
+
+    def test_solo_se_escriben_las_filas_afectadas(self):
+        """Test: los grupos y agregados no tocados conservan sus filas en el archivo"""
+        def filas(tabla):
+            with sqlite3.connect(self.almacen) as conexion:
+                consulta = f"SELECT rowid, nombre_centro, neto FROM {tabla} WHERE periodo = '2025-01'"
+                return {centro: (rowid, neto) for rowid, centro, neto in conexion.execute(consulta)}
+
+        self._cargar(self._auxiliar("enero.xlsx", [['10/01/2025', '7313', 'Norte', 100],
+                                                   ['15/01/2025', '5105', 'Sur', 30]]))
+        movimientos, agregados = filas('movimientos'), filas('agregados')
+        inodo = os.stat(self.almacen).st_ino
+
+        # Corrige enero/Sur y agrega febrero: enero/Norte no se reescribe
+        importador = self._cargar(self._auxiliar("febrero.xlsx", [['15/01/2025', '5105', 'Sur', 35],
+                                                                  ['05/02/2025', '7313', 'Norte', 70]]))
+        importador.almacen.cerrar()
+        self.assertEqual(os.stat(self.almacen).st_ino, inodo)
+        self.assertEqual(filas('movimientos')['Norte'], movimientos['Norte'])
+        self.assertEqual(filas('agregados')['Norte'], agregados['Norte'])
+        self.assertEqual(filas('movimientos')['Sur'][1], 35)
+        self.assertEqual(filas('agregados')['Sur'][1], 35)
+
+    def test_reimportar_sin_cambios(self):
+        """Test: volver a cargar el mismo archivo no cambia nada"""
+        ruta = self._auxiliar("enero.xlsx", [['10/01/2025', '7313', 'Norte', 100]])
+        self._cargar(ruta)
+        importador = self._cargar(ruta)
+        self.assertIn("  - Grupos corregidos: 0", importador.advertencias)
+        self.assertEqual(len(importador.tabla), 1)
+
+    def test_movimiento_tardio_de_un_grupo_nuevo(self):
+        """Test: un movimiento anterior a la marca en un grupo sin datos se agrega"""
+        self._cargar(self._auxiliar("febrero.xlsx", [['05/02/2025', '7313', 'Norte', 70]]))
+        importador = self._cargar(self._auxiliar("tardio.xlsx", [['28/01/2025', '5105', 'Sur', 30]]))
+        self.assertEqual(len(importador.tabla), 2)
+        self.assertEqual(importador.almacen.marca_agua, pd.Timestamp('2025-02-05'))
+
+    def test_produccion_por_numero_de_factura(self):
+        """Test: producción usa No Factura como marca y agrega por servicio/sede/cliente"""
+        columnas = ['codigo_servicio', 'servicio', 'Sede', 'entidad', 'Valor Servicio', 'No Factura']
+        inicial = os.path.join(self.tmp.name, "produccion-1.csv")
+        pd.DataFrame([['890201', 'Consulta', 'Norte', 'EPS1', 100, 'FE001'],
+                      ['890201', 'Consulta', 'Norte', 'EPS1', 100, 'FE002'],
+                      ['890301', 'Control', 'Sur', 'EPS2', 80, 'FE003']], columns=columnas).to_csv(inicial, index=False)
+        siguiente = os.path.join(self.tmp.name, "produccion-2.csv")
+        pd.DataFrame([['890301', 'Control', 'Sur', 'EPS2', 90, 'FE003'],  # Factura corregida
+                      ['890201', 'Consulta', 'Norte', 'EPS1', 100, 'FE004']],
+                     columns=columnas).to_csv(siguiente, index=False)
+        almacen = os.path.join(self.tmp.name, "produccion.sqlite")
+
+        ImportadorProduccion().cargar_incremental(inicial, almacen)
+        importador = ImportadorProduccion()
+        self.assertTrue(importador.cargar_incremental(siguiente, almacen), importador.errores)
+        self.assertIn("  - Facturas corregidas: 1", importador.advertencias)
+        self.assertEqual(importador.almacen.marca_agua, 4)
+        registros = {r['codigo_servicio']: (r['cantidad'], r['valor_unitario']) for r in importador.datos_produccion}
+        self.assertEqual(registros, {'890201': (3, 100), '890301': (1, 90)})
+
+    def test_marca_de_factura_numerica(self):
+        """Test: FE10 es posterior a FE9 (la marca no compara textos) y el almacén es SQLite"""
+        columnas = ['codigo_servicio', 'servicio', 'Sede', 'entidad', 'Valor Servicio', 'No Factura']
+        almacen = os.path.join(self.tmp.name, "produccion.sqlite")
+        for nombre, factura in (("fe9.csv", 'FE9'), ("fe10.csv", 'FE10')):
+            ruta = os.path.join(self.tmp.name, nombre)
+            pd.DataFrame([['890201', 'Consulta', 'Norte', 'EPS1', 100, factura]],
+                         columns=columnas).to_csv(ruta, index=False)
+            importador = ImportadorProduccion()
+            self.assertTrue(importador.cargar_incremental(ruta, almacen), importador.errores)
+        self.assertIn("  - Filas nuevas: 1", importador.advertencias)
+        self.assertEqual(importador.almacen.marca_agua, 10)
+        conexion = sqlite3.connect(almacen)
+        self.addCleanup(conexion.close)
+        facturas = [f for f, in conexion.execute("SELECT numero_factura FROM movimientos ORDER BY orden_factura")]
+        self.assertEqual(facturas, ['FE9', 'FE10'])
+
+
+class TestGuardarEnAlmacen(unittest.TestCase):
+    """Tests para la escritura de los importadores en el almacén SQLite"""
+
+    def setUp(self):
+        self.almacen = AlmacenSQL()
+        self.addCleanup(self.almacen.cerrar)
+
+    def test_contabilidad_por_periodo(self):
+        """Test: cada periodo de la tabla se reemplaza y se consulta por separado"""
+        contabilidad = ImportadorContabilidad()
+        contabilidad._procesar_dataframe(pd.DataFrame({
+            'Fecha': ['05/01/2025', '10/02/2025', '11/02/2025'],
+            'Auxiliar': ['7313', '7313', '5105'],
+            'Desc. C.O. movto.': ['Norte', 'Norte', 'Sur'],
+            'Neto': ['1.000', '2.000,50', '300'],
+        }), "auxiliar.xlsx")
+        with self.assertRaises(ValueError):
+            contabilidad.guardar_en_almacen(self.almacen)
+        self.assertEqual(contabilidad.guardar_en_almacen(self.almacen, "2025-01"), 3)
+
+        contabilidad.tabla = contabilidad.tabla.iloc[1:].assign(periodo='2025-02')
+        self.assertEqual(contabilidad.guardar_en_almacen(self.almacen), 2)
+        self.assertEqual(self.almacen.periodos("contabilidad"), ['2025-01', '2025-02'])
+        self.assertEqual(self.almacen.costos_por_cuenta("2025-02"), {'5105': 300, '7313': 2000.5})
+        self.assertEqual(self.almacen.costos_por_centro(), {'Norte': 5001, 'Sur': 600})
+        agregada = self.almacen.contabilidad_agregada()
+        self.assertEqual(list(agregada.itertuples(index=False, name=None)), [
+            ('2025-01', '5105', 'Sur', 300), ('2025-01', '7313', 'Norte', 3000.5),
+            ('2025-02', '5105', 'Sur', 300), ('2025-02', '7313', 'Norte', 2000.5)])
+        fechas = self.almacen.consultar("SELECT DISTINCT fecha FROM contabilidad ORDER BY fecha")['fecha']
+        self.assertEqual(fechas.tolist(), ['2025-01-05', '2025-02-10', '2025-02-11'])
+
+    def test_nomina_y_produccion(self):
+        """Test: nómina y producción se guardan con el periodo indicado"""
+        nomina = ImportadorNomina()
+        nomina._procesar_dataframe(pd.DataFrame({
+            'Empleado': ['1', '2', '3'], 'Descripcion C.O.': ['Norte', 'Sur', 'Norte'],
+            'Salario': ['1.000.000', '2.000.000', '1.500.000']}), "nomina.xlsx")
+        nomina.guardar_en_almacen(self.almacen, "2025-03")
+        self.assertEqual(self.almacen.costo_nomina_por_sede("2025-03"), {'Norte': 2500000, 'Sur': 2000000})
+        self.assertEqual([(r['sede'], r['salario'], r['cantidad']) for r in self.almacen.nomina_por_grupo("2025-03")],
+                         [('Norte', 1250000, 2), ('Sur', 2000000, 1)])
+
+        produccion = ImportadorProduccion()
+        produccion._procesar_dataframe(pd.DataFrame({
+            'codigo_servicio': ['890201'], 'servicio': ['Consulta'], 'Sede': ['Norte'],
+            'entidad': ['EPS1'], 'Valor Servicio': [100]}), "produccion.xlsx")
+        self.assertEqual(produccion.guardar_en_almacen(self.almacen, "2025-03"), 1)
+        self.assertEqual(list(self.almacen.iterar_produccion("2025-03")), [{
+            'codigo': '890201', 'servicio': 'Consulta', 'sede': 'Norte', 'aseguradora': 'EPS1',
+            'cantidad': 1, 'valor_unitario': 100}])
+
+
+class TestLectorExcel(unittest.TestCase):
+    """Tests para los motores de lectura de Excel"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.ruta = os.path.join(self.tmp.name, "auxiliar.xlsx")
+        self.df = pd.DataFrame({
+            'Auxiliar': [73130601, 73150501, 73130601],
+            'Fecha': pd.to_datetime(['2025-01-31', '2025-02-28', '2025-03-15 10:30:00'], format='ISO8601'),
+            'Detalle': ['a', 'b', 'c'],
+            'Desc. C.O. movto.': ['Norte', None, 'Sur'],
+            'Neto': [1000.5, 2000, 3000],
+        })
+        with pd.ExcelWriter(self.ruta) as escritor:
+            pd.DataFrame({'x': [1]}).to_excel(escritor, sheet_name="Portada", index=False)
+            self.df.to_excel(escritor, sheet_name="Auxiliar", index=False)
+
+    def test_motores_equivalentes(self):
+        """Test: todos los motores disponibles leen lo mismo, solo con las columnas pedidas"""
+        columnas = ['Auxiliar', 'Fecha', 'Desc. C.O. movto.', 'Neto', 'No existe']
+        esperado = self.df.drop(columns='Detalle')
+        for motor in motores_disponibles():
+            with self.subTest(motor=motor):
+                leido = leer_excel(self.ruta, "Auxiliar", columnas=columnas, motor=motor)
+                pd.testing.assert_frame_equal(leido, esperado, check_dtype=False)
+
+    def test_primera_hoja_por_defecto(self):
+        """Test: sin hoja se lee la primera, como pd.read_excel"""
+        self.assertEqual(list(leer_excel(self.ruta, motor="openpyxl").columns), ['x'])
+
+    def test_auto_usa_el_siguiente_motor_si_falla(self):
+        """Test: con motor auto, un motor que falla cede al siguiente"""
+        primero = motores_disponibles()[0]
+        with mock.patch.dict(MOTORES, {primero: mock.Mock(side_effect=ValueError("motor roto"))}):
+            leido = leer_excel(self.ruta, "Auxiliar", columnas=['Neto'])
+        self.assertEqual(leido['Neto'].tolist(), [1000.5, 2000, 3000])
+
+    def test_importador_lee_solo_columnas_del_mapeo(self):
+        """Test: el importador no carga columnas fuera de MAPEO_COLUMNAS"""
+        importador = ImportadorContabilidad(motor_excel="openpyxl")
+        self.assertTrue(importador.cargar_desde_excel(self.ruta, hoja="Auxiliar"), importador.errores)
+        self.assertEqual(list(importador.tabla.columns), ['codigo_cuenta', 'fecha', 'nombre_centro', 'neto'])
+
+
+class TestMontos(unittest.TestCase):
+    """Tests para la conversión de montos con formato local"""
+
+    def test_detectar_decimal(self):
+        """Test: el separador decimal se deduce de la muestra"""
+        self.assertEqual(detectar_decimal(['$ 1.234.567,89', '12,5']), ',')
+        self.assertEqual(detectar_decimal(['1,234,567.89', '1234.5']), '.')
+        self.assertEqual(detectar_decimal(['1.234', '56.000']), ',')  # Solo miles
+        self.assertEqual(detectar_decimal(['1,234']), '.')
+        self.assertIsNone(detectar_decimal(['100', '2500000']))
+
+    def test_formato_colombiano(self):
+        """Test: "1.234,56" no pierde los decimales ni se multiplica por 100"""
+        serie = pd.Series(['$ 1.234,56', '1.000', '(2.500,50)', '-75', '', None, 'N/A'])
+        convertida = a_numero(serie)
+        self.assertEqual(convertida.iloc[:4].tolist(), [1234.56, 1000, -2500.5, -75])
+        self.assertTrue(convertida.iloc[4:].isna().all())
+
+    def test_formato_estadounidense(self):
+        """Test: "1,234.56" se convierte con el punto como decimal"""
+        convertida = a_numero(pd.Series(['$1,234.56', '1,000,000', '0.5']))
+        self.assertEqual(convertida.tolist(), [1234.56, 1000000, 0.5])
+
+    def test_columna_numerica_sin_cambios(self):
+        """Test: una columna ya numérica se devuelve tal cual"""
+        serie = pd.Series([1000.5, 2000.0])
+        self.assertIs(a_numero(serie), serie)
+
+    def test_numeros_y_textos_mezclados(self):
+        """Test: los números que ya vienen del Excel no se reinterpretan con el formato del texto"""
+        convertida = a_numero(pd.Series([1000.5, '1.234,56', 7], dtype=object))
+        self.assertEqual(convertida.tolist(), [1000.5, 1234.56, 7])
+
+    def test_importadores(self):
+        """Test: contabilidad y nómina convierten sus montos con el formato detectado"""
+        contabilidad = ImportadorContabilidad()
+        contabilidad._procesar_dataframe(pd.DataFrame({
+            'Auxiliar': ['73130601', '73130601'],
+            'Débitos': ['1.234,56', '10,5'],
+            'Neto': ['1.500.000', '250.000'],
+        }), "auxiliar.xlsx")
+        self.assertEqual(contabilidad.tabla['debitos'].tolist(), [1234.56, 10.5])
+        self.assertEqual(contabilidad.obtener_costos_por_cuenta(), {'73130601': 1750000})
+
+        nomina = ImportadorNomina()
+        nomina._procesar_dataframe(pd.DataFrame({
+            'Empleado': ['1', '2'], 'Salario': ['2,500,000.50', '1,800,000']}), "nomina.xlsx")
+        self.assertEqual(nomina.obtener_costo_total_nomina(), 4300000.5)
+
+
+class TestDetectorEncabezados(unittest.TestCase):
+    """Tests para el reconocimiento de encabezados por similitud y sus perfiles"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.perfiles = os.path.join(self.tmp.name, "mapeo_columnas.json")
+        self.ruta = os.path.join(self.tmp.name, "auxiliar.xlsx")
+        pd.DataFrame({
+            'AUXILIAR': ['73130601', '73130602'],
+            'Desc C.O. Movto': ['Norte', 'Sur'],
+            'Debitos': ['1.000,00', '500,00'],
+            'Neto': [1000, 500],
+            'Observaciones': ['', ''],
+        }).to_excel(self.ruta, index=False)
+
+    def test_normalizar_y_emparejar(self):
+        """Test: sin tildes ni mayúsculas, abreviaturas incluidas, sin asignar dos veces"""
+        self.assertEqual(normalizar("Razón social  tercero-movto."), "razon social tercero movto")
+        mapeo, puntajes = emparejar(['DÉBITOS', 'Desc. cargo', 'Total'],
+                                    ['Débitos', 'Descripcion del cargo', 'Créditos'])
+        self.assertEqual(mapeo, {'DÉBITOS': 'Débitos', 'Desc. cargo': 'Descripcion del cargo'})
+        self.assertEqual(puntajes['DÉBITOS'], 1.0)
+
+    def test_leer_encabezado(self):
+        """Test: solo se lee la primera fila"""
+        self.assertEqual(leer_encabezado(self.ruta),
+                         ['AUXILIAR', 'Desc C.O. Movto', 'Debitos', 'Neto', 'Observaciones'])
+
+    def test_importacion_con_encabezados_distintos(self):
+        """Test: el importador renombra los encabezados reconocidos y lo informa"""
+        importador = ImportadorContabilidad(detector=DetectorEncabezados(self.perfiles))
+        self.assertTrue(importador.cargar_desde_excel(self.ruta))
+        self.assertEqual(importador.obtener_costos_por_centro(), {'Norte': 1000, 'Sur': 500})
+        self.assertEqual(importador.tabla['debitos'].tolist(), [1000.0, 500.0])
+        self.assertTrue(any("'Debitos' -> 'Débitos'" in a for a in importador.advertencias))
+        self.assertNotIn('Observaciones', importador.tabla.columns)
+
+    def test_perfil_confirmado(self):
+        """Test: el mapeo confirmado se guarda y la siguiente importación lo usa sin comparar"""
+        detector = DetectorEncabezados(self.perfiles)
+        ImportadorContabilidad(detector=detector).cargar_desde_excel(self.ruta)
+        firma = detector.confirmar()
+
+        otro = DetectorEncabezados(self.perfiles)
+        self.assertIn(firma, otro.perfiles())
+        importador = ImportadorContabilidad(detector=otro)
+        with mock.patch('src.detector_encabezados.emparejar') as emparejar_mock:
+            self.assertTrue(importador.cargar_desde_excel(self.ruta))
+        emparejar_mock.assert_not_called()
+        self.assertEqual(importador.obtener_costos_por_cuenta(), {'73130601': 1000, '73130602': 500})
+        with open(self.perfiles, 'rb') as f:
+            self.assertIn(b'\r\n', f.read())
+
+    def test_confirmar_sin_pendiente(self):
+        """Test: sin una detección por similitud no hay nada que confirmar"""
+        with self.assertRaises(ValueError):
+            DetectorEncabezados(self.perfiles).confirmar()
+
+    def test_produccion_csv_por_bloques(self):
+        """Test: los encabezados reconocidos también sirven en la lectura por bloques"""
+        ruta = os.path.join(self.tmp.name, "produccion.csv")
+        pd.DataFrame({
+            'Codigo Servicio': ['001', '001', '002'],
+            'Servicio': ['Consulta', 'Consulta', 'Ecografía'],
+            'SEDE': ['Norte', 'Norte', 'Sur'],
+            'Entidad': ['EPS1', 'EPS1', 'EPS2'],
+            'Valor servicio': [100, 100, 300],
+        }).to_csv(ruta, index=False)
+        importador = ImportadorProduccion(detector=DetectorEncabezados(self.perfiles))
+        self.assertTrue(importador.cargar_desde_csv_por_bloques(ruta, tamano_bloque=2), importador.errores)
+        registros = {r['codigo_servicio']: r for r in importador.datos_produccion}
+        self.assertEqual(registros['001']['cantidad'], 2)
+        self.assertEqual(registros['002']['sede'], 'Sur')
+
+
+if __name__ == '__main__':
+    unittest.main()
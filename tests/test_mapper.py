@@ -0,0 +1,147 @@
+"""
+Tests unitarios para el mapeo de columnas de ConfigMapper.
+"""
+import pickle
+import subprocess
+import sys
+import unittest
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+from src import config
+from src.mapper import ConfigMapper
+
+
+def crear_mapper(mapeo_columnas):
+    """ConfigMapper con un mapeo en memoria (sin leer los JSON)"""
+    mapper = ConfigMapper()
+    mapper.mapeo_columnas = mapeo_columnas
+    mapper._loaded = True
+    return mapper
+
+
+class TestMapeoCompilado(unittest.TestCase):
+    """Tests para aplicar_mapeo con el mapeo resuelto una vez"""
+
+    MAPEO = {'nomina': {'id': 'ID', 'salario': 'Salario Base', 'centro': 'Sede'}}
+
+    def setUp(self):
+        self.mapper = crear_mapper(self.MAPEO)
+
+    def test_lista_de_filas(self):
+        """Test: cada fila queda con las llaves estándar en el orden del mapeo"""
+        filas = [{'ID': 1, 'Salario Base': 100, 'Sede': 'Norte', 'Otra': 'x'},
+                 {'ID': 2, 'Salario Base': 200, 'Sede': 'Sur', 'Otra': 'y'}]
+        self.assertEqual(self.mapper.aplicar_mapeo(filas, 'nomina'), [
+            {'id': 1, 'salario': 100, 'centro': 'Norte'},
+            {'id': 2, 'salario': 200, 'centro': 'Sur'},
+        ])
+        self.assertEqual(self.mapper.aplicar_mapeo(filas[0], 'nomina'),
+                         {'id': 1, 'salario': 100, 'centro': 'Norte'})
+
+    def test_faltantes_se_reportan_una_vez(self):
+        """Test: una columna ausente genera una sola advertencia y queda en None"""
+        filas = [{'ID': i, 'Sede': 'Norte'} for i in range(1000)]
+        with warnings.catch_warnings(record=True) as avisos:
+            warnings.simplefilter("always")
+            resultado = self.mapper.aplicar_mapeo(filas, 'nomina')
+        self.assertEqual(len(avisos), 1)
+        self.assertIn("salario ('Salario Base')", str(avisos[0].message))
+        self.assertIsNone(resultado[999]['salario'])
+
+    def test_dataframe(self):
+        """Test: un DataFrame se convierte con un solo select/rename"""
+        df = pd.DataFrame({'Sede': ['Norte'], 'ID': [7], 'Salario Base': [100]})
+        resultado = self.mapper.aplicar_mapeo(df, 'nomina')
+        self.assertEqual(list(resultado.columns), ['id', 'salario', 'centro'])
+        self.assertEqual(resultado.iloc[0].tolist(), [7, 100, 'Norte'])
+
+    def test_filas_tupla_por_posicion(self):
+        """Test: el extractor compilado lee tuplas por posición del encabezado"""
+        compilado = self.mapper.compilar_mapeo('nomina', ['Sede', 'ID', 'Salario Base'])
+        self.assertEqual(compilado.aplicar_filas([('Norte', 1, 100)], por_posicion=True),
+                         [{'id': 1, 'salario': 100, 'centro': 'Norte'}])
+        self.assertIsNone(self.mapper.compilar_mapeo('otro', ['ID']))
+
+    def test_filas_con_llaves_distintas(self):
+        """Test: si una fila no tiene las columnas de la primera se resuelve por separado"""
+        filas = [{'ID': 1, 'Salario Base': 100}, {'ID': 2}]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            resultado = self.mapper.aplicar_mapeo(filas, 'nomina')
+        self.assertEqual(resultado[1], {'id': 2, 'salario': None, 'centro': None})
+
+    def test_columnas_que_aparecen_despues_de_la_primera_fila(self):
+        """Test: una columna ausente en la primera fila se lee en las que sí la traen"""
+        filas = [{'ID': 1}, {'ID': 2, 'Salario Base': 99}]
+        with warnings.catch_warnings(record=True) as avisos:
+            warnings.simplefilter("always")
+            resultado = self.mapper.aplicar_mapeo(filas, 'nomina')
+        self.assertEqual([fila['salario'] for fila in resultado], [None, 99])
+        # Solo se reporta la columna que no aparece en ninguna fila
+        self.assertEqual(len(avisos), 1)
+        self.assertNotIn("salario", str(avisos[0].message))
+        self.assertIn("centro ('Sede')", str(avisos[0].message))
+
+
+class TestConfigSnapshot(unittest.TestCase):
+    """Tests para la configuración perezosa e inmutable de src.config"""
+
+    def tearDown(self):
+        config.recargar()
+
+    def test_importar_no_lee_los_json(self):
+        """Test: importar src.config no carga el mapper; el primer valor pedido sí"""
+        codigo = ("import sys; from src import config; print('src.mapper' in sys.modules); "
+                  "config.SEDES; print('src.mapper' in sys.modules)")
+        salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                                cwd=Path(__file__).resolve().parents[1]).stdout.split()
+        self.assertEqual(salida, ['False', 'True'])
+
+    def test_snapshot_inmutable(self):
+        """Test: el snapshot no se puede modificar y sus colecciones son de solo lectura"""
+        snapshot = config.obtener()
+        self.assertIs(config.obtener(), snapshot)
+        with self.assertRaises(AttributeError):
+            snapshot.sedes = ()
+        with self.assertRaises(TypeError):
+            snapshot.salas_por_sede['Otra'] = 1
+        self.assertEqual(config.SEDES, list(snapshot.sedes))
+
+    def test_valores_publicos_son_copias(self):
+        """Test: modificar una lista o diccionario público no cambia el snapshot"""
+        snapshot = config.obtener()
+        sedes = list(snapshot.sedes)
+        config.SEDES.append('Otra')
+        snapshot.PRESUPUESTO_INDIRECTOS['Otro'] = 1
+        snapshot.CATEGORIAS[next(iter(snapshot.categorias))].append('Otro')
+        self.assertEqual(config.SEDES, sedes)
+        self.assertNotIn('Otro', snapshot.PRESUPUESTO_INDIRECTOS)
+        self.assertNotIn('Otro', snapshot.CATEGORIAS[next(iter(snapshot.categorias))])
+
+    def test_snapshot_serializable(self):
+        """Test: el snapshot se puede enviar a otro proceso (pickle) y sigue siendo inmutable"""
+        copia = pickle.loads(pickle.dumps(config.obtener()))
+        self.assertEqual(copia.SEDES, config.SEDES)
+        self.assertEqual(copia.SALAS_POR_SEDE, config.SALAS_POR_SEDE)
+        with self.assertRaises(TypeError):
+            copia.salas_por_sede['Otra'] = 1
+
+    def test_establecer_otra_configuracion(self):
+        """Test: los valores públicos del módulo siguen al snapshot en uso"""
+        mapper = crear_mapper({})
+        mapper.centros_costo = {'centros': [{'nombre': 'Sede Única', 'salas': 2}]}
+        config.establecer(config.ConfigSnapshot.desde_mapper(mapper))
+        self.assertEqual(config.SEDES, ['Sede Única'])
+        self.assertEqual(config.SALAS_POR_SEDE, {'Sede Única': 2})
+        self.assertIs(config._mapper, mapper)
+        # Lo que no viene en el mapper toma los valores por defecto
+        self.assertEqual(len(config.SERVICIOS), 20)
+        config.recargar()
+        self.assertNotEqual(config.SEDES, ['Sede Única'])
+
+
+if __name__ == '__main__':
+    unittest.main()
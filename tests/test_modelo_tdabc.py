@@ -0,0 +1,646 @@
+"""
+Tests de generación del libro completo (modo normal y streaming).
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import unittest
+import zipfile
+from datetime import date, datetime, time, timezone
+from unittest import mock
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+from openpyxl.utils.exceptions import IllegalCharacterError
+import pandas as pd
+
+from src import config
+from src.almacen_sql import AlmacenSQL
+from src.data.ecuaciones_data import ECUACIONES_SERVICIOS
+from src.ensamblador import _ESTILO_CELDA, TareaHoja, generar_hojas
+from src.escritor import EscritorHoja, Celda
+from src.escritor_xml import LibroXML, escritor_masivo, filas_relativas
+from src.generators.nomina_generator import generar_personal_nomina
+from src.layout import layout_libro
+from src.lote import MANIFIESTO, generar_empresas, generar_lote
+from src.modelo_tdabc import ModeloTDABC
+from src.sheets import parametros, produccion
+from src.sheets.produccion_agregada import AgregadorProduccion
+from src.styles import registrar_estilos
+from tests.evaluador_formulas import EvaluadorLibro
+
+
+def generar_libro(ruta, **kwargs):
+    """Genera el modelo con semilla fija y sin imprimir el progreso"""
+    random.seed(2024)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ModeloTDABC().generar_archivo(ruta, **kwargs)
+    return load_workbook(ruta)
+
+
+class TestModoStreaming(unittest.TestCase):
+    """El modo streaming debe producir el mismo libro que el modo normal"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.wb_normal = generar_libro(os.path.join(cls.tmp.name, "normal.xlsx"))
+        cls.wb_streaming = generar_libro(os.path.join(cls.tmp.name, "streaming.xlsx"), streaming=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_mismas_hojas(self):
+        self.assertEqual(self.wb_normal.sheetnames, self.wb_streaming.sheetnames)
+        self.assertEqual(len(self.wb_normal.sheetnames), 12)
+
+    def test_mismos_valores_y_formulas(self):
+        for nombre in self.wb_normal.sheetnames:
+            filas_normal = list(self.wb_normal[nombre].iter_rows(values_only=True))
+            filas_streaming = list(self.wb_streaming[nombre].iter_rows(values_only=True))
+            self.assertEqual(filas_normal, filas_streaming, f"Diferencias en hoja {nombre}")
+
+    def test_mismos_rangos_combinados(self):
+        for nombre in self.wb_normal.sheetnames:
+            normal = sorted(str(r) for r in self.wb_normal[nombre].merged_cells.ranges)
+            streaming = sorted(str(r) for r in self.wb_streaming[nombre].merged_cells.ranges)
+            self.assertEqual(normal, streaming, f"Diferencias en hoja {nombre}")
+
+    def test_tablas_con_nombres_de_columna(self):
+        """En write-only las columnas de las tablas deben llevar los encabezados reales"""
+        tabla = self.wb_streaming["PRODUCCION"].tables["TablaProduccion"]
+        nombres = [c.name for c in tabla.tableColumns]
+        self.assertIn("Total Facturado", nombres)
+        self.assertEqual(nombres, [c.name for c in self.wb_normal["PRODUCCION"].tables["TablaProduccion"].tableColumns])
+
+
+class TestHojasEnProcesos(unittest.TestCase):
+    """Las hojas construidas en procesos y ensambladas deben dar el mismo libro"""
+
+    @staticmethod
+    def _celdas(ws):
+        return [[(c.value, c.style, c.number_format, c.font.b, c.fill.fgColor.rgb) for c in fila]
+                for fila in ws.iter_rows()]
+
+    def _comparar(self, **kwargs):
+        with tempfile.TemporaryDirectory() as tmp:
+            secuencial = generar_libro(os.path.join(tmp, "secuencial.xlsx"), **kwargs)
+            paralelo = generar_libro(os.path.join(tmp, "paralelo.xlsx"), procesos=2, **kwargs)
+        self.assertEqual(secuencial.sheetnames, paralelo.sheetnames)
+        for nombre in secuencial.sheetnames:
+            a, b = secuencial[nombre], paralelo[nombre]
+            self.assertEqual(self._celdas(a), self._celdas(b), f"Diferencias en hoja {nombre}")
+            self.assertEqual(sorted(map(str, a.merged_cells.ranges)), sorted(map(str, b.merged_cells.ranges)))
+            self.assertEqual(dict(a.tables.items()), dict(b.tables.items()))
+            self.assertEqual({c: d.width for c, d in a.column_dimensions.items()},
+                             {c: d.width for c, d in b.column_dimensions.items()})
+
+    def test_mismo_libro(self):
+        self._comparar()
+
+    def test_mismo_libro_streaming_ambos(self):
+        self._comparar(streaming=True, modo="ambos")
+
+    def test_hoja_requerida_inexistente(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaisesRegex(ValueError, "NO_EXISTE"):
+                generar_hojas([TareaHoja("PARAMETROS", parametros.crear_hoja_parametros,
+                                         requiere=["NO_EXISTE"])], os.path.join(tmp, "x.xlsx"), procesos=1)
+
+    def test_estilo_en_cualquier_posicion(self):
+        """Test: el índice de estilo se traduce sin importar el orden de los atributos de la celda"""
+        xml = b'<c r="A1" s="3"/><c s="3" r="B1" t="n"/><c r="C1" t="s" s="12"/><cols s="3"/>'
+        traducido = _ESTILO_CELDA.sub(lambda m: m.group(1) + {b"3": b"7"}.get(m.group(2), m.group(2)) + b'"', xml)
+        self.assertEqual(traducido, b'<c r="A1" s="7"/><c s="7" r="B1" t="n"/><c r="C1" t="s" s="12"/><cols s="3"/>')
+
+
+class TestEscritorXML(unittest.TestCase):
+    """Las hojas masivas escritas como XML directo deben dar el mismo libro que openpyxl"""
+
+    def _comparar(self, **kwargs):
+        with tempfile.TemporaryDirectory() as tmp:
+            normal = generar_libro(os.path.join(tmp, "openpyxl.xlsx"), **kwargs)
+            directo = generar_libro(os.path.join(tmp, "xml.xlsx"), xml_directo=True, **kwargs)
+        self.assertEqual(normal.sheetnames, directo.sheetnames)
+        for nombre in normal.sheetnames:
+            a, b = normal[nombre], directo[nombre]
+            # openpyxl lee cada celda de una fórmula compartida con su propia fórmula
+            self.assertEqual(self._celdas(a), self._celdas(b), f"Diferencias en hoja {nombre}")
+            self.assertEqual(sorted(map(str, a.merged_cells.ranges)), sorted(map(str, b.merged_cells.ranges)))
+            self.assertEqual(dict(a.tables.items()), dict(b.tables.items()))
+            self.assertEqual({c: d.width for c, d in a.column_dimensions.items()},
+                             {c: d.width for c, d in b.column_dimensions.items()})
+
+    @staticmethod
+    def _celdas(ws):
+        """Celdas de la hoja con los float redondeados a 16 cifras, como los escribe openpyxl"""
+        return [[(float("%.16g" % c[0]),) + c[1:] if isinstance(c[0], float) else c for c in fila]
+                for fila in TestHojasEnProcesos._celdas(ws)]
+
+    def test_mismo_libro(self):
+        self._comparar()
+
+    def test_mismo_libro_streaming_valores(self):
+        self._comparar(streaming=True, modo="valores")
+
+    def test_textos_y_formulas_compartidas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = os.path.join(tmp, "xml.xlsx")
+            wb = generar_libro(ruta, xml_directo=True)
+            with zipfile.ZipFile(ruta) as paquete:
+                # Una sola tabla de textos: openpyxl no escribe la suya
+                self.assertEqual(paquete.namelist().count("xl/sharedStrings.xml"), 1)
+                indice = wb.sheetnames.index("PRODUCCION") + 1
+                hoja = paquete.read(f"xl/worksheets/sheet{indice}.xml").decode()
+        filas = wb["PRODUCCION"].max_row - 4
+        # Una sola fórmula maestra para toda la columna G; el resto solo la referencia
+        self.assertEqual(hoja.count('<f t="shared" ref="G4:'), 1)
+        self.assertEqual(hoja.count('<f t="shared" si="0"/>'), filas - 1)
+        self.assertNotIn("inlineStr", hoja)
+        self.assertEqual(wb["PRODUCCION"]["G5"].value, "=E5*F5")
+
+    def test_filas_relativas(self):
+        self.assertEqual(filas_relativas("E4*$F$4+10"), (True, False, False))
+        self.assertEqual(filas_relativas("SUMIFS(Tabla[Col 1],Tabla[Sede],C5)"), (False, True))
+        self.assertEqual(filas_relativas('IF(A2="B2",LOG10(C$2),Hoja1!D3)'),
+                         (True, False, False, False, False, True))
+
+    def test_caracteres_de_control(self):
+        """Test: como openpyxl, un texto o fórmula con caracteres no válidos en XML se rechaza"""
+        for valor in ("ACME\x0bS.A.", '=A1&"\x0b"'):
+            with tempfile.TemporaryDirectory() as tmp:
+                wb = Workbook()
+                wb.remove(wb.active)
+                libro = LibroXML(wb, os.path.join(tmp, "xml.xlsx"))
+                hoja = escritor_masivo(wb, "DATOS")
+                try:
+                    with self.assertRaises(IllegalCharacterError):
+                        hoja.agregar(1, ["ok", valor])
+                        hoja.cerrar()
+                finally:
+                    libro.descartar()
+                with self.assertRaises(IllegalCharacterError):
+                    EscritorHoja(Workbook(), "DATOS").agregar(1, ["ok", valor])
+
+    def _escribir(self, filas):
+        """Escribe las filas con EscritorXML y con EscritorHoja; devuelve las dos hojas leídas"""
+        hojas = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for directo in (True, False):
+                ruta = os.path.join(tmp, f"{directo}.xlsx")
+                wb = Workbook()
+                wb.remove(wb.active)
+                registrar_estilos(wb)
+                libro = LibroXML(wb, ruta) if directo else None
+                hoja = escritor_masivo(wb, "DATOS")
+                hoja.escribir(enumerate(filas, 1))
+                hoja.cerrar()
+                libro.guardar() if directo else wb.save(ruta)
+                hojas.append(load_workbook(ruta)["DATOS"])
+        return hojas
+
+    def test_numeros_sin_perder_precision(self):
+        """Test: los números vuelven iguales al leerlos; openpyxl los redondea a 16 cifras"""
+        numeros = [0.12345678901234568, 12345678901234567, 1 / 3, 2.5e16, 1e-300, -7]
+        directa, openpyxl = self._escribir([numeros, [Celda(n, "calculo", '#,##0.00') for n in numeros]])
+        for fila in (1, 2):
+            self.assertEqual([c.value for c in directa[fila]], numeros)
+            self.assertEqual([float(c.value) for c in openpyxl[fila]], [float("%.16g" % n) for n in numeros])
+            self.assertEqual([c.style_id for c in directa[fila]], [c.style_id for c in openpyxl[fila]])
+
+    def test_fechas_como_openpyxl(self):
+        """Test: las fechas son números de serie con el mismo formato y estilo que en EscritorHoja"""
+        fechas = [date(2025, 1, 31), datetime(2025, 3, 15, 10, 30), time(8, 30),
+                  Celda(date(2025, 2, 1), "calculo"), Celda(datetime(2025, 2, 1, 12), "input", "dd/mm/yyyy"),
+                  Celda(date(2025, 2, 2), font=Font(bold=True))]
+        directa, openpyxl = self._escribir([fechas, fechas])
+        self.assertEqual(TestHojasEnProcesos._celdas(directa), TestHojasEnProcesos._celdas(openpyxl))
+        self.assertEqual(directa["A1"].value, datetime(2025, 1, 31))
+        self.assertEqual(directa["A1"].number_format, "yyyy-mm-dd")
+        self.assertEqual(directa["E2"].number_format, "dd/mm/yyyy")
+        with tempfile.TemporaryDirectory() as tmp:
+            wb = Workbook()
+            libro = LibroXML(wb, os.path.join(tmp, "xml.xlsx"))
+            try:
+                with self.assertRaises(TypeError):
+                    escritor_masivo(wb, "DATOS").agregar(1, [datetime(2025, 1, 1, tzinfo=timezone.utc)])
+            finally:
+                libro.descartar()
+
+    def test_error_descarta_archivo(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = os.path.join(tmp, "xml.xlsx")
+            with mock.patch("src.sheets.resumen_ejecutivo.crear_hoja_resumen_ejecutivo",
+                            side_effect=RuntimeError("falla")):
+                with self.assertRaisesRegex(RuntimeError, "falla"):
+                    generar_libro(ruta, xml_directo=True)
+            self.assertFalse(os.path.exists(ruta))
+            with self.assertRaises(ValueError):
+                generar_libro(ruta, xml_directo=True, procesos=2)
+
+
+class TestModoValores(unittest.TestCase):
+    """modo="valores" debe escribir, en lugar de cada fórmula, el número que esta produce"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.wb_formulas = generar_libro(os.path.join(cls.tmp.name, "formulas.xlsx"))
+        cls.wb_valores = generar_libro(os.path.join(cls.tmp.name, "valores.xlsx"), modo="valores", streaming=True)
+        cls.wb_ambos = generar_libro(os.path.join(cls.tmp.name, "ambos.xlsx"), modo="ambos")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_sin_formulas(self):
+        for ws in self.wb_valores.worksheets:
+            for fila in ws.iter_rows(values_only=True):
+                for valor in fila:
+                    self.assertFalse(isinstance(valor, str) and valor.startswith("="), f"{ws.title}: {valor}")
+
+    def test_valores_coinciden_con_formulas(self):
+        evaluador = EvaluadorLibro(self.wb_formulas)
+        for ws in self.wb_formulas.worksheets:
+            for fila in ws.iter_rows():
+                for celda in fila:
+                    if isinstance(celda.value, str) and celda.value.startswith("="):
+                        esperado = evaluador.valor(ws.title, celda.coordinate)
+                        obtenido = self.wb_valores[ws.title][celda.coordinate].value
+                        self.assertAlmostEqual(obtenido, esperado, places=4,
+                                               msg=f"{ws.title}!{celda.coordinate}")
+
+    def test_ambos_agrega_hoja_resultados(self):
+        self.assertEqual(self.wb_ambos.sheetnames[:-1], self.wb_formulas.sheetnames)
+        self.assertEqual(self.wb_ambos.sheetnames[-1], "RESULTADOS")
+        # Primera fila de costeo: mismo servicio/sede y costo total que COSTEO_SERVICIOS
+        resultados = self.wb_ambos["RESULTADOS"]
+        self.assertEqual(resultados["A5"].value, self.wb_formulas["COSTEO_SERVICIOS"]["B5"].value)
+        self.assertAlmostEqual(resultados["F5"].value, self.wb_valores["COSTEO_SERVICIOS"]["G5"].value)
+
+    def test_modo_invalido(self):
+        with self.assertRaises(ValueError):
+            ModeloTDABC().generar_archivo(os.path.join(self.tmp.name, "x.xlsx"), modo="cache")
+
+
+class TestReferenciasAcotadas(unittest.TestCase):
+    """Las fórmulas no deben recorrer columnas completas de 1.048.576 filas"""
+
+    COLUMNA_COMPLETA = re.compile(r"(?<![\w\[])\$?[A-Z]{1,3}:\$?[A-Z]{1,3}(?![\w\]])")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.wb = generar_libro(os.path.join(cls.tmp.name, "modelo.xlsx"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_sin_columnas_completas(self):
+        for ws in self.wb.worksheets:
+            for fila in ws.iter_rows(values_only=True):
+                for valor in fila:
+                    if isinstance(valor, str) and valor.startswith("="):
+                        self.assertIsNone(self.COLUMNA_COMPLETA.search(valor), f"{ws.title}: {valor}")
+
+    def test_tablas_de_origen(self):
+        tablas = {
+            "NOMINA": "TablaNomina", "CAPACIDAD": "TablaCapacidad",
+            "COSTO_POR_MINUTO": "TablaCostoMinutoGrupo", "ECUACIONES_TIEMPO": "TablaEcuaciones",
+            "INSUMOS": "TablaInsumos", "COSTOS_INDIRECTOS": "TablaTasasCIF",
+        }
+        for hoja, tabla in tablas.items():
+            self.assertIn(tabla, self.wb[hoja].tables, hoja)
+        # La tabla termina en la última fila de datos, antes del total
+        ws = self.wb["NOMINA"]
+        ultima = int(ws.tables["TablaNomina"].ref.split(":")[1][1:])
+        self.assertEqual(ws.cell(row=ultima + 1, column=2).value, "TOTAL NÓMINA MENSUAL")
+
+
+class TestLayoutLibro(unittest.TestCase):
+    """Las hojas publican sus tablas y las siguientes usan el rango real"""
+
+    @classmethod
+    def setUpClass(cls):
+        # 160 servicios × sedes supera las 496 filas que antes cubría $C$5:$C$500;
+        # los servicios con insumos quedan al final, fuera de ese rango fijo
+        cls.servicios = [f"Servicio Extra {i}" for i in range(150)] + config.SERVICIOS
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.ruta = os.path.join(cls.tmp.name, "grande.xlsx")
+        random.seed(2024)
+        with mock.patch.object(config, "SERVICIOS", cls.servicios), contextlib.redirect_stdout(io.StringIO()):
+            cls.modelo = ModeloTDABC()
+            cls.modelo.generar_archivo(cls.ruta)
+        cls.layout = layout_libro(cls.modelo.wb)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_tablas_publicadas_por_hoja(self):
+        hojas = self.layout.hojas()
+        self.assertEqual(hojas["COSTOS_INDIRECTOS"], ["TablaIndirectos", "TablaTasasCIF"])
+        costeo = self.layout.tabla("TablaCosteo")
+        self.assertEqual(costeo.filas, len(self.servicios) * len(config.SEDES))
+        self.assertEqual(costeo.rango("Sede"), f"COSTEO_SERVICIOS!$C$5:$C${4 + costeo.filas}")
+
+    def test_tabla_no_publicada(self):
+        with self.assertRaises(KeyError):
+            self.layout.tabla("TablaInexistente")
+
+    def test_materia_prima_cubre_todo_el_costeo(self):
+        costeo = self.layout.tabla("TablaCosteo")
+        libro = EvaluadorLibro(load_workbook(self.ruta))
+        formula = libro.wb["COSTOS_INDIRECTOS"]["D5"].value
+        self.assertIn(costeo.rango("Volumen Mes"), formula)
+
+        sede = config.SEDES[0]
+        esperado = sum(
+            libro.valor("COSTEO_SERVICIOS", f"E{fila}") * libro.valor("COSTEO_SERVICIOS", f"K{fila}")
+            for fila in range(costeo.primera_fila, costeo.ultima_fila + 1)
+            if libro.valor("COSTEO_SERVICIOS", f"C{fila}") == sede
+        )
+        self.assertGreater(esperado, 0)
+        self.assertAlmostEqual(libro.valor("COSTOS_INDIRECTOS", "D5"), esperado, places=4)
+
+
+class TestAgregadorProduccion(unittest.TestCase):
+    """Agregado de PRODUCCION por (servicio, sede) que lee COSTEO_SERVICIOS"""
+
+    REGISTROS = [
+        {'servicio': "Consulta", 'sede': "Norte", 'cantidad': 1, 'valor_unitario': 100},
+        {'servicio': "Consulta", 'sede': "Sur", 'cantidad': 2, 'valor_unitario': 50},
+        {'servicio': "Consulta", 'sede': "Norte", 'cantidad': 3, 'valor_unitario': 300},
+        {'servicio': "Otro", 'sede': "Norte", 'cantidad': 5, 'valor_unitario': 10},
+    ]
+
+    def _agregar(self, tamano_bloque):
+        agregador = AgregadorProduccion(tamano_bloque)
+        consumidos = list(agregador.acumular(iter(self.REGISTROS)))
+        self.assertEqual(consumidos, self.REGISTROS)
+        return agregador.resultado(["Consulta", "Eco"], ["Norte", "Sur"])
+
+    def test_orden_de_costeo_y_pares_extra_al_final(self):
+        agregado = self._agregar(100)
+        self.assertEqual(list(agregado.index), [
+            ("Consulta", "Norte"), ("Consulta", "Sur"), ("Eco", "Norte"), ("Eco", "Sur"), ("Otro", "Norte")
+        ])
+        self.assertEqual(agregado.loc[("Eco", "Sur"), 'volumen'], 0)
+        self.assertEqual(agregado.loc[("Eco", "Sur"), 'precio'], 0)
+
+    def test_precio_ponderado_por_cantidad(self):
+        fila = self._agregar(100).loc[("Consulta", "Norte")]
+        self.assertEqual(fila['volumen'], 4)
+        self.assertEqual(fila['facturado'], 1000)
+        self.assertEqual(fila['precio'], 250)
+
+    def test_bloques_no_cambian_el_resultado(self):
+        self.assertTrue(self._agregar(1).equals(self._agregar(100)))
+
+    def test_sin_registros(self):
+        agregado = AgregadorProduccion().resultado(["Consulta"], ["Norte"])
+        self.assertEqual(agregado.loc[("Consulta", "Norte")].tolist(), [0, 0, 0])
+
+
+class TestAlmacenSQL(unittest.TestCase):
+    """PRODUCCION y PRODUCCION_AGREGADA leídas del almacén SQLite"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.almacen = AlmacenSQL(os.path.join(self.tmp.name, "tdabc.sqlite"))
+        self.addCleanup(self.almacen.cerrar)
+
+    def test_agregado_sql_igual_al_agregador(self):
+        registros = TestAgregadorProduccion.REGISTROS
+        self.almacen.guardar_produccion(registros, "2025-01")
+        agregador = AgregadorProduccion()
+        list(agregador.acumular(registros))
+        esperado = agregador.resultado(["Consulta", "Eco"], ["Norte", "Sur"])
+        agregado = self.almacen.produccion_agregada("2025-01", ["Consulta", "Eco"], ["Norte", "Sur"])
+        self.assertEqual(list(agregado.index), list(esperado.index))
+        self.assertEqual(agregado.to_numpy().tolist(), esperado.to_numpy().tolist())
+
+    def test_periodos_separados(self):
+        self.almacen.guardar_produccion([{'servicio': "Consulta", 'sede': "Norte", 'cantidad': 1,
+                                          'valor_unitario': 100}], "2025-01")
+        self.almacen.guardar_produccion([{'servicio': "Consulta", 'sede': "Norte", 'cantidad': 2,
+                                          'valor_unitario': 100}], "2025-02")
+        self.almacen.guardar_produccion([], "2025-01")  # Reemplaza solo enero
+        self.assertEqual(self.almacen.periodos("produccion"), ["2025-02"])
+        self.assertEqual([r['cantidad'] for r in self.almacen.iterar_produccion("2025-02")], [2])
+
+    def test_periodo_de_la_fecha_de_cita(self):
+        """Test: lo importado va al mes de su Fecha Cita; sin fecha hace falta el periodo"""
+        ruta = os.path.join(self.tmp.name, "citas.csv")
+        pd.DataFrame({
+            'codigo_servicio': ['890201', '890201', '890301'], 'servicio': ['Consulta', 'Consulta', 'Eco'],
+            'Sede': ['Norte'] * 3, 'entidad': ['EPS1'] * 3, 'Valor Servicio': [100, 100, 80],
+            'Fecha Cita': ['2024-11-03', '2024-12-15', '05/12/2024'],
+        }).to_csv(ruta, index=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(ModeloTDABC._preparar_almacen(self.almacen, ruta), "2024-12")
+        self.assertEqual(self.almacen.periodos("produccion"), ["2024-11", "2024-12"])
+        self.assertEqual(sorted(r['servicio'] for r in self.almacen.iterar_produccion("2024-12")),
+                         ['Consulta', 'Eco'])
+
+        sin_fecha = [{'servicio': "Consulta", 'sede': "Norte", 'cantidad': 1, 'valor_unitario': 100}]
+        with self.assertRaises(ValueError):
+            self.almacen.guardar_produccion([{**sin_fecha[0], 'periodo': "2024-11"}] + sin_fecha)
+        self.assertEqual(len(list(self.almacen.iterar_produccion("2024-11"))), 1)  # Nada a medias
+
+    def test_libro_desde_almacen(self):
+        """Test: la simulación no se guarda y un periodo guardado se regenera sin datos de origen"""
+        wb_normal = generar_libro(os.path.join(self.tmp.name, "normal.xlsx"))
+        wb_almacen = generar_libro(os.path.join(self.tmp.name, "almacen.xlsx"),
+                                   almacen=self.almacen, periodo="2025-09",
+                                   datos_reales_path=os.path.join(self.tmp.name, "no_existe.csv"))
+        for nombre in wb_normal.sheetnames:
+            self.assertEqual(list(wb_normal[nombre].iter_rows(values_only=True)),
+                             list(wb_almacen[nombre].iter_rows(values_only=True)), nombre)
+        self.assertEqual(self.almacen.periodos("produccion"), [])
+        self.assertEqual(self.almacen.consultar("SELECT COUNT(*) AS n FROM ecuaciones")['n'][0],
+                         sum(len(lineas) for lineas in ECUACIONES_SERVICIOS.values()))
+
+        # La misma producción, guardada como si viniera de una importación
+        random.seed(2024)
+        generar_personal_nomina(config.GRUPOS_OCUPACIONALES, config.SEDES)
+        self.almacen.guardar_produccion(produccion._generar_datos_simulados(), "2025-09")
+        random.seed(1)  # La producción histórica no depende de la simulación
+        with mock.patch.object(self.almacen, "ecuaciones_tiempo", wraps=self.almacen.ecuaciones_tiempo) as leidas:
+            wb_historico = generar_libro(os.path.join(self.tmp.name, "historico.xlsx"), almacen=self.almacen)
+        leidas.assert_called_once_with()
+        for nombre in ("PRODUCCION", "PRODUCCION_AGREGADA", "SERVICIOS", "ECUACIONES_TIEMPO", "COSTEO_SERVICIOS"):
+            self.assertEqual(list(wb_normal[nombre].iter_rows(values_only=True)),
+                             list(wb_historico[nombre].iter_rows(values_only=True)), nombre)
+
+        # Códigos del catálogo de la configuración, no de la posición en las ecuaciones
+        codigos = {s['nombre']: s['codigo'] for s in config._mapper.get_servicios_completos()}
+        guardados = self.almacen.consultar("SELECT DISTINCT servicio, codigo_servicio FROM ecuaciones")
+        self.assertEqual(dict(guardados.itertuples(index=False, name=None)),
+                         {servicio: codigos[servicio] for servicio in ECUACIONES_SERVICIOS})
+        self.assertEqual(wb_historico["COSTEO_SERVICIOS"]["A5"].value, codigos[config.SERVICIOS[0]])
+
+    def test_nomina_desde_almacen(self):
+        """Test: la nómina guardada del periodo reemplaza a la simulada, por cargo y sede"""
+        sede = config.SEDES[0]
+        self.almacen.guardar_produccion(TestAgregadorProduccion.REGISTROS, "2025-09")
+        self.almacen.guardar_nomina(pd.DataFrame({
+            'cargo': ["Enfermero", "Enfermero", "Médico General"], 'sede': [sede] * 3,
+            'salario': [2000000, 3000000, 5000000]}), "2025-09")
+        self.assertEqual(self.almacen.costo_nomina_por_cargo("2025-09"),
+                         {"Enfermero": 5000000, "Médico General": 5000000})
+        wb = generar_libro(os.path.join(self.tmp.name, "nomina.xlsx"), almacen=self.almacen, modo="valores")
+        filas = [fila[1:3] + fila[5:8:2] for fila in wb["NOMINA"].iter_rows(min_row=4, max_row=5, values_only=True)]
+        self.assertEqual(filas, [("Enfermero", 2500000, 2, sede), ("Médico General", 5000000, 1, sede)])
+
+
+class TestEscritorHoja(unittest.TestCase):
+    """Tests para el escritor fila por fila"""
+
+    def test_rellena_filas_saltadas(self):
+        wb = Workbook()
+        hoja = EscritorHoja(wb, "PRUEBA")
+        hoja.agregar(1, ["titulo"])
+        hoja.agregar(4, {'B': Celda(10, "input", '$#,##0')})
+        hoja.cerrar()
+
+        self.assertEqual(hoja.ws['A1'].value, "titulo")
+        self.assertEqual(hoja.ws['B4'].value, 10)
+        self.assertEqual(hoja.ws['B4'].number_format, '$#,##0')
+        self.assertIsNone(hoja.ws['A4'].value)
+
+    def test_rechaza_filas_fuera_de_orden(self):
+        wb = Workbook()
+        hoja = EscritorHoja(wb, "PRUEBA")
+        hoja.agregar(3, ["a"])
+        with self.assertRaises(ValueError):
+            hoja.agregar(2, ["b"])
+
+
+class TestEstilosConNombre(unittest.TestCase):
+    """Las celdas deben referenciar los NamedStyle registrados en el libro"""
+
+    def test_registro_idempotente(self):
+        wb = Workbook()
+        EscritorHoja(wb, "A")
+        total = len(wb.named_styles)
+        EscritorHoja(wb, "B")
+        self.assertIn("calculo_moneda", wb.named_styles)
+        self.assertEqual(len(wb.named_styles), total)
+
+    def test_celdas_usan_estilo_registrado(self):
+        wb = Workbook()
+        hoja = EscritorHoja(wb, "PRUEBA")
+        hoja.agregar(1, [
+            Celda("Grupo", "header"),
+            Celda(1500, "resultado", '$#,##0'),
+            Celda(0.25, "calculo", '0.00%'),
+        ])
+        hoja.cerrar()
+
+        self.assertEqual(hoja.ws['A1'].style, "header")
+        self.assertEqual(hoja.ws['B1'].style, "resultado_moneda")
+        self.assertEqual(hoja.ws['B1'].number_format, '$#,##0')
+        # Formato sin estilo propio: se aplica sobre el estilo base
+        self.assertEqual(hoja.ws['C1'].style, "calculo")
+        self.assertEqual(hoja.ws['C1'].number_format, '0.00%')
+
+
+class TestConfiguracionPorEmpresa(unittest.TestCase):
+    """Cada empresa se genera con su configuración en memoria, sin tocar la del proceso ni src/config"""
+
+    EJEMPLO = os.path.join(os.path.dirname(__file__), "..", "ejemplos", "clinica_dental.json")
+    CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "config")
+
+    @staticmethod
+    def _textos(wb):
+        return {celda.value for ws in wb.worksheets for fila in ws.iter_rows() for celda in fila
+                if isinstance(celda.value, str)}
+
+    def _archivos_config(self):
+        contenido = {}
+        for nombre in sorted(os.listdir(self.CONFIG_DIR)):
+            with open(os.path.join(self.CONFIG_DIR, nombre), "rb") as f:
+                contenido[nombre] = f.read()
+        return contenido
+
+    def test_snapshot_desde_empresa(self):
+        snapshot = config.ConfigSnapshot.desde_empresa(self.EJEMPLO)
+        self.assertEqual(snapshot.NOMBRE_EMPRESA, "Mi Clínica S.A.S.")
+        self.assertEqual(snapshot.SEDES, ["Sede Principal"])
+        self.assertEqual(len(snapshot.SERVICIOS), 2)
+        self.assertNotEqual(config.SEDES, snapshot.SEDES)
+
+    def test_empresa_invalida(self):
+        with self.assertRaises(ValueError):
+            config.ConfigSnapshot.desde_empresa({"empresa": {}, "servicios": []})
+
+    def test_lote_en_un_proceso(self):
+        with open(self.EJEMPLO, encoding="utf-8") as f:
+            empresa = json.load(f)
+        otra = json.loads(json.dumps(empresa))
+        otra["empresa"]["nombre_empresa"] = "Otra Clínica Ltda."
+        otra["centros"] = [{"nombre": "Sede Norte", "ciudad": "Cali", "salas": 2},
+                           {"nombre": "Sede Sur", "ciudad": "Cali", "salas": 1}]
+        antes = self._archivos_config()
+        sedes = list(config.SEDES)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            entrada = os.path.join(tmp, "empresas")
+            os.mkdir(entrada)
+            for nombre, datos in (("a_dental", empresa), ("b_otra", otra)):
+                with open(os.path.join(entrada, nombre + ".json"), "w", encoding="utf-8") as f:
+                    json.dump(datos, f, ensure_ascii=False)
+            random.seed(2024)
+            with contextlib.redirect_stdout(io.StringIO()):
+                rutas = generar_empresas(entrada, os.path.join(tmp, "salida"))
+
+            self.assertEqual([r.name for r in rutas],
+                             ["Modelo_TDABC_a_dental.xlsx", "Modelo_TDABC_b_otra.xlsx"])
+            dental, otra_wb = (load_workbook(r) for r in rutas)
+            self.assertIn("Mi Clínica", dental["PARAMETROS"]["A1"].value)
+            self.assertIn("Otra Clínica", otra_wb["PARAMETROS"]["A1"].value)
+            self.assertIn("Sede Principal", self._textos(dental))
+            self.assertNotIn("Sede Norte", self._textos(dental))
+            self.assertTrue({"Sede Norte", "Sede Sur"} <= self._textos(otra_wb))
+
+        self.assertEqual(config.SEDES, sedes)
+        self.assertEqual(self._archivos_config(), antes)
+
+    def test_lote_con_procesos_y_manifiesto(self):
+        """Test: las empresas válidas se generan en el pool y la inválida queda en el manifiesto"""
+        with tempfile.TemporaryDirectory() as tmp:
+            entrada = os.path.join(tmp, "empresas")
+            salida = os.path.join(tmp, "salida")
+            os.mkdir(entrada)
+            with open(self.EJEMPLO, encoding="utf-8") as f:
+                ejemplo = f.read()
+            for nombre, texto in (("a.json", ejemplo), ("b.json", '{"empresa": {}}'), ("c.json", ejemplo)):
+                with open(os.path.join(entrada, nombre), "w", encoding="utf-8") as f:
+                    f.write(texto)
+            with contextlib.redirect_stdout(io.StringIO()):
+                manifiesto = generar_lote(entrada, salida, procesos=2, streaming=True)
+
+            self.assertEqual((manifiesto["exitosas"], manifiesto["fallidas"]), (2, 1))
+            a, b, c = manifiesto["empresas"]
+            self.assertEqual([a["empresa"], b["empresa"], c["empresa"]], ["a.json", "b.json", "c.json"])
+            self.assertIn("ValueError", b["error"])
+            self.assertIsNone(b["archivo"])
+            self.assertEqual(a["filas"]["PARAMETROS"], load_workbook(a["archivo"])["PARAMETROS"].max_row)
+            self.assertGreater(c["filas"]["PRODUCCION"], 1)
+            with open(os.path.join(salida, MANIFIESTO), encoding="utf-8") as f:
+                self.assertEqual(json.load(f), manifiesto)
+            # Solo los dos modelos y el manifiesto: ni temporales ni el de la empresa fallida
+            self.assertEqual(sorted(os.listdir(salida)),
+                             ["Modelo_TDABC_a.xlsx", "Modelo_TDABC_c.xlsx", MANIFIESTO])
+
+
+if __name__ == '__main__':
+    unittest.main()